@@ -4,7 +4,7 @@ import { Form, Select, DatePicker, Input, Upload, Button, Row, Col } from "antd"
 import { UploadOutlined } from "@ant-design/icons";
 import dayjs from "dayjs";
 import { getLeaveTypeOptions, onMasterDataChange } from "@/app/lib/masterData";
-import { apiRequest } from "@/app/lib/api";
+import { apiRequest, openAttachment } from "@/app/lib/api";
 import { toast } from "react-hot-toast";
 
 interface ApplyLeaveTabProps {
@@ -315,6 +315,10 @@ export default function ApplyLeaveTab({
                         {(file.file_url || file.file_path) && (
                           <a 
                             href={file.file_url || file.file_path} 
+                            onClick={(e) => {
+                              e.preventDefault();
+                              openAttachment(file.file_url || file.file_path).catch((err) => toast.error(err.message));
+                            }}
                             target="_blank" 
                             rel="noopener noreferrer"
                             className="text-blue-600 hover:text-blue-800 text-sm font-medium"
@@ -516,6 +520,10 @@ export default function ApplyLeaveTab({
                   {(file.file_url || file.file_path) && (
                     <a 
                       href={file.file_url || file.file_path} 
+                      onClick={(e) => {
+                        e.preventDefault();
+                        openAttachment(file.file_url || file.file_path).catch((err) => toast.error(err.message));
+                      }}
                       target="_blank" 
                       rel="noopener noreferrer"
                       className="text-blue-600 hover:text-blue-800 text-sm"
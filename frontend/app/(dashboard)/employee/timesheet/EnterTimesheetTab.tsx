@@ -5,7 +5,7 @@ import { UploadOutlined, CalendarOutlined } from "@ant-design/icons";
 import dayjs from "dayjs";
 import { toast } from "react-hot-toast";
 import { useRouter, usePathname } from "next/navigation";
-import { apiRequest } from "@/app/lib/api";
+import { apiRequest, openAttachment } from "@/app/lib/api";
 import { getTaskTypeOptions, getWorkLocationOptions, getEpicOptions, getProductOptions, getActivityOptions } from "@/app/lib/masterData";
 import { getRoleBase, buildRoleHref } from "@/app/lib/paths";
 import type { TaskApiData } from "@/app/types/api";
@@ -2116,6 +2116,10 @@ export default function EnterTimesheetTab({
                   {(file.file_url || file.file_path) && (
                     <a 
                       href={file.file_url || file.file_path} 
+                      onClick={(e) => {
+                        e.preventDefault();
+                        openAttachment(file.file_url || file.file_path).catch((err) => toast.error(err.message));
+                      }}
                       target="_blank" 
                       rel="noopener noreferrer"
                       className="text-blue-600 hover:text-blue-800 text-sm"
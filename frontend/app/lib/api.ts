@@ -190,3 +190,47 @@ export async function fetchAndCacheMasterData(token?: string) {
 }
 
 
+
+// Timesheet entry / leave application files are only served by the access-checked
+// download endpoint, which needs the bearer token: fetch the file and open a local copy
+export async function openAttachment(url: string, token?: string) {
+  if (typeof window === 'undefined' || !url) return;
+  if (!url.startsWith('/api/')) {
+    window.open(url, '_blank', 'noopener,noreferrer');
+    return;
+  }
+
+  // Open the tab now, while the click still counts as a user gesture for popup blockers
+  const tab = window.open('', '_blank');
+  try {
+    const rawBase = (process.env.NEXT_PUBLIC_BASE_URL || process.env.NEXT_PUBLIC_API_BASE_URL || '')
+      .trim()
+      .replace(/^['"]|['"]$/g, '');
+    const authToken = token || (await import('./auth/storage')).getUserFromStorage()?.accessToken;
+    const res = await fetch(new URL(url, rawBase).toString(), {
+      headers: authToken ? { Authorization: `Bearer ${authToken}` } : {},
+    });
+    if (!res.ok) {
+      let errorMessage = "Failed to open attachment";
+      try {
+        const errorData = await res.json() as { detail?: string };
+        errorMessage = errorData.detail || errorMessage;
+      } catch {
+        errorMessage = res.statusText || errorMessage;
+      }
+      throw new ApiError(errorMessage, res.status);
+    }
+    const objectUrl = URL.createObjectURL(await res.blob());
+    if (tab) {
+      tab.location.href = objectUrl;
+    } else {
+      window.open(objectUrl, '_blank');
+    }
+    // The opened tab has loaded the file by then
+    setTimeout(() => URL.revokeObjectURL(objectUrl), 60000);
+  } catch (error) {
+    tab?.close();
+    if (error instanceof ApiError) throw error;
+    throw new ApiError("Network error occurred");
+  }
+}
@@ -105,6 +105,9 @@ export interface AttachmentApiData {
   file_name: string;
   file_path: string;
   file_url?: string;
+  preview_status?: 'PENDING' | 'READY' | 'FAILED' | null;
+  thumbnail_url?: string | null;
+  preview_url?: string | null;
   file_type: string;
   file_size: string;
   purpose: string;
@@ -2,11 +2,11 @@ import { getActivities, getOutdoorActivities } from '../models/activityModel.js'
 
 export async function fetchActivity(req, res) {
   try {
-    const { parent_type, parent_code, limit, offset } = req.query;
+    const { parent_type, parent_code, limit, offset, before_id } = req.query;
     if (!parent_type || !parent_code) {
       return res.status(400).json({ success_flag: false, message: 'parent_type and parent_code are required' });
     }
-    const items = await getActivities(parent_type, parent_code, Number(limit) || 100, Number(offset) || 0);
+    const items = await getActivities(parent_type, parent_code, Number(limit) || 100, Number(offset) || 0, before_id);
     return res.status(200).json({ success_flag: true, data: items, message: 'Activities retrieved successfully', status_code: 200, status_message: 'OK' });
   } catch (error) {
     console.error('fetchActivity error', error);
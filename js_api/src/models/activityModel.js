@@ -1,7 +1,12 @@
 import { pool } from '../config/db.js';
 import { config } from '../config/env.js';
 
-export async function getActivities(parentType, parentCode, limit = 100, offset = 0) {
+/**
+ * Get the activity feed of an epic or task, newest first.
+ * Pass beforeId (the activity_id of the last row already shown) to page by keyset;
+ * offset is kept for older clients.
+ */
+export async function getActivities(parentType, parentCode, limit = 100, offset = 0, beforeId = null) {
   const type = String(parentType || '').toUpperCase();
   const code = Number(parentCode);
   if (!code || (type !== 'EPIC' && type !== 'TASK')) {
@@ -21,8 +26,13 @@ export async function getActivities(parentType, parentCode, limit = 100, offset
     where += ` AND entity_code = $${params.length}`;
   }
 
+  if (beforeId) {
+    params.push(Number(beforeId));
+    where += ` AND (created_at, activity_id) < (SELECT created_at, id FROM sts_ts.activity_feed WHERE id = $${params.length})`;
+  }
+
   params.push(limit);
-  params.push(offset);
+  params.push(beforeId ? 0 : offset);
 
   const query = `
     SELECT
@@ -44,10 +54,11 @@ export async function getActivities(parentType, parentCode, limit = 100, offset
       created_by_name,
       assignee_name,
       formatted_time,
-      time_ago
+      time_ago,
+      activity_id
     FROM sts_ts.view_recent_activities
     ${where}
-    ORDER BY created_at DESC
+    ORDER BY created_at DESC, activity_id DESC
     LIMIT $${params.length - 1} OFFSET $${params.length};
   `;
 
@@ -151,7 +162,8 @@ export async function getOutdoorActivities(filters = {}, limit = 100, offset = 0
 
       // Construct file_url for each attachment
       attachments = attachments.map((att) => {
-        const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+        // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+        const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
         const fileServerBase = config.FILE_SERVER_BASE_URL;
         let fileUrl = '';
 
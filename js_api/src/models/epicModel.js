@@ -295,7 +295,8 @@ export const getEpics = async (filters = {}, limit = 100, offset = 0) => {
         // Construct file_url for each attachment
         attachments = attachments.map((att) => {
           // Extract filename from file_path (e.g., "/var/www/fileServer/abc123.xlsx" -> "abc123.xlsx")
-          const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+          // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+          const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
           // Construct file URL using configured file server base URL
           const fileServerBase = config.FILE_SERVER_BASE_URL;
           let fileUrl = '';
@@ -550,7 +551,8 @@ export const getEpicById = async (epic_id) => {
       // Construct file_url for each attachment
       attachments = attachments.map((att) => {
         // Extract filename from file_path (e.g., "/var/www/fileServer/abc123.xlsx" -> "abc123.xlsx")
-        const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+        // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+        const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
         // Construct file URL using configured file server base URL
         const fileServerBase = config.FILE_SERVER_BASE_URL;
         // Ensure base URL ends with / and add filename
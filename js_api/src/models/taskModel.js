@@ -148,7 +148,8 @@ export const getTasks = async (filters = {}, limit = 100, offset = 0) => {
       
       // Construct file_url for each attachment
       attachments = attachments.map((att) => {
-        const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+        // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+        const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
         // Construct file URL using configured file server base URL
         const fileServerBase = config.FILE_SERVER_BASE_URL;
         let fileUrl = '';
@@ -235,7 +236,8 @@ export const getTaskById = async (task_id) => {
     // Construct file_url for each attachment
     attachments = attachments.map((att) => {
       // Extract filename from file_path (e.g., "/var/www/fileServer/abc123.xlsx" -> "abc123.xlsx")
-      const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+      // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+      const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
       // Construct file URL using configured file server base URL
       const fileServerBase = config.FILE_SERVER_BASE_URL;
       const fileUrl = fileNameFromPath ? `${fileServerBase}/${fileNameFromPath}` : '';
@@ -438,6 +440,9 @@ export const getSubtaskById = async (subtask_id) => {
           file_name,
           file_path,
           file_url,
+          preview_status,
+          thumbnail_url,
+          preview_url,
           file_type,
           file_size,
           purpose,
@@ -452,7 +457,8 @@ export const getSubtaskById = async (subtask_id) => {
       
       // Construct file_url for each attachment
       attachments = attachments.map((att) => {
-        const fileNameFromPath = att.file_path ? att.file_path.split('/').pop() : '';
+        // Path under the file server root: the file name, or blobs/ab/cd/<sha256>.<ext> for files stored by content
+        const fileNameFromPath = att.file_path ? att.file_path.split('/').slice(att.file_path.includes('/blobs/') ? -4 : -1).join('/') : '';
         const fileServerBase = config.FILE_SERVER_BASE_URL;
         const fileUrl = fileNameFromPath ? `${fileServerBase}/${fileNameFromPath}` : '';
         
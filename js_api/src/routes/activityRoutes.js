@@ -3,7 +3,7 @@ import { fetchActivity, fetchOutdoorActivities } from '../controllers/activityCo
 
 const router = Router();
 
-// GET /api/v1/timesheet/get_activity?parent_type=EPIC|TASK&parent_code=ID&limit=&offset=
+// GET /api/v1/timesheet/get_activity?parent_type=EPIC|TASK&parent_code=ID&limit=&offset=&before_id=
 router.get('/get_activity', fetchActivity);
 
 // GET /api/v1/timesheet/get_outdoor_activities?product_code=&is_billable=&created_by=&created_at_from=&created_at_to=&limit=&offset=
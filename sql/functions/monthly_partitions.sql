@@ -0,0 +1,116 @@
+-- Functions: monthly range partitions
+
+-- sts_ts.timesheet_entry (by entry_date) and sts_ts.timesheet_approval_hist (by created_at)
+-- are partitioned by month. Each partition is named <table>_pYYYYMM; rows outside every
+-- monthly partition (undated drafts, far-off dates) go to <table>_default.
+-- ts_db_apis/partition_maintenance.py keeps the coming months created, at API startup
+-- and from cron.
+
+-- DROP FUNCTION IF EXISTS sts_ts.create_monthly_partition(regclass, date, text);
+
+CREATE OR REPLACE FUNCTION sts_ts.create_monthly_partition(
+    parent_table regclass,
+    month_start date,
+    partition_primary_key text DEFAULT NULL)
+    RETURNS boolean
+    LANGUAGE 'plpgsql'
+AS $BODY$
+-- Create the partition of parent_table for the month of month_start; false if it exists.
+-- Rows for that month already sitting in the default partition are moved into it.
+-- partition_primary_key gives each partition its own primary key, for tables whose
+-- primary key cannot include the (nullable) partition column.
+DECLARE
+    range_start date := date_trunc('month', month_start)::date;
+    range_end date := (date_trunc('month', month_start) + interval '1 month')::date;
+    parent_schema text;
+    parent_name text;
+    partition_name text;
+    key_column text;
+    default_partition regclass;
+BEGIN
+    SELECT n.nspname, c.relname
+    INTO parent_schema, parent_name
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent_table;
+
+    partition_name := parent_name || '_p' || to_char(range_start, 'YYYYMM');
+    IF to_regclass(format('%I.%I', parent_schema, partition_name)) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+
+    SELECT a.attname
+    INTO key_column
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = parent_table;
+    IF key_column IS NULL THEN
+        RAISE EXCEPTION '% is not a partitioned table', parent_table;
+    END IF;
+
+    SELECT i.inhrelid::regclass
+    INTO default_partition
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = parent_table
+      AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT';
+
+    -- Built standalone and attached, so rows can be moved out of the default partition first
+    -- (CREATE TABLE ... PARTITION OF fails if the default partition holds rows for the range)
+    EXECUTE format('CREATE TABLE %I.%I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)',
+                   parent_schema, partition_name, parent_table);
+
+    IF default_partition IS NOT NULL THEN
+        EXECUTE format('WITH moved AS (DELETE FROM %s WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I.%I SELECT * FROM moved',
+                       default_partition, key_column, key_column, parent_schema, partition_name)
+        USING range_start, range_end;
+    END IF;
+
+    IF partition_primary_key IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE %I.%I ADD CONSTRAINT %I PRIMARY KEY (%s)',
+                       parent_schema, partition_name, partition_name || '_pkey', partition_primary_key);
+    END IF;
+
+    -- Attaching creates the parent's indexes and foreign keys on the partition
+    EXECUTE format('ALTER TABLE %s ATTACH PARTITION %I.%I FOR VALUES FROM (%L) TO (%L)',
+                   parent_table, parent_schema, partition_name, range_start, range_end);
+
+    RAISE NOTICE 'Created partition %.% for % to %', parent_schema, partition_name, range_start, range_end;
+    RETURN true;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.create_monthly_partition(regclass, date, text)
+    OWNER TO sts_ts;
+
+-- DROP FUNCTION IF EXISTS sts_ts.ensure_monthly_partitions(regclass, integer, integer, text);
+
+CREATE OR REPLACE FUNCTION sts_ts.ensure_monthly_partitions(
+    parent_table regclass,
+    months_back integer,
+    months_ahead integer,
+    partition_primary_key text DEFAULT NULL)
+    RETURNS integer
+    LANGUAGE 'plpgsql'
+AS $BODY$
+-- Make sure partitions exist from months_back months before the current month to
+-- months_ahead months after it. Returns how many were created.
+DECLARE
+    this_month date := date_trunc('month', CURRENT_DATE)::date;
+    created integer := 0;
+    month_offset integer;
+BEGIN
+    -- Serialize concurrent callers (every API worker runs this at startup)
+    PERFORM pg_advisory_xact_lock(parent_table::oid::bigint);
+
+    FOR month_offset IN -months_back .. months_ahead LOOP
+        IF sts_ts.create_monthly_partition(parent_table, (this_month + make_interval(months => month_offset))::date, partition_primary_key) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.ensure_monthly_partitions(regclass, integer, integer, text)
+    OWNER TO sts_ts;
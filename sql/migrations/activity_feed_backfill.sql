@@ -0,0 +1,32 @@
+-- Migration: move the recent activities feed onto sts_ts.activity_feed
+
+-- view_recent_activities used to derive every event from epic_hist, task_hist,
+-- subtask_hist and comments on each read. The API now appends the events to
+-- sts_ts.activity_feed when it makes the change, and the view reads that table.
+--
+-- Run in this order:
+--   1. sql/tables/activity_feed.sql
+--   2. this file, while the old view definition is still installed
+--   3. sql/views/view_recent_activities.sql
+--
+-- The backfill copies what the old view shows. Only events older than the first one
+-- the API has already written are copied, so it is safe to run after the new code is live.
+
+BEGIN;
+
+INSERT INTO sts_ts.activity_feed (
+    activity_type, entity_type, entity_code, epic_code, task_id,
+    status_desc, assignee, activity_description, created_by, created_at
+)
+SELECT
+    ra.activity_type, ra.entity_type, ra.entity_code, ra.epic_code, ra.task_id,
+    ra.status_desc, ra.assignee, ra.activity_description, ra.created_by, ra.created_at
+FROM sts_ts.view_recent_activities ra
+WHERE ra.created_at IS NOT NULL
+  AND ra.created_at < (SELECT COALESCE(min(af.created_at), 'infinity'::timestamp) FROM sts_ts.activity_feed af)
+ORDER BY ra.created_at, ra.entity_type, ra.entity_code;
+
+-- The new definition changes column types, so it cannot replace the old one in place
+DROP VIEW IF EXISTS sts_ts.view_recent_activities;
+
+COMMIT;
@@ -0,0 +1,38 @@
+-- Migration: content-addressed attachment storage
+
+-- Uploads are now stored once per SHA-256 in sts_ts.attachment_blobs (files under
+-- <upload_dir>/blobs/), and sts_ts.attachments rows point at their blob through
+-- blob_sha256. Rows uploaded before keep blob_sha256 NULL and their own file.
+--
+-- Run with psql from this directory before deploying the API:
+--   psql -v ON_ERROR_STOP=1 -f attachment_blobs.sql
+-- Then schedule the cleanup of unreferenced blobs, e.g. daily:
+--   python ts_db_apis/blob_store.py
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+\ir ../tables/attachment_blobs.sql
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    ADD COLUMN IF NOT EXISTS blob_sha256 character(64) COLLATE pg_catalog."default";
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    DROP CONSTRAINT IF EXISTS fk_attachments_blob_sha256;
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    ADD CONSTRAINT fk_attachments_blob_sha256 FOREIGN KEY (blob_sha256)
+        REFERENCES sts_ts.attachment_blobs (sha256) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION;
+
+CREATE INDEX IF NOT EXISTS idx_attachments_blob_sha256
+    ON sts_ts.attachments USING btree
+    (blob_sha256 COLLATE pg_catalog."default" ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE blob_sha256 IS NOT NULL;
+
+\ir ../triggers/attachment_blob_refcount.sql
+
+COMMIT;
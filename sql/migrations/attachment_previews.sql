@@ -0,0 +1,55 @@
+-- Migration: thumbnails and previews for image attachments
+
+-- Image attachments get a small thumbnail and a web-sized preview, generated in the
+-- background by the API's preview workers (ts_db_apis/image_previews.py). The files are
+-- stored next to the original and recorded on the sts_ts.attachments row. New image rows
+-- are queued by trg_attachments_preview_queue.
+--
+-- Run with psql from this directory before deploying the API:
+--   psql -v ON_ERROR_STOP=1 -f attachment_previews.sql
+-- Then queue the images uploaded before (the running API generates them):
+--   python ts_db_apis/image_previews.py
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    ADD COLUMN IF NOT EXISTS preview_status character varying(20) COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS thumbnail_path text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS thumbnail_url text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS preview_path text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS preview_url text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS previews_generated_at timestamp without time zone;
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    DROP CONSTRAINT IF EXISTS chk_attachments_preview_status;
+
+ALTER TABLE IF EXISTS sts_ts.attachments
+    ADD CONSTRAINT chk_attachments_preview_status CHECK (preview_status IS NULL OR (preview_status::text = ANY (ARRAY['PENDING'::character varying, 'READY'::character varying, 'FAILED'::character varying]::text[])));
+
+COMMENT ON COLUMN sts_ts.attachments.preview_status
+    IS 'Thumbnail / preview generation for image attachments (image_previews.py): PENDING, READY or FAILED. NULL for other files.';
+
+COMMENT ON COLUMN sts_ts.attachments.thumbnail_url
+    IS 'Small JPEG for attachment lists, stored next to the file (READY rows only)';
+
+COMMENT ON COLUMN sts_ts.attachments.preview_url
+    IS 'Web-sized JPEG for viewing the image without the original, stored next to the file (READY rows only)';
+
+CREATE INDEX IF NOT EXISTS idx_attachments_preview_pending
+    ON sts_ts.attachments USING btree
+    (id ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE preview_status::text = 'PENDING'::text;
+
+\ir ../triggers/attachment_preview_queue.sql
+
+-- Attachment lists expose preview_status, thumbnail_url and preview_url
+
+\ir ../views/view_unified_epic_task.sql
+\ir ../views/view_timesheet_entry.sql
+\ir ../views/view_activities.sql
+\ir ../views/view_leave_application.sql
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Migration: sharded upload directory layout
+
+-- Blobs are now stored under <upload_dir>/blobs/<2 hex digits>/<2 hex digits>/ instead
+-- of one flat directory. Attachments uploaded before the blob store are folded into it.
+-- Each moved file's old path is kept in sts_ts.attachment_relocations so that old
+-- /files URLs redirect to the new location.
+--
+-- Run with psql from this directory before deploying the API:
+--   psql -v ON_ERROR_STOP=1 -f attachment_sharded_layout.sql
+-- Then move the files in batches while the API is running (safe to stop and rerun):
+--   python ts_db_apis/upload_layout.py
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+\ir ../tables/attachment_relocations.sql
+
+COMMIT;
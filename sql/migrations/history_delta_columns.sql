@@ -0,0 +1,45 @@
+-- Migration: store sts_ts.task_hist and sts_ts.epic_hist as deltas with periodic checkpoints
+
+-- Every task/epic change used to copy the whole row into the history table. The API
+-- now writes a full row (checkpoint) for the first change and every 20th one, and in
+-- between only the columns that changed (plus status_code and the event columns);
+-- the other columns stay NULL and changed_columns names the ones the row sets.
+-- See ts_db_apis/history_store.py for the write and reconstruction rules.
+--
+-- Existing rows keep changed_columns NULL and count as checkpoints, so the history
+-- stays readable without touching them. The views read the latest row with a
+-- COALESCE onto the tasks/epics row, which holds the same values, so they need no change.
+--
+-- Run in this order:
+--   1. this file (safe while the old code is live: the new columns have defaults)
+--   2. deploy the API
+--   3. optionally, to reclaim the space of the existing rows, once the activity feed
+--      backfill (activity_feed_backfill.sql) has run, since it derives events from them:
+--        python ts_db_apis/history_store.py
+--      then VACUUM (or pg_repack) both tables.
+
+BEGIN;
+
+ALTER TABLE IF EXISTS sts_ts.task_hist
+    ADD COLUMN IF NOT EXISTS max_hours numeric(6,2),
+    ADD COLUMN IF NOT EXISTS is_checkpoint boolean NOT NULL DEFAULT true,
+    ADD COLUMN IF NOT EXISTS changed_columns text[] COLLATE pg_catalog."default";
+
+ALTER TABLE IF EXISTS sts_ts.epic_hist
+    ADD COLUMN IF NOT EXISTS max_hours numeric(6,2),
+    ADD COLUMN IF NOT EXISTS is_checkpoint boolean NOT NULL DEFAULT true,
+    ADD COLUMN IF NOT EXISTS changed_columns text[] COLLATE pg_catalog."default";
+
+CREATE INDEX IF NOT EXISTS idx_task_hist_task_code_checkpoint
+    ON sts_ts.task_hist USING btree
+    (task_code ASC NULLS LAST, created_at DESC NULLS FIRST, id DESC NULLS FIRST)
+    TABLESPACE pg_default
+    WHERE is_checkpoint;
+
+CREATE INDEX IF NOT EXISTS idx_epic_hist_epic_code_checkpoint
+    ON sts_ts.epic_hist USING btree
+    (epic_code ASC NULLS LAST, created_at DESC NULLS FIRST, id DESC NULLS FIRST)
+    TABLESPACE pg_default
+    WHERE is_checkpoint;
+
+COMMIT;
@@ -0,0 +1,119 @@
+-- Migration: partition sts_ts.timesheet_entry and sts_ts.timesheet_approval_hist by month
+
+-- Replaces the two unpartitioned tables with the partitioned definitions in sql/tables,
+-- creates a partition for every month that has rows plus the next months, and copies
+-- the rows over. The old tables are kept as *_legacy until the copy has been checked.
+--
+-- Run with psql from this directory, in a maintenance window: both tables are locked
+-- against reads and writes for the length of the copy.
+--   psql -v ON_ERROR_STOP=1 -f timesheet_monthly_partitions.sql
+--
+-- Ids and sequences are kept, so the API and the history rows' entry_id need no change.
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+LOCK TABLE sts_ts.timesheet_entry, sts_ts.timesheet_approval_hist IN ACCESS EXCLUSIVE MODE;
+
+-- 1. Move the current tables aside. Index names are schema-wide, so rename the old
+--    indexes too; the sequences must not be dropped with the legacy tables later.
+
+ALTER TABLE sts_ts.timesheet_approval_hist DROP CONSTRAINT IF EXISTS fk_timesheet_approval_hist_entry_id;
+
+ALTER SEQUENCE timesheet_entry_id_seq OWNED BY NONE;
+ALTER SEQUENCE timesheet_approval_hist_id_seq OWNED BY NONE;
+
+ALTER TABLE sts_ts.timesheet_entry RENAME TO timesheet_entry_legacy;
+ALTER TABLE sts_ts.timesheet_approval_hist RENAME TO timesheet_approval_hist_legacy;
+
+DO $$
+DECLARE
+    index_name text;
+BEGIN
+    FOR index_name IN
+        SELECT ic.relname
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        WHERE i.indrelid IN ('sts_ts.timesheet_entry_legacy'::regclass, 'sts_ts.timesheet_approval_hist_legacy'::regclass)
+    LOOP
+        EXECUTE format('ALTER INDEX sts_ts.%I RENAME TO %I', index_name, index_name || '_legacy');
+    END LOOP;
+END;
+$$;
+
+-- 2. Create the partitioned tables, their default partitions and indexes
+
+\ir ../functions/monthly_partitions.sql
+\ir ../tables/timesheet_entry.sql
+\ir ../tables/timesheet_approval_hist.sql
+\ir ../triggers/timesheet_entry_history_cascade.sql
+
+ALTER SEQUENCE timesheet_entry_id_seq OWNED BY sts_ts.timesheet_entry.id;
+ALTER SEQUENCE timesheet_approval_hist_id_seq OWNED BY sts_ts.timesheet_approval_hist.id;
+
+-- 3. One partition per month that has rows, then the coming months
+
+SELECT sts_ts.create_monthly_partition('sts_ts.timesheet_entry', month::date, 'id')
+FROM generate_series(
+    (SELECT date_trunc('month', min(entry_date)) FROM sts_ts.timesheet_entry_legacy),
+    (SELECT date_trunc('month', max(entry_date)) FROM sts_ts.timesheet_entry_legacy),
+    interval '1 month'
+) AS month;
+
+SELECT sts_ts.create_monthly_partition('sts_ts.timesheet_approval_hist', month::date)
+FROM generate_series(
+    (SELECT date_trunc('month', min(created_at)) FROM sts_ts.timesheet_approval_hist_legacy),
+    (SELECT date_trunc('month', max(created_at)) FROM sts_ts.timesheet_approval_hist_legacy),
+    interval '1 month'
+) AS month;
+
+SELECT sts_ts.ensure_monthly_partitions('sts_ts.timesheet_entry', 0, 3, 'id');
+SELECT sts_ts.ensure_monthly_partitions('sts_ts.timesheet_approval_hist', 0, 3);
+
+-- 4. Copy the rows; each lands in its month's partition (undated drafts in the default one)
+
+INSERT INTO sts_ts.timesheet_entry (
+    id, task_code, epic_code, activity_code, ticket_code, subtask_code, entry_date, user_code,
+    approval_status, actual_hours_worked, travel_time, waiting_time, total_hours, work_location,
+    task_type_code, description, submitted_by, submitted_at, approved_by, approved_at,
+    rejected_by, rejected_at, rejection_reason, created_by, created_at, updated_by, updated_at
+)
+SELECT
+    id, task_code, epic_code, activity_code, ticket_code, subtask_code, entry_date, user_code,
+    approval_status, actual_hours_worked, travel_time, waiting_time, total_hours, work_location,
+    task_type_code, description, submitted_by, submitted_at, approved_by, approved_at,
+    rejected_by, rejected_at, rejection_reason, created_by, created_at, updated_by, updated_at
+FROM sts_ts.timesheet_entry_legacy;
+
+INSERT INTO sts_ts.timesheet_approval_hist (
+    id, entry_id, approval_status, status_reason, entry_user_code, entry_date,
+    task_code, epic_code, activity_code, ticket_code, subtask_code,
+    actual_hours_worked, travel_time, waiting_time, total_hours,
+    submitted_by, submitted_at, approved_by, approved_at, rejected_by, rejected_at,
+    created_by, created_at
+)
+SELECT
+    id, entry_id, approval_status, status_reason, entry_user_code, entry_date,
+    task_code, epic_code, activity_code, ticket_code, subtask_code,
+    actual_hours_worked, travel_time, waiting_time, total_hours,
+    submitted_by, submitted_at, approved_by, approved_at, rejected_by, rejected_at,
+    created_by, created_at
+FROM sts_ts.timesheet_approval_hist_legacy;
+
+-- 5. Views bind to tables, not names: point them at the new tables
+
+\ir ../views/view_timesheet_entry.sql
+\ir ../views/view_my_dashboard.sql
+\ir ../views/view_team_dashboard.sql
+\ir ../views/view_super_admin_dashboard.sql
+
+ANALYZE sts_ts.timesheet_entry;
+ANALYZE sts_ts.timesheet_approval_hist;
+
+COMMIT;
+
+-- 6. Once the counts match and the API works against the new tables:
+-- SELECT (SELECT count(*) FROM sts_ts.timesheet_entry) = (SELECT count(*) FROM sts_ts.timesheet_entry_legacy),
+--        (SELECT count(*) FROM sts_ts.timesheet_approval_hist) = (SELECT count(*) FROM sts_ts.timesheet_approval_hist_legacy);
+-- DROP TABLE sts_ts.timesheet_approval_hist_legacy, sts_ts.timesheet_entry_legacy;
@@ -0,0 +1,65 @@
+-- Table: sts_ts.activity_feed
+
+-- DROP TABLE IF EXISTS sts_ts.activity_feed;
+
+CREATE TABLE IF NOT EXISTS sts_ts.activity_feed
+(
+    id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+    activity_type character varying(30) COLLATE pg_catalog."default" NOT NULL,
+    entity_type character varying(20) COLLATE pg_catalog."default" NOT NULL,
+    entity_code integer NOT NULL,
+    epic_code integer,
+    task_id integer,
+    status_desc character varying(255) COLLATE pg_catalog."default",
+    assignee character varying(50) COLLATE pg_catalog."default",
+    activity_description text COLLATE pg_catalog."default" NOT NULL,
+    details jsonb,
+    created_by character varying(50) COLLATE pg_catalog."default",
+    created_at timestamp without time zone NOT NULL DEFAULT now(),
+    CONSTRAINT activity_feed_pkey PRIMARY KEY (id),
+    CONSTRAINT chk_activity_feed_entity_type CHECK (entity_type::text = ANY (ARRAY['EPIC'::character varying, 'TASK'::character varying, 'SUBTASK'::character varying, 'TIMESHEET_ENTRY'::character varying]::text[]))
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.activity_feed
+    OWNER to sts_ts;
+
+REVOKE ALL ON TABLE sts_ts.activity_feed FROM sukraa_analyst;
+REVOKE ALL ON TABLE sts_ts.activity_feed FROM sukraa_dev;
+
+GRANT ALL ON TABLE sts_ts.activity_feed TO sts_ts;
+
+GRANT SELECT ON TABLE sts_ts.activity_feed TO sukraa_analyst;
+
+GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.activity_feed TO sukraa_dev;
+
+COMMENT ON TABLE sts_ts.activity_feed
+    IS 'Append-only activity events for epics and tasks, written by the API in the same transaction as the change (activity_feed.py). No foreign keys so events outlive deleted tasks.';
+
+COMMENT ON COLUMN sts_ts.activity_feed.details
+    IS 'Changed field with its old and new code, e.g. {"field": "priority_code", "old": 2, "new": 1}';
+-- Index: idx_activity_feed_created_at
+
+-- DROP INDEX IF EXISTS sts_ts.idx_activity_feed_created_at;
+
+CREATE INDEX IF NOT EXISTS idx_activity_feed_created_at
+    ON sts_ts.activity_feed USING btree
+    (created_at DESC, id DESC)
+    TABLESPACE pg_default;
+-- Index: idx_activity_feed_epic_created_at
+
+-- DROP INDEX IF EXISTS sts_ts.idx_activity_feed_epic_created_at;
+
+CREATE INDEX IF NOT EXISTS idx_activity_feed_epic_created_at
+    ON sts_ts.activity_feed USING btree
+    (epic_code ASC NULLS LAST, created_at DESC, id DESC)
+    TABLESPACE pg_default;
+-- Index: idx_activity_feed_entity_created_at
+
+-- DROP INDEX IF EXISTS sts_ts.idx_activity_feed_entity_created_at;
+
+CREATE INDEX IF NOT EXISTS idx_activity_feed_entity_created_at
+    ON sts_ts.activity_feed USING btree
+    (entity_type COLLATE pg_catalog."default" ASC NULLS LAST, entity_code ASC NULLS LAST, created_at DESC, id DESC)
+    TABLESPACE pg_default;
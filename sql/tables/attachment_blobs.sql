@@ -0,0 +1,44 @@
+-- Table: sts_ts.attachment_blobs
+
+-- DROP TABLE IF EXISTS sts_ts.attachment_blobs;
+
+CREATE TABLE IF NOT EXISTS sts_ts.attachment_blobs
+(
+    sha256 character(64) COLLATE pg_catalog."default" NOT NULL,
+    relative_path text COLLATE pg_catalog."default" NOT NULL,
+    file_size bigint NOT NULL,
+    ref_count integer NOT NULL DEFAULT 0,
+    created_at timestamp without time zone NOT NULL DEFAULT now(),
+    last_referenced_at timestamp without time zone NOT NULL DEFAULT now(),
+    CONSTRAINT attachment_blobs_pkey PRIMARY KEY (sha256),
+    CONSTRAINT chk_attachment_blobs_ref_count CHECK (ref_count >= 0)
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.attachment_blobs
+    OWNER to sts_ts;
+
+REVOKE ALL ON TABLE sts_ts.attachment_blobs FROM sukraa_analyst;
+REVOKE ALL ON TABLE sts_ts.attachment_blobs FROM sukraa_dev;
+
+GRANT ALL ON TABLE sts_ts.attachment_blobs TO sts_ts;
+
+GRANT SELECT ON TABLE sts_ts.attachment_blobs TO sukraa_analyst;
+
+GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.attachment_blobs TO sukraa_dev;
+
+COMMENT ON TABLE sts_ts.attachment_blobs
+    IS 'Uploaded file contents stored once per SHA-256 under the fileserver upload_dir (blob_store.py). ref_count is the number of attachments rows pointing at the blob, kept by trg_attachments_blob_refcount.';
+
+COMMENT ON COLUMN sts_ts.attachment_blobs.relative_path
+    IS 'Path of the file under upload_dir, also its URL path under the fileserver base_url';
+-- Index: idx_attachment_blobs_unreferenced
+
+-- DROP INDEX IF EXISTS sts_ts.idx_attachment_blobs_unreferenced;
+
+CREATE INDEX IF NOT EXISTS idx_attachment_blobs_unreferenced
+    ON sts_ts.attachment_blobs USING btree
+    (last_referenced_at ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE ref_count = 0;
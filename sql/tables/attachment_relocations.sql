@@ -0,0 +1,34 @@
+-- Table: sts_ts.attachment_relocations
+
+-- DROP TABLE IF EXISTS sts_ts.attachment_relocations;
+
+CREATE TABLE IF NOT EXISTS sts_ts.attachment_relocations
+(
+    old_relative_path text COLLATE pg_catalog."default" NOT NULL,
+    new_relative_path text COLLATE pg_catalog."default" NOT NULL,
+    relocated_at timestamp without time zone NOT NULL DEFAULT now(),
+    CONSTRAINT attachment_relocations_pkey PRIMARY KEY (old_relative_path)
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.attachment_relocations
+    OWNER to sts_ts;
+
+REVOKE ALL ON TABLE sts_ts.attachment_relocations FROM sukraa_analyst;
+REVOKE ALL ON TABLE sts_ts.attachment_relocations FROM sukraa_dev;
+
+GRANT ALL ON TABLE sts_ts.attachment_relocations TO sts_ts;
+
+GRANT SELECT ON TABLE sts_ts.attachment_relocations TO sukraa_analyst;
+
+GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.attachment_relocations TO sukraa_dev;
+
+COMMENT ON TABLE sts_ts.attachment_relocations
+    IS 'Files moved into the sharded upload layout by upload_layout.py. Requests for an old path under the fileserver base_url are redirected to the new one.';
+
+COMMENT ON COLUMN sts_ts.attachment_relocations.old_relative_path
+    IS 'Former path of the file under upload_dir';
+
+COMMENT ON COLUMN sts_ts.attachment_relocations.new_relative_path
+    IS 'Path of the file under upload_dir now, the relative_path of its attachment_blobs row';
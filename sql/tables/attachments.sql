@@ -17,12 +17,24 @@ CREATE TABLE IF NOT EXISTS sts_ts.attachments
     created_at timestamp without time zone NOT NULL DEFAULT now(),
     updated_by character varying(50) COLLATE pg_catalog."default",
     updated_at timestamp without time zone,
+    blob_sha256 character(64) COLLATE pg_catalog."default",
+    preview_status character varying(20) COLLATE pg_catalog."default",
+    thumbnail_path text COLLATE pg_catalog."default",
+    thumbnail_url text COLLATE pg_catalog."default",
+    preview_path text COLLATE pg_catalog."default",
+    preview_url text COLLATE pg_catalog."default",
+    previews_generated_at timestamp without time zone,
     CONSTRAINT attachments_pkey PRIMARY KEY (id),
+    CONSTRAINT fk_attachments_blob_sha256 FOREIGN KEY (blob_sha256)
+        REFERENCES sts_ts.attachment_blobs (sha256) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION,
     CONSTRAINT fk_attachments_created_by FOREIGN KEY (created_by)
         REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
         ON UPDATE NO ACTION
         ON DELETE NO ACTION,
     CONSTRAINT chk_attachments_parent_type CHECK (parent_type::text = ANY (ARRAY['TASK'::character varying, 'EPIC'::character varying, 'TIMESHEET_ENTRY'::character varying, 'LEAVE_APPLICATION'::character varying, 'ACTIVITY'::character varying, 'SUBTASK'::character varying]::text[])),
+    CONSTRAINT chk_attachments_preview_status CHECK (preview_status IS NULL OR (preview_status::text = ANY (ARRAY['PENDING'::character varying, 'READY'::character varying, 'FAILED'::character varying]::text[]))),
     CONSTRAINT chk_attachments_file_type CHECK (file_type IS NULL OR (file_type::text = ANY (ARRAY['pdf'::character varying, 'doc'::character varying, 'docx'::character varying, 'xls'::character varying, 'xlsx'::character varying, 'ppt'::character varying, 'pptx'::character varying, 'txt'::character varying, 'csv'::character varying, 'jpg'::character varying, 'jpeg'::character varying, 'png'::character varying, 'gif'::character varying, 'bmp'::character varying, 'svg'::character varying, 'tiff'::character varying, 'mp4'::character varying, 'avi'::character varying, 'mov'::character varying, 'wmv'::character varying, 'flv'::character varying, 'mp3'::character varying, 'wav'::character varying, 'flac'::character varying, 'aac'::character varying, 'zip'::character varying, 'rar'::character varying, '7z'::character varying, 'tar'::character varying, 'gz'::character varying, 'json'::character varying, 'xml'::character varying, 'html'::character varying, 'css'::character varying, 'js'::character varying, 'sql'::character varying]::text[])))
 )
 
@@ -39,6 +51,15 @@ GRANT ALL ON TABLE sts_ts.attachments TO sts_ts;
 GRANT SELECT ON TABLE sts_ts.attachments TO sukraa_analyst;
 
 GRANT DELETE, INSERT, UPDATE, SELECT ON TABLE sts_ts.attachments TO sukraa_dev;
+
+COMMENT ON COLUMN sts_ts.attachments.preview_status
+    IS 'Thumbnail / preview generation for image attachments (image_previews.py): PENDING, READY or FAILED. NULL for other files.';
+
+COMMENT ON COLUMN sts_ts.attachments.thumbnail_url
+    IS 'Small JPEG for attachment lists, stored next to the file (READY rows only)';
+
+COMMENT ON COLUMN sts_ts.attachments.preview_url
+    IS 'Web-sized JPEG for viewing the image without the original, stored next to the file (READY rows only)';
 -- Index: idx_attachments_created_at
 
 -- DROP INDEX IF EXISTS sts_ts.idx_attachments_created_at;
@@ -86,4 +107,22 @@ CREATE INDEX IF NOT EXISTS idx_attachments_parent_type
 CREATE INDEX IF NOT EXISTS idx_attachments_parent_type_code
     ON sts_ts.attachments USING btree
     (parent_type COLLATE pg_catalog."default" ASC NULLS LAST, parent_code ASC NULLS LAST)
-    TABLESPACE pg_default;
\ No newline at end of file
+    TABLESPACE pg_default;
+-- Index: idx_attachments_blob_sha256
+
+-- DROP INDEX IF EXISTS sts_ts.idx_attachments_blob_sha256;
+
+CREATE INDEX IF NOT EXISTS idx_attachments_blob_sha256
+    ON sts_ts.attachments USING btree
+    (blob_sha256 COLLATE pg_catalog."default" ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE blob_sha256 IS NOT NULL;
+-- Index: idx_attachments_preview_pending
+
+-- DROP INDEX IF EXISTS sts_ts.idx_attachments_preview_pending;
+
+CREATE INDEX IF NOT EXISTS idx_attachments_preview_pending
+    ON sts_ts.attachments USING btree
+    (id ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE preview_status::text = 'PENDING'::text;
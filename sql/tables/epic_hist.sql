@@ -17,10 +17,13 @@ CREATE TABLE IF NOT EXISTS sts_ts.epic_hist
     closed_on date,
     estimated_hours numeric(6,2),
     estimated_days numeric(6,2),
+    max_hours numeric(6,2),
     cancelled_by character varying(30) COLLATE pg_catalog."default",
     cancelled_at date,
     created_by character varying(30) COLLATE pg_catalog."default" NOT NULL,
     created_at timestamp without time zone NOT NULL DEFAULT now(),
+    is_checkpoint boolean NOT NULL DEFAULT true,
+    changed_columns text[] COLLATE pg_catalog."default",
     CONSTRAINT epic_hist_pkey PRIMARY KEY (id),
     CONSTRAINT fk_epic_hist_created_by FOREIGN KEY (created_by)
         REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
@@ -138,4 +141,13 @@ CREATE INDEX IF NOT EXISTS idx_epic_hist_status_created
 CREATE INDEX IF NOT EXISTS idx_epic_hist_user_code
     ON sts_ts.epic_hist USING btree
     (user_code COLLATE pg_catalog."default" ASC NULLS LAST)
-    TABLESPACE pg_default;
\ No newline at end of file
+    TABLESPACE pg_default;
+-- Index: idx_epic_hist_epic_code_checkpoint
+
+-- DROP INDEX IF EXISTS sts_ts.idx_epic_hist_epic_code_checkpoint;
+
+CREATE INDEX IF NOT EXISTS idx_epic_hist_epic_code_checkpoint
+    ON sts_ts.epic_hist USING btree
+    (epic_code ASC NULLS LAST, created_at DESC NULLS FIRST, id DESC NULLS FIRST)
+    TABLESPACE pg_default
+    WHERE is_checkpoint;
@@ -21,10 +21,13 @@ CREATE TABLE IF NOT EXISTS sts_ts.task_hist
     closed_on date,
     estimated_hours numeric(6,2),
     estimated_days numeric(6,2),
+    max_hours numeric(6,2),
     cancelled_by character varying(50) COLLATE pg_catalog."default",
     cancelled_at date,
     created_by character varying(30) COLLATE pg_catalog."default" NOT NULL DEFAULT CURRENT_USER,
     created_at timestamp without time zone NOT NULL DEFAULT now(),
+    is_checkpoint boolean NOT NULL DEFAULT true,
+    changed_columns text[] COLLATE pg_catalog."default",
     CONSTRAINT task_hist_pkey PRIMARY KEY (id),
     CONSTRAINT fk_task_hist_assigned_team FOREIGN KEY (assigned_team_code)
         REFERENCES sts_new.team_master (team_code) MATCH SIMPLE
@@ -173,4 +176,13 @@ CREATE INDEX IF NOT EXISTS idx_task_hist_task_type_code
 CREATE INDEX IF NOT EXISTS idx_task_hist_work_mode
     ON sts_ts.task_hist USING btree
     (work_mode COLLATE pg_catalog."default" ASC NULLS LAST)
-    TABLESPACE pg_default;
\ No newline at end of file
+    TABLESPACE pg_default;
+-- Index: idx_task_hist_task_code_checkpoint
+
+-- DROP INDEX IF EXISTS sts_ts.idx_task_hist_task_code_checkpoint;
+
+CREATE INDEX IF NOT EXISTS idx_task_hist_task_code_checkpoint
+    ON sts_ts.task_hist USING btree
+    (task_code ASC NULLS LAST, created_at DESC NULLS FIRST, id DESC NULLS FIRST)
+    TABLESPACE pg_default
+    WHERE is_checkpoint;
@@ -1,5 +1,12 @@
 -- Table: sts_ts.timesheet_approval_hist
 
+-- Partitioned by month on created_at: sts_ts.timesheet_approval_hist_pYYYYMM, created ahead of
+-- time by sts_ts.ensure_monthly_partitions (sql/functions/monthly_partitions.sql).
+-- entry_id cannot be a foreign key: timesheet_entry has no unique key on id alone once
+-- partitioned. sql/triggers/timesheet_entry_history_cascade.sql deletes the history of a
+-- deleted entry instead of ON DELETE CASCADE.
+-- To convert an existing unpartitioned table, run sql/migrations/timesheet_monthly_partitions.sql.
+
 -- DROP TABLE IF EXISTS sts_ts.timesheet_approval_hist;
 
 CREATE TABLE IF NOT EXISTS sts_ts.timesheet_approval_hist
@@ -27,7 +34,7 @@ CREATE TABLE IF NOT EXISTS sts_ts.timesheet_approval_hist
     rejected_at timestamp without time zone,
     created_by character varying(50) COLLATE pg_catalog."default" NOT NULL DEFAULT CURRENT_USER,
     created_at timestamp without time zone NOT NULL DEFAULT now(),
-    CONSTRAINT timesheet_approval_hist_pkey PRIMARY KEY (id),
+    CONSTRAINT timesheet_approval_hist_pkey PRIMARY KEY (id, created_at),
     CONSTRAINT fk_timesheet_approval_hist_activity FOREIGN KEY (activity_code)
         REFERENCES sts_ts.activities (id) MATCH SIMPLE
         ON UPDATE NO ACTION
@@ -40,10 +47,6 @@ CREATE TABLE IF NOT EXISTS sts_ts.timesheet_approval_hist
         REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
         ON UPDATE NO ACTION
         ON DELETE NO ACTION,
-    CONSTRAINT fk_timesheet_approval_hist_entry_id FOREIGN KEY (entry_id)
-        REFERENCES sts_ts.timesheet_entry (id) MATCH SIMPLE
-        ON UPDATE NO ACTION
-        ON DELETE CASCADE,
     CONSTRAINT fk_timesheet_approval_hist_entry_user_code FOREIGN KEY (entry_user_code)
         REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
         ON UPDATE NO ACTION
@@ -73,7 +76,7 @@ CREATE TABLE IF NOT EXISTS sts_ts.timesheet_approval_hist
         ON UPDATE NO ACTION
         ON DELETE NO ACTION,
     CONSTRAINT chk_timesheet_approval_hist_approval_status CHECK (approval_status::text = ANY (ARRAY['DRAFT'::character varying, 'SUBMITTED'::character varying, 'APPROVED'::character varying, 'REJECTED'::character varying]::text[]))
-)
+) PARTITION BY RANGE (created_at)
 
 TABLESPACE pg_default;
 
@@ -88,6 +91,16 @@ GRANT ALL ON TABLE sts_ts.timesheet_approval_hist TO sts_ts;
 GRANT SELECT ON TABLE sts_ts.timesheet_approval_hist TO sukraa_analyst;
 
 GRANT DELETE, INSERT, UPDATE, SELECT ON TABLE sts_ts.timesheet_approval_hist TO sukraa_dev;
+-- Table: sts_ts.timesheet_approval_hist_default
+
+-- DROP TABLE IF EXISTS sts_ts.timesheet_approval_hist_default;
+
+CREATE TABLE IF NOT EXISTS sts_ts.timesheet_approval_hist_default PARTITION OF sts_ts.timesheet_approval_hist
+DEFAULT
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.timesheet_approval_hist_default
+    OWNER to sts_ts;
 -- Index: idx_timesheet_approval_hist_activity_code
 
 -- DROP INDEX IF EXISTS sts_ts.idx_timesheet_approval_hist_activity_code;
@@ -1,5 +1,12 @@
 -- Table: sts_ts.timesheet_entry
 
+-- Partitioned by month on entry_date: sts_ts.timesheet_entry_pYYYYMM, created ahead of time by
+-- sts_ts.ensure_monthly_partitions (sql/functions/monthly_partitions.sql, run from
+-- ts_db_apis/partition_maintenance.py). Drafts without an entry_date live in timesheet_entry_default.
+-- entry_date is nullable, so it cannot be part of a primary key on the whole table: each
+-- partition has its own primary key on id, and ids stay unique through timesheet_entry_id_seq.
+-- To convert an existing unpartitioned table, run sql/migrations/timesheet_monthly_partitions.sql.
+
 -- DROP TABLE IF EXISTS sts_ts.timesheet_entry;
 
 CREATE TABLE IF NOT EXISTS sts_ts.timesheet_entry
@@ -31,7 +38,6 @@ CREATE TABLE IF NOT EXISTS sts_ts.timesheet_entry
     created_at timestamp without time zone NOT NULL DEFAULT now(),
     updated_by character varying(50) COLLATE pg_catalog."default",
     updated_at timestamp without time zone,
-    CONSTRAINT timesheet_entry_pkey PRIMARY KEY (id),
     CONSTRAINT fk_timesheet_entry_activity FOREIGN KEY (activity_code)
         REFERENCES sts_ts.activities (id) MATCH SIMPLE
         ON UPDATE NO ACTION
@@ -83,7 +89,7 @@ CREATE TABLE IF NOT EXISTS sts_ts.timesheet_entry
     CONSTRAINT chk_timesheet_entry_work_location CHECK (work_location IS NULL OR (work_location::text = ANY (ARRAY['REMOTE'::character varying, 'ON_SITE'::character varying, 'OFFICE'::character varying]::text[]))),
     CONSTRAINT chk_timesheet_entry_approval_status CHECK (approval_status::text = ANY (ARRAY['DRAFT'::character varying, 'SUBMITTED'::character varying, 'APPROVED'::character varying, 'REJECTED'::character varying]::text[])),
     CONSTRAINT chk_timesheet_entry_parent CHECK (task_code IS NOT NULL AND activity_code IS NULL AND ticket_code IS NULL AND subtask_code IS NULL OR task_code IS NULL AND activity_code IS NOT NULL AND ticket_code IS NULL AND subtask_code IS NULL OR task_code IS NULL AND activity_code IS NULL AND ticket_code IS NOT NULL AND subtask_code IS NULL OR task_code IS NULL AND activity_code IS NULL AND ticket_code IS NULL AND subtask_code IS NOT NULL OR task_code IS NULL AND activity_code IS NULL AND ticket_code IS NULL AND subtask_code IS NULL AND approval_status::text = 'DRAFT'::text)
-)
+) PARTITION BY RANGE (entry_date)
 
 TABLESPACE pg_default;
 
@@ -98,6 +104,19 @@ GRANT ALL ON TABLE sts_ts.timesheet_entry TO sts_ts;
 GRANT SELECT ON TABLE sts_ts.timesheet_entry TO sukraa_analyst;
 
 GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.timesheet_entry TO sukraa_dev;
+-- Table: sts_ts.timesheet_entry_default
+
+-- DROP TABLE IF EXISTS sts_ts.timesheet_entry_default;
+
+CREATE TABLE IF NOT EXISTS sts_ts.timesheet_entry_default PARTITION OF sts_ts.timesheet_entry
+(
+    CONSTRAINT timesheet_entry_default_pkey PRIMARY KEY (id)
+)
+DEFAULT
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.timesheet_entry_default
+    OWNER to sts_ts;
 -- Index: idx_timesheet_entry_activity_code
 
 -- DROP INDEX IF EXISTS sts_ts.idx_timesheet_entry_activity_code;
@@ -0,0 +1,49 @@
+-- Table: sts_ts.timesheet_hours_daily
+
+-- DROP TABLE IF EXISTS sts_ts.timesheet_hours_daily;
+
+CREATE TABLE IF NOT EXISTS sts_ts.timesheet_hours_daily
+(
+    user_code character varying(50) COLLATE pg_catalog."default" NOT NULL,
+    entry_date date NOT NULL,
+    draft_hours numeric(7,2) NOT NULL DEFAULT 0,
+    submitted_hours numeric(7,2) NOT NULL DEFAULT 0,
+    approved_hours numeric(7,2) NOT NULL DEFAULT 0,
+    rejected_hours numeric(7,2) NOT NULL DEFAULT 0,
+    total_hours numeric(7,2) GENERATED ALWAYS AS (draft_hours + submitted_hours + approved_hours + rejected_hours) STORED,
+    entry_count integer NOT NULL DEFAULT 0,
+    updated_at timestamp without time zone NOT NULL DEFAULT now(),
+    CONSTRAINT timesheet_hours_daily_pkey PRIMARY KEY (user_code, entry_date),
+    CONSTRAINT fk_timesheet_hours_daily_user FOREIGN KEY (user_code)
+        REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.timesheet_hours_daily
+    OWNER to sts_ts;
+
+REVOKE ALL ON TABLE sts_ts.timesheet_hours_daily FROM sukraa_analyst;
+REVOKE ALL ON TABLE sts_ts.timesheet_hours_daily FROM sukraa_dev;
+
+GRANT ALL ON TABLE sts_ts.timesheet_hours_daily TO sts_ts;
+
+GRANT SELECT ON TABLE sts_ts.timesheet_hours_daily TO sukraa_analyst;
+
+GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.timesheet_hours_daily TO sukraa_dev;
+
+COMMENT ON TABLE sts_ts.timesheet_hours_daily
+    IS 'Per-user hours per entry_date, maintained by the timesheet routes in the same transaction as the entry change (hours_rollup.py)';
+
+COMMENT ON COLUMN sts_ts.timesheet_hours_daily.total_hours
+    IS 'Hours of all entries; the daily cap counts total_hours - rejected_hours';
+-- Index: idx_timesheet_hours_daily_entry_date
+
+-- DROP INDEX IF EXISTS sts_ts.idx_timesheet_hours_daily_entry_date;
+
+CREATE INDEX IF NOT EXISTS idx_timesheet_hours_daily_entry_date
+    ON sts_ts.timesheet_hours_daily USING btree
+    (entry_date ASC NULLS LAST)
+    TABLESPACE pg_default;
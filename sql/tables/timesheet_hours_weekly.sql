@@ -0,0 +1,51 @@
+-- Table: sts_ts.timesheet_hours_weekly
+
+-- DROP TABLE IF EXISTS sts_ts.timesheet_hours_weekly;
+
+CREATE TABLE IF NOT EXISTS sts_ts.timesheet_hours_weekly
+(
+    user_code character varying(50) COLLATE pg_catalog."default" NOT NULL,
+    iso_year integer NOT NULL,
+    iso_week integer NOT NULL,
+    week_start date NOT NULL,
+    draft_hours numeric(7,2) NOT NULL DEFAULT 0,
+    submitted_hours numeric(7,2) NOT NULL DEFAULT 0,
+    approved_hours numeric(7,2) NOT NULL DEFAULT 0,
+    rejected_hours numeric(7,2) NOT NULL DEFAULT 0,
+    total_hours numeric(7,2) GENERATED ALWAYS AS (draft_hours + submitted_hours + approved_hours + rejected_hours) STORED,
+    entry_count integer NOT NULL DEFAULT 0,
+    updated_at timestamp without time zone NOT NULL DEFAULT now(),
+    CONSTRAINT timesheet_hours_weekly_pkey PRIMARY KEY (user_code, iso_year, iso_week),
+    CONSTRAINT fk_timesheet_hours_weekly_user FOREIGN KEY (user_code)
+        REFERENCES sts_new.user_master (user_code) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS sts_ts.timesheet_hours_weekly
+    OWNER to sts_ts;
+
+REVOKE ALL ON TABLE sts_ts.timesheet_hours_weekly FROM sukraa_analyst;
+REVOKE ALL ON TABLE sts_ts.timesheet_hours_weekly FROM sukraa_dev;
+
+GRANT ALL ON TABLE sts_ts.timesheet_hours_weekly TO sts_ts;
+
+GRANT SELECT ON TABLE sts_ts.timesheet_hours_weekly TO sukraa_analyst;
+
+GRANT DELETE, INSERT, SELECT, UPDATE ON TABLE sts_ts.timesheet_hours_weekly TO sukraa_dev;
+
+COMMENT ON TABLE sts_ts.timesheet_hours_weekly
+    IS 'Per-user hours per ISO week (week_start is the Monday), maintained by the timesheet routes in the same transaction as the entry change (hours_rollup.py)';
+
+COMMENT ON COLUMN sts_ts.timesheet_hours_weekly.total_hours
+    IS 'Hours of all entries in the week, rejected ones included';
+-- Index: idx_timesheet_hours_weekly_week_start
+
+-- DROP INDEX IF EXISTS sts_ts.idx_timesheet_hours_weekly_week_start;
+
+CREATE INDEX IF NOT EXISTS idx_timesheet_hours_weekly_week_start
+    ON sts_ts.timesheet_hours_weekly USING btree
+    (week_start ASC NULLS LAST)
+    TABLESPACE pg_default;
@@ -0,0 +1,52 @@
+-- Trigger: attachment blob reference counts
+
+-- Keeps sts_ts.attachment_blobs.ref_count equal to the number of sts_ts.attachments rows
+-- with that blob_sha256, whichever code inserts, deletes or repoints attachments.
+-- Blobs left at zero are removed by ts_db_apis/blob_store.py after a grace period.
+
+-- DROP FUNCTION IF EXISTS sts_ts.update_attachment_blob_refcount();
+
+CREATE OR REPLACE FUNCTION sts_ts.update_attachment_blob_refcount()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+AS $BODY$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.blob_sha256 IS NOT NULL THEN
+        UPDATE sts_ts.attachment_blobs
+        SET ref_count = ref_count - 1,
+            last_referenced_at = now()
+        WHERE sha256 = OLD.blob_sha256;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.blob_sha256 IS NOT NULL THEN
+        UPDATE sts_ts.attachment_blobs
+        SET ref_count = ref_count + 1,
+            last_referenced_at = now()
+        WHERE sha256 = NEW.blob_sha256;
+    END IF;
+    RETURN NULL;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.update_attachment_blob_refcount()
+    OWNER TO sts_ts;
+
+-- Trigger: trg_attachments_blob_refcount
+
+-- DROP TRIGGER IF EXISTS trg_attachments_blob_refcount ON sts_ts.attachments;
+
+CREATE OR REPLACE TRIGGER trg_attachments_blob_refcount
+    AFTER INSERT OR DELETE
+    ON sts_ts.attachments
+    FOR EACH ROW
+    EXECUTE FUNCTION sts_ts.update_attachment_blob_refcount();
+
+-- Trigger: trg_attachments_blob_refcount_update
+
+-- DROP TRIGGER IF EXISTS trg_attachments_blob_refcount_update ON sts_ts.attachments;
+
+CREATE OR REPLACE TRIGGER trg_attachments_blob_refcount_update
+    AFTER UPDATE OF blob_sha256
+    ON sts_ts.attachments
+    FOR EACH ROW
+    WHEN (OLD.blob_sha256 IS DISTINCT FROM NEW.blob_sha256)
+    EXECUTE FUNCTION sts_ts.update_attachment_blob_refcount();
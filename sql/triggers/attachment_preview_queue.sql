@@ -0,0 +1,38 @@
+-- Trigger: attachment preview queue
+
+-- Marks new image attachments PENDING for thumbnail / preview generation and wakes the
+-- preview workers of the API (ts_db_apis/image_previews.py) when rows become PENDING.
+-- Identical notifications in one transaction are delivered once, at commit.
+-- The channel must match [attachment_previews] channel in ts_db_apis/config.ini.
+
+-- DROP FUNCTION IF EXISTS sts_ts.queue_attachment_preview();
+
+CREATE OR REPLACE FUNCTION sts_ts.queue_attachment_preview()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+AS $BODY$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.preview_status IS NULL
+        -- By file name: not every route stores the extension in file_type
+        AND lower(substring(NEW.file_name from '\.([^.]*)$')) IN ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff') THEN
+        NEW.preview_status := 'PENDING';
+    END IF;
+    IF NEW.preview_status = 'PENDING' THEN
+        PERFORM pg_notify('ts_attachment_previews', '');
+    END IF;
+    RETURN NEW;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.queue_attachment_preview()
+    OWNER TO sts_ts;
+
+-- Trigger: trg_attachments_preview_queue
+
+-- DROP TRIGGER IF EXISTS trg_attachments_preview_queue ON sts_ts.attachments;
+
+CREATE OR REPLACE TRIGGER trg_attachments_preview_queue
+    BEFORE INSERT OR UPDATE OF preview_status
+    ON sts_ts.attachments
+    FOR EACH ROW
+    EXECUTE FUNCTION sts_ts.queue_attachment_preview();
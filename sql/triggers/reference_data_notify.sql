@@ -0,0 +1,43 @@
+-- Trigger: reference data change notifications
+
+-- Announces changes to the code tables held in memory by the API (reference_registry.py)
+-- and in the GetMasterData cache (master_data_cache.py) on the cache invalidation channel,
+-- so edits made directly in the database reach every worker without a restart.
+-- The channel must match [cache_invalidation] channel in ts_db_apis/config.ini.
+
+-- DROP FUNCTION IF EXISTS sts_ts.notify_reference_data_change();
+
+CREATE OR REPLACE FUNCTION sts_ts.notify_reference_data_change()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+AS $BODY$
+BEGIN
+    -- TG_ARGV[0]: reference_registry kind, TG_ARGV[1]: master data section
+    PERFORM pg_notify('ts_cache_invalidation', json_build_object('target', 'reference_data', 'keys', json_build_array(TG_ARGV[0]))::text);
+    PERFORM pg_notify('ts_cache_invalidation', json_build_object('target', 'master_data', 'keys', json_build_array(TG_ARGV[1]))::text);
+    RETURN NULL;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.notify_reference_data_change()
+    OWNER TO sts_ts;
+
+-- Trigger: trg_task_type_master_notify
+
+-- DROP TRIGGER IF EXISTS trg_task_type_master_notify ON sts_ts.task_type_master;
+
+CREATE OR REPLACE TRIGGER trg_task_type_master_notify
+    AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE
+    ON sts_ts.task_type_master
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sts_ts.notify_reference_data_change('task_types', 'task_types');
+
+-- Trigger: trg_leave_type_master_notify
+
+-- DROP TRIGGER IF EXISTS trg_leave_type_master_notify ON sts_ts.leave_type_master;
+
+CREATE OR REPLACE TRIGGER trg_leave_type_master_notify
+    AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE
+    ON sts_ts.leave_type_master
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sts_ts.notify_reference_data_change('leave_types', 'leave_types');
@@ -0,0 +1,33 @@
+-- Trigger: timesheet entry history cascade
+
+-- Stands in for the ON DELETE CASCADE foreign key from timesheet_approval_hist.entry_id,
+-- which cannot exist now that timesheet_entry is partitioned (see sql/tables/timesheet_entry.sql).
+
+-- DROP FUNCTION IF EXISTS sts_ts.delete_timesheet_entry_history();
+
+CREATE OR REPLACE FUNCTION sts_ts.delete_timesheet_entry_history()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+AS $BODY$
+BEGIN
+    -- An UPDATE that moves an entry to another month's partition runs as a delete plus an
+    -- insert, so only drop the history when no entry with this id is left
+    DELETE FROM sts_ts.timesheet_approval_hist h
+    WHERE h.entry_id = OLD.id
+      AND NOT EXISTS (SELECT 1 FROM sts_ts.timesheet_entry te WHERE te.id = OLD.id);
+    RETURN NULL;
+END;
+$BODY$;
+
+ALTER FUNCTION sts_ts.delete_timesheet_entry_history()
+    OWNER TO sts_ts;
+
+-- Trigger: trg_timesheet_entry_history_cascade
+
+-- DROP TRIGGER IF EXISTS trg_timesheet_entry_history_cascade ON sts_ts.timesheet_entry;
+
+CREATE OR REPLACE TRIGGER trg_timesheet_entry_history_cascade
+    AFTER DELETE
+    ON sts_ts.timesheet_entry
+    FOR EACH ROW
+    EXECUTE FUNCTION sts_ts.delete_timesheet_entry_history();
@@ -32,7 +32,7 @@ CREATE OR REPLACE VIEW sts_ts.view_activities
     updated_by_user.designation_name AS updated_by_designation,
     updated_by_user.team_code AS updated_by_team_code,
     updated_by_team.team_name AS updated_by_team_name,
-    COALESCE(( SELECT json_agg(json_build_object('id', att.id, 'file_name', att.file_name, 'file_path', att.file_path, 'file_url', att.file_url, 'file_type', att.file_type, 'file_size', att.file_size, 'purpose', att.purpose, 'created_by', att.created_by, 'created_at', att.created_at) ORDER BY att.created_at DESC) AS json_agg
+    COALESCE(( SELECT json_agg(json_build_object('id', att.id, 'file_name', att.file_name, 'file_path', att.file_path, 'file_url', att.file_url, 'preview_status', att.preview_status, 'thumbnail_url', att.thumbnail_url, 'preview_url', att.preview_url, 'file_type', att.file_type, 'file_size', att.file_size, 'purpose', att.purpose, 'created_by', att.created_by, 'created_at', att.created_at) ORDER BY att.created_at DESC) AS json_agg
            FROM attachments att
           WHERE att.parent_type::text = 'ACTIVITY'::text AND att.parent_code = a.id), '[]'::json) AS attachments,
     ( SELECT count(*) AS count
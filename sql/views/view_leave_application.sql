@@ -42,7 +42,7 @@ CREATE OR REPLACE VIEW sts_ts.view_leave_application
     um_creator.user_name AS created_by_name,
     la.updated_by,
     um_updater.user_name AS updated_by_name,
-    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', a.file_url, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_at', a.created_at) ORDER BY a.created_at) AS json_agg
+    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', '/api/v1/timesheet/attachments/'::text || a.id || '/download'::text, 'preview_status', a.preview_status, 'thumbnail_url', CASE WHEN a.preview_status::text = 'READY'::text THEN '/api/v1/timesheet/attachments/'::text || a.id || '/download'::text || '?variant=thumbnail'::text ELSE NULL::text END, 'preview_url', CASE WHEN a.preview_status::text = 'READY'::text THEN '/api/v1/timesheet/attachments/'::text || a.id || '/download'::text || '?variant=preview'::text ELSE NULL::text END, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_at', a.created_at) ORDER BY a.created_at) AS json_agg
            FROM attachments a
           WHERE a.parent_type::text = 'LEAVE_APPLICATION'::text AND a.parent_code = la.id), '[]'::json) AS attachments
    FROM leave_application la
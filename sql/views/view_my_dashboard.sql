@@ -23,14 +23,20 @@ CREATE OR REPLACE VIEW sts_ts.view_my_dashboard
              CROSS JOIN date_ranges dr_1
           WHERE timesheet_entry.entry_date >= dr_1.month_start AND timesheet_entry.entry_date < dr_1.month_end
         ), current_week_timesheets AS (
-         SELECT timesheet_entry.user_code,
-            timesheet_entry.entry_date,
-            timesheet_entry.total_hours,
-            EXTRACT(dow FROM timesheet_entry.entry_date) AS day_of_week,
-            to_char(timesheet_entry.entry_date::timestamp with time zone, 'Dy'::text) AS day_name
-           FROM timesheet_entry
+         SELECT thd.user_code,
+            thd.entry_date,
+            thd.total_hours,
+            EXTRACT(dow FROM thd.entry_date) AS day_of_week,
+            to_char(thd.entry_date::timestamp with time zone, 'Dy'::text) AS day_name
+           FROM timesheet_hours_daily thd
+             CROSS JOIN date_ranges dr_1
+          WHERE thd.entry_date >= dr_1.week_start AND thd.entry_date < dr_1.week_end
+        ), current_week_hours AS (
+         SELECT thw.user_code,
+            thw.total_hours
+           FROM timesheet_hours_weekly thw
              CROSS JOIN date_ranges dr_1
-          WHERE timesheet_entry.entry_date >= dr_1.week_start AND timesheet_entry.entry_date < dr_1.week_end
+          WHERE thw.week_start = dr_1.week_start
         ), user_tasks AS (
          SELECT tasks.assignee AS user_code,
             count(*) AS total_tasks_count,
@@ -228,15 +234,17 @@ CREATE OR REPLACE VIEW sts_ts.view_my_dashboard
     12::numeric - COALESCE(lr.leaves_taken, 0::numeric) AS leaves_remaining,
     24 - COALESCE(lr.permissions_taken, 0::bigint) AS permissions_remaining,
     dr.year_start AS current_year_start,
-    (dr.year_start + '1 year'::interval - '1 day'::interval)::date AS current_year_end
+    (dr.year_start + '1 year'::interval - '1 day'::interval)::date AS current_year_end,
+    COALESCE(cwh.total_hours, 0::numeric) AS total_hours_current_week
    FROM sts_new.user_master um
      CROSS JOIN date_ranges dr
      LEFT JOIN current_month_timesheets tm ON um.user_code::text = tm.user_code::text
      LEFT JOIN user_tasks ut ON um.user_code::text = ut.user_code::text
      LEFT JOIN user_subtasks ust ON um.user_code::text = ust.user_code::text
      LEFT JOIN leave_registry lr ON um.user_code::text = lr.user_code::text
+     LEFT JOIN current_week_hours cwh ON um.user_code::text = cwh.user_code::text
   WHERE um.is_inactive = false AND um.user_type_code::text <> 'C'::text
-  GROUP BY um.user_code, um.user_name, ut.total_tasks_count, ut.completed_tasks_count, ut.to_do_tasks_count, ut.in_progress_tasks_count, ut.cancelled_tasks_count, ut.overdue_tasks_count, ust.total_subtasks_count, ust.completed_subtasks_count, ust.to_do_subtasks_count, ust.in_progress_subtasks_count, ust.cancelled_subtasks_count, ust.overdue_subtasks_count, dr.month_start, dr.week_start, dr.year_start, lr.leaves_taken, lr.permissions_taken
+  GROUP BY um.user_code, um.user_name, ut.total_tasks_count, ut.completed_tasks_count, ut.to_do_tasks_count, ut.in_progress_tasks_count, ut.cancelled_tasks_count, ut.overdue_tasks_count, ust.total_subtasks_count, ust.completed_subtasks_count, ust.to_do_subtasks_count, ust.in_progress_subtasks_count, ust.cancelled_subtasks_count, ust.overdue_subtasks_count, dr.month_start, dr.week_start, dr.year_start, lr.leaves_taken, lr.permissions_taken, cwh.total_hours
   ORDER BY um.user_name;
 
 ALTER TABLE sts_ts.view_my_dashboard
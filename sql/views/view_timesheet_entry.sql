@@ -137,7 +137,7 @@ CREATE OR REPLACE VIEW sts_ts.view_timesheet_entry
     um_created.user_name AS created_by_name,
     te.updated_by,
     um_updated.user_name AS updated_by_name,
-    COALESCE(( SELECT json_agg(json_build_object('id', a_1.id, 'file_name', a_1.file_name, 'file_path', a_1.file_path, 'file_url', a_1.file_url, 'file_type', a_1.file_type, 'file_size', a_1.file_size, 'purpose', a_1.purpose, 'created_by', a_1.created_by, 'created_at', a_1.created_at) ORDER BY a_1.created_at DESC) AS json_agg
+    COALESCE(( SELECT json_agg(json_build_object('id', a_1.id, 'file_name', a_1.file_name, 'file_path', a_1.file_path, 'file_url', '/api/v1/timesheet/attachments/'::text || a_1.id || '/download'::text, 'preview_status', a_1.preview_status, 'thumbnail_url', CASE WHEN a_1.preview_status::text = 'READY'::text THEN '/api/v1/timesheet/attachments/'::text || a_1.id || '/download'::text || '?variant=thumbnail'::text ELSE NULL::text END, 'preview_url', CASE WHEN a_1.preview_status::text = 'READY'::text THEN '/api/v1/timesheet/attachments/'::text || a_1.id || '/download'::text || '?variant=preview'::text ELSE NULL::text END, 'file_type', a_1.file_type, 'file_size', a_1.file_size, 'purpose', a_1.purpose, 'created_by', a_1.created_by, 'created_at', a_1.created_at) ORDER BY a_1.created_at DESC) AS json_agg
            FROM attachments a_1
           WHERE a_1.parent_type::text = 'TIMESHEET_ENTRY'::text AND a_1.parent_code = te.id), '[]'::json) AS attachments,
     ( SELECT count(*) AS count
@@ -47,7 +47,7 @@ CREATE OR REPLACE VIEW sts_ts.view_unified_epic_task
     COALESCE(task_stats.task_count, 0::bigint) AS epic_task_count,
     COALESCE(task_stats.total_task_estimated_hours, 0::numeric) AS total_task_estimated_hours,
     COALESCE(task_stats.total_task_estimated_days, 0::numeric) AS total_task_estimated_days,
-    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', a.file_url, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_by', a.created_by, 'created_at', a.created_at) ORDER BY a.created_at DESC) AS json_agg
+    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', a.file_url, 'preview_status', a.preview_status, 'thumbnail_url', a.thumbnail_url, 'preview_url', a.preview_url, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_by', a.created_by, 'created_at', a.created_at) ORDER BY a.created_at DESC) AS json_agg
            FROM attachments a
           WHERE a.parent_type::text = 'EPIC'::text AND a.parent_code = e.id), '[]'::json) AS epic_attachments,
     ( SELECT count(*) AS count
@@ -92,7 +92,7 @@ CREATE OR REPLACE VIEW sts_ts.view_unified_epic_task
     t.updated_at AS task_updated_at,
     created_by_task_user.user_name AS task_created_by_name,
     updated_by_task_user.user_name AS task_updated_by_name,
-    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', a.file_url, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_by', a.created_by, 'created_at', a.created_at) ORDER BY a.created_at DESC) AS json_agg
+    COALESCE(( SELECT json_agg(json_build_object('id', a.id, 'file_name', a.file_name, 'file_path', a.file_path, 'file_url', a.file_url, 'preview_status', a.preview_status, 'thumbnail_url', a.thumbnail_url, 'preview_url', a.preview_url, 'file_type', a.file_type, 'file_size', a.file_size, 'purpose', a.purpose, 'created_by', a.created_by, 'created_at', a.created_at) ORDER BY a.created_at DESC) AS json_agg
            FROM attachments a
           WHERE a.parent_type::text = 'TASK'::text AND a.parent_code = t.id), '[]'::json) AS task_attachments,
     ( SELECT count(*) AS count
@@ -0,0 +1,391 @@
+# activity_feed.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import load_config
+from reference_registry import ReferenceData
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+MAX_FEED_PAGE_SIZE = 200
+
+
+class ActivityEvent(NamedTuple):
+    activity_type: str  # CREATED, TO_DO, IN_PROGRESS, DONE, BLOCKED, STATUS_CHANGE, PRIORITY_CHANGE, ...
+    entity_type: str  # EPIC, TASK (SUBTASK only in backfilled rows)
+    entity_code: int
+    epic_code: Optional[int]
+    task_id: Optional[int]
+    status_desc: str
+    assignee: Optional[str]
+    activity_description: str
+    details: Optional[Dict[str, Any]] = None  # {"field": ..., "old": ..., "new": ...} for field changes
+
+
+class FieldEvent(NamedTuple):
+    field: str  # snapshot key
+    activity_type: str
+    label: str  # used as "<label> changed to <value>"
+    value_kind: str  # how the new value is shown, see _display_value
+
+
+# Field changes recorded when both the old and the new value are set and differ
+# (assignee, team and status are handled separately because they also record a first value)
+TASK_FIELD_EVENTS = (
+    FieldEvent("priority_code", "PRIORITY_CHANGE", "priority", "priority"),
+    FieldEvent("start_date", "DATE_CHANGE", "start date", "date"),
+    FieldEvent("due_date", "DATE_CHANGE", "due date", "date"),
+    FieldEvent("estimated_hours", "HOURS_CHANGE", "estimated hours", "hours"),
+    FieldEvent("work_mode", "WORK_MODE_CHANGE", "work mode", "text"),
+    FieldEvent("task_type_code", "TYPE_CHANGE", "task type", "task_type"),
+    FieldEvent("reporter", "REPORTER_CHANGE", "reporter", "user"),
+)
+EPIC_FIELD_EVENTS = (
+    FieldEvent("priority_code", "PRIORITY_CHANGE", "priority", "priority"),
+    FieldEvent("start_date", "DATE_CHANGE", "start date", "date"),
+    FieldEvent("due_date", "DATE_CHANGE", "due date", "date"),
+    FieldEvent("estimated_hours", "HOURS_CHANGE", "estimated hours", "hours"),
+    FieldEvent("product_code", "PRODUCT_CHANGE", "product", "product"),
+    FieldEvent("reporter", "REPORTER_CHANGE", "reporter", "user"),
+)
+
+NAME_LOOKUPS = {
+    "user": "SELECT 'user', user_code, user_name FROM sts_new.user_master WHERE user_code = ANY(%(user)s)",
+    "team": "SELECT 'team', team_code, team_name FROM sts_new.team_master WHERE team_code = ANY(%(team)s)",
+    "product": "SELECT 'product', product_code, product_name FROM sts_new.product_master WHERE product_code = ANY(%(product)s)",
+}
+
+
+def _normalize(value: Any) -> Any:
+    """Compare numbers by value (Decimal from the table vs float from the form) and strip strings."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return round(float(value), 2)
+    if isinstance(value, str):
+        return value.strip() or None
+    return value
+
+
+def _changed(old: Any, new: Any) -> bool:
+    return _normalize(old) != _normalize(new)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, int):
+        return value
+    value = _normalize(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def status_activity(status_desc: Optional[str]) -> Tuple[str, str]:
+    """Map a status description to (activity_type, status text shown in the feed)."""
+    normalized = (status_desc or "").strip().lower()
+    if normalized == "not yet started":
+        return "TO_DO", "To Do"
+    if normalized == "in progress":
+        return "IN_PROGRESS", status_desc
+    if normalized in ("completed", "closed"):
+        return "DONE", status_desc
+    if normalized in ("cancelled", "canceled"):
+        return "BLOCKED", status_desc
+    return "STATUS_CHANGE", status_desc or "Unknown"
+
+
+async def _load_names(cursor, snapshots: Iterable[Optional[Dict[str, Any]]], fields: Dict[str, str]) -> Dict[Tuple[str, Any], str]:
+    """Fetch display names for the user/team/product codes in the snapshots with one query."""
+    codes: Dict[str, set] = {kind: set() for kind in NAME_LOOKUPS}
+    for snapshot in snapshots:
+        if not snapshot:
+            continue
+        for field, kind in fields.items():
+            if kind in codes and snapshot.get(field):
+                codes[kind].add(snapshot[field])
+    kinds = [kind for kind, values in codes.items() if values]
+    if not kinds:
+        return {}
+    await cursor.execute(
+        " UNION ALL ".join(NAME_LOOKUPS[kind] for kind in kinds),
+        {kind: list(codes[kind]) for kind in kinds}
+    )
+    return {(kind, code): name for kind, code, name in await cursor.fetchall()}
+
+
+def _display_value(kind: str, value: Any, reference_data: ReferenceData, names: Dict[Tuple[str, Any], str]) -> str:
+    if kind == "priority":
+        return reference_data.priorities.get(value) or "Unknown"
+    if kind == "task_type":
+        return reference_data.task_types.get(value) or value or "Unknown"
+    if kind == "date":
+        return value.strftime("%d-%m-%Y") if value else ""
+    if kind == "hours":
+        return f"{float(value):.2f}"
+    if kind in NAME_LOOKUPS:
+        return names.get((kind, value)) or value or "Unknown"
+    return str(value)
+
+
+def _change_events(
+    entity_type: str,
+    entity_code: int,
+    epic_code: Optional[int],
+    task_id: Optional[int],
+    assignee: Optional[str],
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+    field_events: Tuple[FieldEvent, ...],
+    reference_data: ReferenceData,
+    names: Dict[Tuple[str, Any], str],
+) -> List[ActivityEvent]:
+    prefix = f"{entity_type.title()} #{entity_code}"
+    events = []
+    for spec in field_events:
+        old, new = previous.get(spec.field), current.get(spec.field)
+        if old is None or new is None or not _changed(old, new):
+            continue
+        shown = _display_value(spec.value_kind, new, reference_data, names)
+        events.append(ActivityEvent(
+            spec.activity_type, entity_type, entity_code, epic_code, task_id,
+            f"{spec.label.capitalize()} changed to {shown}", assignee,
+            f"{prefix} {spec.label} changed to {shown}",
+            {"field": spec.field, "old": _json_value(old), "new": _json_value(new)},
+        ))
+    return events
+
+
+def _status_event(entity_type, entity_code, epic_code, task_id, assignee, created_by,
+                  old_status, new_status, reference_data: ReferenceData) -> Optional[ActivityEvent]:
+    if not new_status or not _changed(old_status, new_status):
+        return None
+    activity_type, status_text = status_activity(reference_data.statuses.get(new_status))
+    prefix = f"{entity_type.title()} #{entity_code}"
+    if activity_type == "TO_DO" and entity_type == "TASK" and assignee:
+        description = f"{prefix} assigned to self" if assignee == created_by else f"{prefix} assigned"
+    else:
+        description = {
+            "TO_DO": f"{prefix} status changed to To Do",
+            "IN_PROGRESS": f"{prefix} started",
+            "DONE": f"{prefix} completed",
+            "BLOCKED": f"{prefix} blocked",
+        }.get(activity_type, f"{prefix} status changed to {status_text}")
+    return ActivityEvent(
+        activity_type, entity_type, entity_code, epic_code, task_id, status_text, assignee, description,
+        {"field": "status_code", "old": old_status, "new": new_status},
+    )
+
+
+async def task_events(
+    cursor,
+    task_id: int,
+    epic_code: Optional[int],
+    previous: Optional[Dict[str, Any]],
+    current: Dict[str, Any],
+    created_by: str,
+    reference_data: ReferenceData,
+) -> List[ActivityEvent]:
+    """
+    Events for a task write. previous is None for a new task; otherwise previous and current
+    are snapshots with the task_hist columns named in TASK_FIELD_EVENTS plus status_code,
+    assignee and assigned_team_code.
+    """
+    assignee = current.get("assignee")
+    prefix = f"Task #{task_id}"
+    if previous is None:
+        if assignee and assignee == created_by:
+            description = f"{prefix} assigned to self"
+        elif assignee:
+            description = f"{prefix} assigned"
+        else:
+            description = f"{prefix} created"
+        return [ActivityEvent("CREATED", "TASK", task_id, epic_code, task_id, "Created", assignee, description)]
+
+    fields = {spec.field: spec.value_kind for spec in TASK_FIELD_EVENTS}
+    fields.update({"assignee": "user", "assigned_team_code": "team"})
+    names = await _load_names(cursor, [current], fields)
+
+    events = []
+    status_event = _status_event("TASK", task_id, epic_code, task_id, assignee, created_by,
+                                 previous.get("status_code"), current.get("status_code"), reference_data)
+    if status_event:
+        events.append(status_event)
+
+    old_assignee = previous.get("assignee")
+    if assignee and _changed(old_assignee, assignee):
+        assignee_name = names.get(("user", assignee)) or assignee
+        if assignee == created_by:
+            status_text = "Assigned to self"
+        elif not old_assignee:
+            status_text = f"Assigned to {assignee_name}"
+        else:
+            status_text = f"Assignee changed to {assignee_name}"
+        events.append(ActivityEvent(
+            "ASSIGNEE_CHANGE", "TASK", task_id, epic_code, task_id, status_text, assignee,
+            f"{prefix} {status_text[0].lower()}{status_text[1:]}",
+            {"field": "assignee", "old": old_assignee, "new": assignee},
+        ))
+
+    old_team, new_team = previous.get("assigned_team_code"), current.get("assigned_team_code")
+    if new_team and _changed(old_team, new_team):
+        team_name = names.get(("team", new_team)) or new_team
+        status_text = f"Assigned to team {team_name}" if not old_team else f"Team changed to {team_name}"
+        events.append(ActivityEvent(
+            "TEAM_CHANGE", "TASK", task_id, epic_code, task_id, status_text, assignee,
+            f"{prefix} {status_text[0].lower()}{status_text[1:]}",
+            {"field": "assigned_team_code", "old": old_team, "new": new_team},
+        ))
+
+    events.extend(_change_events("TASK", task_id, epic_code, task_id, assignee, previous, current,
+                                 TASK_FIELD_EVENTS, reference_data, names))
+    return events
+
+
+async def epic_events(
+    cursor,
+    epic_id: int,
+    previous: Optional[Dict[str, Any]],
+    current: Dict[str, Any],
+    created_by: str,
+    reference_data: ReferenceData,
+) -> List[ActivityEvent]:
+    """Events for an epic write; previous is None for a new epic (see task_events)."""
+    if previous is None:
+        return [ActivityEvent("CREATED", "EPIC", epic_id, epic_id, None, "Created", None, f"Epic #{epic_id} created")]
+
+    names = await _load_names(cursor, [current], {spec.field: spec.value_kind for spec in EPIC_FIELD_EVENTS})
+    events = []
+    status_event = _status_event("EPIC", epic_id, epic_id, None, None, created_by,
+                                 previous.get("status_code"), current.get("status_code"), reference_data)
+    if status_event:
+        events.append(status_event)
+    events.extend(_change_events("EPIC", epic_id, epic_id, None, None, previous, current,
+                                 EPIC_FIELD_EVENTS, reference_data, names))
+    return events
+
+
+def comment_event(parent_type: str, parent_code: int, epic_code: Optional[int], commented_by: str) -> ActivityEvent:
+    label = "Entry" if parent_type == "TIMESHEET_ENTRY" else parent_type.title()
+    return ActivityEvent(
+        "COMMENTED", parent_type, parent_code, epic_code, parent_code if parent_type == "TASK" else None,
+        "Commented", commented_by, f"{label} #{parent_code} commented",
+    )
+
+
+async def append_activity_events(cursor, events: List[ActivityEvent], created_by: str, created_at: datetime) -> int:
+    """Append events to sts_ts.activity_feed on an async_db.AsyncCursor, in the caller's transaction."""
+    if not events:
+        return 0
+    rows = [
+        (
+            event.activity_type, event.entity_type, event.entity_code, event.epic_code, event.task_id,
+            event.status_desc, event.assignee, event.activity_description,
+            json.dumps(event.details) if event.details else None,
+            created_by, created_at
+        )
+        for event in events
+    ]
+    await cursor.execute_values("""
+        INSERT INTO sts_ts.activity_feed (
+            activity_type, entity_type, entity_code, epic_code, task_id,
+            status_desc, assignee, activity_description, details,
+            created_by, created_at
+        ) VALUES %s
+    """, rows, page_size=len(rows))
+    logger.info(f"[INFO] Appended {len(rows)} activity feed event(s): {', '.join(event.activity_type for event in events)}")
+    return len(rows)
+
+
+# Page of the feed, newest first. Display fields are joined only for the rows of the page.
+FEED_PAGE_QUERY = """
+    SELECT
+        af.id, af.activity_type, af.entity_type, af.entity_code, af.epic_code, af.task_id,
+        af.status_desc, af.assignee, af.activity_description, af.details,
+        af.created_by, af.created_at,
+        e.epic_title,
+        CASE af.entity_type WHEN 'EPIC' THEN e.epic_title WHEN 'TASK' THEN t.task_title END AS entity_title,
+        t.task_title,
+        COALESCE(um_created.user_name, 'System') AS created_by_name,
+        COALESCE(um_assignee.user_name, 'Unassigned') AS assignee_name
+    FROM (
+        SELECT *
+        FROM sts_ts.activity_feed
+        WHERE {filters}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %(limit)s
+    ) af
+    LEFT JOIN sts_ts.epics e ON e.id = af.epic_code
+    LEFT JOIN sts_ts.tasks t ON t.id = af.task_id
+    LEFT JOIN sts_new.user_master um_created ON um_created.user_code = af.created_by
+    LEFT JOIN sts_new.user_master um_assignee ON um_assignee.user_code = af.assignee
+    ORDER BY af.created_at DESC, af.id DESC
+"""
+
+
+async def fetch_activity_page(
+    cursor,
+    epic_code: Optional[int] = None,
+    entity_type: Optional[str] = None,
+    entity_code: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Read one page of the feed with keyset pagination: rows strictly older than the
+    before_id event in (created_at, id) order, so each page is an index range scan
+    however deep the client pages. Returns the rows and the before_id of the next page
+    (None on the last page).
+    """
+    filters = []
+    params: Dict[str, Any] = {"limit": limit + 1}
+    if epic_code is not None:
+        filters.append("epic_code = %(epic_code)s")
+        params["epic_code"] = epic_code
+    if entity_type is not None:
+        filters.append("entity_type = %(entity_type)s AND entity_code = %(entity_code)s")
+        params["entity_type"] = entity_type
+        params["entity_code"] = entity_code
+    if before_id is not None:
+        filters.append("(created_at, id) < (SELECT created_at, id FROM sts_ts.activity_feed WHERE id = %(before_id)s)")
+        params["before_id"] = before_id
+
+    await cursor.execute(FEED_PAGE_QUERY.format(filters=" AND ".join(filters) or "true"), params)
+    rows = await cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        {
+            "activity_id": row[0],
+            "activity_type": row[1],
+            "entity_type": row[2],
+            "entity_code": row[3],
+            "epic_code": row[4],
+            "task_id": row[5],
+            "status_desc": row[6],
+            "assignee": row[7],
+            "activity_description": row[8],
+            "details": row[9],
+            "created_by": row[10],
+            "created_at": row[11].isoformat() if row[11] else None,
+            "epic_title": row[12],
+            "entity_title": row[13],
+            "task_title": row[14],
+            "created_by_name": row[15],
+            "assignee_name": row[16],
+        }
+        for row in rows
+    ]
+    return items, (rows[-1][0] if has_more and rows else None)
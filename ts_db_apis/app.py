@@ -3,9 +3,17 @@
 STS Timesheet System API - Simple Version
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+
+from db_pool import init_pool, close_pool, get_pool_stats
+from cache_invalidation import start_invalidation_listener, stop_invalidation_listener, get_invalidation_listener_stats
+from reference_registry import load_reference_data, reference_registry
+from partition_maintenance import ensure_partitions_at_startup
+from upload_layout import RelocatingStaticFiles
+from image_previews import start_preview_worker, stop_preview_worker, get_preview_worker_stats
 
 
 # Import timesheet routes
@@ -15,7 +23,9 @@ from routes.update_task_status import router as update_task_status_router
 from routes.create_epic import router as create_epic_router
 from routes.update_epic_status import router as update_epic_status_router
 from routes.add_attachments import router as add_attachments_router
+from routes.download_attachment import router as download_attachment_router
 from routes.get_master_data import router as get_master_data_router
+from routes.stream_epics import router as stream_epics_router
 from routes.login import router as login_router
 from routes.add_comment import router as add_comment_router
 from routes.leave_application import router as leave_application_router
@@ -25,17 +35,37 @@ from routes.delete_task import router as delete_task_router
 from routes.create_activity import router as create_activity_router
 from routes.assign_task_to_self import router as assign_task_to_self_router
 from routes.save_template import router as save_template_router
+from routes.recent_activities import router as recent_activities_router
+
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared database connection pool once per worker process
+    init_pool()
+    # Evict cached master data when any worker commits a change
+    start_invalidation_listener()
+    # Task type / status / priority / leave type codes validated in memory by the write routes
+    load_reference_data()
+    # Next months' timesheet partitions, so new rows never fall into the default partition
+    ensure_partitions_at_startup()
+    # Thumbnails / previews of image attachments, rendered in background processes
+    start_preview_worker()
+    yield
+    stop_preview_worker()
+    stop_invalidation_listener()
+    close_pool()
+
 
 # Create FastAPI app
-app = FastAPI(title="STS Timesheet API", version="1.0.0")
+app = FastAPI(title="STS Timesheet API", version="1.0.0", lifespan=lifespan)
 
 # =============================================================================
 # STATIC FILES SERVING
 # =============================================================================
 # Comment out static files for local testing
-app.mount("/files", StaticFiles(directory="/var/www/fileServer"), name="files")
+# Old /files URLs of relocated uploads redirect to where the file lives now
+app.mount("/files", RelocatingStaticFiles(directory="/var/www/fileServer"), name="files")
 
 
 # Add CORS middleware
@@ -53,6 +83,34 @@ async def root():
         "status": "active"
     }
 
+@app.get("/health/cache_invalidation", tags=["health"])
+async def cache_invalidation_health():
+    return {
+        "status": "active",
+        "cache_invalidation": get_invalidation_listener_stats()
+    }
+
+@app.get("/health/attachment_previews", tags=["health"])
+async def attachment_previews_health():
+    return {
+        "status": "active",
+        "attachment_previews": get_preview_worker_stats()
+    }
+
+@app.get("/health/reference_registry", tags=["health"])
+async def reference_registry_health():
+    return {
+        "status": "active",
+        "reference_registry": reference_registry.stats()
+    }
+
+@app.get("/health/db_pool", tags=["health"])
+async def db_pool_health():
+    return {
+        "status": "active",
+        "db_pool": get_pool_stats()
+    }
+
 # Register timesheet routes
 app.include_router(timesheet_router, tags=["timesheet"])
 
@@ -70,9 +128,11 @@ app.include_router(use_existing_epic_router, tags=["epics"])
 
 # Register attachment routes
 app.include_router(add_attachments_router, tags=["attachments"])
+app.include_router(download_attachment_router, tags=["attachments"])
 
 # Register master data routes
 app.include_router(get_master_data_router, tags=["master-data"])
+app.include_router(stream_epics_router, tags=["master-data"])
 
 # Register comment routes
 app.include_router(add_comment_router, tags=["comments"])
@@ -86,5 +146,8 @@ app.include_router(leave_application_router, tags=["leave"])
 # Register activity routes
 app.include_router(create_activity_router, tags=["activities"])
 
+# Register activity feed routes
+app.include_router(recent_activities_router, tags=["activity-feed"])
+
 # Register template routes (unified for epic and task templates)
 app.include_router(save_template_router, tags=["templates"])
\ No newline at end of file
@@ -0,0 +1,134 @@
+# async_db.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+
+import psycopg2
+from psycopg2.extras import execute_values
+from fastapi import HTTPException
+from config import load_config
+from db_pool import get_connection, release_connection
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Blocking psycopg2 calls run here instead of on the event loop. One worker per
+# pooled connection is enough because a request only has one statement in flight.
+# Pool checkouts (which may wait) go through the default executor so a queue of
+# waiting requests can never starve the statements that would free a connection.
+db_executor = ThreadPoolExecutor(
+    max_workers=config.get('db_pool_max_size'),
+    thread_name_prefix="db"
+)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call on the bounded DB executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+
+class AsyncCursor:
+    """Awaitable wrapper around a psycopg2 cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    async def execute(self, query, params=None):
+        return await run_db(self._cursor.execute, query, params)
+
+    async def executemany(self, query, params_seq):
+        return await run_db(self._cursor.executemany, query, params_seq)
+
+    async def execute_values(self, query, argslist, template=None, page_size=100, fetch=False):
+        """Multi-row statement via psycopg2.extras.execute_values (query has a single VALUES %s)."""
+        return await run_db(execute_values, self._cursor, query, argslist, template, page_size, fetch)
+
+    async def fetchone(self):
+        return await run_db(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        if size is None:
+            return await run_db(self._cursor.fetchmany)
+        return await run_db(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await run_db(self._cursor.fetchall)
+
+    def mogrify(self, query, params=None):
+        return self._cursor.mogrify(query, params)
+
+    def close(self):
+        # Client-side cursors close without a server round trip
+        self._cursor.close()
+
+
+class AsyncConnection:
+    """
+    Awaitable wrapper around a pooled psycopg2 connection.
+
+    Transaction semantics are psycopg2's: the first statement opens a transaction
+    and it stays open until commit() or rollback() is awaited.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection, for code that must stay synchronous."""
+        return self._conn
+
+    def cursor(self, *args, **kwargs) -> AsyncCursor:
+        return AsyncCursor(self._conn.cursor(*args, **kwargs))
+
+    async def commit(self):
+        return await run_db(self._conn.commit)
+
+    async def rollback(self):
+        return await run_db(self._conn.rollback)
+
+
+async def get_async_db_connection():
+    """
+    FastAPI dependency: check out a pooled connection and wrap it for await-based use.
+
+    The route owns commit/rollback; any transaction still open when the request
+    finishes is rolled back before the connection goes back to the pool.
+    """
+    try:
+        conn = await asyncio.to_thread(get_connection)
+    except psycopg2.OperationalError as e:
+        logger.error(f"[ERROR] Could not check out a database connection: {str(e)}")
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Database connection failed"
+        )
+    try:
+        yield AsyncConnection(conn)
+    finally:
+        await asyncio.to_thread(release_connection, conn)
+
+
+# get_async_db_connection as an `async with` block, for routes that must give the
+# connection back before their response is sent (e.g. file downloads)
+async_db_connection = asynccontextmanager(get_async_db_connection)
@@ -0,0 +1,90 @@
+# batch_loader.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import load_config
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+
+def unique_keys(keys: Iterable[Any]) -> List[Any]:
+    """Drop None and duplicate keys, keeping first-seen order."""
+    seen = set()
+    result = []
+    for key in keys:
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+        result.append(key)
+    return result
+
+
+class BatchLoader:
+    """
+    DataLoader-style batched lookup of rows by key.
+
+    One query fetches the rows for every key at once and the rows are grouped in
+    memory, replacing a query per key inside a row loop. The query selects rows
+    with "<key column> = ANY(%(keys)s)" and may use further named parameters;
+    key_index is the position of the key column in the selected row.
+
+    With many=True (child loading) each key maps to the list of its rows in query
+    order and keys without rows map to []. With many=False (lookup by unique key)
+    each key maps to its row and keys without a row are left out.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        key_index: int = 0,
+        row_mapper: Optional[Callable[[tuple], Any]] = None,
+        many: bool = True,
+    ):
+        self.query = query
+        self.key_index = key_index
+        self.row_mapper = row_mapper
+        self.many = many
+
+    def _params(self, keys: List[Any], params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        query_params = dict(params or {})
+        query_params["keys"] = keys
+        return query_params
+
+    def _group(self, keys: List[Any], rows: List[tuple]) -> Dict[Any, Any]:
+        if self.many:
+            grouped = {key: [] for key in keys}
+            for row in rows:
+                value = self.row_mapper(row) if self.row_mapper else row
+                grouped.setdefault(row[self.key_index], []).append(value)
+        else:
+            grouped = {}
+            for row in rows:
+                value = self.row_mapper(row) if self.row_mapper else row
+                grouped.setdefault(row[self.key_index], value)
+        logger.info(f"[INFO] Batch loaded {len(rows)} rows for {len(keys)} keys")
+        return grouped
+
+    def load(self, cursor, keys: Iterable[Any], params: Optional[Dict[str, Any]] = None) -> Dict[Any, Any]:
+        """Load rows for all keys with a psycopg2 cursor in one round trip."""
+        keys = unique_keys(keys)
+        if not keys:
+            return {}
+        cursor.execute(self.query, self._params(keys, params))
+        return self._group(keys, cursor.fetchall())
+
+    async def load_async(self, cursor, keys: Iterable[Any], params: Optional[Dict[str, Any]] = None) -> Dict[Any, Any]:
+        """Load rows for all keys with an async_db.AsyncCursor in one round trip."""
+        keys = unique_keys(keys)
+        if not keys:
+            return {}
+        await cursor.execute(self.query, self._params(keys, params))
+        return self._group(keys, await cursor.fetchall())
@@ -0,0 +1,234 @@
+# blob_store.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from typing import List, NamedTuple, Optional, Tuple
+
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from upload_pipeline import UploadBudget, hash_upload, save_upload
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+UPLOAD_DIR = config.get('upload_dir')
+BASE_URL = config.get('base_url')
+
+# Blobs live in this directory under upload_dir, named <sha256><extension of the first upload>
+# and sharded by the leading hex digits of the hash: blobs/ab/cd/abcd....pdf, so no
+# directory holds more than a few files even with millions of uploads
+BLOB_DIR = "blobs"
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+# Files generated from a stored file (image_previews.py) sit next to it as <file name><suffix>
+# and are deleted with it
+DERIVATIVE_SUFFIXES = (".thumb.jpg", ".preview.jpg")
+
+# Unreferenced blobs and stray files are kept this long before they are deleted, so an
+# upload that is still between storing its blob and committing its attachment row is safe
+BLOB_GC_GRACE_HOURS = 24
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    size: int
+    file_path: str
+    file_url: str
+    deduplicated: bool  # the content was already stored; nothing was written
+
+
+def shard_directory(digest: str) -> str:
+    """Nested directories for a hex digest, e.g. 'ab/cd' for 'abcd...'."""
+    return "/".join(digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(SHARD_LEVELS))
+
+
+def blob_relative_path(sha256: str, extension: str) -> str:
+    return f"{BLOB_DIR}/{shard_directory(sha256)}/{sha256}{extension.lower()}"
+
+
+def blob_file_path(relative_path: str) -> str:
+    return os.path.join(UPLOAD_DIR, relative_path).replace('\\', '/')
+
+
+def blob_file_url(relative_path: str) -> str:
+    return (BASE_URL if BASE_URL.endswith('/') else BASE_URL + '/') + relative_path
+
+
+def derivative_owner(relative_path: str) -> Optional[str]:
+    """The stored file a derivative file was generated from, or None if it is not a derivative."""
+    for suffix in DERIVATIVE_SUFFIXES:
+        if relative_path.endswith(suffix):
+            return relative_path[:-len(suffix)]
+    return None
+
+
+def _stored_blob(sha256: str, size: int, relative_path: str, deduplicated: bool) -> StoredBlob:
+    return StoredBlob(sha256, size, blob_file_path(relative_path), blob_file_url(relative_path), deduplicated)
+
+
+def _remove_file(file_path: str) -> None:
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def remove_with_derivatives(file_path: str) -> None:
+    for path in (file_path, *(file_path + suffix for suffix in DERIVATIVE_SUFFIXES)):
+        _remove_file(path)
+
+
+async def store_upload_blob(cursor, upload, budget: Optional[UploadBudget] = None) -> StoredBlob:
+    """
+    Store a FastAPI UploadFile in the blob store on an async_db.AsyncCursor, in the
+    caller's transaction, and return where it lives. Insert the attachments row with
+    blob_sha256 = the returned sha256 in the same transaction (the reference count
+    trigger counts it).
+
+    The upload is first only hashed, under the upload_pipeline limits. If a blob with
+    that SHA-256 exists, nothing is written. Otherwise the upload is read again and
+    streamed to a temporary file that is renamed into place.
+    """
+    digest = await hash_upload(upload, budget)
+
+    # Refreshing last_referenced_at also locks the blob against garbage collection until commit
+    await cursor.execute("""
+        UPDATE sts_ts.attachment_blobs
+        SET last_referenced_at = now()
+        WHERE sha256 = %s
+        RETURNING relative_path
+    """, (digest.sha256,))
+    existing = await cursor.fetchone()
+    if existing:
+        logger.info(f"[INFO] Upload '{upload.filename}' matches blob {digest.sha256}, not stored again")
+        return _stored_blob(digest.sha256, digest.size, existing[0], True)
+
+    relative_path = blob_relative_path(digest.sha256, os.path.splitext(upload.filename or "")[1])
+    file_path = blob_file_path(relative_path)
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    await asyncio.to_thread(os.makedirs, os.path.dirname(file_path), 0o755, True)
+    await upload.seek(0)
+    stored = await save_upload(upload, temp_path)
+    if stored.sha256 != digest.sha256:
+        await asyncio.to_thread(_remove_file, temp_path)
+        raise ValueError(f"File '{upload.filename}' changed while it was being stored")
+    # Atomic, so a concurrent upload of the same content only ever replaces it with itself
+    await asyncio.to_thread(os.replace, temp_path, file_path)
+
+    await cursor.execute("""
+        INSERT INTO sts_ts.attachment_blobs (sha256, relative_path, file_size)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (sha256) DO UPDATE SET last_referenced_at = now()
+        RETURNING relative_path
+    """, (digest.sha256, relative_path, digest.size))
+    stored_path = (await cursor.fetchone())[0]
+    if stored_path != relative_path:
+        # A concurrent upload of the same content under another extension got there first
+        await asyncio.to_thread(_remove_file, file_path)
+        return _stored_blob(digest.sha256, digest.size, stored_path, True)
+
+    logger.info(f"[INFO] Upload '{upload.filename}' stored as new blob {relative_path} ({digest.size} bytes)")
+    return _stored_blob(digest.sha256, digest.size, relative_path, False)
+
+
+def collect_garbage(conn, grace_hours: float = BLOB_GC_GRACE_HOURS, batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Delete blobs no attachment has referenced for grace_hours, then files in the blob
+    directory that no blob row points at (left by rolled back uploads), on a synchronous
+    psycopg2 connection. Returns the number of blobs and stray files removed.
+    """
+    removed_blobs = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            # Files go before the commit: once the row is gone a new upload may write the same path
+            cursor.execute("""
+                DELETE FROM sts_ts.attachment_blobs
+                WHERE sha256 IN (
+                    SELECT sha256
+                    FROM sts_ts.attachment_blobs
+                    WHERE ref_count = 0 AND last_referenced_at < now() - make_interval(secs => %(grace)s)
+                    LIMIT %(batch_size)s
+                    FOR UPDATE SKIP LOCKED
+                )
+                AND ref_count = 0 AND last_referenced_at < now() - make_interval(secs => %(grace)s)
+                RETURNING relative_path
+            """, {"grace": grace_hours * 3600, "batch_size": batch_size})
+            relative_paths = [row[0] for row in cursor.fetchall()]
+            for relative_path in relative_paths:
+                remove_with_derivatives(blob_file_path(relative_path))
+            conn.commit()
+            removed_blobs += len(relative_paths)
+            if len(relative_paths) < batch_size:
+                break
+
+        removed_files = _remove_stray_files(cursor, grace_hours, batch_size)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"[INFO] Blob garbage collection removed {removed_blobs} blob(s) and {removed_files} stray file(s)")
+    return removed_blobs, removed_files
+
+
+def _remove_stray_files(cursor, grace_hours: float, batch_size: int) -> int:
+    blob_root = blob_file_path(BLOB_DIR)
+    cutoff = time.time() - grace_hours * 3600
+    candidates = []
+    for directory, _, file_names in os.walk(blob_root):
+        for file_name in file_names:
+            file_path = os.path.join(directory, file_name)
+            try:
+                if os.stat(file_path).st_mtime < cutoff:
+                    candidates.append(os.path.relpath(file_path, UPLOAD_DIR).replace('\\', '/'))
+            except OSError:
+                continue
+
+    removed = 0
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        # A derivative is kept as long as the file it was generated from is
+        owners = {relative_path: derivative_owner(relative_path) or relative_path for relative_path in batch}
+        cursor.execute("""
+            SELECT relative_path
+            FROM sts_ts.attachment_blobs
+            WHERE relative_path = ANY(%s)
+        """, (list(set(owners.values())),))
+        known = {row[0] for row in cursor.fetchall()}
+        for relative_path in batch:
+            if owners[relative_path] not in known:
+                _remove_file(blob_file_path(relative_path))
+                removed += 1
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Delete attachment blobs that are no longer referenced.")
+    parser.add_argument("--grace-hours", type=float, default=BLOB_GC_GRACE_HOURS, help="Keep unreferenced blobs this long")
+    parser.add_argument("--batch-size", type=int, default=500, help="Blobs deleted per transaction")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        removed_blobs, removed_files = collect_garbage(conn, grace_hours=args.grace_hours, batch_size=args.batch_size)
+    finally:
+        release_connection(conn)
+        close_pool()
+    print(f"{removed_blobs} unreferenced blob(s) and {removed_files} stray file(s) removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# cache_invalidation.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import json
+import select
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from psycopg2 import sql
+from config import load_config
+from utils.connect_to_psql import connect_to_psql
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+host = config.get('host')
+port = config.get('port')
+username = config.get('username')
+password = config.get('password')
+database_name = config.get('database_name')
+schema_name = config.get('primary_schema')
+
+INVALIDATION_CHANNEL = config.get('cache_invalidation_channel')
+RECONNECT_SECONDS = config.get('cache_invalidation_reconnect_seconds')
+
+# How long the listener blocks waiting for a notification before checking for shutdown,
+# and how often it pings an otherwise idle connection to notice a dead socket
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15.0
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+
+class InvalidationHandler(NamedTuple):
+    invalidate: Callable[[List[str]], None]  # evict the given keys
+    on_connected: Callable[[], None]  # listener (re)connected - notifications may have been missed
+    on_disconnected: Callable[[], None]  # listener lost - notifications are not arriving
+
+
+_handlers: Dict[str, InvalidationHandler] = {}
+
+
+def register_invalidation_handler(
+    target: str,
+    invalidate: Callable[[List[str]], None],
+    on_connected: Callable[[], None],
+    on_disconnected: Callable[[], None],
+) -> None:
+    """Register the cache that owns notifications published for target."""
+    _handlers[target] = InvalidationHandler(invalidate, on_connected, on_disconnected)
+
+
+async def publish_invalidation(cursor, target: str, *keys: str) -> None:
+    """
+    Queue a change notification in the current transaction of an async_db cursor.
+
+    Postgres delivers it to every listening worker (this one included) only when the
+    transaction commits, and drops it on rollback, so call it before conn.commit().
+    """
+    payload = json.dumps({"target": target, "keys": list(keys)})
+    await cursor.execute("SELECT pg_notify(%s, %s)", (INVALIDATION_CHANNEL, payload))
+
+
+class InvalidationListener(threading.Thread):
+    """
+    Background thread that LISTENs on the invalidation channel over a dedicated
+    (non-pooled) connection and hands each notification to its target's handler.
+    On any connection failure it tells every handler the feed is down, then keeps
+    reconnecting every RECONNECT_SECONDS.
+    """
+
+    def __init__(self, channel: str, reconnect_seconds: float):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._stop_event = threading.Event()
+        self._conn = None
+        self.connected = False
+        self.received = 0
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+    def _notify_handlers(self, connected: bool) -> None:
+        for target, handler in _handlers.items():
+            try:
+                if connected:
+                    handler.on_connected()
+                else:
+                    handler.on_disconnected()
+            except Exception as e:
+                logger.error(f"[ERROR] Invalidation handler for {target} failed on {'connect' if connected else 'disconnect'}: {str(e)}")
+
+    def _dispatch(self, payload: str) -> None:
+        self.received += 1
+        try:
+            message = json.loads(payload)
+            target, keys = message["target"], list(message["keys"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"[WARNING] Ignoring malformed cache invalidation payload {payload!r}: {str(e)}")
+            return
+        handler = _handlers.get(target)
+        if handler is None:
+            logger.warning(f"[WARNING] No cache invalidation handler registered for target {target}")
+            return
+        try:
+            handler.invalidate(keys)
+        except Exception as e:
+            logger.error(f"[ERROR] Cache invalidation for {target} {keys} failed: {str(e)}")
+
+    def _listen(self) -> None:
+        self._conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+        self._conn.autocommit = True
+        cursor = self._conn.cursor()
+        cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        self.connected = True
+        logger.info(f"[INFO] Listening for cache invalidations on channel {self.channel}")
+        self._notify_handlers(connected=True)
+
+        idle_seconds = 0.0
+        while not self._stop_event.is_set():
+            if select.select([self._conn], [], [], POLL_SECONDS) == ([], [], []):
+                idle_seconds += POLL_SECONDS
+                if idle_seconds >= HEARTBEAT_SECONDS:
+                    cursor.execute("SELECT 1")
+                    idle_seconds = 0.0
+                continue
+            idle_seconds = 0.0
+            self._conn.poll()
+            while self._conn.notifies:
+                self._dispatch(self._conn.notifies.pop(0).payload)
+
+    def _close(self) -> None:
+        self.connected = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"[ERROR] Cache invalidation listener failed, retrying in {self.reconnect_seconds}s: {str(e)}")
+                self._notify_handlers(connected=False)
+            finally:
+                self._close()
+            self._stop_event.wait(self.reconnect_seconds)
+        logger.info(f"[INFO] Cache invalidation listener stopped")
+
+
+_listener: Optional[InvalidationListener] = None
+
+
+def start_invalidation_listener() -> InvalidationListener:
+    """Start this worker's listener thread (called once from app startup)."""
+    global _listener
+    if _listener is None or not _listener.is_alive():
+        _listener = InvalidationListener(INVALIDATION_CHANNEL, RECONNECT_SECONDS)
+        _listener.start()
+    return _listener
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop(timeout=POLL_SECONDS * 2)
+        _listener = None
+
+
+def get_invalidation_listener_stats() -> Dict[str, object]:
+    return {
+        "channel": INVALIDATION_CHANNEL,
+        "running": _listener is not None and _listener.is_alive(),
+        "connected": bool(_listener and _listener.connected),
+        "received": _listener.received if _listener else 0,
+    }
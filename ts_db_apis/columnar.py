@@ -0,0 +1,47 @@
+# columnar.py
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# A column spec is (output name, converter or None), one per selected column in query order.
+# Converters mirror the per-field expressions used when building row dicts.
+ColumnSpec = Sequence[Tuple[str, Optional[Callable[[Any], Any]]]]
+
+
+def or_none(value: Any) -> Any:
+    return value if value else None
+
+
+def or_default(default: Any) -> Callable[[Any], Any]:
+    return lambda value: value if value else default
+
+
+def bool_or(default: bool) -> Callable[[Any], Any]:
+    return lambda value: value if value is not None else default
+
+
+def float_or_none(value: Any) -> Optional[float]:
+    return float(value) if value else None
+
+
+def str_or_none(value: Any) -> Optional[str]:
+    return str(value) if value else None
+
+
+def build_columnar(rows: List[tuple], columns: ColumnSpec) -> Dict[str, Any]:
+    """
+    Turn cursor rows into {"columns": [...], "values": [[...], ...], "row_count": n}.
+
+    values holds one array per column, transposed straight from the row tuples, so no
+    per-row dict is created and each key name is sent once instead of once per row.
+    """
+    column_values = list(zip(*rows)) if rows else [() for _ in columns]
+    if len(column_values) != len(columns):
+        raise ValueError(f"Column spec has {len(columns)} columns but rows have {len(column_values)}")
+    return {
+        "columns": [name for name, _ in columns],
+        "values": [
+            list(values) if convert is None else [convert(value) for value in values]
+            for (_, convert), values in zip(columns, column_values)
+        ],
+        "row_count": len(rows),
+    }
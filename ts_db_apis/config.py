@@ -11,6 +11,12 @@ def load_config() -> Dict[str, Any]:
     Returns:
         dict: A dictionary containing configuration settings:
             - Database settings
+            - Connection pool settings
+            - Master data cache and invalidation settings
+            - Reference data registry settings
+            - Table partitioning settings
+            - Fileserver, upload limit and download offload settings
+            - Attachment preview generation settings
             
     Raises:
         FileNotFoundError: If config.config is not found
@@ -39,6 +45,29 @@ def load_config() -> Dict[str, Any]:
             'password': config['postgresql']['password'],
             'database_name': config['postgresql']['database_name'],
             
+            # Connection pool settings
+            'db_pool_min_size': int(config['db_pool']['min_size']),
+            'db_pool_max_size': int(config['db_pool']['max_size']),
+            'db_pool_max_idle_seconds': float(config['db_pool']['max_idle_seconds']),
+            'db_pool_health_check_interval_seconds': float(config['db_pool']['health_check_interval_seconds']),
+            'db_pool_acquire_timeout_seconds': float(config['db_pool']['acquire_timeout_seconds']),
+            
+            # Master data cache settings
+            'master_data_cache_ttl_seconds': float(config['master_data_cache']['ttl_seconds']),
+            'master_data_cache_epics_ttl_seconds': float(config['master_data_cache']['epics_ttl_seconds']),
+            'master_data_snapshot_connections': int(config['master_data_cache']['snapshot_connections']),
+            
+            # Cache invalidation settings
+            'cache_invalidation_channel': config['cache_invalidation']['channel'],
+            'cache_invalidation_reconnect_seconds': float(config['cache_invalidation']['reconnect_seconds']),
+            'cache_invalidation_degraded_ttl_seconds': float(config['cache_invalidation']['degraded_ttl_seconds']),
+            
+            # Reference data registry settings
+            'reference_registry_ttl_seconds': float(config['reference_registry']['ttl_seconds']),
+            
+            # Table partitioning settings
+            'partition_months_ahead': int(config['partitions']['months_ahead']),
+            
             # Schema settings
             'primary_schema': config['schemas']['primary_schema'],
             'user_schema': config['schemas']['user_schema'],
@@ -52,6 +81,20 @@ def load_config() -> Dict[str, Any]:
             # Fileserver settings
             'base_url': config['fileserver']['base_url'],
             'upload_dir': config['fileserver']['upload_dir'],
+            'upload_chunk_size': int(config['fileserver']['upload_chunk_size_kb']) * 1024,
+            'max_file_size': int(config['fileserver']['max_file_size_mb']) * 1024 * 1024,
+            'max_total_upload_size': int(config['fileserver']['max_total_upload_size_mb']) * 1024 * 1024,
+            'accel_redirect_location': config['fileserver']['accel_redirect_location'].strip(),
+            
+            # Attachment preview settings
+            'attachment_previews_channel': config['attachment_previews']['channel'],
+            'attachment_previews_workers': int(config['attachment_previews']['workers']),
+            'attachment_previews_batch_size': int(config['attachment_previews']['batch_size']),
+            'attachment_previews_poll_seconds': float(config['attachment_previews']['poll_seconds']),
+            'attachment_previews_reconnect_seconds': float(config['attachment_previews']['reconnect_seconds']),
+            'attachment_previews_thumbnail_px': int(config['attachment_previews']['thumbnail_px']),
+            'attachment_previews_preview_px': int(config['attachment_previews']['preview_px']),
+            'attachment_previews_jpeg_quality': int(config['attachment_previews']['jpeg_quality']),
             
             # Logging settings
             'log_dir': config['logs']['log_dir'],
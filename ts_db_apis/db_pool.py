@@ -0,0 +1,314 @@
+# db_pool.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2 import extensions
+from fastapi import HTTPException
+from config import load_config
+from utils.connect_to_psql import connect_to_psql
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+host = config.get('host')
+port = config.get('port')
+username = config.get('username')
+password = config.get('password')
+database_name = config.get('database_name')
+schema_name = config.get('primary_schema')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes available within the acquire timeout.
+
+    Subclasses OperationalError so existing handlers treat an exhausted pool
+    the same way as an unreachable database.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe, size-bounded pool of psycopg2 connections.
+
+    Connections are created through utils.connect_to_psql so they carry the same
+    session settings as before. Idle connections are handed out LIFO so the most
+    recently used (warmest) connection is reused first and surplus connections
+    age out after max_idle_seconds.
+    """
+
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        max_idle_seconds: float,
+        health_check_interval_seconds: float,
+        acquire_timeout_seconds: float,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size settings: min_size={min_size}, max_size={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, last_used) - oldest on the left
+        self._size = 0  # idle + checked out + being created
+        self._waiting = 0
+        self._closed = False
+
+        self._created = 0
+        self._discarded = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._health_check_failures = 0
+
+    def _connect(self):
+        return connect_to_psql(host, port, username, password, database_name, schema_name)
+
+    def _discard(self, conn) -> None:
+        """Close a connection and give its slot back (caller must hold the lock)."""
+        self._size -= 1
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _prune_idle(self, now: float) -> None:
+        """Close idle connections past max_idle_seconds, keeping min_size (caller must hold the lock)."""
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used <= self.max_idle_seconds:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"[WARNING] Pooled connection failed health check, discarding: {str(e)}")
+            return False
+
+    def open(self) -> None:
+        """Pre-create min_size connections."""
+        logger.info(f"[INFO] Opening database connection pool (min_size: {self.min_size}, max_size: {self.max_size})")
+        for _ in range(self.min_size):
+            with self._cond:
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.append((conn, time.monotonic()))
+        logger.info(f"[INFO] Database connection pool opened with {self.min_size} connections")
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check a connection out of the pool, waiting up to timeout seconds for one to free up."""
+        timeout = self.acquire_timeout_seconds if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn = None
+            last_used = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise psycopg2.OperationalError("connection pool is closed")
+                    now = time.monotonic()
+                    self._prune_idle(now)
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        if conn.closed:
+                            self._discard(conn)
+                            conn = None
+                            continue
+                        break
+                    if self._size < self.max_size:
+                        # Reserve the slot, connect outside the lock
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(pool size: {self._size}, max_size: {self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                    self._checkouts += 1
+                return conn
+
+            if time.monotonic() - last_used > self.health_check_interval_seconds and not self._is_healthy(conn):
+                with self._cond:
+                    self._health_check_failures += 1
+                    self._discard(conn)
+                continue
+
+            with self._cond:
+                self._checkouts += 1
+            return conn
+
+    def putconn(self, conn) -> None:
+        """Return a connection to the pool, rolling back any transaction left open."""
+        if not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception as e:
+                logger.warning(f"[WARNING] Failed to reset pooled connection, discarding: {str(e)}")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+        with self._cond:
+            if conn.closed or self._closed:
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close every idle connection; checked-out connections are closed when returned."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+        logger.info(f"[INFO] Database connection pool closed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "waiting": self._waiting,
+                "created": self._created,
+                "discarded": self._discarded,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "health_check_failures": self._health_check_failures,
+                "max_idle_seconds": self.max_idle_seconds,
+                "health_check_interval_seconds": self.health_check_interval_seconds,
+                "acquire_timeout_seconds": self.acquire_timeout_seconds,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> ConnectionPool:
+    """Create and open the process-wide pool (called once from app startup)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool(
+                min_size=config.get('db_pool_min_size'),
+                max_size=config.get('db_pool_max_size'),
+                max_idle_seconds=config.get('db_pool_max_idle_seconds'),
+                health_check_interval_seconds=config.get('db_pool_health_check_interval_seconds'),
+                acquire_timeout_seconds=config.get('db_pool_acquire_timeout_seconds'),
+            )
+            pool.open()
+            _pool = pool
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, opening it lazily if startup has not run (e.g. scripts)."""
+    if _pool is None:
+        return init_pool()
+    return _pool
+
+
+def get_connection():
+    """Check a connection out of the process-wide pool."""
+    return get_pool().getconn()
+
+
+def release_connection(conn) -> None:
+    """Return a connection obtained from get_connection() to the pool."""
+    get_pool().putconn(conn)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
+
+
+def get_db_connection():
+    """
+    FastAPI dependency: check out a pooled connection for the duration of the request.
+
+    The route owns commit/rollback; any transaction still open when the request
+    finishes is rolled back before the connection goes back to the pool.
+    """
+    try:
+        conn = get_connection()
+    except psycopg2.OperationalError as e:
+        logger.error(f"[ERROR] Could not check out a database connection: {str(e)}")
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Database connection failed"
+        )
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
@@ -0,0 +1,132 @@
+# file_delivery.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import asyncio
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from config import load_config
+from helper_functions import etag_matches
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+UPLOAD_DIR = config.get('upload_dir')
+ACCEL_REDIRECT_LOCATION = config.get('accel_redirect_location')
+
+# Downloads are authorized per request, so caches must revalidate (cheap with the ETag)
+CACHE_CONTROL = "private, no-cache"
+
+# Attachments of records belonging to one employee; their files are only served by the
+# access-checked download below, never as /files URLs
+PERSONAL_PARENT_TYPES = ('TIMESHEET_ENTRY', 'LEAVE_APPLICATION')
+ATTACHMENT_DOWNLOAD_PATH = "/api/v1/timesheet/attachments/{attachment_id}/download"
+
+
+class DeliverableFile(NamedTuple):
+    file_path: str  # absolute path under upload_dir
+    file_name: str  # name the client saves it under
+    media_type: str
+    etag: Optional[str] = None  # quoted; derived from size and mtime when None
+
+
+def attachment_download_url(attachment_id: int, variant: str = "original") -> str:
+    url = ATTACHMENT_DOWNLOAD_PATH.format(attachment_id=attachment_id)
+    return url if variant == "original" else f"{url}?variant={variant}"
+
+
+def behind_accel_proxy(request: Request) -> bool:
+    """
+    Whether the request came through the nginx API location, which marks it with
+    X-Sendfile-Type: X-Accel-Redirect. The header is taken as is, so nginx must set it
+    with proxy_set_header on every location proxying to the API (replacing whatever the
+    client sent) and never pass a client's value through.
+    """
+    return bool(ACCEL_REDIRECT_LOCATION) and request.headers.get("x-sendfile-type", "").lower() == "x-accel-redirect"
+
+
+def _relative_to_upload_dir(file_path: str) -> Optional[str]:
+    relative_path = os.path.relpath(file_path, UPLOAD_DIR).replace('\\', '/')
+    if relative_path.startswith('../') or relative_path == '..':
+        return None
+    return relative_path
+
+
+def content_disposition(file_name: str, disposition_type: str) -> str:
+    quoted_name = quote(file_name)
+    if quoted_name != file_name:
+        return f"{disposition_type}; filename*=utf-8''{quoted_name}"
+    return f'{disposition_type}; filename="{file_name}"'
+
+
+def _stat_etag(stat_result: os.stat_result) -> str:
+    return '"' + hashlib.md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode()).hexdigest() + '"'
+
+
+def _not_modified(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def deliver_file(request: Request, delivered: DeliverableFile, disposition_type: str = "attachment") -> Response:
+    """
+    Response that sends a stored file once the caller has been authorized.
+
+    Behind nginx (see behind_accel_proxy) the body is left to the proxy: the response
+    only carries X-Accel-Redirect to the internal location for upload_dir, and nginx
+    serves the file with Range, ETag and Last-Modified handling of its own. Otherwise
+    the file is sent by the application with Range requests (206 / 416), ETag and
+    Last-Modified, answering conditional requests with 304.
+
+    Raises FileNotFoundError if the file is missing or outside upload_dir.
+    """
+    relative_path = _relative_to_upload_dir(delivered.file_path)
+    if relative_path is None:
+        raise FileNotFoundError(delivered.file_path)
+    headers = {
+        "Cache-Control": CACHE_CONTROL,
+        "Content-Disposition": content_disposition(delivered.file_name, disposition_type),
+    }
+
+    if behind_accel_proxy(request):
+        headers["X-Accel-Redirect"] = ACCEL_REDIRECT_LOCATION.rstrip('/') + '/' + quote(relative_path)
+        logger.info(f"[INFO] Handing {relative_path} to the proxy via X-Accel-Redirect")
+        return Response(media_type=delivered.media_type, headers=headers)
+
+    stat_result = await asyncio.to_thread(os.stat, delivered.file_path)
+    etag = delivered.etag or _stat_etag(stat_result)
+    headers["ETag"] = etag
+    headers["Last-Modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+    if _not_modified(request, etag, stat_result):
+        del headers["Content-Disposition"]
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse answers Range / If-Range itself, reads the file off the event loop, and
+    # hands the whole transfer to the server when it supports the ASGI pathsend extension
+    return FileResponse(
+        delivered.file_path,
+        stat_result=stat_result,
+        media_type=delivered.media_type,
+        headers=headers,
+    )
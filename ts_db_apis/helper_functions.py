@@ -114,4 +114,42 @@ def format_file_size(bytes_size):
     elif bytes_size < 1024 * 1024 * 1024:
         return f"{bytes_size / (1024 * 1024):.1f} MB"
     else:
-        return f"{bytes_size / (1024 * 1024 * 1024):.1f} GB"
\ No newline at end of file
+        return f"{bytes_size / (1024 * 1024 * 1024):.1f} GB"
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header value against an ETag (weak comparison, supports lists and *)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    def _opaque(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+    target = _opaque(etag)
+    return any(_opaque(candidate) == target for candidate in if_none_match.split(","))
+
+
+def select_content_encoding(accept_encoding: str, available) -> str:
+    """Pick the best content-coding from available (br, gzip, identity) allowed by an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    best, best_quality = "identity", 0.0
+    for coding in ("br", "gzip"):  # br wins ties
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if coding in available and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
@@ -0,0 +1,360 @@
+# history_store.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# A full snapshot is written at least every this many history rows of one task/epic,
+# which bounds how many deltas a reconstruction has to replay
+CHECKPOINT_INTERVAL = 20
+
+
+class HistorySpec(NamedTuple):
+    table: str
+    key_column: str  # task_code / epic_code
+    columns: Tuple[str, ...]  # state columns, stored in full on checkpoints and when changed on deltas
+    always_written: Tuple[str, ...]  # state columns stored on every row (views filter on them)
+    event_columns: Tuple[str, ...]  # per-change columns that are not state (never carried forward)
+
+
+TASK_HISTORY = HistorySpec(
+    table="task_hist",
+    key_column="task_code",
+    columns=(
+        "status_code", "priority_code", "task_type_code", "product_code", "assigned_team_code",
+        "assignee", "reporter", "work_mode", "assigned_on", "start_date", "due_date", "closed_on",
+        "estimated_hours", "max_hours", "cancelled_by", "cancelled_at",
+    ),
+    always_written=("status_code",),
+    event_columns=("status_reason",),
+)
+
+EPIC_HISTORY = HistorySpec(
+    table="epic_hist",
+    key_column="epic_code",
+    columns=(
+        "status_code", "reporter", "priority_code", "product_code", "start_date", "due_date",
+        "closed_on", "estimated_hours", "max_hours", "cancelled_by", "cancelled_at",
+    ),
+    always_written=("status_code",),
+    event_columns=("status_reason", "user_code"),
+)
+
+HISTORY_SPECS = {"task": TASK_HISTORY, "epic": EPIC_HISTORY}
+
+
+class HistoryRow(NamedTuple):
+    id: int
+    is_checkpoint: bool
+    changed_columns: Optional[List[str]]  # None on rows written before compact history (full snapshots)
+    values: Dict[str, Any]
+    event: Dict[str, Any]
+    created_by: str
+    created_at: datetime
+
+
+def _comparable(value: Any) -> Any:
+    # numeric columns come back as Decimal but routes pass floats and ints
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    return value
+
+
+def diff_state(spec: HistorySpec, previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """State columns whose value differs between two states, in spec order."""
+    return [
+        column for column in spec.columns
+        if _comparable(previous.get(column)) != _comparable(current.get(column))
+    ]
+
+
+def apply_history_row(spec: HistorySpec, state: Optional[Dict[str, Any]], row: HistoryRow) -> Dict[str, Any]:
+    """Return the state after row: a checkpoint replaces it, a delta overwrites its changed columns."""
+    if row.is_checkpoint or state is None:
+        return {column: row.values.get(column) for column in spec.columns}
+    state = dict(state)
+    for column in spec.always_written + tuple(row.changed_columns or ()):
+        state[column] = row.values.get(column)
+    return state
+
+
+def replay_history(spec: HistorySpec, rows: Sequence[HistoryRow]) -> Optional[Dict[str, Any]]:
+    """State after rows (oldest first, starting at a checkpoint), or None without rows."""
+    state = None
+    for row in rows:
+        state = apply_history_row(spec, state, row)
+    return state
+
+
+def _select_list(spec: HistorySpec) -> str:
+    return ", ".join(("id", "is_checkpoint", "changed_columns") + spec.columns + spec.event_columns + ("created_by", "created_at"))
+
+
+def _history_row(spec: HistorySpec, row: tuple) -> HistoryRow:
+    state_end = 3 + len(spec.columns)
+    event_end = state_end + len(spec.event_columns)
+    return HistoryRow(
+        id=row[0],
+        is_checkpoint=row[1],
+        changed_columns=list(row[2]) if row[2] is not None else None,
+        values=dict(zip(spec.columns, row[3:state_end])),
+        event=dict(zip(spec.event_columns, row[state_end:event_end])),
+        created_by=row[event_end],
+        created_at=row[event_end + 1],
+    )
+
+
+async def write_history(
+    cursor,
+    spec: HistorySpec,
+    code: int,
+    state: Dict[str, Any],
+    created_by: str,
+    created_at: datetime,
+    **event_values: Any,
+) -> int:
+    """
+    Record the state of a task/epic after a change on an async_db.AsyncCursor, in the
+    caller's transaction (after the tasks/epics row was updated, so concurrent writers
+    of the same row are serialized). Returns the history row id.
+
+    state holds the spec's columns (missing ones are NULL). Only the columns that differ
+    from the last recorded state are stored, plus the always-written ones; a full
+    checkpoint is stored for the first row and then every CHECKPOINT_INTERVAL rows.
+    event_values are the spec's event columns, e.g. status_reason.
+    """
+    await cursor.execute(f"""
+        SELECT {_select_list(spec)}
+        FROM sts_ts.{spec.table}
+        WHERE {spec.key_column} = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, (code, CHECKPOINT_INTERVAL))
+    recent = [_history_row(spec, row) for row in await cursor.fetchall()]
+
+    # Replay from the newest checkpoint in the window; without one, start a new chain
+    checkpoint_index = next((index for index, row in enumerate(recent) if row.is_checkpoint), None)
+    if checkpoint_index is None:
+        previous = None
+        is_checkpoint = True
+    else:
+        previous = replay_history(spec, list(reversed(recent[:checkpoint_index + 1])))
+        is_checkpoint = checkpoint_index + 1 >= CHECKPOINT_INTERVAL
+
+    if previous is None:
+        changed = [column for column in spec.columns if state.get(column) is not None]
+    else:
+        changed = diff_state(spec, previous, state)
+
+    if is_checkpoint:
+        state_columns = list(spec.columns)
+    else:
+        state_columns = list(spec.always_written) + [column for column in changed if column not in spec.always_written]
+    event_columns = [column for column in spec.event_columns if event_values.get(column) is not None]
+    columns = [spec.key_column] + state_columns + event_columns + ["is_checkpoint", "changed_columns", "created_by", "created_at"]
+    values = (
+        [code]
+        + [state.get(column) for column in state_columns]
+        + [event_values[column] for column in event_columns]
+        + [is_checkpoint, changed, created_by, created_at]
+    )
+    await cursor.execute(f"""
+        INSERT INTO sts_ts.{spec.table} ({', '.join(columns)})
+        VALUES ({', '.join(['%s'] * len(values))})
+        RETURNING id
+    """, values)
+    result = await cursor.fetchone()
+    if not result:
+        raise Exception(f"Failed to insert {spec.table} entry - no ID returned")
+    logger.info(f"[INFO] {spec.table} entry {result[0]} for {spec.key_column} {code}: "
+                f"{'checkpoint' if is_checkpoint else 'delta'}, changed {changed}")
+    return result[0]
+
+
+async def write_task_history(cursor, task_code: int, state: Dict[str, Any], created_by: str, created_at: datetime,
+                             status_reason: Optional[str] = None) -> int:
+    return await write_history(cursor, TASK_HISTORY, task_code, state, created_by, created_at, status_reason=status_reason)
+
+
+async def write_epic_history(cursor, epic_code: int, state: Dict[str, Any], created_by: str, created_at: datetime,
+                             status_reason: Optional[str] = None, user_code: Optional[str] = None) -> int:
+    return await write_history(cursor, EPIC_HISTORY, epic_code, state, created_by, created_at,
+                               status_reason=status_reason, user_code=user_code)
+
+
+async def _rows_since_checkpoint(cursor, spec: HistorySpec, code: int, as_of: Optional[datetime]) -> List[HistoryRow]:
+    as_of_filter = "AND created_at <= %(as_of)s" if as_of is not None else ""
+    params = {"code": code, "as_of": as_of}
+    await cursor.execute(f"""
+        SELECT created_at, id
+        FROM sts_ts.{spec.table}
+        WHERE {spec.key_column} = %(code)s AND is_checkpoint {as_of_filter}
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+    """, params)
+    checkpoint = await cursor.fetchone()
+    if checkpoint is None:
+        return []
+    params["checkpoint_at"], params["checkpoint_id"] = checkpoint
+    await cursor.execute(f"""
+        SELECT {_select_list(spec)}
+        FROM sts_ts.{spec.table}
+        WHERE {spec.key_column} = %(code)s
+          AND (created_at, id) >= (%(checkpoint_at)s, %(checkpoint_id)s) {as_of_filter}
+        ORDER BY created_at, id
+    """, params)
+    return [_history_row(spec, row) for row in await cursor.fetchall()]
+
+
+async def reconstruct_state(cursor, spec: HistorySpec, code: int, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    State of a task/epic as recorded in its history at as_of (latest when None), on an
+    async_db.AsyncCursor: the newest checkpoint at or before as_of plus the deltas after it.
+    Returns None if nothing was recorded by then.
+    """
+    return replay_history(spec, await _rows_since_checkpoint(cursor, spec, code, as_of))
+
+
+async def reconstruct_timeline(cursor, spec: HistorySpec, code: int) -> List[Dict[str, Any]]:
+    """Every history row of a task/epic, oldest first, with the full state after it."""
+    await cursor.execute(f"""
+        SELECT {_select_list(spec)}
+        FROM sts_ts.{spec.table}
+        WHERE {spec.key_column} = %s
+        ORDER BY created_at, id
+    """, (code,))
+    timeline = []
+    state = None
+    for row in (_history_row(spec, values) for values in await cursor.fetchall()):
+        previous = state
+        state = apply_history_row(spec, state, row)
+        timeline.append({
+            "id": row.id,
+            "created_by": row.created_by,
+            "created_at": row.created_at,
+            "changed_columns": row.changed_columns if row.changed_columns is not None else (
+                diff_state(spec, previous, state) if previous is not None else list(spec.columns)
+            ),
+            **row.event,
+            "state": state,
+        })
+    return timeline
+
+
+def _compaction_plan(spec: HistorySpec, rows: Sequence[HistoryRow]) -> List[Tuple[int, bool, List[str]]]:
+    """(id, is_checkpoint, changed_columns) for each full-snapshot row of one task/epic that should be rewritten."""
+    plan = []
+    state = None
+    since_checkpoint = 0
+    for row in rows:
+        if row.changed_columns is None:
+            new_state = {column: row.values.get(column) for column in spec.columns}
+            changed = diff_state(spec, state if state is not None else {}, new_state)
+            is_checkpoint = state is None or since_checkpoint + 1 >= CHECKPOINT_INTERVAL
+            plan.append((row.id, is_checkpoint, changed))
+            state = new_state
+        else:
+            is_checkpoint = row.is_checkpoint
+            state = apply_history_row(spec, state, row)
+        since_checkpoint = 0 if is_checkpoint else since_checkpoint + 1
+    return plan
+
+
+def compact_history(conn, spec: HistorySpec, batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Rewrite the full-snapshot rows written before compact history into deltas plus periodic
+    checkpoints, on a synchronous psycopg2 connection, committing per batch of tasks/epics.
+    Returns the number of rows turned into deltas and kept as checkpoints. The space is
+    reusable after the next VACUUM; VACUUM FULL (or pg_repack) returns it to the OS.
+    """
+    nulling = ",\n                ".join(
+        f"{column} = CASE WHEN v.is_checkpoint OR '{column}' = ANY(v.changed_columns) THEN h.{column} END"
+        for column in spec.columns if column not in spec.always_written
+    )
+    update_query = f"""
+        UPDATE sts_ts.{spec.table} h SET
+                {nulling},
+                is_checkpoint = v.is_checkpoint,
+                changed_columns = v.changed_columns
+        FROM (VALUES %s) AS v(id, is_checkpoint, changed_columns)
+        WHERE h.id = v.id
+    """
+    deltas = checkpoints = 0
+    last_code = None
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT DISTINCT {spec.key_column}
+                FROM sts_ts.{spec.table}
+                WHERE changed_columns IS NULL AND (%(last_code)s::integer IS NULL OR {spec.key_column} > %(last_code)s)
+                ORDER BY {spec.key_column}
+                LIMIT %(batch_size)s
+            """, {"last_code": last_code, "batch_size": batch_size})
+            codes = [row[0] for row in cursor.fetchall()]
+            if not codes:
+                break
+            last_code = codes[-1]
+
+            cursor.execute(f"""
+                SELECT {spec.key_column}, {_select_list(spec)}
+                FROM sts_ts.{spec.table}
+                WHERE {spec.key_column} = ANY(%s)
+                ORDER BY {spec.key_column}, created_at, id
+                FOR UPDATE
+            """, (codes,))
+            rows_by_code: Dict[int, List[HistoryRow]] = {}
+            for row in cursor.fetchall():
+                rows_by_code.setdefault(row[0], []).append(_history_row(spec, row[1:]))
+
+            plan = [entry for rows in rows_by_code.values() for entry in _compaction_plan(spec, rows)]
+            if plan:
+                execute_values(cursor, update_query, plan, template="(%s, %s, %s::text[])", page_size=1000)
+            conn.commit()
+            batch_checkpoints = sum(1 for _, is_checkpoint, _ in plan if is_checkpoint)
+            checkpoints += batch_checkpoints
+            deltas += len(plan) - batch_checkpoints
+            logger.info(f"[INFO] Compacted {spec.table} for {len(codes)} {spec.key_column}(s) up to {last_code}: "
+                        f"{len(plan) - batch_checkpoints} delta(s), {batch_checkpoints} checkpoint(s)")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return deltas, checkpoints
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rewrite full-snapshot task/epic history rows into compact deltas.")
+    parser.add_argument("--history", choices=sorted(HISTORY_SPECS), action="append", help="History to compact (repeatable, default: all)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tasks/epics compacted per transaction")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        for name in args.history or sorted(HISTORY_SPECS):
+            deltas, checkpoints = compact_history(conn, HISTORY_SPECS[name], batch_size=args.batch_size)
+            print(f"{HISTORY_SPECS[name].table}: {deltas} row(s) compacted to deltas, {checkpoints} kept as checkpoints")
+    finally:
+        release_connection(conn)
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
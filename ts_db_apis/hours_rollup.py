@@ -0,0 +1,231 @@
+# hours_rollup.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from helper_functions import get_current_time_ist, parse_date
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Most hours a user may log for one day across all entries that are not REJECTED
+MAX_DAILY_HOURS = Decimal(24)
+
+# Rollup column holding the hours of entries in each approval status
+STATUS_COLUMNS = {
+    "DRAFT": "draft_hours",
+    "SUBMITTED": "submitted_hours",
+    "APPROVED": "approved_hours",
+    "REJECTED": "rejected_hours",
+}
+HOURS_COLUMNS = tuple(STATUS_COLUMNS.values())
+
+
+class HoursChange(NamedTuple):
+    user_code: str
+    entry_date: Optional[date]  # DRAFT entries may have no date yet - they are not rolled up
+    total_hours: Any  # numeric from the entry (Decimal, float, int or None)
+    from_status: Optional[str]  # None for a new entry
+    to_status: str
+
+
+def _week_key(entry_date: date) -> Tuple[int, int, date]:
+    iso_year, iso_week, iso_weekday = entry_date.isocalendar()
+    return iso_year, iso_week, entry_date - timedelta(days=iso_weekday - 1)
+
+
+def aggregate_hours_changes(changes: Iterable[HoursChange]) -> Dict[Tuple[str, date], Dict[str, Any]]:
+    """
+    Net the changes per (user_code, entry_date) into deltas for each hours column plus
+    entry_count, e.g. a DRAFT -> SUBMITTED move of 8h is draft_hours -8, submitted_hours +8.
+    """
+    deltas: Dict[Tuple[str, date], Dict[str, Any]] = {}
+    for change in changes:
+        if change.entry_date is None:
+            continue
+        delta = deltas.setdefault(
+            (change.user_code, change.entry_date),
+            dict({column: Decimal(0) for column in HOURS_COLUMNS}, entry_count=0)
+        )
+        hours = Decimal(str(change.total_hours or 0))
+        if change.from_status is None:
+            delta["entry_count"] += 1
+        else:
+            delta[STATUS_COLUMNS[change.from_status]] -= hours
+        delta[STATUS_COLUMNS[change.to_status]] += hours
+    return deltas
+
+
+def _upsert_query(table: str, key_columns: Sequence[str], insert_columns: Sequence[str] = ()) -> str:
+    # insert_columns are only written when the row is created
+    columns = list(key_columns) + list(insert_columns) + list(HOURS_COLUMNS) + ["entry_count", "updated_at"]
+    updates = [f"{column} = r.{column} + EXCLUDED.{column}" for column in HOURS_COLUMNS + ("entry_count",)]
+    return f"""
+        INSERT INTO sts_ts.{table} AS r ({', '.join(columns)})
+        VALUES %s
+        ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET
+            {', '.join(updates)},
+            updated_at = EXCLUDED.updated_at
+        RETURNING {', '.join(key_columns)}, total_hours - rejected_hours
+    """
+
+
+DAILY_UPSERT_QUERY = _upsert_query("timesheet_hours_daily", ("user_code", "entry_date"))
+WEEKLY_UPSERT_QUERY = _upsert_query("timesheet_hours_weekly", ("user_code", "iso_year", "iso_week"), ("week_start",))
+
+
+async def apply_hours_changes(cursor, changes: Iterable[HoursChange]) -> Dict[Tuple[str, date], Decimal]:
+    """
+    Add entry changes to the daily and weekly rollups on an async_db.AsyncCursor, inside
+    the caller's transaction so the rollup commits or rolls back with the entries.
+
+    Rows are upserted in key order so concurrent requests lock them in the same order.
+    Returns the resulting non-rejected hours per (user_code, entry_date) for cap checks.
+    """
+    deltas = aggregate_hours_changes(changes)
+    if not deltas:
+        return {}
+    updated_at = get_current_time_ist()
+
+    weekly: Dict[Tuple[str, int, int, date], Dict[str, Any]] = {}
+    for (user_code, entry_date), delta in deltas.items():
+        week_delta = weekly.setdefault((user_code,) + _week_key(entry_date), defaultdict(int))
+        for column, value in delta.items():
+            week_delta[column] += value
+
+    columns = HOURS_COLUMNS + ("entry_count",)
+    daily_rows = [
+        key + tuple(delta[column] for column in columns) + (updated_at,)
+        for key, delta in sorted(deltas.items())
+    ]
+    weekly_rows = [
+        key + tuple(delta[column] for column in columns) + (updated_at,)
+        for key, delta in sorted(weekly.items())
+    ]
+    daily_result = await cursor.execute_values(DAILY_UPSERT_QUERY, daily_rows, page_size=len(daily_rows), fetch=True)
+    await cursor.execute_values(WEEKLY_UPSERT_QUERY, weekly_rows, page_size=len(weekly_rows))
+    logger.info(f"[INFO] Hours rollup updated: {len(daily_rows)} day(s), {len(weekly_rows)} week(s)")
+    return {(row[0], row[1]): row[2] for row in daily_result}
+
+
+def daily_cap_error(daily_hours: Dict[Tuple[str, date], Decimal]) -> Optional[str]:
+    """Return why the returned daily totals break MAX_DAILY_HOURS, or None if they don't."""
+    over = sorted((entry_date, hours) for (_, entry_date), hours in daily_hours.items() if hours > MAX_DAILY_HOURS)
+    if not over:
+        return None
+    return "Total time for a day cannot exceed 24 hours: " + ", ".join(f"{entry_date} would have {hours} hours" for entry_date, hours in over)
+
+
+def rebuild_hours_rollup(conn, from_date: Optional[date] = None, to_date: Optional[date] = None,
+                         user_codes: Optional[List[str]] = None) -> Tuple[int, int]:
+    """
+    Recompute the rollups from sts_ts.timesheet_entry (backfill, or repair after direct edits)
+    on a synchronous psycopg2 connection, and commit. Without dates every row is rebuilt.
+
+    The range is widened to whole ISO weeks so the weekly rows stay complete. Both tables
+    are locked against writers meanwhile; route transactions wait and then apply their
+    deltas on top of the rebuilt rows. Returns the number of daily and weekly rows written.
+    """
+    if from_date is not None:
+        from_date = _week_key(from_date)[2]
+    if to_date is not None:
+        to_date = _week_key(to_date)[2] + timedelta(days=6)
+
+    params: Dict[str, object] = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "user_codes": list(user_codes) if user_codes else None,
+        "updated_at": get_current_time_ist(),
+    }
+
+    def range_filter(date_column: str) -> str:
+        conditions = [f"{date_column} IS NOT NULL"]
+        if from_date is not None:
+            conditions.append(f"{date_column} >= %(from_date)s")
+        if to_date is not None:
+            conditions.append(f"{date_column} <= %(to_date)s")
+        if user_codes:
+            conditions.append("user_code = ANY(%(user_codes)s)")
+        return " AND ".join(conditions)
+
+    entry_filter = range_filter("entry_date")
+    sums = ", ".join(
+        f"COALESCE(sum(total_hours) FILTER (WHERE approval_status = '{status}'), 0)"
+        for status in STATUS_COLUMNS
+    )
+    cursor = conn.cursor()
+    try:
+        cursor.execute("LOCK TABLE sts_ts.timesheet_hours_daily, sts_ts.timesheet_hours_weekly IN EXCLUSIVE MODE")
+
+        cursor.execute(f"DELETE FROM sts_ts.timesheet_hours_daily WHERE {entry_filter}", params)
+        cursor.execute(f"""
+            INSERT INTO sts_ts.timesheet_hours_daily (user_code, entry_date, {', '.join(HOURS_COLUMNS)}, entry_count, updated_at)
+            SELECT user_code, entry_date, {sums}, count(*), %(updated_at)s
+            FROM sts_ts.timesheet_entry
+            WHERE {entry_filter}
+            GROUP BY user_code, entry_date
+        """, params)
+        daily_count = cursor.rowcount
+
+        cursor.execute(f"DELETE FROM sts_ts.timesheet_hours_weekly WHERE {range_filter('week_start')}", params)
+        cursor.execute(f"""
+            INSERT INTO sts_ts.timesheet_hours_weekly (user_code, iso_year, iso_week, week_start, {', '.join(HOURS_COLUMNS)}, entry_count, updated_at)
+            SELECT
+                user_code,
+                EXTRACT(isoyear FROM entry_date)::integer,
+                EXTRACT(week FROM entry_date)::integer,
+                date_trunc('week', entry_date)::date,
+                {sums}, count(*), %(updated_at)s
+            FROM sts_ts.timesheet_entry
+            WHERE {entry_filter}
+            GROUP BY user_code, EXTRACT(isoyear FROM entry_date), EXTRACT(week FROM entry_date), date_trunc('week', entry_date)
+        """, params)
+        weekly_count = cursor.rowcount
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"[INFO] Hours rollup rebuilt from {from_date or 'start'} to {to_date or 'end'}"
+                f"{f' for {len(user_codes)} user(s)' if user_codes else ''}: {daily_count} daily, {weekly_count} weekly rows")
+    return daily_count, weekly_count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the timesheet hours rollup tables from timesheet_entry.")
+    parser.add_argument("--from-date", help="First entry date to rebuild (widened to its ISO week)")
+    parser.add_argument("--to-date", help="Last entry date to rebuild (widened to its ISO week)")
+    parser.add_argument("--user", action="append", dest="user_codes", help="Only rebuild this user (repeatable)")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        daily_count, weekly_count = rebuild_hours_rollup(
+            conn,
+            from_date=parse_date(args.from_date) if args.from_date else None,
+            to_date=parse_date(args.to_date) if args.to_date else None,
+            user_codes=args.user_codes,
+        )
+    finally:
+        release_connection(conn)
+        close_pool()
+    print(f"Rebuilt {daily_count} daily and {weekly_count} weekly rollup rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+# image_previews.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+import multiprocessing
+import os
+import select
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+from PIL import Image, ImageOps
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from blob_store import DERIVATIVE_SUFFIXES
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from utils.connect_to_psql import connect_to_psql
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+host = config.get('host')
+port = config.get('port')
+username = config.get('username')
+password = config.get('password')
+database_name = config.get('database_name')
+schema_name = config.get('primary_schema')
+
+PREVIEW_CHANNEL = config.get('attachment_previews_channel')
+PREVIEW_WORKERS = config.get('attachment_previews_workers')
+BATCH_SIZE = config.get('attachment_previews_batch_size')
+POLL_SECONDS = config.get('attachment_previews_poll_seconds')
+RECONNECT_SECONDS = config.get('attachment_previews_reconnect_seconds')
+THUMBNAIL_PX = config.get('attachment_previews_thumbnail_px')
+PREVIEW_PX = config.get('attachment_previews_preview_px')
+JPEG_QUALITY = config.get('attachment_previews_jpeg_quality')
+
+THUMBNAIL_SUFFIX, PREVIEW_SUFFIX = DERIVATIVE_SUFFIXES
+
+# File name extensions the preview queue trigger marks PENDING (sql/triggers/attachment_preview_queue.sql)
+IMAGE_FILE_TYPES = ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff')
+
+# How long the worker blocks waiting for a notification before checking for shutdown
+WAIT_SECONDS = 1.0
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+
+class PreviewJob(NamedTuple):
+    attachment_id: int
+    file_path: str
+    file_url: str
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    # JPEG has no alpha channel; transparent areas become white instead of black
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _save_jpeg(image: Image.Image, file_path: str, quality: int) -> None:
+    temp_path = f"{file_path}.{os.getpid()}.part"
+    image.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    # Readable by the web server that serves the files
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, file_path)
+
+
+def render_previews(
+    file_path: str,
+    thumbnail_px: int = THUMBNAIL_PX,
+    preview_px: int = PREVIEW_PX,
+    quality: int = JPEG_QUALITY,
+) -> None:
+    """
+    Write the preview (longest side preview_px) and thumbnail (thumbnail_px) JPEGs of
+    an image next to it. Runs in the worker pool's processes. Files that already exist
+    are kept: stored files are content addressed, so they were rendered from the same image.
+    """
+    thumbnail_path, preview_path = file_path + THUMBNAIL_SUFFIX, file_path + PREVIEW_SUFFIX
+    if os.path.exists(thumbnail_path) and os.path.exists(preview_path):
+        return
+    with Image.open(file_path) as source:
+        # JPEGs are decoded at a reduced scale when that is still larger than the preview
+        source.draft("RGB", (preview_px, preview_px))
+        image = _to_rgb(ImageOps.exif_transpose(source))
+    image.thumbnail((preview_px, preview_px), Image.Resampling.LANCZOS)
+    _save_jpeg(image, preview_path, quality)
+    image.thumbnail((thumbnail_px, thumbnail_px), Image.Resampling.LANCZOS)
+    _save_jpeg(image, thumbnail_path, quality)
+
+
+def process_pending(conn, executor: ProcessPoolExecutor, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Render one batch of PENDING attachments on a synchronous psycopg2 connection and
+    record the outcome on their rows. The rows stay locked while the batch renders, so
+    every API worker (and the CLI) can run this at the same time. Returns the number
+    of attachments processed.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT id, file_path, file_url
+            FROM sts_ts.attachments
+            WHERE preview_status = 'PENDING'
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        jobs = [PreviewJob(*row) for row in cursor.fetchall()]
+        if not jobs:
+            conn.rollback()
+            return 0
+
+        futures = {job: executor.submit(render_previews, job.file_path) for job in jobs if job.file_path}
+        ready, failed = [], []
+        for job in jobs:
+            try:
+                if job not in futures:
+                    raise FileNotFoundError("attachment has no file_path")
+                futures[job].result()
+                ready.append((
+                    job.attachment_id,
+                    job.file_path + THUMBNAIL_SUFFIX, job.file_url + THUMBNAIL_SUFFIX,
+                    job.file_path + PREVIEW_SUFFIX, job.file_url + PREVIEW_SUFFIX,
+                ))
+            except Exception as e:
+                logger.warning(f"[WARNING] Preview generation failed for attachment {job.attachment_id} ({job.file_path}): {str(e)}")
+                failed.append(job.attachment_id)
+
+        if ready:
+            execute_values(cursor, """
+                UPDATE sts_ts.attachments a
+                SET preview_status = 'READY',
+                    thumbnail_path = v.thumbnail_path, thumbnail_url = v.thumbnail_url,
+                    preview_path = v.preview_path, preview_url = v.preview_url,
+                    previews_generated_at = now()
+                FROM (VALUES %s) AS v(id, thumbnail_path, thumbnail_url, preview_path, preview_url)
+                WHERE a.id = v.id
+            """, ready)
+        if failed:
+            cursor.execute("""
+                UPDATE sts_ts.attachments
+                SET preview_status = 'FAILED'
+                WHERE id = ANY(%s)
+            """, (failed,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"[INFO] Generated previews for {len(ready)} attachment(s), {len(failed)} failed")
+    return len(jobs)
+
+
+def _new_executor(workers: int) -> ProcessPoolExecutor:
+    # Fresh interpreters rather than forks of the multi-threaded API process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class PreviewWorker(threading.Thread):
+    """
+    Background thread that LISTENs on the preview channel over a dedicated (non-pooled)
+    connection and, whenever attachments are queued (and every poll_seconds in case a
+    notification was missed), renders PENDING ones in a pool of worker processes until
+    none are left. On a connection failure it keeps reconnecting every reconnect_seconds.
+    """
+
+    def __init__(self, channel: str, workers: int, poll_seconds: float, reconnect_seconds: float):
+        super().__init__(name="attachment-preview-worker", daemon=True)
+        self.channel = channel
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self._stop_event = threading.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._conn = None
+        self.connected = False
+        self.processed = 0
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+    def _drain(self) -> None:
+        while not self._stop_event.is_set():
+            conn = get_connection()
+            try:
+                processed = process_pending(conn, self._executor)
+            finally:
+                release_connection(conn)
+            self.processed += processed
+            if processed == 0:
+                return
+
+    def _listen(self) -> None:
+        self._conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+        self._conn.autocommit = True
+        cursor = self._conn.cursor()
+        cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        self.connected = True
+        logger.info(f"[INFO] Listening for attachment previews on channel {self.channel}")
+
+        # Rows queued while nobody was listening
+        self._drain()
+        idle_seconds = 0.0
+        while not self._stop_event.is_set():
+            if select.select([self._conn], [], [], WAIT_SECONDS) == ([], [], []):
+                idle_seconds += WAIT_SECONDS
+                if idle_seconds < self.poll_seconds:
+                    continue
+                # Also checks that the idle connection is still alive
+                cursor.execute("SELECT 1")
+            else:
+                self._conn.poll()
+                self._conn.notifies.clear()
+            idle_seconds = 0.0
+            self._drain()
+
+    def _close(self) -> None:
+        self.connected = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def run(self) -> None:
+        self._executor = _new_executor(self.workers)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self._listen()
+                except Exception as e:
+                    logger.error(f"[ERROR] Attachment preview worker failed, retrying in {self.reconnect_seconds}s: {str(e)}")
+                finally:
+                    self._close()
+                self._stop_event.wait(self.reconnect_seconds)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        logger.info(f"[INFO] Attachment preview worker stopped")
+
+
+_worker: Optional[PreviewWorker] = None
+
+
+def start_preview_worker() -> PreviewWorker:
+    """Start this API worker's preview thread and its process pool (called once from app startup)."""
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = PreviewWorker(PREVIEW_CHANNEL, PREVIEW_WORKERS, POLL_SECONDS, RECONNECT_SECONDS)
+        _worker.start()
+    return _worker
+
+
+def stop_preview_worker() -> None:
+    global _worker
+    if _worker is not None:
+        # A batch being rendered is finished and recorded first
+        _worker.stop()
+        _worker = None
+
+
+def get_preview_worker_stats() -> Dict[str, object]:
+    return {
+        "channel": PREVIEW_CHANNEL,
+        "running": _worker is not None and _worker.is_alive(),
+        "connected": bool(_worker and _worker.connected),
+        "workers": PREVIEW_WORKERS,
+        "processed": _worker.processed if _worker else 0,
+    }
+
+
+def queue_existing_images(conn, retry_failed: bool = False, batch_size: int = 1000) -> int:
+    """
+    Mark image attachments that have no previews yet (and FAILED ones if retry_failed)
+    PENDING on a synchronous psycopg2 connection, in committed batches. The API's preview
+    workers are notified by the queue trigger and generate them. Returns the number queued.
+    """
+    statuses = ['FAILED'] if retry_failed else []
+    queued = 0
+    after_id = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute("""
+                UPDATE sts_ts.attachments
+                SET preview_status = 'PENDING'
+                WHERE id IN (
+                    SELECT id
+                    FROM sts_ts.attachments
+                    WHERE id > %s
+                      AND lower(substring(file_name from '\\.([^.]*)$')) = ANY(%s)
+                      AND (preview_status IS NULL OR preview_status = ANY(%s))
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+            """, (after_id, list(IMAGE_FILE_TYPES), statuses, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            if not ids:
+                break
+            queued += len(ids)
+            after_id = max(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"[INFO] Queued {queued} image attachment(s) for preview generation")
+    return queued
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Queue image attachments for thumbnail and preview generation.")
+    parser.add_argument("--retry-failed", action="store_true", help="Also queue attachments whose previews failed")
+    parser.add_argument("--render", action="store_true",
+                        help="Render the queue in this process instead of leaving it to the running API")
+    parser.add_argument("--workers", type=int, default=PREVIEW_WORKERS, help="Rendering processes with --render")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        queued = queue_existing_images(conn, retry_failed=args.retry_failed)
+        rendered = 0
+        if args.render:
+            with _new_executor(args.workers) as executor:
+                while True:
+                    processed = process_pending(conn, executor)
+                    if processed == 0:
+                        break
+                    rendered += processed
+    finally:
+        release_connection(conn)
+        close_pool()
+    print(f"{queued} image attachment(s) queued" + (f", {rendered} processed" if args.render else ""))
+
+
+if __name__ == "__main__":
+    main()
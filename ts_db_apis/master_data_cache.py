@@ -0,0 +1,308 @@
+# master_data_cache.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from cache_invalidation import publish_invalidation, register_invalidation_handler
+from config import load_config
+from helper_functions import get_current_time_ist
+from utils.logger import get_logger
+
+try:
+    import brotli
+except ImportError:  # optional - without it only gzip and identity bodies are prepared
+    brotli = None
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Sections returned by GET /api/v1/timesheet/GetMasterData, in response order
+MASTER_DATA_SECTIONS = (
+    "task_statuses",
+    "task_types",
+    "priorities",
+    "products",
+    "employees",
+    "teams",
+    "epics",
+    "companies",
+    "contact_persons",
+    "work_locations",
+    "leave_types",
+    "reporters",
+    "activities",
+    "predefined_epics",
+    "predefined_tasks",
+)
+
+
+class SectionEntry(NamedTuple):
+    value: Any
+    etag: str  # content hash of value, stable across reloads and workers
+    expires_at: float
+    loaded_at: datetime  # IST time taken before the load; rows written after it may be missing
+
+
+def compute_section_etag(value: Any) -> str:
+    """Hash a section's content so unchanged data keeps the same ETag after a reload."""
+    payload = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def compute_master_data_etag(section_etags: Dict[str, str]) -> str:
+    """Combine section ETags (in the given order) into one strong ETag for the response."""
+    digest = hashlib.sha256()
+    for section, etag in section_etags.items():
+        digest.update(f"{section}:{etag};".encode('utf-8'))
+    return f'"md-{digest.hexdigest()[:32]}"'
+
+
+class MasterDataCache:
+    """
+    In-process, per-section cache for master data.
+
+    Each section expires after its TTL and can be evicted explicitly by the write
+    routes. Every eviction bumps the section's generation so a load that was
+    already running when the data changed does not store its stale result.
+    A section can be cached in several representations (variants, e.g. "rows" and
+    "columnar"); they share the TTL and generation and are evicted together.
+    """
+
+    def __init__(self, default_ttl_seconds: float, section_ttls: Optional[Dict[str, float]] = None):
+        self.default_ttl_seconds = default_ttl_seconds
+        self.section_ttls = dict(section_ttls or {})
+
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._entries: Dict[Tuple[str, str], SectionEntry] = {}
+        self._generations = {section: 0 for section in MASTER_DATA_SECTIONS}
+        self._ttl_cap: Optional[float] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _ttl(self, section: str) -> float:
+        ttl = self.section_ttls.get(section, self.default_ttl_seconds)
+        if self._ttl_cap is not None:
+            return min(ttl, self._ttl_cap)
+        return ttl
+
+    def set_ttl_cap(self, seconds: Optional[float]) -> None:
+        """Cap the TTL of entries cached from now on (None removes the cap)."""
+        self._ttl_cap = seconds
+
+    def lookup(self, section: str, variant: str = "rows") -> Optional[SectionEntry]:
+        """Return the live cached entry for a section, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get((section, variant))
+            if entry is None:
+                return None
+            if time.monotonic() >= entry.expires_at:
+                del self._entries[(section, variant)]
+                return None
+            self._hits += 1
+            return entry
+
+    def get_or_load(self, section: str, loader: Callable[[], Any], variant: str = "rows") -> SectionEntry:
+        """
+        Return the cached section entry, running loader() on a miss.
+
+        Concurrent misses for the same section wait for a single load instead of
+        all hitting the database.
+        """
+        entry = self.lookup(section, variant)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            if section not in self._generations:
+                raise KeyError(f"Unknown master data section: {section}")
+            load_lock = self._load_locks.setdefault((section, variant), threading.Lock())
+
+        with load_lock:
+            entry = self.lookup(section, variant)
+            if entry is not None:
+                return entry
+
+            with self._lock:
+                self._misses += 1
+                generation = self._generations[section]
+
+            loaded_at = get_current_time_ist()
+            value = loader()
+            entry = SectionEntry(value, compute_section_etag(value), time.monotonic() + self._ttl(section), loaded_at)
+
+            with self._lock:
+                if self._generations[section] == generation:
+                    self._entries[(section, variant)] = entry
+                else:
+                    logger.info(f"[INFO] Master data section '{section}' changed while loading - result not cached")
+            return entry
+
+    def invalidate(self, *sections: str) -> None:
+        with self._lock:
+            for section in sections:
+                if section not in self._generations:
+                    raise KeyError(f"Unknown master data section: {section}")
+                for variant_key in [key for key in self._entries if key[0] == section]:
+                    del self._entries[variant_key]
+                self._generations[section] += 1
+                self._invalidations += 1
+        logger.info(f"[INFO] Master data cache invalidated for sections: {', '.join(sections)}")
+
+    def invalidate_all(self) -> None:
+        self.invalidate(*MASTER_DATA_SECTIONS)
+
+    def generation(self, section: str) -> int:
+        with self._lock:
+            return self._generations[section]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "cached_sections": sorted(
+                    section if variant == "rows" else f"{section}:{variant}"
+                    for (section, variant), entry in self._entries.items() if entry.expires_at > now
+                ),
+                "default_ttl_seconds": self.default_ttl_seconds,
+                "ttl_cap_seconds": self._ttl_cap,
+            }
+
+
+master_data_cache = MasterDataCache(
+    default_ttl_seconds=config.get('master_data_cache_ttl_seconds'),
+    section_ttls={"epics": config.get('master_data_cache_epics_ttl_seconds')},
+)
+
+
+def invalidate_master_data(*sections: str) -> None:
+    """Evict master data sections after a write has been committed."""
+    master_data_cache.invalidate(*sections)
+
+
+async def publish_master_data_change(cursor, *sections: str) -> None:
+    """
+    Tell every worker to evict these sections once the current transaction commits.
+    Call before conn.commit(); invalidate_master_data() after the commit still evicts
+    this worker's copy immediately.
+    """
+    unknown = set(sections) - set(MASTER_DATA_SECTIONS)
+    if unknown:
+        raise KeyError(f"Unknown master data section(s): {', '.join(sorted(unknown))}")
+    await publish_invalidation(cursor, "master_data", *sections)
+
+
+def _invalidate_from_notification(sections: List[str]) -> None:
+    # Skip names this worker does not know (e.g. published by a newer deployment)
+    known = [section for section in sections if section in MASTER_DATA_SECTIONS]
+    if known:
+        master_data_cache.invalidate(*known)
+
+
+def _on_listener_connected() -> None:
+    # Changes made while the listener was down were never announced
+    master_data_cache.invalidate_all()
+    master_data_cache.set_ttl_cap(None)
+
+
+def _on_listener_disconnected() -> None:
+    # Without notifications, bound staleness by expiring entries quickly instead
+    master_data_cache.set_ttl_cap(config.get('cache_invalidation_degraded_ttl_seconds'))
+    master_data_cache.invalidate_all()
+
+
+register_invalidation_handler(
+    "master_data",
+    invalidate=_invalidate_from_notification,
+    on_connected=_on_listener_connected,
+    on_disconnected=_on_listener_disconnected,
+)
+
+
+# Compression levels for prepared bodies; the cost is paid once per payload, not per request
+GZIP_COMPRESS_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def encode_json_body(payload: Any) -> Dict[str, bytes]:
+    """Serialize payload once with orjson and return it per content-coding (identity, gzip, br)."""
+    body = orjson.dumps(payload, default=_json_default)
+    bodies = {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL),
+    }
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return bodies
+
+
+class ResponseBodyCache:
+    """
+    Ready-to-send GetMasterData bodies, keyed by the requested section list.
+
+    Each slot remembers the version key (combined ETag plus anything else baked into the
+    body) it was built for; a lookup with a different key misses, so bodies are rebuilt
+    only after one of their sections was invalidated or reloaded with different content.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[Tuple[str, ...], Tuple[str, Dict[str, bytes]]]" = OrderedDict()
+        self._hits = 0
+        self._builds = 0
+
+    def get(self, sections: Tuple[str, ...], version_key: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            slot = self._bodies.get(sections)
+            if slot is None or slot[0] != version_key:
+                return None
+            self._bodies.move_to_end(sections)
+            self._hits += 1
+            return slot[1]
+
+    def put(self, sections: Tuple[str, ...], version_key: str, bodies: Dict[str, bytes]) -> None:
+        with self._lock:
+            self._bodies[sections] = (version_key, bodies)
+            self._bodies.move_to_end(sections)
+            self._builds += 1
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "builds": self._builds,
+                "entries": len(self._bodies),
+                "bytes": sum(len(body) for _, bodies in self._bodies.values() for body in bodies.values()),
+            }
+
+
+response_body_cache = ResponseBodyCache()
@@ -0,0 +1,92 @@
+# partition_maintenance.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+from typing import Dict, List, NamedTuple, Optional
+
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+PARTITION_MONTHS_AHEAD = config.get('partition_months_ahead')
+
+
+class PartitionedTable(NamedTuple):
+    table: str
+    partition_primary_key: Optional[str]  # per-partition primary key when the table cannot have one
+
+
+# Tables partitioned by month (sql/functions/monthly_partitions.sql)
+PARTITIONED_TABLES = (
+    PartitionedTable("sts_ts.timesheet_entry", "id"),
+    PartitionedTable("sts_ts.timesheet_approval_hist", None),
+)
+
+
+def ensure_partitions(conn, months_ahead: Optional[int] = None, months_back: int = 0) -> Dict[str, int]:
+    """
+    Create any missing monthly partitions from months_back months ago to months_ahead
+    months ahead on a synchronous psycopg2 connection, and commit. Creating them ahead
+    keeps new rows out of the default partition. Returns the number created per table.
+    """
+    if months_ahead is None:
+        months_ahead = PARTITION_MONTHS_AHEAD
+    created = {}
+    cursor = conn.cursor()
+    try:
+        for partitioned in PARTITIONED_TABLES:
+            cursor.execute(
+                "SELECT sts_ts.ensure_monthly_partitions(%s::regclass, %s, %s, %s)",
+                (partitioned.table, months_back, months_ahead, partitioned.partition_primary_key)
+            )
+            created[partitioned.table] = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"[INFO] Monthly partitions ensured {months_ahead} month(s) ahead, created: {created}")
+    return created
+
+
+def ensure_partitions_at_startup() -> None:
+    """Create the coming months' partitions at startup; on failure the cron run covers it."""
+    conn = None
+    try:
+        conn = get_connection()
+        ensure_partitions(conn)
+    except Exception as e:
+        logger.warning(f"[WARNING] Monthly partitions could not be ensured at startup: {str(e)}")
+    finally:
+        if conn is not None:
+            release_connection(conn)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Create the monthly partitions of the timesheet tables ahead of time.")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Months after the current one to create")
+    parser.add_argument("--months-back", type=int, default=0, help="Months before the current one to create")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        created = ensure_partitions(conn, months_ahead=args.months_ahead, months_back=args.months_back)
+    finally:
+        release_connection(conn)
+        close_pool()
+    for table, count in created.items():
+        print(f"{table}: {count} partition(s) created")
+
+
+if __name__ == "__main__":
+    main()
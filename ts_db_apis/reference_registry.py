@@ -0,0 +1,201 @@
+# reference_registry.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from cache_invalidation import register_invalidation_handler
+from config import load_config
+from db_pool import get_connection, release_connection
+from helper_functions import get_current_time_ist
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Small code tables validated on every write, loaded as {code: display name}
+REFERENCE_QUERIES = {
+    "task_types": "SELECT type_code, type_name FROM sts_ts.task_type_master WHERE is_active = true ORDER BY type_code",
+    "statuses": "SELECT status_code, status_desc FROM sts_new.status_master ORDER BY status_code",
+    "priorities": "SELECT priority_code, priority_desc FROM sts_new.tkt_priority_master ORDER BY priority_code",
+    "leave_types": "SELECT leave_type_code, leave_type_name FROM sts_ts.leave_type_master WHERE is_active = true ORDER BY leave_type_code",
+}
+
+# Work locations are a CHECK constraint on tasks.work_mode and timesheet_entry.work_location, not a table
+WORK_LOCATIONS = {
+    "REMOTE": "Remote",
+    "ON_SITE": "On Site",
+    "OFFICE": "Office",
+}
+
+REFERENCE_KINDS = tuple(REFERENCE_QUERIES) + ("work_locations",)
+
+
+class ReferenceData(NamedTuple):
+    task_types: Dict[str, str]  # active task types
+    statuses: Dict[str, str]
+    priorities: Dict[int, str]
+    work_locations: Dict[str, str]
+    leave_types: Dict[str, str]  # active leave types
+    loaded_at: datetime
+
+
+class ReferenceRegistry:
+    """
+    In-process snapshot of the reference code tables, so validating a code is a dict
+    lookup instead of a query. The snapshot is replaced as a whole: on a change
+    notification, after its TTL, or on first use if the startup load failed.
+    Like the master data cache, a generation counter keeps a load that overlapped a
+    change from being kept.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._data: Optional[ReferenceData] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._ttl_cap: Optional[float] = None
+        self._loads = 0
+        self._invalidations = 0
+
+    def _ttl(self) -> float:
+        if self._ttl_cap is not None:
+            return min(self.ttl_seconds, self._ttl_cap)
+        return self.ttl_seconds
+
+    def set_ttl_cap(self, seconds: Optional[float]) -> None:
+        """Cap the TTL of snapshots loaded from now on (None removes the cap)."""
+        self._ttl_cap = seconds
+
+    def current(self) -> Optional[ReferenceData]:
+        """Return the live snapshot, or None if it has not been loaded or has expired."""
+        with self._lock:
+            if self._data is None or time.monotonic() >= self._expires_at:
+                return None
+            return self._data
+
+    def _load(self) -> ReferenceData:
+        loaded_at = get_current_time_ist()
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            tables = {}
+            for kind, query in REFERENCE_QUERIES.items():
+                cursor.execute(query)
+                tables[kind] = {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            release_connection(conn)
+        return ReferenceData(work_locations=dict(WORK_LOCATIONS), loaded_at=loaded_at, **tables)
+
+    def get(self) -> ReferenceData:
+        """Return the snapshot, loading it (once, for all waiting callers) when missing or expired."""
+        data = self.current()
+        if data is not None:
+            return data
+
+        with self._load_lock:
+            data = self.current()
+            if data is not None:
+                return data
+
+            with self._lock:
+                generation = self._generation
+            data = self._load()
+            with self._lock:
+                self._loads += 1
+                if self._generation == generation:
+                    self._data = data
+                    self._expires_at = time.monotonic() + self._ttl()
+                else:
+                    logger.info(f"[INFO] Reference data changed while loading - snapshot not kept")
+            logger.info(f"[INFO] Reference data loaded: " + ", ".join(f"{kind}={len(getattr(data, kind))}" for kind in REFERENCE_KINDS))
+            return data
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+            self._generation += 1
+            self._invalidations += 1
+        logger.info(f"[INFO] Reference data registry invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = self._data if self._data is not None and time.monotonic() < self._expires_at else None
+            return {
+                "loaded": data is not None,
+                "loaded_at": str(data.loaded_at) if data else None,
+                "counts": {kind: len(getattr(data, kind)) for kind in REFERENCE_KINDS} if data else {},
+                "loads": self._loads,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl_seconds,
+                "ttl_cap_seconds": self._ttl_cap,
+            }
+
+
+reference_registry = ReferenceRegistry(ttl_seconds=config.get('reference_registry_ttl_seconds'))
+
+
+def load_reference_data() -> None:
+    """Warm the registry at startup; on failure the first request loads it instead."""
+    try:
+        reference_registry.get()
+    except Exception as e:
+        logger.warning(f"[WARNING] Reference data could not be loaded at startup: {str(e)}")
+
+
+async def get_reference_data() -> ReferenceData:
+    """Return the reference snapshot from an async route, loading it off the event loop if needed."""
+    data = reference_registry.current()
+    if data is not None:
+        return data
+    return await asyncio.to_thread(reference_registry.get)
+
+
+def format_task_type_choices(data: ReferenceData) -> str:
+    """Allowed task types for error messages, e.g. "TT001 (Accounts), TT002 (Development)"."""
+    return ", ".join(f"{code} ({name})" for code, name in data.task_types.items())
+
+
+def check_task_type_code(data: ReferenceData, task_type_code: Any) -> str:
+    """Normalize a task type code and check it is an active task type; raises ValueError if not."""
+    task_type_code_str = str(task_type_code).strip().upper()
+    if task_type_code_str not in data.task_types:
+        raise ValueError(f"Task type code '{task_type_code_str}' is not allowed. Allowed values are: {format_task_type_choices(data)}")
+    return task_type_code_str
+
+
+def _invalidate_from_notification(kinds: List[str]) -> None:
+    # The tables are small, so any change reloads the whole snapshot
+    reference_registry.invalidate()
+
+
+def _on_listener_connected() -> None:
+    # Changes made while the listener was down were never announced
+    reference_registry.invalidate()
+    reference_registry.set_ttl_cap(None)
+
+
+def _on_listener_disconnected() -> None:
+    # Without notifications, bound staleness by reloading quickly instead
+    reference_registry.set_ttl_cap(config.get('cache_invalidation_degraded_ttl_seconds'))
+    reference_registry.invalidate()
+
+
+register_invalidation_handler(
+    "reference_data",
+    invalidate=_invalidate_from_notification,
+    on_connected=_on_listener_connected,
+    on_disconnected=_on_listener_disconnected,
+)
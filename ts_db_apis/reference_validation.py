@@ -0,0 +1,114 @@
+# reference_validation.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from config import load_config
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+
+class ReferenceLookup(NamedTuple):
+    columns: Tuple[str, ...]  # selected columns, returned in this order
+    source: str  # FROM ... WHERE ... matching at most one row for the key bound to %(key)s
+
+
+# Existence lookups for the codes referenced by create/entry routes, by kind.
+# Each returns the same columns the routes used to fetch with their own SELECT.
+# Small code tables (task types, statuses, priorities) are checked in reference_registry instead.
+REFERENCE_LOOKUPS: Dict[str, ReferenceLookup] = {
+    "task": ReferenceLookup(
+        ("t.id", "t.epic_code", "t.task_type_code", "te.id IS NOT NULL"),
+        "FROM sts_ts.tasks t LEFT JOIN sts_ts.epics te ON te.id = t.epic_code WHERE t.id = %(key)s",
+    ),
+    "epic": ReferenceLookup(
+        ("id", "epic_title", "start_date", "due_date", "closed_on", "created_at::DATE", "status_code", "product_code"),
+        "FROM sts_ts.epics WHERE id = %(key)s",
+    ),
+    "activity": ReferenceLookup(
+        ("id", "product_code"),
+        "FROM sts_ts.activities WHERE id = %(key)s",
+    ),
+    "ticket": ReferenceLookup(
+        ("ticket_code",),
+        "FROM sts_new.ticket_master WHERE ticket_code = %(key)s",
+    ),
+    "user": ReferenceLookup(
+        ("um.user_code", "um.team_code", "um.is_inactive", "tm.team_name"),
+        "FROM sts_new.user_master um LEFT JOIN sts_new.team_master tm ON tm.team_code = um.team_code WHERE um.user_code = %(key)s",
+    ),
+    "active_team": ReferenceLookup(
+        ("team_code", "team_name"),
+        "FROM sts_new.team_master WHERE team_code = %(key)s AND is_active = true",
+    ),
+    "product": ReferenceLookup(
+        ("product_code",),
+        "FROM sts_new.product_master WHERE product_code = %(key)s",
+    ),
+    "predefined_task": ReferenceLookup(
+        ("id", "task_title", "task_description", "status_code", "priority_code",
+         "work_mode", "estimated_hours", "max_hours", "is_billable", "team_code"),
+        "FROM sts_ts.predefined_tasks WHERE id = %(key)s",
+    ),
+}
+
+
+def build_reference_query(references: Dict[str, Tuple[str, Any]]) -> Tuple[str, Dict[str, Any], list]:
+    """
+    Build the combined lookup for references ({name: (kind, key)}, None keys skipped).
+
+    Every lookup becomes a LEFT JOIN LATERAL onto a single dummy row, so the query always
+    returns exactly one row: a found flag plus the lookup's columns per reference, NULLs
+    where nothing matched. Returns the query, its parameters and the names in column order.
+    """
+    names = [name for name, (_, key) in references.items() if key is not None]
+    selects = []
+    joins = []
+    params = {}
+    for position, name in enumerate(names):
+        kind, key = references[name]
+        lookup = REFERENCE_LOOKUPS[kind]
+        alias = f"ref_{position}"
+        param = f"{alias}_key"
+        columns = ", ".join(f"{column} AS c{index}" for index, column in enumerate(lookup.columns))
+        source = lookup.source.replace("%(key)s", f"%({param})s")
+        joins.append(f"LEFT JOIN LATERAL (SELECT true AS found, {columns} {source} LIMIT 1) AS {alias} ON true")
+        selects.append(", ".join([f"{alias}.found"] + [f"{alias}.c{index}" for index in range(len(lookup.columns))]))
+        params[param] = key
+    query = f"SELECT {', '.join(selects)} FROM (SELECT 1) AS ref {' '.join(joins)}"
+    return query, params, names
+
+
+async def resolve_references(cursor, references: Dict[str, Tuple[str, Any]]) -> Dict[str, Optional[tuple]]:
+    """
+    Look up every referenced code with one query on an async_db.AsyncCursor.
+
+    references maps a caller-chosen name to (kind, key), kind being a REFERENCE_LOOKUPS key,
+    so the same kind can be used twice (e.g. assignee and creator are both "user").
+    Returns {name: row tuple or None}, the tuple holding the lookup's columns like a
+    fetchone() of the single-table SELECT would; references with a None key map to None.
+    """
+    resolved: Dict[str, Optional[tuple]] = {name: None for name in references}
+    query, params, names = build_reference_query(references)
+    if not names:
+        return resolved
+
+    await cursor.execute(query, params)
+    row = await cursor.fetchone()
+
+    offset = 0
+    for name in names:
+        width = len(REFERENCE_LOOKUPS[references[name][0]].columns)
+        if row[offset]:
+            resolved[name] = tuple(row[offset + 1:offset + 1 + width])
+        offset += 1 + width
+    logger.info(f"[INFO] Resolved {len(names)} references in one query, missing: {[name for name in names if resolved[name] is None]}")
+    return resolved
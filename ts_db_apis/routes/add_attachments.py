@@ -9,25 +9,19 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget, UploadTooLarge
+from blob_store import store_upload_blob
+from file_delivery import PERSONAL_PARENT_TYPES, attachment_download_url
 from config import load_config
 from utils.logger import get_logger
 from typing import List
-import uuid
 import traceback
 
 config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -37,6 +31,7 @@ logger = get_logger(log_file_name, log_dir=log_dir)
 @router.post("/api/v1/timesheet/add_attachments")
 async def add_task_attachments(
     current_user: dict = Depends(verify_token), 
+    conn=Depends(get_async_db_connection),
     parent_type: str = Form(..., description="Type of parent entity (TASK, EPIC, TIMESHEET_ENTRY, LEAVE_APPLICATION)"),
     parent_code: str = Form(..., description="Code/ID of the parent entity (task_id, epic_id, entry_id, leave_application_id)"),
     attachments: List[UploadFile] = File(..., description="File attachments to add"),
@@ -46,15 +41,11 @@ async def add_task_attachments(
     """
     logger.info(f"[INFO] Starting attachment addition for parent_type: {parent_type}, parent_code: {parent_code}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        # Step 1: Establish database connection
-        logger.info(f"[INFO] Establishing database connection for attachment addition")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+        # Step 1: Open a cursor on the pooled request connection
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")        
 
 
         # Step 2: Validate input data
@@ -74,8 +65,8 @@ async def add_task_attachments(
             )
 
         # Step 3: Validate user exists
-        cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"User with code '{current_user['user_code']}' does not exist"
@@ -93,12 +84,12 @@ async def add_task_attachments(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Task ID must be an integer. Received: '{parent_code}'"
                 )
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id 
                 FROM sts_ts.tasks 
                 WHERE id = %s
             """, (task_id,))
-            parent_result = cursor.fetchone()
+            parent_result = await cursor.fetchone()
             if not parent_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -116,12 +107,12 @@ async def add_task_attachments(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Epic ID must be an integer. Received: '{parent_code}'"
                 )
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id 
                 FROM sts_ts.epics 
                 WHERE id = %s
             """, (epic_id,))
-            parent_result = cursor.fetchone()
+            parent_result = await cursor.fetchone()
             if not parent_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -140,12 +131,12 @@ async def add_task_attachments(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Timesheet entry ID must be an integer. Received: '{parent_code}'"
                 )
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id 
                 FROM sts_ts.timesheet_entry 
                 WHERE id = %s
             """, (entry_id,))
-            parent_result = cursor.fetchone()
+            parent_result = await cursor.fetchone()
             if not parent_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -163,12 +154,12 @@ async def add_task_attachments(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Leave application ID must be an integer. Received: '{parent_code}'"
                 )
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id 
                 FROM sts_ts.leave_application 
                 WHERE id = %s
             """, (leave_id,))
-            parent_result = cursor.fetchone()
+            parent_result = await cursor.fetchone()
             if not parent_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -184,7 +175,6 @@ async def add_task_attachments(
             )
 
         # Step 5: Validate file attachments
-        total_file_size = 0
         validated_attachments = []
         
         for attachment in attachments:
@@ -220,69 +210,34 @@ async def add_task_attachments(
             logger.info(f"[INFO] Upload directory created successfully with permissions")
 
         
-        # Ensure base_url ends with a trailing slash for correct URL join
-        normalized_base_url = base_url if base_url.endswith('/') else (base_url + '/')
 
+        upload_budget = UploadBudget()
         for attachment in validated_attachments:
             try:
-                # Generate unique filename with parent type and id
-                file_extension = os.path.splitext(attachment.filename)[1]
-                parent_type_lower = parent_type.lower()
-                unique_filename = f"{parent_type_lower}_{parent_id}_{uuid.uuid4()}{file_extension}"
-                file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-                
-
-                # Create the URL for client access
-                file_url = normalized_base_url + unique_filename
-                logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-
-                # Save file to disk
+                # Store file by content (identical files are stored once); the 10MB per-file and
+                # 50MB total limits abort the upload as soon as they are crossed
                 try:
-                    with open(file_path, "wb") as buffer:
-                        content = await attachment.read()
-                        buffer.write(content)
-                except Exception as e:
-                    logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
+                    stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
+                except UploadTooLarge as e:
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
-                        detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
+                        detail=str(e)
                     )
-                
-                # Check file size after reading (10MB limit per file)
-                file_size = len(content)
-                if file_size > 10 * 1024 * 1024:
-                    # Delete the file if it exceeds size limit
-                    try:
-                        os.remove(file_path)
-                    except:
-                        pass
-                    raise HTTPException(
-                        status_code=HTTPStatus.BAD_REQUEST,
-                        detail=f"File '{attachment.filename}' is too large. Maximum size is 10MB"
-                    )
-                
-                # Check total file size (50MB limit for all files)
-                total_file_size += file_size
-                if total_file_size > 50 * 1024 * 1024:
-                    # Delete the current file if total exceeds limit
-                    try:
-                        os.remove(file_path)
-                    except:
-                        pass
+                except Exception as e:
+                    logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
-                        detail="Total file size cannot exceed 50MB"
+                        detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                     )
                 
+                file_size = stored_blob.size
+                file_path, file_url = stored_blob.file_path, stored_blob.file_url
                 logger.info(f"[INFO] File saved to disk: {file_path}, size: {file_size} bytes")
                 
-                # Set proper file permissions for web server access
-                os.chmod(file_path, 0o644)
-                
                 # Extract file information to insert into database
                 file_name = attachment.filename
                 file_type = os.path.splitext(attachment.filename)[1].lower().lstrip('.')
-                file_size_bytes = len(content)
+                file_size_bytes = file_size
                 file_size_display = format_file_size(file_size_bytes)
                 
                 # Determine purpose based on parent_type
@@ -297,17 +252,17 @@ async def add_task_attachments(
                 # Insert attachment record into database
                 attachment_query = """
                     INSERT INTO sts_ts.attachments (
-                        parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                        parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                     ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                     ) RETURNING id
                 """
-                cursor.execute(attachment_query, (
+                await cursor.execute(attachment_query, (
                     parent_type, parent_id, file_path, file_url, file_name, file_type, file_size_display, purpose,
-                    current_user['user_code'], current_time
+                    stored_blob.sha256, current_user['user_code'], current_time
                 ))
                 
-                attachment_id = cursor.fetchone()[0]
+                attachment_id = (await cursor.fetchone())[0]
                 attachment_data.append({
                     "id": attachment_id,
                     "file_name": file_name,
@@ -315,7 +270,7 @@ async def add_task_attachments(
                     "file_size_bytes": file_size_bytes,
                     "file_size_display": file_size_display,
                     "file_path": file_path,
-                    "file_url": file_url,
+                    "file_url": attachment_download_url(attachment_id) if parent_type in PERSONAL_PARENT_TYPES else file_url,
                     "purpose": purpose,
                     "parent_type": parent_type,
                     "parent_id": parent_id,
@@ -329,14 +284,14 @@ async def add_task_attachments(
                 logger.error(f"[ERROR] Failed to save attachment {attachment.filename}: {str(e)}")
                 # ROLLBACK the entire transaction and return error
                 if conn:
-                    conn.rollback()
+                    await conn.rollback()
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Failed to save attachment '{attachment.filename}'. The attachment addition has been rolled back. Error: {str(e)}"
                 )
 
         # Step 7: Commit transaction
-        conn.commit()
+        await conn.commit()
         logger.info(f"[INFO] Successfully added {len(attachment_data)} attachments to {parent_type}: {parent_id} (provided: {parent_code})")
         
         return {
@@ -349,7 +304,7 @@ async def add_task_attachments(
                 "parent_id": parent_id,
                 "parent_code": parent_code,
                 "attachments_added": len(attachment_data),
-                "total_file_size_display": format_file_size(total_file_size),
+                "total_file_size_display": format_file_size(upload_budget.used),
                 "attachments": attachment_data
             }
         }
@@ -357,7 +312,7 @@ async def add_task_attachments(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Data integrity violation. Please check your input data."
@@ -373,7 +328,7 @@ async def add_task_attachments(
         logger.error(f"[ERROR] Database query error: {error_message}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query error: {error_message}"
@@ -390,6 +345,4 @@ async def add_task_attachments(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for attachment addition")
+        logger.info(f"[INFO] Database cursor closed for attachment addition")
@@ -8,7 +8,8 @@ from fastapi import APIRouter, HTTPException, Form, Depends
 from auth.jwt_handler import verify_token
 from http import HTTPStatus
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from activity_feed import append_activity_events, comment_event
 from config import load_config
 from utils.logger import get_logger
 from helper_functions import get_current_time_ist
@@ -18,13 +19,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -35,14 +29,14 @@ async def add_comment(
     parent_type: str = Form(..., description="Type of parent entity: TASK, EPIC, or TIMESHEET_ENTRY"),
     parent_code: int = Form(..., description="ID of the parent entity (task_id, epic_id, or entry_id)"),
     comment_text: str = Form(..., description="The comment text"),
-    current_user: dict = Depends(verify_token)
+    current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create a comment for a task, epic, or timesheet entry
     """
     logger.info(f"[INFO] Adding comment for parent_type: {parent_type}, parent_code: {parent_code}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
     
     try:
@@ -64,25 +58,25 @@ async def add_comment(
                 detail="Comment text cannot be empty"
             )
         
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
         
         # Validate parent entity exists
         logger.info(f"[INFO] Validating parent entity existence: {parent_type_upper} with code: {parent_code}")
         
+        epic_code = parent_code if parent_type_upper == 'EPIC' else None
         if parent_type_upper == 'TASK':
-            cursor.execute("SELECT id FROM sts_ts.tasks WHERE id = %s", (parent_code,))
-            parent_exists = cursor.fetchone()
+            await cursor.execute("SELECT id, epic_code FROM sts_ts.tasks WHERE id = %s", (parent_code,))
+            parent_exists = await cursor.fetchone()
             if not parent_exists:
                 logger.error(f"[ERROR] Task not found with id: {parent_code}")
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
                     detail=f"Task with id {parent_code} not found"
                 )
+            epic_code = parent_exists[1]
         elif parent_type_upper == 'EPIC':
-            cursor.execute("SELECT id FROM sts_ts.epics WHERE id = %s", (parent_code,))
-            parent_exists = cursor.fetchone()
+            await cursor.execute("SELECT id FROM sts_ts.epics WHERE id = %s", (parent_code,))
+            parent_exists = await cursor.fetchone()
             if not parent_exists:
                 logger.error(f"[ERROR] Epic not found with id: {parent_code}")
                 raise HTTPException(
@@ -90,8 +84,8 @@ async def add_comment(
                     detail=f"Epic with id {parent_code} not found"
                 )
         elif parent_type_upper == 'TIMESHEET_ENTRY':
-            cursor.execute("SELECT id FROM sts_ts.timesheet_entry WHERE id = %s", (parent_code,))
-            parent_exists = cursor.fetchone()
+            await cursor.execute("SELECT id FROM sts_ts.timesheet_entry WHERE id = %s", (parent_code,))
+            parent_exists = await cursor.fetchone()
             if not parent_exists:
                 logger.error(f"[ERROR] Timesheet entry not found with id: {parent_code}")
                 raise HTTPException(
@@ -104,8 +98,8 @@ async def add_comment(
         # Validate commented_by user exists
         commented_by = current_user['user_code']
         logger.info(f"[INFO] Validating commented_by user: {commented_by}")
-        cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (commented_by,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (commented_by,))
+        if not await cursor.fetchone():
             logger.error(f"[ERROR] User not found in user_master with user_code: {commented_by}")
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
@@ -124,7 +118,7 @@ async def add_comment(
         """
         
         logger.info(f"[INFO] Executing INSERT query with params: parent_type={parent_type_upper}, parent_code={parent_code}, commented_by={commented_by}")
-        cursor.execute(insert_query, (
+        await cursor.execute(insert_query, (
             parent_type_upper,
             parent_code,
             comment_text,
@@ -132,7 +126,7 @@ async def add_comment(
             get_current_time_ist()
         ))
         
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         if not result:
             logger.error(f"[ERROR] INSERT query did not return a result")
             raise HTTPException(
@@ -140,9 +134,12 @@ async def add_comment(
                 detail="Failed to insert comment - no result returned"
             )
         logger.info(f"[INFO] Comment record inserted successfully, id: {result[0]}")
+
+        await append_activity_events(cursor, [comment_event(parent_type_upper, parent_code, epic_code, commented_by)],
+                                     commented_by, result[5])
         
         logger.info(f"[INFO] Committing transaction for comment creation")
-        conn.commit()
+        await conn.commit()
         logger.info(f"[INFO] Transaction committed successfully for comment creation")
         
         logger.info(f"[INFO] Comment creation completed successfully for {parent_type_upper} with code: {parent_code}, comment_id: {result[0]}")
@@ -165,14 +162,14 @@ async def add_comment(
         logger.error(f"[ERROR] HTTP Exception in comment creation for {parent_type} with code: {parent_code}, status_code: {http_err.status_code}, detail: {http_err.detail}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to HTTP exception")
-            conn.rollback()
+            await conn.rollback()
         raise http_err
         
     except psycopg2.IntegrityError as inte_error:
         logger.error(f"[ERROR] Integrity error in comment creation: {str(inte_error)}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to integrity error")
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Database integrity error: {str(inte_error)}"
@@ -183,7 +180,7 @@ async def add_comment(
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to programming error")
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query error: {str(prog_error)}. Please check table/column names and SQL syntax."
@@ -193,7 +190,7 @@ async def add_comment(
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to operational error")
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database connection error: {str(op_error)}"
@@ -204,7 +201,7 @@ async def add_comment(
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to database error")
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(db_error)}"
@@ -215,7 +212,7 @@ async def add_comment(
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
             logger.info(f"[INFO] Rolling back transaction due to unexpected error")
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -224,6 +221,4 @@ async def add_comment(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
 
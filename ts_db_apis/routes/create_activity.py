@@ -9,25 +9,20 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget
+from blob_store import store_upload_blob
+from reference_validation import resolve_references
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 from typing import List, Optional
-import uuid
 import traceback
 
 config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir', 'uploads')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -42,37 +37,35 @@ async def create_activity(
     is_billable: bool = Form(default=True, description="Whether the activity is billable"),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the activity"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create a new activity with optional file attachments
     """
     logger.info(f"[INFO] Starting activity creation for title: {title}, product_code: {product_code}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
 
-        logger.info(f"[INFO] Establishing database connection for activity creation")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")       
 
-        # Step 1: Validate product exists
-        cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (product_code,))
-        if not cursor.fetchone():
+        # Step 1: Resolve the product and the creating user in one query
+        user_code = current_user['user_code']
+        references = await resolve_references(cursor, {
+            "product": ("product", product_code),
+            "created_by": ("user", user_code),
+        })
+
+        # Validate product exists
+        if not references["product"]:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Product with code {product_code} does not exist"
             )
 
         # Step 2: Validate created_by user exists
-        user_code = current_user['user_code']
-        cursor.execute(
-            "SELECT user_code FROM sts_new.user_master WHERE user_code = %s",
-            (user_code,)
-        )
-        if not cursor.fetchone():
+        if not references["created_by"]:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Created by user with code {user_code} does not exist"
@@ -91,12 +84,12 @@ async def create_activity(
             ) RETURNING id
         """
         
-        cursor.execute(insert_query, (
+        await cursor.execute(insert_query, (
             title, description, product_code,
             is_billable, created_by, current_time
         ))
         
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         if not result:
             raise Exception("Failed to insert activity - no ID returned")
         activity_id = result[0]
@@ -114,31 +107,14 @@ async def create_activity(
                 os.makedirs(upload_dir, exist_ok=True)
                 os.chmod(upload_dir, 0o755)
                 logger.info(f"[INFO] Upload directory created successfully with permissions")
-        
-            # Ensure base_url ends with a trailing slash for correct URL join
-            if base_url.endswith('/'):
-                normalized_base_url = base_url
-            else:
-                normalized_base_url = base_url + '/'
 
+            upload_budget = UploadBudget()
             for attachment in attachments:
                 if attachment.filename:  # Check if file was actually uploaded
                     try:
-                        # Generate unique filename
-                        file_extension = os.path.splitext(attachment.filename)[1]
-                        unique_filename = f"{uuid.uuid4()}{file_extension}"
-                        file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-                        
-                        # Create the URL for client access
-                        file_url = normalized_base_url + unique_filename
-                        logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-
-                        # Save file to disk
+                        # Store file by content (identical files are stored once; size limits are enforced while reading)
                         try:
-                            with open(file_path, "wb") as buffer:
-                                content = await attachment.read()
-                                buffer.write(content)
-                            logger.info(f"[INFO] File saved to disk: {file_path}, size: {len(content)} bytes")
+                            stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
                         except Exception as e:
                             logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                             raise HTTPException(
@@ -146,10 +122,8 @@ async def create_activity(
                                 detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                             )
                         
-                        file_size = len(content)
-                        
-                        # Set proper file permissions for web server access
-                        os.chmod(file_path, 0o644)
+                        file_size = stored_blob.size
+                        file_path, file_url = stored_blob.file_path, stored_blob.file_url
                         
                         # Extract file information
                         file_name = attachment.filename
@@ -162,18 +136,18 @@ async def create_activity(
                         # Insert attachment record into database
                         attachment_query = """
                             INSERT INTO sts_ts.attachments (
-                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                             ) VALUES (
-                                'ACTIVITY', %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                'ACTIVITY', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             ) RETURNING id
                         """
                         
-                        cursor.execute(attachment_query, (
+                        await cursor.execute(attachment_query, (
                             str(activity_id), file_path, file_url, file_name, file_type, file_size_display, "ACTIVITY ATTACHMENT", 
-                            current_user['user_code'], current_time
+                            stored_blob.sha256, current_user['user_code'], current_time
                         ))
                         
-                        attachment_id = cursor.fetchone()[0]
+                        attachment_id = (await cursor.fetchone())[0]
                         attachment_data.append({
                             "id": attachment_id,
                             "original_filename": attachment.filename,
@@ -191,14 +165,16 @@ async def create_activity(
                         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
                         # ROLLBACK the entire transaction and return error
                         if conn:
-                            conn.rollback()
+                            await conn.rollback()
                         raise HTTPException(
                             status_code=HTTPStatus.BAD_REQUEST,
                             detail=f"Failed to save attachment '{attachment.filename}'. The activity creation has been rolled back. Error: {str(e)}"
                         )
 
         # Step 5: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "activities")
+        await conn.commit()
+        invalidate_master_data("activities")
         logger.info(f"[INFO] Successfully created activity with ID: {activity_id}")
         
         return {
@@ -220,7 +196,7 @@ async def create_activity(
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Data integrity violation. Please check your input data. Error: {str(e)}"
@@ -236,7 +212,7 @@ async def create_activity(
         logger.error(f"[ERROR] Database query error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed. Error: {str(e)}"
@@ -248,7 +224,7 @@ async def create_activity(
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -257,7 +233,4 @@ async def create_activity(
         if cursor:
             cursor.close()
             logger.info(f"[INFO] Database cursor closed")
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for activity creation")
 
@@ -9,11 +9,15 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget
+from blob_store import store_upload_blob
+from activity_feed import append_activity_events, epic_events
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
+from reference_registry import get_reference_data
 from utils.logger import get_logger
 from typing import List, Optional
-import uuid
 import traceback
 from enum import Enum
 
@@ -21,14 +25,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -59,21 +55,18 @@ async def create_epic(
     is_billable: bool = Form(default=True, description="Whether the epic is billable"),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the epic"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create a new epic with optional file attachments
     """
     logger.info(f"[INFO] Starting epic creation for epic_title: {epic_title}, product_code: {product_code}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
 
-        logger.info(f"[INFO] Establishing database connection for epic creation")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")       
 
         # Step 1: Set default status if not provided
         if not status_code:
@@ -83,9 +76,8 @@ async def create_epic(
         status_code_str = status_code.value if isinstance(status_code, StatusCode) else str(status_code).upper()
         
         # Step 1.1: Validate Status code exists and is allowed for epics
-        cursor.execute("SELECT status_desc FROM sts_new.status_master WHERE status_code = %s", (status_code_str,))
-        status_result = cursor.fetchone()
-        if not status_result:
+        reference_data = await get_reference_data()
+        if status_code_str not in reference_data.statuses:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Status code '{status_code_str}' does not exist in status_master"
@@ -107,8 +99,8 @@ async def create_epic(
             )
 
         # Step 2: Validate product exists
-        cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (product_code,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (product_code,))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Product with code {product_code} does not exist"
@@ -116,8 +108,8 @@ async def create_epic(
 
         # Step 2.1: Validate company_code exists (if provided)
         if company_code:
-            cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s AND is_inactive = false", (company_code,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s AND is_inactive = false", (company_code,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Company with code {company_code} does not exist or is inactive"
@@ -125,11 +117,11 @@ async def create_epic(
 
         # Step 2.2: Validate contact_person_code exists and belongs to company (if provided)
         if contact_person_code:
-            cursor.execute(
+            await cursor.execute(
                 "SELECT contact_person_code, company_code FROM sts_new.contact_master WHERE contact_person_code = %s AND is_inactive = false",
                 (contact_person_code,)
             )
-            contact_result = cursor.fetchone()
+            contact_result = await cursor.fetchone()
             if not contact_result:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -150,19 +142,18 @@ async def create_epic(
                 logger.info(f"[INFO] Auto-set company_code to {company_code} from contact_person_code {contact_person_code}")
 
         # Step 3: Validate priority_code exists
-        cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (priority_code,))
-        if not cursor.fetchone():
+        if priority_code not in reference_data.priorities:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Priority code {priority_code} does not exist"
             )
 
         # Step 4: Validate created_by user exists and has admin role
-        cursor.execute(
+        await cursor.execute(
             "SELECT user_code, designation_name FROM sts_new.user_master WHERE user_code = %s",
             (current_user['user_code'],)
         )
-        user_result = cursor.fetchone()
+        user_result = await cursor.fetchone()
         if not user_result:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
@@ -202,13 +193,13 @@ async def create_epic(
         else:
             # Regular employee: use team lead
             # Get team information for the creator
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT tm.team_lead
                 FROM sts_new.user_master um
                 LEFT JOIN sts_new.team_master tm ON um.team_code = tm.team_code
                 WHERE um.user_code = %s
             """, (user_code,))
-            team_result = cursor.fetchone()
+            team_result = await cursor.fetchone()
             
             if not team_result:
                 raise HTTPException(
@@ -297,7 +288,7 @@ async def create_epic(
             ) RETURNING id
         """
         
-        cursor.execute(insert_query, (
+        await cursor.execute(insert_query, (
             epic_title, epic_description, product_code,
             company_code, contact_person_code, reporter,
             status_code_str, priority_code,
@@ -306,7 +297,7 @@ async def create_epic(
             created_by, current_time
         ))
         
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         if not result:
             raise Exception("Failed to insert epic - no ID returned")
         epic_id = result[0]
@@ -315,7 +306,10 @@ async def create_epic(
         
         # Note: No initial history entry created - history entries are only created when epic is updated
         logger.info(f"[INFO] Epic created without initial history entry (history entries are only created on updates)")
-        
+
+        # Step 7: Record the new epic in the activity feed
+        events = await epic_events(cursor, epic_id, None, {}, created_by, reference_data)
+        await append_activity_events(cursor, events, created_by, current_time)
         
         # Step 8: Handle file attachments if provided
         attachment_data = []
@@ -328,31 +322,14 @@ async def create_epic(
                 os.makedirs(upload_dir, exist_ok=True)
                 os.chmod(upload_dir, 0o755)
                 logger.info(f"[INFO] Upload directory created successfully with permissions")
-        
-            # Ensure base_url ends with a trailing slash for correct URL join
-            if base_url.endswith('/'):
-                normalized_base_url = base_url
-            else:
-                normalized_base_url = base_url + '/'
 
+            upload_budget = UploadBudget()
             for attachment in attachments:
                 if attachment.filename:  # Check if file was actually uploaded
                     try:
-                        # Generate unique filename
-                        file_extension = os.path.splitext(attachment.filename)[1]
-                        unique_filename = f"{uuid.uuid4()}{file_extension}"
-                        file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-                        
-                        # Create the URL for client access
-                        file_url = normalized_base_url + unique_filename
-                        logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-
-                        # Save file to disk
+                        # Store file by content (identical files are stored once; size limits are enforced while reading)
                         try:
-                            with open(file_path, "wb") as buffer:
-                                content = await attachment.read()
-                                buffer.write(content)
-                            logger.info(f"[INFO] File saved to disk: {file_path}, size: {len(content)} bytes")
+                            stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
                         except Exception as e:
                             logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                             raise HTTPException(
@@ -360,10 +337,8 @@ async def create_epic(
                                 detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                             )
                         
-                        file_size = len(content)
-                        
-                        # Set proper file permissions for web server access
-                        os.chmod(file_path, 0o644)
+                        file_size = stored_blob.size
+                        file_path, file_url = stored_blob.file_path, stored_blob.file_url
                         
                         # Extract file information
                         file_name = attachment.filename
@@ -376,18 +351,18 @@ async def create_epic(
                         # Insert attachment record into database
                         attachment_query = """
                             INSERT INTO sts_ts.attachments (
-                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                             ) VALUES (
-                                'EPIC', %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                'EPIC', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             ) RETURNING id
                         """
                         
-                        cursor.execute(attachment_query, (
+                        await cursor.execute(attachment_query, (
                             str(epic_id), file_path, file_url, file_name, file_type, file_size_display, "EPIC ATTACHMENT", 
-                            current_user['user_code'], current_time
+                            stored_blob.sha256, current_user['user_code'], current_time
                         ))
                         
-                        attachment_id = cursor.fetchone()[0]
+                        attachment_id = (await cursor.fetchone())[0]
                         attachment_data.append({
                             "id": attachment_id,
                             "original_filename": attachment.filename,
@@ -405,14 +380,16 @@ async def create_epic(
                         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
                         # ROLLBACK the entire transaction and return error
                         if conn:
-                            conn.rollback()
+                            await conn.rollback()
                         raise HTTPException(
                             status_code=HTTPStatus.BAD_REQUEST,
                             detail=f"Failed to save attachment '{attachment.filename}'. The epic creation has been rolled back. Error: {str(e)}"
                         )
 
         # Step 9: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "epics")
+        await conn.commit()
+        invalidate_master_data("epics")
         logger.info(f"[INFO] Successfully created epic with ID: {epic_id}")
         
         return {
@@ -444,7 +421,7 @@ async def create_epic(
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Data integrity violation. Please check your input data. Error: {str(e)}"
@@ -460,7 +437,7 @@ async def create_epic(
         logger.error(f"[ERROR] Database query error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed. Error: {str(e)}"
@@ -472,7 +449,7 @@ async def create_epic(
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -481,7 +458,4 @@ async def create_epic(
         if cursor:
             cursor.close()
             logger.info(f"[INFO] Database cursor closed")
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for epic creation")
 
@@ -9,11 +9,17 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget
+from blob_store import store_upload_blob
+from activity_feed import append_activity_events, task_events
+from history_store import write_task_history
+from reference_validation import resolve_references
+from reference_registry import check_task_type_code, get_reference_data
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 from typing import List, Optional
-import uuid
 import traceback
 from enum import Enum
 
@@ -21,14 +27,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir', 'uploads')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -48,20 +46,6 @@ class StatusCode(str, Enum):
     COMPLETED = "STS002"        # Completed
     CANCELLED = "STS010"        # Cancelled
 
-# Task Type Code Enum - Valid values from task_type_master
-class TaskTypeCode(str, Enum):
-    ACCOUNTS = "TT001"              # Accounts
-    DEVELOPMENT = "TT002"           # Development
-    QUALITY_ASSURANCE = "TT003"     # Quality Assurance
-    USER_ACCEPTANCE_TESTING = "TT004"  # User Acceptance Testing
-    PROD_MOVE = "TT005"             # PROD Move
-    DOCUMENTATION = "TT006"         # Documentation
-    DESIGN = "TT007"                # Design
-    CODE_REVIEW = "TT008"           # Code Review
-    MEETING = "TT009"               # Meeting
-    TRAINING = "TT010"              # Training
-    IMPLEMENTATION = "TT011"        # Implementation
-    SUPPORT = "TT012"               # Support
 
 
 @router.post("/api/v1/timesheet/create_task")
@@ -74,7 +58,7 @@ async def create_task(
     reporter: Optional[str] = Form(None, description="User code of the person reporting the task (optional - will be auto-determined if not provided)"),
     status_code: StatusCode = Form(default=StatusCode.NOT_YET_STARTED, description="Current status of the task (default: STS001 - Not Yet Started, valid codes: STS001, STS007, STS002, STS010)"),
     priority_code: int = Form(..., description="Priority level of the task"),
-    task_type_code: TaskTypeCode = Form(..., description="Task type code (TT001-TT012) - required"),
+    task_type_code: str = Form(..., description="Task type code (active code from task_type_master, e.g. TT002) - required"),
     work_mode: Optional[WorkMode] = Form(None, description="Work mode of the task (REMOTE, ON_SITE, OFFICE) - optional"),
     start_date: Optional[str] = Form(None, description="Start date in DD-MM-YYYY or YYYY-MM-DD format (optional)"),
     due_date: Optional[str] = Form(None, description="Due date in DD-MM-YYYY or YYYY-MM-DD format (optional)"),
@@ -82,21 +66,18 @@ async def create_task(
     max_hours: Optional[float] = Form(default=None, description="Maximum hours allowed for the task (optional - defaults to estimated_hours if not provided)"),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the task"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create a new task with optional file attachments
     """
     logger.info(f"[INFO] Starting task creation for task_title: {task_title}, reporter: {reporter}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
 
-        logger.info(f"[INFO] Establishing database connection for task creation")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")       
 
         # Step 1: Set default status if not provided
         if not status_code:
@@ -128,13 +109,19 @@ async def create_task(
                 detail=f"Status code '{status_code_str}' is not allowed for tasks. Allowed values are: STS001 (Not Yet Started), STS007 (In Progress), STS002 (Completed), STS010 (Cancelled)"
             )
         
-        cursor.execute("""
-            SELECT status_desc FROM sts_new.status_master 
-            WHERE status_code = %s 
-            AND status_code IN ('STS001', 'STS007', 'STS002', 'STS010')
-        """, (status_code_str,))
-        status_result = cursor.fetchone()
-        if not status_result:
+        # Resolve every referenced code (epic, assignee, creator, team) in one query;
+        # status and task type codes are checked against the in-memory reference registry
+        user_code = current_user['user_code']
+        assigned_team_code_clean = assigned_team_code.strip() if assigned_team_code else None
+        references = await resolve_references(cursor, {
+            "epic": ("epic", epic_code),
+            "assignee": ("user", assignee if assignee else None),
+            "created_by": ("user", user_code),
+            "assigned_team": ("active_team", assigned_team_code_clean if not assignee and assigned_team_code_clean else None),
+        })
+        reference_data = await get_reference_data()
+
+        if status_code_str not in reference_data.statuses or status_code_str not in ('STS001', 'STS007', 'STS002', 'STS010'):
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Status code '{status_code_str}' does not exist or is not allowed for tasks. Valid status codes are: STS001 (Not Yet Started), STS007 (In Progress), STS002 (Completed), STS010 (Cancelled)"
@@ -152,60 +139,33 @@ async def create_task(
                 )
 
         # Step 2: Validate epic exists and fetch epic dates
-        cursor.execute("""
-            SELECT id, start_date, due_date, closed_on, created_at::DATE, product_code
-            FROM sts_ts.epics 
-            WHERE id = %s
-        """, (epic_code,))
-        epic_result = cursor.fetchone()
+        epic_result = references["epic"]
         if not epic_result:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Epic with ID {epic_code} does not exist"
             )
-        epic_id, epic_start_date, epic_due_date, epic_closed_on, epic_created_date, epic_product_code = epic_result
+        epic_id, _, epic_start_date, epic_due_date, epic_closed_on, epic_created_date, _, epic_product_code = epic_result
 
         # Step 3: Validate assignee exists (if provided)
         if assignee:
-            cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (assignee,))
-            if not cursor.fetchone():
+            if not references["assignee"]:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Assignee with code {assignee} does not exist"
                 )
 
-        # Step 3.1: Validate and convert task_type_code (required field)
-        # Convert enum to string value
-        if isinstance(task_type_code, TaskTypeCode):
-            task_type_code_str = task_type_code.value
-        else:
-            task_type_code_str = str(task_type_code).upper()
-        
-        # Validate task_type_code is one of the allowed enum values
+        # Step 3.1: Validate task_type_code is an active task type (required field)
         try:
-            task_type_code_enum = TaskTypeCode(task_type_code_str)
-            task_type_code_str = task_type_code_enum.value
-        except ValueError:
+            final_task_type_code = check_task_type_code(reference_data, task_type_code)
+        except ValueError as e:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
-                detail=f"Task type code '{task_type_code_str}' is not allowed. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
+                detail=str(e)
             )
-        
-        cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-        if not cursor.fetchone():
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail=f"Task type code {task_type_code_str} does not exist or is not active"
-            )
-        final_task_type_code = task_type_code_str
 
         # Step 4: Validate created_by user exists
-        user_code = current_user['user_code']
-        cursor.execute(
-            "SELECT user_code FROM sts_new.user_master WHERE user_code = %s",
-            (user_code,)
-        )
-        if not cursor.fetchone():
+        if not references["created_by"]:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Created by user with code {user_code} does not exist"
@@ -287,25 +247,25 @@ async def create_task(
         #           2) If no assignee but assigned_team_code provided, use assigned_team_code
         #           3) Otherwise, NULL
         final_assigned_team_code = None
+        assigned_team_name = None
         
         if assignee:
             # If assignee is provided, ALWAYS use assignee's team code from user_master (overrides any provided assigned_team_code)
-            cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (assignee,))
-            assignee_team_result = cursor.fetchone()
+            assignee_team_result = references["assignee"]
             if assignee_team_result:
-                final_assigned_team_code = assignee_team_result[0]
+                final_assigned_team_code = assignee_team_result[1]
+                assigned_team_name = assignee_team_result[3]
                 logger.info(f"[INFO] Using assignee {assignee}'s team code from user_master: {final_assigned_team_code}")
             else:
                 logger.warning(f"[WARNING] Could not find team code for assignee {assignee} in user_master, assigned_team_code will be NULL")
         elif assigned_team_code:
             # If no assignee but assigned_team_code is provided, validate and use it
-            assigned_team_code_clean = assigned_team_code.strip() if assigned_team_code else None
             if assigned_team_code_clean:
                 # Validate team exists and is active
-                cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (assigned_team_code_clean,))
-                team_result = cursor.fetchone()
+                team_result = references["assigned_team"]
                 if team_result:
                     final_assigned_team_code = assigned_team_code_clean
+                    assigned_team_name = team_result[1]
                     logger.info(f"[INFO] Using provided assigned_team_code: {final_assigned_team_code}")
                 else:
                     logger.warning(f"[WARNING] Provided assigned_team_code {assigned_team_code_clean} does not exist or is inactive, assigned_team_code will be NULL")
@@ -337,65 +297,39 @@ async def create_task(
         # If max_hours is not provided, default to estimated_hours
         final_max_hours = max_hours if max_hours is not None else estimated_hours
         
-        cursor.execute(insert_query, (
+        await cursor.execute(insert_query, (
             task_title, task_description, epic_code, assignee, reporter, final_assigned_team_code,
             status_code_str, priority_code, final_task_type_code, work_mode_str,
             current_time.date() if assignee else None, start_date_parsed, due_date_parsed, estimated_hours, final_max_hours,
             epic_product_code, created_by, current_time
         ))
         
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         id = result[0]
 
         # Step 9: Insert initial status history entry into sts_ts.task_hist table
         logger.info(f"[INFO] Creating initial status history entry for task_id: {id}")
-        status_hist_query = """
-            INSERT INTO sts_ts.task_hist (
-                task_code, status_code, priority_code, task_type_code, status_reason, 
-                product_code, assigned_team_code, assignee, reporter,
-                work_mode, assigned_on, start_date, due_date, closed_on,
-                estimated_hours, max_hours,
-                cancelled_by, cancelled_at,
-                created_by, created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s,
-                %s, %s,
-                %s, %s
-            ) RETURNING id
-        """
-        
-        # Insert initial status history with full snapshot of task state
-        cursor.execute(status_hist_query, (
-            id,  # task_code (references tasks.id)
-            status_code_str,
-            priority_code,
-            final_task_type_code,  # task_type_code
-            None,  # status_reason (cancellation_reason uses status_reason when status is STS010)
-            epic_product_code,  # product_code (from epic)
-            final_assigned_team_code,  # assigned_team_code (from assignee's team or provided)
-            assignee,
-            reporter,
-            work_mode_str,  # work_mode
-            current_time.date() if assignee else None,  # assigned_on (only set if assignee is provided)
-            start_date_parsed,
-            due_date_parsed,
-            None,  # closed_on
-            estimated_hours,
-            final_max_hours,
-            None,  # cancelled_by
-            None,  # cancelled_at
-            created_by,
-            current_time
-        ))
-        
-        result = cursor.fetchone()
-        if not result:
-            raise Exception("Failed to insert status history entry - no ID returned")
-        status_hist_seq = result[0]
+        # Only the changed columns are stored after the first (checkpoint) row, see history_store.py
+        status_hist_seq = await write_task_history(cursor, id, {
+            "status_code": status_code_str,
+            "priority_code": priority_code,
+            "task_type_code": final_task_type_code,
+            "product_code": epic_product_code,  # from epic
+            "assigned_team_code": final_assigned_team_code,  # from assignee's team or provided
+            "assignee": assignee,
+            "reporter": reporter,
+            "work_mode": work_mode_str,
+            "assigned_on": current_time.date() if assignee else None,  # only set if assignee is provided
+            "start_date": start_date_parsed,
+            "due_date": due_date_parsed,
+            "estimated_hours": estimated_hours,
+            "max_hours": final_max_hours,
+        }, created_by, current_time)
         logger.info(f"[INFO] Successfully created status history entry with seq: {status_hist_seq}")
-        
+
+        # Step 9.0.1: Record the new task in the activity feed
+        events = await task_events(cursor, id, epic_code, None, {"assignee": assignee}, created_by, reference_data)
+        await append_activity_events(cursor, events, created_by, current_time)
         
         # Step 9: Handle file attachments if provided
         attachment_data = []
@@ -412,31 +346,14 @@ async def create_task(
                 os.chmod(upload_dir, 0o755)  # Sets directory permissions to rwxr-xr-x (owner can read/write/execute, group and others can read/execute)
                 logger.info(f"[INFO] Upload directory created successfully with permissions")
 
-        
-            # Ensure base_url ends with a trailing slash for correct URL join
-            if base_url.endswith('/'):
-                normalized_base_url = base_url
-            else:
-                normalized_base_url = base_url + '/'
 
+            upload_budget = UploadBudget()
             for attachment in attachments:
                 if attachment.filename:  # Check if file was actually uploaded
                     try:
-                        # Generate unique filename
-                        file_extension = os.path.splitext(attachment.filename)[1]
-                        unique_filename = f"{uuid.uuid4()}{file_extension}"
-                        file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-                        
-                        # Create the URL for client access
-                        file_url = normalized_base_url + unique_filename
-                        logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-
-                        # Save file to disk
+                        # Store file by content (identical files are stored once; size limits are enforced while reading)
                         try:
-                            with open(file_path, "wb") as buffer:
-                                content = await attachment.read()
-                                buffer.write(content)
-                            logger.info(f"[INFO] File saved to disk: {file_path}, size: {len(content)} bytes")
+                            stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
                         except Exception as e:
                             logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                             raise HTTPException(
@@ -444,12 +361,10 @@ async def create_task(
                                 detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                             )
                         
-                        file_size = len(content)
+                        file_size = stored_blob.size
+                        file_path, file_url = stored_blob.file_path, stored_blob.file_url
                         logger.info(f"[INFO] File saved to disk: {file_path}, size: {file_size} bytes")
                         
-                        # Set proper file permissions for web server access
-                        os.chmod(file_path, 0o644)
-                        
                         # Extract file information
                         file_name = attachment.filename
                         file_type = os.path.splitext(attachment.filename)[1].lower().lstrip('.')  # Remove the dot
@@ -461,18 +376,18 @@ async def create_task(
                         # Insert attachment record into database
                         attachment_query = """
                             INSERT INTO sts_ts.attachments (
-                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                             ) VALUES (
-                                'TASK', %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                'TASK', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             ) RETURNING id
                         """
                         
-                        cursor.execute(attachment_query, (
+                        await cursor.execute(attachment_query, (
                             str(id), file_path, file_url, file_name, file_type, file_size_display, "TASK ATTACHMENT", 
-                            current_user['user_code'], current_time
+                            stored_blob.sha256, current_user['user_code'], current_time
                         ))
                         
-                        attachment_id = cursor.fetchone()[0]
+                        attachment_id = (await cursor.fetchone())[0]
                         attachment_data.append({
                             "id": attachment_id,
                             "original_filename": attachment.filename,
@@ -489,24 +404,18 @@ async def create_task(
                         logger.error(f"[ERROR] Failed to save attachment {attachment.filename}: {str(e)}")
                         # ROLLBACK the entire transaction and return error
                         if conn:
-                            conn.rollback()
+                            await conn.rollback()
                         raise HTTPException(
                             status_code=HTTPStatus.BAD_REQUEST,
                             detail=f"Failed to save attachment '{attachment.filename}'. The task creation has been rolled back. Error: {str(e)}"
                         )
 
         # Step 10: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "epics")
+        await conn.commit()
+        invalidate_master_data("epics")
         logger.info(f"[INFO] Successfully created task with ID: {id}")
         
-        # Fetch team name if assigned_team_code exists
-        assigned_team_name = None
-        if final_assigned_team_code:
-            cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (final_assigned_team_code,))
-            team_name_result = cursor.fetchone()
-            if team_name_result:
-                assigned_team_name = team_name_result[0]
-        
         return {
             "Status_Flag": True,
             "Status_Description": "Task created successfully",
@@ -539,7 +448,7 @@ async def create_task(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Data integrity violation. Please check your input data."
@@ -553,7 +462,7 @@ async def create_task(
     except psycopg2.ProgrammingError as e:
         logger.error(f"[ERROR] Database query error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail="Database query failed"
@@ -565,7 +474,7 @@ async def create_task(
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -573,6 +482,4 @@ async def create_task(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for task creation")
+        logger.info(f"[INFO] Database cursor closed for task creation")
@@ -9,7 +9,8 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 import traceback
@@ -18,13 +19,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -35,6 +29,7 @@ async def delete_task(
     epic_id: int,
     task_id: int,
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Delete a task and its history (epic is NOT deleted)
@@ -45,30 +40,26 @@ async def delete_task(
     """
     logger.info(f"[INFO] Starting task deletion for epic_id: {epic_id}, task_id: {task_id}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for task deletion")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 1: Check if epic is predefined or actual
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id FROM sts_ts.predefined_epics WHERE id = %s
         """, (epic_id,))
-        is_predefined_epic = cursor.fetchone() is not None
+        is_predefined_epic = await cursor.fetchone() is not None
         
         if is_predefined_epic:
             # Handle predefined task deletion (predefined tasks are now independent, no epic connection)
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id, task_title
                 FROM sts_ts.predefined_tasks
                 WHERE id = %s
             """, (task_id,))
             
-            task_result = cursor.fetchone()
+            task_result = await cursor.fetchone()
             if not task_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -79,7 +70,7 @@ async def delete_task(
             logger.info(f"[INFO] Predefined task found: {task_title}")
             
             # Delete predefined task (no timesheet entries, comments, or attachments for predefined tasks)
-            cursor.execute("""
+            await cursor.execute("""
                 DELETE FROM sts_ts.predefined_tasks 
                 WHERE id = %s
             """, (task_id,))
@@ -92,7 +83,9 @@ async def delete_task(
                 )
             
             # Commit changes
-            conn.commit()
+            await publish_master_data_change(cursor, "predefined_tasks", "predefined_epics")
+            await conn.commit()
+            invalidate_master_data("predefined_tasks", "predefined_epics")
             logger.info(f"[INFO] Predefined task {task_id} deleted successfully")
             
             return {
@@ -112,13 +105,13 @@ async def delete_task(
             }
         else:
             # Handle actual task deletion (existing logic)
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id, task_title, epic_code, status_code
                 FROM sts_ts.tasks
                 WHERE id = %s AND epic_code = %s
             """, (task_id, epic_id))
             
-            task_result = cursor.fetchone()
+            task_result = await cursor.fetchone()
             if not task_result:
                 raise HTTPException(
                     status_code=HTTPStatus.NOT_FOUND,
@@ -136,17 +129,17 @@ async def delete_task(
                 )
 
             # Step 2: Check for timesheet entries and set task_code to NULL to preserve them
-        cursor.execute("""
+        await cursor.execute("""
             SELECT COUNT(*) 
             FROM sts_ts.timesheet_entry 
             WHERE task_code = %s
         """, (task_id,))
         
-        timesheet_count = cursor.fetchone()[0]
+        timesheet_count = (await cursor.fetchone())[0]
         
         if timesheet_count > 0:
             logger.info(f"[INFO] Task {task_id} has {timesheet_count} timesheet entry/entries. Setting task_code to NULL to preserve them.")
-            cursor.execute("""
+            await cursor.execute("""
                 UPDATE sts_ts.timesheet_entry 
                 SET task_code = NULL, updated_by = %s, updated_at = NOW()
                 WHERE task_code = %s
@@ -154,24 +147,24 @@ async def delete_task(
             logger.info(f"[INFO] Updated {timesheet_count} timesheet entries - task_code set to NULL")
 
             # Step 3: Check for comments
-        cursor.execute("""
+        await cursor.execute("""
             SELECT COUNT(*) 
             FROM sts_ts.comments 
             WHERE parent_type = 'TASK' AND parent_code = %s
         """, (task_id,))
         
-        comment_count = cursor.fetchone()[0]
+        comment_count = (await cursor.fetchone())[0]
         if comment_count > 0:
             logger.info(f"[INFO] Task {task_id} has {comment_count} comment(s). Will be deleted.")
 
             # Step 4: Check for attachments
-        cursor.execute("""
+        await cursor.execute("""
             SELECT COUNT(*) 
             FROM sts_ts.attachments 
             WHERE parent_type = 'TASK' AND parent_code = %s
         """, (task_id,))
         
-        attachment_count = cursor.fetchone()[0]
+        attachment_count = (await cursor.fetchone())[0]
         if attachment_count > 0:
             logger.info(f"[INFO] Task {task_id} has {attachment_count} attachment(s). Will be deleted.")
 
@@ -180,7 +173,7 @@ async def delete_task(
             
             # Delete comments
         if comment_count > 0:
-            cursor.execute("""
+            await cursor.execute("""
                 DELETE FROM sts_ts.comments 
                 WHERE parent_type = 'TASK' AND parent_code = %s
             """, (task_id,))
@@ -188,21 +181,21 @@ async def delete_task(
 
         # Delete attachments (file records - actual files may remain on disk)
         if attachment_count > 0:
-            cursor.execute("""
+            await cursor.execute("""
                 DELETE FROM sts_ts.attachments 
                 WHERE parent_type = 'TASK' AND parent_code = %s
             """, (task_id,))
             logger.info(f"[INFO] Deleted {attachment_count} attachment records for task {task_id}")
 
             # Delete task history
-            cursor.execute("""
+            await cursor.execute("""
                 DELETE FROM sts_ts.task_hist 
                 WHERE task_code = %s
             """, (task_id,))
             logger.info(f"[INFO] Deleted task history for task {task_id}")
 
             # Delete the task itself
-            cursor.execute("""
+            await cursor.execute("""
                 DELETE FROM sts_ts.tasks 
                 WHERE id = %s
             """, (task_id,))
@@ -215,7 +208,9 @@ async def delete_task(
                 )
 
             # Commit all changes
-            conn.commit()
+            await publish_master_data_change(cursor, "epics")
+            await conn.commit()
+            invalidate_master_data("epics")
             logger.info(f"[INFO] Task {task_id} deleted successfully")
 
             return {
@@ -240,11 +235,11 @@ async def delete_task(
 
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except psycopg2.IntegrityError as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Database integrity error: {error_msg}")
         raise HTTPException(
@@ -253,7 +248,7 @@ async def delete_task(
         )
     except Exception as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Unexpected error: {error_msg}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
@@ -264,7 +259,4 @@ async def delete_task(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for task deletion")
 
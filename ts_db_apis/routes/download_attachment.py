@@ -0,0 +1,204 @@
+# routes/download_attachment.py
+
+import sys
+import os
+sys.path.append('E:\projects\sts_prod_developement')
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from auth.jwt_handler import verify_token
+from http import HTTPStatus
+import mimetypes
+import psycopg2
+from async_db import async_db_connection
+from file_delivery import ATTACHMENT_DOWNLOAD_PATH, DeliverableFile, deliver_file
+from config import load_config
+from utils.logger import get_logger
+import traceback
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+allowed_admin_designations = config.get('admin_designations', [])
+
+router = APIRouter()
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Parents every signed-in user can see (they are all listed in GetMasterData)
+SHARED_PARENT_TABLES = {
+    'TASK': 'sts_ts.tasks',
+    'EPIC': 'sts_ts.epics',
+    'ACTIVITY': 'sts_ts.activities',
+    'SUBTASK': 'sts_ts.subtasks',
+}
+
+# Parents belonging to one employee: visible to them, their team lead and reporter, and admins
+PERSONAL_PARENT_TABLES = {
+    'TIMESHEET_ENTRY': 'sts_ts.timesheet_entry',
+    'LEAVE_APPLICATION': 'sts_ts.leave_application',
+}
+
+VARIANTS = ('original', 'preview', 'thumbnail')
+
+
+async def _can_access_parent(cursor, user_code: str, user_is_admin: bool, parent_type: str, parent_code: int) -> bool:
+    if parent_type in SHARED_PARENT_TABLES:
+        await cursor.execute(f"SELECT 1 FROM {SHARED_PARENT_TABLES[parent_type]} WHERE id = %s", (parent_code,))
+        return await cursor.fetchone() is not None
+
+    if parent_type in PERSONAL_PARENT_TABLES:
+        await cursor.execute(f"""
+            SELECT p.user_code, tm.team_lead, tm.reporter
+            FROM {PERSONAL_PARENT_TABLES[parent_type]} p
+            LEFT JOIN sts_new.user_master um ON um.user_code = p.user_code
+            LEFT JOIN sts_new.team_master tm ON tm.team_code = um.team_code
+            WHERE p.id = %s
+        """, (parent_code,))
+        owner = await cursor.fetchone()
+        return owner is not None and (user_is_admin or user_code in owner)
+
+    return False
+
+
+@router.get(ATTACHMENT_DOWNLOAD_PATH)
+async def download_attachment(
+    request: Request,
+    attachment_id: int,
+    variant: str = Query("original", description="original, or the preview / thumbnail JPEG of an image"),
+    disposition: str = Query("attachment", description="attachment (save the file) or inline (display it)"),
+    current_user: dict = Depends(verify_token),
+):
+    """
+    Download an attachment of a task, epic, activity, subtask, timesheet entry or leave application
+    Timesheet entry and leave application files are limited to their owner, the owner's team lead and reporter, and admins
+    Supports Range, If-None-Match and If-Modified-Since; behind nginx the file itself is sent by the proxy
+    """
+    user_code = current_user['user_code']
+    logger.info(f"[INFO] Attachment download requested for attachment_id: {attachment_id}, variant: {variant}, user: {user_code}")
+
+    try:
+        # Step 1: Validate the request
+        variant = variant.strip().lower()
+        if variant not in VARIANTS:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Invalid variant: {variant}. Must be one of: {', '.join(VARIANTS)}"
+            )
+        disposition = disposition.strip().lower()
+        if disposition not in ('attachment', 'inline'):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Invalid disposition: {disposition}. Must be one of: attachment, inline"
+            )
+
+        # The pooled connection goes back before the file is sent, however long that takes
+        async with async_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Step 2: Validate user exists and is active
+                await cursor.execute("""
+                    SELECT designation_name
+                    FROM sts_new.user_master
+                    WHERE user_code = %s AND is_inactive = false
+                """, (user_code,))
+                user_result = await cursor.fetchone()
+                if not user_result:
+                    raise HTTPException(
+                        status_code=HTTPStatus.FORBIDDEN,
+                        detail="User not found or inactive"
+                    )
+                designation_name = user_result[0]
+                user_is_admin = bool(designation_name) and designation_name.strip().lower() in allowed_admin_designations
+
+                # Step 3: Fetch the attachment
+                await cursor.execute("""
+                    SELECT parent_type, parent_code, file_path, file_name, blob_sha256,
+                           preview_status, thumbnail_path, preview_path
+                    FROM sts_ts.attachments
+                    WHERE id = %s
+                """, (attachment_id,))
+                attachment = await cursor.fetchone()
+                if not attachment:
+                    raise HTTPException(
+                        status_code=HTTPStatus.NOT_FOUND,
+                        detail=f"Attachment with id '{attachment_id}' does not exist"
+                    )
+                parent_type, parent_code, file_path, file_name, blob_sha256, preview_status, thumbnail_path, preview_path = attachment
+
+                # Step 4: Check the user can see the parent record
+                if not await _can_access_parent(cursor, user_code, user_is_admin, parent_type, parent_code):
+                    logger.warning(f"[WARNING] User {user_code} denied access to attachment {attachment_id} of {parent_type} {parent_code}")
+                    raise HTTPException(
+                        status_code=HTTPStatus.FORBIDDEN,
+                        detail="You do not have access to this attachment"
+                    )
+            finally:
+                cursor.close()
+
+        # Step 5: Pick the file to send
+        file_name = file_name or os.path.basename(file_path or "")
+        if variant == 'original':
+            if not file_path:
+                raise HTTPException(
+                    status_code=HTTPStatus.NOT_FOUND,
+                    detail=f"File for attachment '{attachment_id}' is not available"
+                )
+            delivered = DeliverableFile(
+                file_path=file_path,
+                file_name=file_name,
+                media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+                # Blob contents never change, so the content hash is a strong validator
+                etag=f'"{blob_sha256}"' if blob_sha256 else None,
+            )
+        else:
+            derivative_path = thumbnail_path if variant == 'thumbnail' else preview_path
+            if preview_status != 'READY' or not derivative_path:
+                raise HTTPException(
+                    status_code=HTTPStatus.NOT_FOUND,
+                    detail=f"No {variant} is available for attachment '{attachment_id}'"
+                )
+            delivered = DeliverableFile(
+                file_path=derivative_path,
+                file_name=f"{os.path.splitext(file_name)[0]}.{variant}.jpg",
+                media_type="image/jpeg",
+            )
+
+        # Step 6: Send it, or hand it to the proxy
+        try:
+            response = await deliver_file(request, delivered, disposition)
+        except FileNotFoundError:
+            logger.error(f"[ERROR] File for attachment {attachment_id} ({variant}) is missing: {delivered.file_path}")
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail=f"File for attachment '{attachment_id}' is not available"
+            )
+        logger.info(f"[INFO] Serving attachment {attachment_id} ({variant}) to {user_code} with status {response.status_code}")
+        return response
+
+    except HTTPException as http_err:
+        logger.error(f"[ERROR] HTTP Exception in attachment download: {http_err.detail}")
+        raise http_err
+
+    except psycopg2.OperationalError as op_error:
+        logger.error(f"[ERROR] Database operational error in attachment download: {str(op_error)}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database connection error: {str(op_error)}"
+        )
+
+    except psycopg2.ProgrammingError as prog_error:
+        logger.error(f"[ERROR] Database programming error in attachment download: {str(prog_error)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database query error: {str(prog_error)}"
+        )
+
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error in attachment download: {str(e)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
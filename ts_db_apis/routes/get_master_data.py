@@ -4,12 +4,23 @@ import sys
 sys.path.append('E:\projects\sts_prod_developement')
 
 import asyncio
+from functools import partial
 from http import HTTPStatus
-from typing import Dict, List, Any
+from datetime import datetime, timedelta
+from enum import Enum
+import pytz
+from typing import Dict, List, Any, Optional
 import psycopg2
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from auth.jwt_handler import verify_token
-from utils.connect_to_psql import connect_to_psql
+from db_pool import get_connection, release_connection, get_pool, PoolTimeoutError
+from master_data_cache import (
+    master_data_cache, response_body_cache, MASTER_DATA_SECTIONS,
+    compute_master_data_etag, compute_section_etag, encode_json_body,
+)
+from helper_functions import etag_matches, get_current_time_ist, select_content_encoding
+from batch_loader import BatchLoader
+from columnar import build_columnar, or_none, or_default, bool_or, float_or_none, str_or_none
 from config import load_config
 from utils.logger import get_logger
 
@@ -17,23 +28,18 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
 logger = get_logger(log_file_name, log_dir=log_dir)
 
-def fetch_task_status_masters() -> List[Dict[str, Any]]:
+def fetch_task_status_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch task/epic status master data - only the allowed statuses for tasks and epics"""
     logger.info(f"[INFO] Starting task status master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing task status master query")
@@ -61,14 +67,17 @@ def fetch_task_status_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Task status master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Task status master database connection released")
 
-def fetch_priority_masters() -> List[Dict[str, Any]]:
+def fetch_priority_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch task priority master data from main schema"""
     logger.info(f"[INFO] Starting task priority master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing task priority master query")
@@ -94,19 +103,22 @@ def fetch_priority_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Task priority master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Task priority master database connection released")
 
 
 
 
 
 
-def fetch_product_masters() -> List[Dict[str, Any]]:
+def fetch_product_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch product master data"""
     logger.info(f"[INFO] Starting product master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing product master query")
@@ -136,15 +148,36 @@ def fetch_product_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Product master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Product master database connection released")
+
 
+# Columnar layout of the employee query (same names and conversions as the row dicts)
+EMPLOYEE_COLUMNS = [
+    ("user_code", None),
+    ("user_name", None),
+    ("user_type_code", or_none),
+    ("user_type_description", or_default("Unknown")),
+    ("designation_name", or_default("Employee")),
+    ("team_code", or_none),
+    ("team_name", or_none),
+    ("department", or_none),
+    ("contact_num", or_none),
+    ("email_id", or_none),
+    ("pfp_pic_path", or_none),
+    ("is_team_lead", bool_or(False)),
+    ("reporter", or_none),
+]
 
-def fetch_employee_masters() -> List[Dict[str, Any]]:
-    """Fetch active employees for timesheet system"""
+
+def fetch_employee_masters(conn=None, columnar: bool = False) -> Any:
+    """Fetch active employees for timesheet system (as row dicts, or columnar with columnar=True)"""
     logger.info(f"[INFO] Starting employee master data retrieval for timesheet")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing employee master query")
@@ -181,6 +214,9 @@ def fetch_employee_masters() -> List[Dict[str, Any]]:
         """
         cursor.execute(query)
         rows = cursor.fetchall()
+        if columnar:
+            logger.info(f"[INFO] Employee master data retrieved successfully (columnar), count: {len(rows)}")
+            return build_columnar(rows, EMPLOYEE_COLUMNS)
 
         employees = []
         for row in rows:
@@ -206,15 +242,18 @@ def fetch_employee_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Employee master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Employee master database connection released")
 
 
-def fetch_team_masters() -> List[Dict[str, Any]]:
+def fetch_team_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch all active teams from team_master"""
     logger.info(f"[INFO] Starting team master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing team master query")
@@ -261,15 +300,173 @@ def fetch_team_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Team master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Team master database connection released")
+
+
+def map_epic_row(row) -> Dict[str, Any]:
+    """Map an epic master row (em.id ... em.created_at, 23 columns) to the epic dict, without tasks"""
+    return {
+        "id": row[0],
+        "epic_title": row[1],
+        "epic_description": row[2] if row[2] else None,
+        "product_code": row[3],
+        "product_name": row[4] if row[4] else None,
+        "company_code": row[5] if row[5] else None,
+        "company_name": row[6] if row[6] else None,
+        "contact_person_code": row[7] if row[7] else None,
+        "contact_person_name": row[8] if row[8] else None,
+        "contact_person_email": row[9] if row[9] else None,
+        "contact_person_phone": row[10] if row[10] else None,
+        "reporter": row[11] if row[11] else None,
+        "status_code": row[12],
+        "status_desc": row[13] if row[13] else None,
+        "priority_code": row[14],
+        "start_date": str(row[15]) if row[15] else None,
+        "due_date": str(row[16]) if row[16] else None,
+        "closed_on": str(row[17]) if row[17] else None,
+        "estimated_hours": float(row[18]) if row[18] else None,
+        "max_hours": float(row[19]) if row[19] else None,
+        "is_billable": row[20] if row[20] is not None else True,
+        "created_by": row[21],
+        "created_at": str(row[22]) if row[22] else None
+    }
+
+
+# Tasks of a batch of epics, grouped by epic_code (column 1) through BatchLoader
+EPIC_TASKS_QUERY = """
+    SELECT 
+        t.id,
+        t.epic_code,
+        t.task_title,
+        t.description,
+        t.assignee,
+        t.reporter,
+        t.status_code,
+        sm.status_desc,
+        t.priority_code,
+        t.task_type_code,
+        t.work_mode,
+        t.assigned_team_code,
+        t.product_code,
+        t.assigned_on,
+        t.start_date,
+        t.due_date,
+        t.closed_on,
+        t.estimated_hours,
+        t.max_hours,
+        t.is_billable,
+        t.cancelled_by,
+        t.cancelled_at,
+        t.cancellation_reason,
+        t.created_by,
+        t.created_at
+    FROM sts_ts.tasks t
+    LEFT JOIN sts_new.status_master sm ON t.status_code = sm.status_code
+    WHERE t.epic_code = ANY(%(keys)s)
+    {since_filter}
+    ORDER BY t.id DESC;
+"""
 
 
-def fetch_epic_masters() -> List[Dict[str, Any]]:
-    """Fetch epic master data with tasks"""
-    logger.info(f"[INFO] Starting epic master data retrieval")
+def map_epic_task_row(task_row) -> Dict[str, Any]:
+    """Map an EPIC_TASKS_QUERY row to the task dict nested under its epic"""
+    return {
+        "id": task_row[0],
+        "task_title": task_row[2],
+        "description": task_row[3] if task_row[3] else None,
+        "assignee": task_row[4],
+        "reporter": task_row[5] if task_row[5] else None,
+        "status_code": task_row[6],
+        "status_desc": task_row[7] if task_row[7] else None,
+        "priority_code": task_row[8],
+        "task_type_code": task_row[9] if task_row[9] else None,
+        "work_mode": task_row[10] if task_row[10] else None,
+        "assigned_team_code": task_row[11] if task_row[11] else None,
+        "product_code": task_row[12] if task_row[12] else None,
+        "assigned_on": str(task_row[13]) if task_row[13] else None,
+        "start_date": str(task_row[14]) if task_row[14] else None,
+        "due_date": str(task_row[15]) if task_row[15] else None,
+        "closed_on": str(task_row[16]) if task_row[16] else None,
+        "estimated_hours": float(task_row[17]) if task_row[17] else None,
+        "max_hours": float(task_row[18]) if task_row[18] else None,
+        "is_billable": task_row[19] if task_row[19] is not None else True,
+        "cancelled_by": task_row[20] if task_row[20] else None,
+        "cancelled_at": str(task_row[21]) if task_row[21] else None,
+        "cancellation_reason": task_row[22] if task_row[22] else None,
+        "created_by": task_row[23],
+        "created_at": str(task_row[24]) if task_row[24] else None
+    }
+
+
+# Columnar layouts of the epic query (map_epic_row) and EPIC_TASKS_QUERY (map_epic_task_row);
+# tasks keep epic_code so clients can join them to their epic
+EPIC_COLUMNS = [
+    ("id", None),
+    ("epic_title", None),
+    ("epic_description", or_none),
+    ("product_code", None),
+    ("product_name", or_none),
+    ("company_code", or_none),
+    ("company_name", or_none),
+    ("contact_person_code", or_none),
+    ("contact_person_name", or_none),
+    ("contact_person_email", or_none),
+    ("contact_person_phone", or_none),
+    ("reporter", or_none),
+    ("status_code", None),
+    ("status_desc", or_none),
+    ("priority_code", None),
+    ("start_date", str_or_none),
+    ("due_date", str_or_none),
+    ("closed_on", str_or_none),
+    ("estimated_hours", float_or_none),
+    ("max_hours", float_or_none),
+    ("is_billable", bool_or(True)),
+    ("created_by", None),
+    ("created_at", str_or_none),
+]
+
+EPIC_TASK_COLUMNS = [
+    ("id", None),
+    ("epic_code", None),
+    ("task_title", None),
+    ("description", or_none),
+    ("assignee", None),
+    ("reporter", or_none),
+    ("status_code", None),
+    ("status_desc", or_none),
+    ("priority_code", None),
+    ("task_type_code", or_none),
+    ("work_mode", or_none),
+    ("assigned_team_code", or_none),
+    ("product_code", or_none),
+    ("assigned_on", str_or_none),
+    ("start_date", str_or_none),
+    ("due_date", str_or_none),
+    ("closed_on", str_or_none),
+    ("estimated_hours", float_or_none),
+    ("max_hours", float_or_none),
+    ("is_billable", bool_or(True)),
+    ("cancelled_by", or_none),
+    ("cancelled_at", str_or_none),
+    ("cancellation_reason", or_none),
+    ("created_by", None),
+    ("created_at", str_or_none),
+]
+
+
+def fetch_epic_masters(since: Optional[datetime] = None, conn=None, columnar: bool = False) -> Any:
+    """Fetch epic master data with tasks.
+    With columnar=True the epics are columnar and their tasks are a separate columnar "tasks" table.
+    With since, only epics created/updated after it (or with such a task) are returned,
+    and each epic's "tasks" only holds the tasks created/updated after it."""
+    logger.info(f"[INFO] Starting epic master data retrieval, since: {since}")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing epic master query")
@@ -303,122 +500,57 @@ def fetch_epic_masters() -> List[Dict[str, Any]]:
             LEFT JOIN sts_new.company_master cm ON em.company_code = cm.company_code
             LEFT JOIN sts_new.contact_master cpm ON em.contact_person_code = cpm.contact_person_code
             LEFT JOIN sts_new.status_master sm ON em.status_code = sm.status_code
+            {since_filter}
             ORDER BY em.id DESC;
         """
-        cursor.execute(query)
+        since_filter = ""
+        if since:
+            since_filter = """
+            WHERE em.created_at > %(since)s OR em.updated_at > %(since)s
+               OR EXISTS (
+                   SELECT 1 FROM sts_ts.tasks t
+                   WHERE t.epic_code = em.id AND (t.created_at > %(since)s OR t.updated_at > %(since)s)
+               )
+            """
+        cursor.execute(query.format(since_filter=since_filter), {"since": since})
         rows = cursor.fetchall()
+        task_since_filter = "AND (t.created_at > %(since)s OR t.updated_at > %(since)s)" if since else ""
+        
+        if columnar:
+            epics = build_columnar(rows, EPIC_COLUMNS)
+            task_rows = []
+            if rows:
+                cursor.execute(
+                    EPIC_TASKS_QUERY.format(since_filter=task_since_filter),
+                    {"keys": [row[0] for row in rows], "since": since}
+                )
+                task_rows = cursor.fetchall()
+            epics["tasks"] = build_columnar(task_rows, EPIC_TASK_COLUMNS)
+            logger.info(f"[INFO] Epic master data retrieved successfully (columnar), count: {len(rows)}, tasks: {len(task_rows)}")
+            return epics
         
         epics = []
         epic_ids = []
         for row in rows:
             epic_id = row[0]
             epic_ids.append(epic_id)
-            epics.append({
-                "id": epic_id,
-                "epic_title": row[1],
-                "epic_description": row[2] if row[2] else None,
-                "product_code": row[3],
-                "product_name": row[4] if row[4] else None,
-                "company_code": row[5] if row[5] else None,
-                "company_name": row[6] if row[6] else None,
-                "contact_person_code": row[7] if row[7] else None,
-                "contact_person_name": row[8] if row[8] else None,
-                "contact_person_email": row[9] if row[9] else None,
-                "contact_person_phone": row[10] if row[10] else None,
-                "reporter": row[11] if row[11] else None,
-                "status_code": row[12],
-                "status_desc": row[13] if row[13] else None,
-                "priority_code": row[14],
-                "start_date": str(row[15]) if row[15] else None,
-                "due_date": str(row[16]) if row[16] else None,
-                "closed_on": str(row[17]) if row[17] else None,
-                "estimated_hours": float(row[18]) if row[18] else None,
-                "max_hours": float(row[19]) if row[19] else None,
-                "is_billable": row[20] if row[20] is not None else True,
-                "created_by": row[21],
-                "created_at": str(row[22]) if row[22] else None,
-                "tasks": []  # Initialize tasks array
-            })
+            epic = map_epic_row(row)
+            epic["tasks"] = []  # Initialize tasks array
+            epics.append(epic)
         
-        # Fetch tasks for all epics
+        # Fetch tasks for all epics in one query, grouped by epic_code
         if epic_ids:
             logger.info(f"[INFO] Fetching tasks for {len(epic_ids)} epics")
-            tasks_query = """
-                SELECT 
-                    t.id,
-                    t.epic_code,
-                    t.task_title,
-                    t.description,
-                    t.assignee,
-                    t.reporter,
-                    t.status_code,
-                    sm.status_desc,
-                    t.priority_code,
-                    t.task_type_code,
-                    t.work_mode,
-                    t.assigned_team_code,
-                    t.product_code,
-                    t.assigned_on,
-                    t.start_date,
-                    t.due_date,
-                    t.closed_on,
-                    t.estimated_hours,
-                    t.max_hours,
-                    t.is_billable,
-                    t.cancelled_by,
-                    t.cancelled_at,
-                    t.cancellation_reason,
-                    t.created_by,
-                    t.created_at
-                FROM sts_ts.tasks t
-                LEFT JOIN sts_new.status_master sm ON t.status_code = sm.status_code
-                WHERE t.epic_code = ANY(%s)
-                ORDER BY t.id DESC;
-            """
-            cursor.execute(tasks_query, (epic_ids,))
-            task_rows = cursor.fetchall()
-            
-            # Group tasks by epic_code
-            tasks_by_epic = {}
-            for task_row in task_rows:
-                epic_code = task_row[1]
-                if epic_code not in tasks_by_epic:
-                    tasks_by_epic[epic_code] = []
-                
-                tasks_by_epic[epic_code].append({
-                    "id": task_row[0],
-                    "task_title": task_row[2],
-                    "description": task_row[3] if task_row[3] else None,
-                    "assignee": task_row[4],
-                    "reporter": task_row[5] if task_row[5] else None,
-                    "status_code": task_row[6],
-                    "status_desc": task_row[7] if task_row[7] else None,
-                    "priority_code": task_row[8],
-                    "task_type_code": task_row[9] if task_row[9] else None,
-                    "work_mode": task_row[10] if task_row[10] else None,
-                    "assigned_team_code": task_row[11] if task_row[11] else None,
-                    "product_code": task_row[12] if task_row[12] else None,
-                    "assigned_on": str(task_row[13]) if task_row[13] else None,
-                    "start_date": str(task_row[14]) if task_row[14] else None,
-                    "due_date": str(task_row[15]) if task_row[15] else None,
-                    "closed_on": str(task_row[16]) if task_row[16] else None,
-                    "estimated_hours": float(task_row[17]) if task_row[17] else None,
-                    "max_hours": float(task_row[18]) if task_row[18] else None,
-                    "is_billable": task_row[19] if task_row[19] is not None else True,
-                    "cancelled_by": task_row[20] if task_row[20] else None,
-                    "cancelled_at": str(task_row[21]) if task_row[21] else None,
-                    "cancellation_reason": task_row[22] if task_row[22] else None,
-                    "created_by": task_row[23],
-                    "created_at": str(task_row[24]) if task_row[24] else None
-                })
+            tasks_loader = BatchLoader(
+                EPIC_TASKS_QUERY.format(since_filter=task_since_filter),
+                key_index=1,
+                row_mapper=map_epic_task_row,
+            )
+            tasks_by_epic = tasks_loader.load(cursor, epic_ids, {"since": since})
             
             # Add tasks to their respective epics
             for epic in epics:
-                epic_id = epic["id"]
-                if epic_id in tasks_by_epic:
-                    epic["tasks"] = tasks_by_epic[epic_id]
-                else:
-                    epic["tasks"] = []
+                epic["tasks"] = tasks_by_epic.get(epic["id"], [])
         
         logger.info(f"[INFO] Epic master data retrieved successfully, count: {len(epics)}")
         return epics
@@ -427,15 +559,18 @@ def fetch_epic_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Epic master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Epic master database connection released")
 
 
-def fetch_company_masters() -> List[Dict[str, Any]]:
+def fetch_company_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch company master data for dropdowns"""
     logger.info(f"[INFO] Starting company master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing company master query")
@@ -479,15 +614,36 @@ def fetch_company_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Company master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Company master database connection released")
+
 
+# Columnar layout of the contact person query
+CONTACT_PERSON_COLUMNS = [
+    ("contact_person_code", None),
+    ("full_name", None),
+    ("first_name", or_none),
+    ("last_name", or_none),
+    ("email_id", or_none),
+    ("contact_num", or_none),
+    ("company_code", or_none),
+    ("company_name", or_none),
+    ("address", or_none),
+    ("city", or_none),
+    ("state", or_none),
+    ("zip_code", or_none),
+    ("branch", or_none),
+]
 
-def fetch_contact_person_masters() -> List[Dict[str, Any]]:
-    """Fetch contact person master data for dropdowns"""
+
+def fetch_contact_person_masters(conn=None, columnar: bool = False) -> Any:
+    """Fetch contact person master data for dropdowns (as row dicts, or columnar with columnar=True)"""
     logger.info(f"[INFO] Starting contact person master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing contact person master query")
@@ -513,6 +669,9 @@ def fetch_contact_person_masters() -> List[Dict[str, Any]]:
         """
         cursor.execute(query)
         rows = cursor.fetchall()
+        if columnar:
+            logger.info(f"[INFO] Contact person master data retrieved successfully (columnar), count: {len(rows)}")
+            return build_columnar(rows, CONTACT_PERSON_COLUMNS)
         
         contact_persons = []
         for row in rows:
@@ -538,10 +697,11 @@ def fetch_contact_person_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Contact person master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Contact person master database connection released")
 
-def fetch_work_location_masters() -> List[Dict[str, Any]]:
+def fetch_work_location_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch work location options - values are defined by CHECK constraint (REMOTE, ON_SITE, OFFICE)"""
     logger.info(f"[INFO] Starting work location master data retrieval")
     
@@ -573,11 +733,13 @@ def fetch_work_location_masters() -> List[Dict[str, Any]]:
         raise
 
 
-def fetch_leave_type_masters() -> List[Dict[str, Any]]:
+def fetch_leave_type_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch active leave type master data"""
     logger.info(f"[INFO] Starting leave type master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing leave type master query")
@@ -610,15 +772,18 @@ def fetch_leave_type_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Leave type master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Leave type master database connection released")
 
 
-def fetch_reporter_masters() -> List[Dict[str, Any]]:
+def fetch_reporter_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch reporters (team leads and super admins) for timesheet system"""
     logger.info(f"[INFO] Starting reporter master data retrieval for timesheet")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing reporter master query")
@@ -687,15 +852,45 @@ def fetch_reporter_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Reporter master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Reporter master database connection released")
+
+
+# Columnar layout of the predefined tasks query
+PREDEFINED_TASK_COLUMNS = [
+    ("id", None),
+    ("task_title", None),
+    ("task_description", or_none),
+    ("status_code", None),
+    ("status_description", or_none),
+    ("priority_code", None),
+    ("priority_description", or_none),
+    ("task_type_code", or_none),
+    ("task_type_name", or_none),
+    ("work_mode", None),
+    ("team_code", or_none),
+    ("team_name", or_none),
+    ("estimated_hours", float_or_none),
+    ("max_hours", float_or_none),
+    ("is_billable", bool_or(True)),
+    ("created_by", None),
+    ("created_by_name", or_none),
+    ("created_at", str_or_none),
+    ("updated_by", or_none),
+    ("updated_by_name", or_none),
+    ("updated_at", str_or_none),
+]
 
 
-def fetch_predefined_tasks() -> List[Dict[str, Any]]:
-    """Fetch all predefined tasks (independent task templates)"""
-    logger.info(f"[INFO] Starting predefined tasks master data retrieval")
+def fetch_predefined_tasks(since: Optional[datetime] = None, conn=None, columnar: bool = False) -> Any:
+    """Fetch all predefined tasks (independent task templates), or only those created/updated after since.
+    With columnar=True the result is columnar instead of row dicts."""
+    logger.info(f"[INFO] Starting predefined tasks master data retrieval, since: {since}")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing predefined tasks query")
@@ -729,10 +924,15 @@ def fetch_predefined_tasks() -> List[Dict[str, Any]]:
             LEFT JOIN sts_new.team_master tm ON pt.team_code = tm.team_code
             LEFT JOIN sts_new.user_master um_created ON pt.created_by = um_created.user_code
             LEFT JOIN sts_new.user_master um_updated ON pt.updated_by = um_updated.user_code
+            {since_filter}
             ORDER BY pt.task_title ASC;
         """
-        cursor.execute(query)
+        since_filter = "WHERE pt.created_at > %(since)s OR pt.updated_at > %(since)s" if since else ""
+        cursor.execute(query.format(since_filter=since_filter), {"since": since})
         rows = cursor.fetchall()
+        if columnar:
+            logger.info(f"[INFO] Predefined tasks master data retrieved successfully (columnar), count: {len(rows)}")
+            return build_columnar(rows, PREDEFINED_TASK_COLUMNS)
         
         predefined_tasks = []
         for row in rows:
@@ -767,15 +967,18 @@ def fetch_predefined_tasks() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Predefined tasks master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Predefined tasks master database connection released")
 
 
-def fetch_task_type_masters() -> List[Dict[str, Any]]:
+def fetch_task_type_masters(conn=None) -> List[Dict[str, Any]]:
     """Fetch all active task type master data"""
     logger.info(f"[INFO] Starting task type master data retrieval")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing task type master query")
@@ -814,15 +1017,18 @@ def fetch_task_type_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Task type master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Task type master database connection released")
 
 
-def fetch_activities_masters() -> List[Dict[str, Any]]:
-    """Fetch all activities master data"""
-    logger.info(f"[INFO] Starting activities master data retrieval")
+def fetch_activities_masters(since: Optional[datetime] = None, conn=None) -> List[Dict[str, Any]]:
+    """Fetch all activities master data, or only activities created/updated after since"""
+    logger.info(f"[INFO] Starting activities master data retrieval, since: {since}")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing activities query")
@@ -846,9 +1052,11 @@ def fetch_activities_masters() -> List[Dict[str, Any]]:
             LEFT JOIN sts_new.product_master pm ON a.product_code = pm.product_code
             LEFT JOIN sts_new.user_master um_created ON a.created_by = um_created.user_code
             LEFT JOIN sts_new.user_master um_updated ON a.updated_by = um_updated.user_code
+            {since_filter}
             ORDER BY a.id ASC;
         """
-        cursor.execute(query)
+        since_filter = "WHERE a.created_at > %(since)s OR a.updated_at > %(since)s" if since else ""
+        cursor.execute(query.format(since_filter=since_filter), {"since": since})
         rows = cursor.fetchall()
         
         activities = []
@@ -877,15 +1085,71 @@ def fetch_activities_masters() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Activities master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Activities master database connection released")
+
+
+# Linked tasks of a batch of predefined epics, grouped by predefined_epic_id (column 15) through BatchLoader
+PREDEFINED_EPIC_TASKS_QUERY = """
+    SELECT 
+        pt.id,
+        pt.task_title,
+        pt.task_description,
+        pt.status_code,
+        sm.status_desc AS status_description,
+        pt.priority_code,
+        pr_task.priority_desc AS priority_description,
+        pt.task_type_code,
+        ttm.type_name AS task_type_name,
+        pt.work_mode,
+        pt.team_code,
+        tm.team_name AS team_name,
+        pt.estimated_hours,
+        pt.max_hours,
+        pt.is_billable,
+        pt.predefined_epic_id
+    FROM sts_ts.predefined_tasks pt
+    LEFT JOIN sts_new.status_master sm ON pt.status_code = sm.status_code
+    LEFT JOIN sts_new.tkt_priority_master pr_task ON pt.priority_code = pr_task.priority_code
+    LEFT JOIN sts_ts.task_type_master ttm ON pt.task_type_code = ttm.type_code
+    LEFT JOIN sts_new.team_master tm ON pt.team_code = tm.team_code
+    WHERE pt.predefined_epic_id = ANY(%(keys)s)
+    {since_filter}
+    ORDER BY pt.task_title ASC;
+"""
 
 
-def fetch_predefined_epics() -> List[Dict[str, Any]]:
-    """Fetch all predefined epics (epic templates) with their linked tasks from junction table"""
-    logger.info(f"[INFO] Starting predefined epics master data retrieval")
+def map_predefined_epic_task_row(task_row) -> Dict[str, Any]:
+    """Map a PREDEFINED_EPIC_TASKS_QUERY row to the task dict nested under its template"""
+    return {
+        "id": task_row[0],
+        "task_title": task_row[1],
+        "task_description": task_row[2] if task_row[2] else None,
+        "status_code": task_row[3],
+        "status_description": task_row[4] if task_row[4] else None,
+        "priority_code": task_row[5],
+        "priority_description": task_row[6] if task_row[6] else None,
+        "task_type_code": task_row[7] if task_row[7] else None,
+        "task_type_name": task_row[8] if task_row[8] else None,
+        "work_mode": task_row[9],
+        "team_code": task_row[10] if task_row[10] else None,
+        "team_name": task_row[11] if task_row[11] else None,
+        "estimated_hours": float(task_row[12]) if task_row[12] else None,
+        "max_hours": float(task_row[13]) if task_row[13] else None,
+        "is_billable": task_row[14] if task_row[14] is not None else True
+    }
+
+
+def fetch_predefined_epics(since: Optional[datetime] = None, conn=None) -> List[Dict[str, Any]]:
+    """Fetch all predefined epics (epic templates) with their linked tasks from junction table.
+    With since, only templates created/updated after it (or with such a linked task) are returned,
+    and each template's "tasks" only holds the linked tasks created/updated after it."""
+    logger.info(f"[INFO] Starting predefined epics master data retrieval, since: {since}")
     
-    conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
     try:
         logger.info(f"[INFO] Executing predefined epics query")
@@ -914,63 +1178,36 @@ def fetch_predefined_epics() -> List[Dict[str, Any]]:
             LEFT JOIN sts_new.user_master um_created ON pe.created_by = um_created.user_code
             LEFT JOIN sts_new.user_master um_updated ON pe.updated_by = um_updated.user_code
             WHERE pe.is_active = true
+            {since_filter}
             ORDER BY pe.title ASC;
         """
-        cursor.execute(query)
+        since_filter = ""
+        if since:
+            since_filter = """
+            AND (
+                pe.created_at > %(since)s OR pe.updated_at > %(since)s
+                OR EXISTS (
+                    SELECT 1 FROM sts_ts.predefined_tasks pt
+                    WHERE pt.predefined_epic_id = pe.id AND (pt.created_at > %(since)s OR pt.updated_at > %(since)s)
+                )
+            )
+            """
+        cursor.execute(query.format(since_filter=since_filter), {"since": since})
         rows = cursor.fetchall()
         
+        # Fetch the linked tasks of all templates in one query, grouped by predefined_epic_id
+        task_since_filter = "AND (pt.created_at > %(since)s OR pt.updated_at > %(since)s)" if since else ""
+        tasks_loader = BatchLoader(
+            PREDEFINED_EPIC_TASKS_QUERY.format(since_filter=task_since_filter),
+            key_index=15,
+            row_mapper=map_predefined_epic_task_row,
+        )
+        tasks_by_epic = tasks_loader.load(cursor, [row[0] for row in rows], {"since": since})
+        
         predefined_epics = []
         for row in rows:
             epic_id = row[0]
-            
-            # Fetch tasks linked to this epic via predefined_epic_id column
-            tasks_query = """
-                SELECT 
-                    pt.id,
-                    pt.task_title,
-                    pt.task_description,
-                    pt.status_code,
-                    sm.status_desc AS status_description,
-                    pt.priority_code,
-                    pr_task.priority_desc AS priority_description,
-                    pt.task_type_code,
-                    ttm.type_name AS task_type_name,
-                    pt.work_mode,
-                    pt.team_code,
-                    tm.team_name AS team_name,
-                    pt.estimated_hours,
-                    pt.max_hours,
-                    pt.is_billable
-                FROM sts_ts.predefined_tasks pt
-                LEFT JOIN sts_new.status_master sm ON pt.status_code = sm.status_code
-                LEFT JOIN sts_new.tkt_priority_master pr_task ON pt.priority_code = pr_task.priority_code
-                LEFT JOIN sts_ts.task_type_master ttm ON pt.task_type_code = ttm.type_code
-                LEFT JOIN sts_new.team_master tm ON pt.team_code = tm.team_code
-                WHERE pt.predefined_epic_id = %s
-                ORDER BY pt.task_title ASC;
-            """
-            cursor.execute(tasks_query, (epic_id,))
-            task_rows = cursor.fetchall()
-            
-            tasks = []
-            for task_row in task_rows:
-                tasks.append({
-                    "id": task_row[0],
-                    "task_title": task_row[1],
-                    "task_description": task_row[2] if task_row[2] else None,
-                    "status_code": task_row[3],
-                    "status_description": task_row[4] if task_row[4] else None,
-                    "priority_code": task_row[5],
-                    "priority_description": task_row[6] if task_row[6] else None,
-                    "task_type_code": task_row[7] if task_row[7] else None,
-                    "task_type_name": task_row[8] if task_row[8] else None,
-                    "work_mode": task_row[9],
-                    "team_code": task_row[10] if task_row[10] else None,
-                    "team_name": task_row[11] if task_row[11] else None,
-                    "estimated_hours": float(task_row[12]) if task_row[12] else None,
-                    "max_hours": float(task_row[13]) if task_row[13] else None,
-                    "is_billable": task_row[14] if task_row[14] is not None else True
-                })
+            tasks = tasks_by_epic.get(epic_id, [])
             
             predefined_epics.append({
                 "id": epic_id,
@@ -1000,93 +1237,323 @@ def fetch_predefined_epics() -> List[Dict[str, Any]]:
         raise
     finally:
         cursor.close()
-        conn.close()
-        logger.info(f"[INFO] Predefined epics master database connection closed")
+        if own_conn:
+            release_connection(conn)
+            logger.info(f"[INFO] Predefined epics master database connection released")
+
+
+# Section name -> loader, used to fill cache misses
+MASTER_DATA_LOADERS = {
+    "task_statuses": fetch_task_status_masters,
+    "task_types": fetch_task_type_masters,
+    "priorities": fetch_priority_masters,
+    "products": fetch_product_masters,
+    "employees": fetch_employee_masters,
+    "teams": fetch_team_masters,
+    "epics": fetch_epic_masters,
+    "companies": fetch_company_masters,
+    "contact_persons": fetch_contact_person_masters,
+    "work_locations": fetch_work_location_masters,
+    "leave_types": fetch_leave_type_masters,
+    "reporters": fetch_reporter_masters,
+    "activities": fetch_activities_masters,
+    "predefined_epics": fetch_predefined_epics,
+    "predefined_tasks": fetch_predefined_tasks,
+}
+
+# Sections whose loaders can return columnar data (format=columnar)
+COLUMNAR_SECTIONS = ("employees", "epics", "contact_persons", "predefined_tasks")
+
+
+class MasterDataFormat(str, Enum):
+    ROWS = "rows"            # one object per row (default)
+    COLUMNAR = "columnar"    # {"columns": [...], "values": [[...] per column], "row_count": n} for COLUMNAR_SECTIONS
+
+
+# Sections whose loaders accept a since watermark (tables with created_at/updated_at)
+DELTA_SECTIONS = ("epics", "activities", "predefined_epics", "predefined_tasks")
+
+# next_since is moved back by this much so rows written by transactions that were still
+# open when the watermark was taken are picked up by the next delta call
+DELTA_SYNC_OVERLAP_SECONDS = 60
+
+
+# Upper bound on connections used by one snapshot-mode request
+SNAPSHOT_CONNECTIONS = config.get('master_data_snapshot_connections')
+
+
+def load_section(section: str, since: Optional[datetime] = None, conn=None, columnar: bool = False) -> Any:
+    """Run a section's loader, passing since only to the delta-capable sections
+    and columnar only to the sections that support it"""
+    kwargs = {"conn": conn}
+    if columnar and section in COLUMNAR_SECTIONS:
+        kwargs["columnar"] = True
+    if section in DELTA_SECTIONS:
+        return MASTER_DATA_LOADERS[section](since, **kwargs)
+    return MASTER_DATA_LOADERS[section](**kwargs)
+
+
+def section_variant(section: str, columnar: bool) -> str:
+    """Cache variant a section is served in"""
+    return "columnar" if columnar and section in COLUMNAR_SECTIONS else "rows"
+
+
+def section_count(value: Any) -> int:
+    """Row count of a section, whether it is a list of row dicts or columnar"""
+    if isinstance(value, dict):
+        return value["row_count"]
+    return len(value)
+
+
+def begin_snapshot(conn, snapshot_id: Optional[str] = None) -> str:
+    """
+    Open a REPEATABLE READ, READ ONLY transaction on conn.
+    Without snapshot_id the transaction's snapshot is exported and its id returned;
+    with it, that exported snapshot is imported so this connection sees the same data.
+    """
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        if snapshot_id:
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+            return snapshot_id
+        cursor.execute("SELECT pg_export_snapshot()")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def end_snapshot(conn, autocommit: bool) -> None:
+    """End the snapshot transaction, restore the connection's autocommit mode and release it"""
+    try:
+        conn.rollback()
+        conn.autocommit = autocommit
+    except Exception as e:
+        logger.warning(f"[WARNING] Failed to end master data snapshot transaction: {str(e)}")
+    release_connection(conn)
+
+
+def load_sections_on_connection(conn, sections: List[str], since: Optional[datetime] = None, columnar: bool = False) -> Dict[str, Any]:
+    return {section: load_section(section, since, conn, columnar) for section in sections}
+
+
+async def fetch_sections_in_snapshot(sections: List[str], since: Optional[datetime] = None, columnar: bool = False) -> Dict[str, Any]:
+    """
+    Read sections from one consistent snapshot using at most SNAPSHOT_CONNECTIONS connections.
+    The first connection exports its snapshot and the others import it, then each connection
+    loads its share of the sections in parallel. Extra connections are only taken if the pool
+    has one free right away, so a busy pool degrades to fewer connections instead of waiting
+    while this request already holds one.
+    """
+    connection_count = max(1, min(SNAPSHOT_CONNECTIONS, len(sections)))
+    conns = []  # (connection, autocommit mode to restore)
+    try:
+        leader = await asyncio.to_thread(get_connection)
+        conns.append((leader, leader.autocommit))
+        snapshot_id = await asyncio.to_thread(begin_snapshot, leader)
+
+        for _ in range(connection_count - 1):
+            try:
+                conn = await asyncio.to_thread(get_pool().getconn, 0)
+            except PoolTimeoutError:
+                logger.info(f"[INFO] No free connection for master data snapshot, continuing with {len(conns)}")
+                break
+            conns.append((conn, conn.autocommit))
+            await asyncio.to_thread(begin_snapshot, conn, snapshot_id)
+
+        logger.info(f"[INFO] Loading {len(sections)} master data sections from snapshot {snapshot_id} over {len(conns)} connections")
+        groups = [sections[i::len(conns)] for i in range(len(conns))]
+        results = await asyncio.gather(*[
+            asyncio.to_thread(load_sections_on_connection, conn, group, since, columnar)
+            for (conn, _), group in zip(conns, groups)
+        ])
+
+        master_data = {}
+        for result in results:
+            master_data.update(result)
+        return master_data
+    finally:
+        for conn, autocommit in conns:
+            await asyncio.to_thread(end_snapshot, conn, autocommit)
+
+
+def parse_sections(sections: Optional[str]) -> List[str]:
+    """Parse the comma-separated sections parameter, keeping the documented response order"""
+    if not sections:
+        return list(MASTER_DATA_SECTIONS)
+    requested = {section.strip().lower() for section in sections.split(",") if section.strip()}
+    unknown = requested - set(MASTER_DATA_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown master data section(s): {', '.join(sorted(unknown))}. Valid sections: {', '.join(MASTER_DATA_SECTIONS)}"
+        )
+    if not requested:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"At least one section is required. Valid sections: {', '.join(MASTER_DATA_SECTIONS)}"
+        )
+    return [section for section in MASTER_DATA_SECTIONS if section in requested]
+
+
+def parse_since(since: Optional[str]) -> Optional[datetime]:
+    """Parse the since watermark (ISO 8601 date or datetime, IST like the stored timestamps)"""
+    if not since:
+        return None
+    try:
+        since_dt = datetime.fromisoformat(since.strip())
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Invalid since value '{since}'. Expected ISO 8601 format, e.g. 2025-01-31T09:30:00"
+        )
+    if since_dt.tzinfo is not None:
+        # created_at/updated_at are naive IST
+        since_dt = since_dt.astimezone(pytz.timezone('Asia/Kolkata')).replace(tzinfo=None)
+    return since_dt
 
 
 @router.get("/api/v1/timesheet/GetMasterData")
-async def get_timesheet_master_data(current_user: dict = Depends(verify_token)):
+async def get_timesheet_master_data(
+    request: Request,
+    response: Response,
+    sections: Optional[str] = Query(None, description=f"Comma-separated sections to return (default: all). Valid sections: {', '.join(MASTER_DATA_SECTIONS)}"),
+    since: Optional[str] = Query(None, description=f"Delta sync watermark (ISO 8601, use next_since from the previous response). Sections {', '.join(DELTA_SECTIONS)} then only return rows created or updated after it; other sections are returned in full"),
+    snapshot: bool = Query(False, description="Read all requested sections from one consistent database snapshot (bypasses the cache, uses at most a few connections)"),
+    response_format: MasterDataFormat = Query(MasterDataFormat.ROWS, alias="format", description=f"rows (default) or columnar. columnar returns {', '.join(COLUMNAR_SECTIONS)} as column names plus one value array per column (epics carry their tasks as a separate columnar \"tasks\" table with epic_code)"),
+    current_user: dict = Depends(verify_token),
+):
     """
-    Fetch all master data for timesheet system dropdowns in parallel using asyncio.to_thread.
+    Fetch master data for timesheet system dropdowns.
+    Sections are served from the in-process master data cache; only missing or expired
+    sections are loaded, in parallel using asyncio.to_thread.
+    sections= limits the response (and the queries run) to the listed sections.
+    since= switches the delta-capable sections to delta mode: they are read straight from the
+    database and only hold rows created or updated after the watermark. Deleted rows are not
+    reported, so clients should still do a periodic full load.
+    snapshot=true reads every requested section inside one REPEATABLE READ snapshot shared
+    across a small, fixed number of connections, so related sections (e.g. epics and their
+    tasks) are mutually consistent.
+    Full responses support conditional GET: they carry an ETag built from per-section content
+    hashes (also returned under "versions"), and a matching If-None-Match gets 304 Not Modified.
+    format=columnar returns the large lists (employees, epics, contact_persons, predefined_tasks)
+    as column names plus per-column value arrays built straight from the cursor rows.
+    Full responses built from the cache are kept as pre-serialized gzip/brotli/plain bodies and
+    sent according to Accept-Encoding until one of their sections changes.
     Returns: task statuses, task types, priorities, products, employees, teams, epics, companies, contact_persons, work_locations, leave_types, reporters, activities, predefined_epics, predefined_tasks
     """
-    logger.info(f"[INFO] Starting timesheet master data retrieval process")
+    logger.info(f"[INFO] Starting timesheet master data retrieval process, sections: {sections or 'all'}, since: {since}, snapshot: {snapshot}, format: {response_format.value}")
     
     try:
-        logger.info(f"[INFO] Executing parallel timesheet master data queries")
-        # Execute all queries in parallel using asyncio.to_thread
-        tasks = [
-            asyncio.to_thread(fetch_task_status_masters),
-            asyncio.to_thread(fetch_task_type_masters),
-            asyncio.to_thread(fetch_priority_masters),
-            asyncio.to_thread(fetch_product_masters),
-            asyncio.to_thread(fetch_employee_masters),
-            asyncio.to_thread(fetch_team_masters),
-            asyncio.to_thread(fetch_epic_masters),
-            asyncio.to_thread(fetch_company_masters),
-            asyncio.to_thread(fetch_contact_person_masters),
-            asyncio.to_thread(fetch_work_location_masters),
-            asyncio.to_thread(fetch_leave_type_masters),
-            asyncio.to_thread(fetch_reporter_masters),
-            asyncio.to_thread(fetch_activities_masters),
-            asyncio.to_thread(fetch_predefined_epics),
-            asyncio.to_thread(fetch_predefined_tasks),
-        ]
-        
-        # Wait for all tasks to complete
-        results = await asyncio.gather(*tasks)
-        logger.info(f"[INFO] All parallel timesheet queries completed successfully")
-        
-        task_statuses, task_types, priorities, products, employees, teams, epics, companies, contact_persons, work_locations, leave_types, reporters, activities, predefined_epics, predefined_tasks = results
-
-        # Prepare response
-        master_data = {
-            "task_statuses": task_statuses,
-            "task_types": task_types,
-            "priorities": priorities,
-            "products": products,
-            "employees": employees,
-            "teams": teams,
-            "epics": epics,
-            "companies": companies,
-            "contact_persons": contact_persons,
-            "work_locations": work_locations,
-            "leave_types": leave_types,
-            "reporters": reporters,
-            "activities": activities,
-            "predefined_epics": predefined_epics,
-            "predefined_tasks": predefined_tasks,
-        }
+        requested_sections = parse_sections(sections)
+        since_dt = parse_since(since)
+        columnar = response_format == MasterDataFormat.COLUMNAR
+        # Taken before any query runs so nothing written during this call is skipped next time;
+        # moved back below to the load time of the oldest cached section served
+        data_as_of = get_current_time_ist()
 
-        counts = {
-            "task_statuses": len(task_statuses),
-            "task_types": len(task_types),
-            "priorities": len(priorities),
-            "products": len(products),
-            "employees": len(employees),
-            "teams": len(teams),
-            "epics": len(epics),
-            "companies": len(companies),
-            "contact_persons": len(contact_persons),
-            "work_locations": len(work_locations),
-            "leave_types": len(leave_types),
-            "reporters": len(reporters),
-            "activities": len(activities),
-            "predefined_epics": len(predefined_epics),
-            "predefined_tasks": len(predefined_tasks),
-        }
+        delta_sections = [section for section in requested_sections if since_dt and section in DELTA_SECTIONS]
+        master_data = {}
+        versions = {}
 
-        logger.info(f"[INFO] Timesheet master data processing completed successfully - task_statuses: {counts['task_statuses']}, task_types: {counts['task_types']}, priorities: {counts['priorities']}, products: {counts['products']}, employees: {counts['employees']}, teams: {counts['teams']}, epics: {counts['epics']}, companies: {counts['companies']}, contact_persons: {counts['contact_persons']}, work_locations: {counts['work_locations']}, leave_types: {counts['leave_types']}, reporters: {counts['reporters']}, activities: {counts['activities']}, predefined_epics: {counts['predefined_epics']}, predefined_tasks: {counts['predefined_tasks']}")
+        if snapshot:
+            # Every requested section from one database snapshot, bypassing the cache
+            master_data = await fetch_sections_in_snapshot(requested_sections, since_dt, columnar)
+            if not since_dt:
+                versions = {section: compute_section_etag(master_data[section]) for section in requested_sections}
+        else:
+            entries = {}
+            missing_sections = []
+            for section in requested_sections:
+                if section in delta_sections:
+                    continue
+                entry = master_data_cache.lookup(section, section_variant(section, columnar))
+                if entry is not None:
+                    entries[section] = entry
+                else:
+                    missing_sections.append(section)
 
-        return {
+            if missing_sections or delta_sections:
+                logger.info(f"[INFO] Loading master data sections - not in cache: {', '.join(missing_sections) or 'none'}, delta: {', '.join(delta_sections) or 'none'}")
+                # Execute the missing and delta queries in parallel using asyncio.to_thread
+                tasks = [
+                    asyncio.to_thread(
+                        master_data_cache.get_or_load,
+                        section,
+                        partial(load_section, section, columnar=columnar),
+                        section_variant(section, columnar),
+                    )
+                    for section in missing_sections
+                ] + [
+                    asyncio.to_thread(load_section, section, since_dt, None, columnar)
+                    for section in delta_sections
+                ]
+                results = await asyncio.gather(*tasks)
+                entries.update(zip(missing_sections, results[:len(missing_sections)]))
+                master_data.update(zip(delta_sections, results[len(missing_sections):]))
+                logger.info(f"[INFO] All parallel timesheet queries completed successfully")
+            else:
+                logger.info(f"[INFO] All requested master data sections served from cache")
+
+            for section, entry in entries.items():
+                master_data[section] = entry.value
+                versions[section] = entry.etag
+                data_as_of = min(data_as_of, entry.loaded_at)
+
+        next_since = data_as_of - timedelta(seconds=DELTA_SYNC_OVERLAP_SECONDS)
+        # Prepare response in the documented section order
+        master_data = {section: master_data[section] for section in requested_sections}
+        counts = {section: section_count(master_data[section]) for section in requested_sections}
+
+        logger.info(f"[INFO] Timesheet master data processing completed successfully - {', '.join(f'{section}: {count}' for section, count in counts.items())}")
+
+        result = {
             "success_flag": True,
             "message": "Timesheet master data fetched successfully",
             "status_code": HTTPStatus.OK.value,
             "status_message": HTTPStatus.OK.phrase,
             "data": master_data,
-            "counts": counts
+            "counts": counts,
+            "next_since": next_since.isoformat(timespec="seconds"),
         }
 
+        if since_dt:
+            result["since"] = since_dt.isoformat()
+            result["delta_sections"] = delta_sections
+            return result
+
+        versions = {section: versions[section] for section in requested_sections}
+        etag = compute_master_data_etag(versions)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            logger.info(f"[INFO] Timesheet master data not modified (ETag: {etag})")
+            return Response(status_code=HTTPStatus.NOT_MODIFIED.value, headers=cache_headers)
+
+        result["versions"] = versions
+        if snapshot:
+            response.headers.update(cache_headers)
+            return result
+
+        # Cached sections: reuse the pre-serialized, precompressed body unless a section changed
+        body_sections = (response_format.value,) + tuple(requested_sections)
+        version_key = f"{etag}|{result['next_since']}"
+        bodies = response_body_cache.get(body_sections, version_key)
+        if bodies is None:
+            logger.info(f"[INFO] Building master data response body for ETag {etag}")
+            bodies = await asyncio.to_thread(encode_json_body, result)
+            response_body_cache.put(body_sections, version_key, bodies)
+
+        content_encoding = select_content_encoding(request.headers.get("accept-encoding"), bodies)
+        body_headers = dict(cache_headers, Vary="Accept-Encoding")
+        if content_encoding != "identity":
+            body_headers["Content-Encoding"] = content_encoding
+        return Response(content=bodies[content_encoding], media_type="application/json", headers=body_headers)
+
+    except HTTPException:
+        raise
+
     except psycopg2.OperationalError as op_error:
         logger.error(f"[ERROR] Database operational error in timesheet master data retrieval, error: {str(op_error)}")
         return {
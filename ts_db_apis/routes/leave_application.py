@@ -8,28 +8,23 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget
+from blob_store import store_upload_blob
+from file_delivery import attachment_download_url
 from config import load_config
+from reference_registry import get_reference_data
 from utils.logger import get_logger
 from typing import Optional, List
 from enum import Enum
 from datetime import date, timedelta
 import traceback
 import os
-import uuid
 
 config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir', 'uploads')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 allowed_admin_designations = config.get('admin_designations', [])
 
@@ -53,39 +48,32 @@ async def apply_leave(
     leave_application_id: Optional[int] = Form(None, description="Leave application ID to update (if provided, updates existing draft)"),
     approval_status: Optional[str] = Form("PENDING", description="Approval status: DRAFT or PENDING (default: PENDING)"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Apply for leave
     """
     logger.info(f"[INFO] Starting leave application for user_code: {current_user['user_code']}, leave_type_code: {leave_type_code}")
     
-    conn = None
     cursor = None
 
     try:
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         user_code = current_user['user_code']
         current_time = get_current_time_ist()
 
         # Step 1: Validate user exists
-        cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (user_code,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (user_code,))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"User with code {user_code} does not exist or is inactive"
             )
 
         # Step 2: Validate leave type exists and is active
-        cursor.execute("""
-            SELECT leave_type_code, leave_type_name 
-            FROM sts_ts.leave_type_master 
-            WHERE leave_type_code = %s AND is_active = true
-        """, (leave_type_code,))
-        leave_type_result = cursor.fetchone()
-        if not leave_type_result:
+        reference_data = await get_reference_data()
+        if leave_type_code not in reference_data.leave_types:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Leave type '{leave_type_code}' does not exist or is not active"
@@ -169,12 +157,12 @@ async def apply_leave(
             logger.info(f"[INFO] Updating existing leave application with ID: {leave_application_id}")
             
             # Verify the leave application exists and belongs to the user
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT id, user_code, approval_status 
                 FROM sts_ts.leave_application 
                 WHERE id = %s AND user_code = %s
             """, (leave_application_id, user_code))
-            existing_leave = cursor.fetchone()
+            existing_leave = await cursor.fetchone()
             
             if not existing_leave:
                 raise HTTPException(
@@ -207,13 +195,13 @@ async def apply_leave(
                     duration_days, duration_hours, reason, approval_status, created_at
             """
             
-            cursor.execute(update_query, (
+            await cursor.execute(update_query, (
                 leave_type_code, from_date_parsed, to_date_parsed,
                 duration_days, duration_hours, reason,
                 approval_status_upper, user_code, current_time, leave_application_id
             ))
             
-            result = cursor.fetchone()
+            result = await cursor.fetchone()
             if not result:
                 raise Exception("Failed to update leave application - no ID returned")
             
@@ -232,13 +220,13 @@ async def apply_leave(
                     duration_days, duration_hours, reason, approval_status, created_at
             """
             
-            cursor.execute(insert_query, (
+            await cursor.execute(insert_query, (
                 user_code, leave_type_code, from_date_parsed, to_date_parsed,
                 duration_days, duration_hours, reason,
                 approval_status_upper, user_code, current_time
             ))
 
-            result = cursor.fetchone()
+            result = await cursor.fetchone()
             if not result:
                 raise Exception("Failed to insert leave application - no ID returned")
 
@@ -258,27 +246,14 @@ async def apply_leave(
                 os.chmod(upload_dir, 0o755)
                 logger.info(f"[INFO] Upload directory created successfully with permissions")
 
-            # Ensure base_url ends with a trailing slash for correct URL join
-            normalized_base_url = base_url if base_url.endswith('/') else (base_url + '/')
 
+            upload_budget = UploadBudget()
             for attachment in attachments:
                 if attachment.filename:  # Check if file was actually uploaded
                     try:
-                        # Generate unique filename
-                        file_extension = os.path.splitext(attachment.filename)[1]
-                        unique_filename = f"{uuid.uuid4()}{file_extension}"
-                        file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-    
-                        # Create the URL for client access
-                        file_url = normalized_base_url + unique_filename
-                        logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-                                
-                        # Save file to disk
+                        # Store file by content (identical files are stored once; size limits are enforced while reading)
                         try:
-                            with open(file_path, "wb") as buffer:
-                                content = await attachment.read()
-                                buffer.write(content)
-                            logger.info(f"[INFO] File saved to disk: {file_path}, size: {len(content)} bytes")
+                            stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
                         except Exception as e:
                             logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                             raise HTTPException(
@@ -286,11 +261,9 @@ async def apply_leave(
                                 detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                             )
                         
-                        file_size = len(content)
+                        file_size = stored_blob.size
+                        file_path, file_url = stored_blob.file_path, stored_blob.file_url
                         
-                        # Set proper file permissions for web server access
-                        os.chmod(file_path, 0o644)
-                                
                         # Extract file information to insert into database
                         file_name = attachment.filename
                         file_type = os.path.splitext(attachment.filename)[1].lower().lstrip('.')
@@ -300,23 +273,24 @@ async def apply_leave(
                         # Insert attachment record into database
                         attachment_query = """
                             INSERT INTO sts_ts.attachments (
-                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                             ) VALUES (
-                                'LEAVE_APPLICATION', %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                'LEAVE_APPLICATION', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             ) RETURNING id
                         """
                         
-                        cursor.execute(attachment_query, (
+                        await cursor.execute(attachment_query, (
                             leave_id, file_path, file_url, file_name, file_type, file_size_display, "LEAVE APPLICATION ATTACHMENT", 
-                            user_code, current_time
+                            stored_blob.sha256, user_code, current_time
                         ))
                         
-                        attachment_id = cursor.fetchone()[0]
+                        attachment_id = (await cursor.fetchone())[0]
                         attachment_data.append({
                             "id": attachment_id,
                             "original_filename": attachment.filename,
                             "file_path": file_path,
-                            "file_url": file_url,
+                            # Only the owner and their approvers may fetch it, so link the checked download
+                            "file_url": attachment_download_url(attachment_id),
                             "purpose": "LEAVE APPLICATION ATTACHMENT",
                             "file_size_bytes": file_size_bytes,
                             "file_size_display": file_size_display
@@ -334,7 +308,7 @@ async def apply_leave(
                         continue
 
         # Step 8: Commit transaction
-        conn.commit()
+        await conn.commit()
 
         return {
             "Status_Flag": True,
@@ -359,7 +333,7 @@ async def apply_leave(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Data integrity violation. Please check your input data."
@@ -375,20 +349,20 @@ async def apply_leave(
         logger.error(f"[ERROR] Database query error: {error_msg}")
         logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed: {error_msg}"
         )
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -396,9 +370,7 @@ async def apply_leave(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for leave application")
+        logger.info(f"[INFO] Database cursor closed for leave application")
 
 @router.post("/api/v1/timesheet/approve_leave/")
 async def approve_leave(
@@ -406,13 +378,13 @@ async def approve_leave(
     action: ApprovalAction = Form(..., description="Action to perform: APPROVE or REJECT"),
     rejection_reason: Optional[str] = Form(None, description="Reason for rejection (required if action is REJECT)"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Approve or reject a leave application (Admin only)
     """
     logger.info(f"[INFO] Starting leave approval/rejection for leave_id: {leave_id}, action: {action}, by user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
@@ -420,17 +392,16 @@ async def approve_leave(
         user_code = current_user['user_code']
         logger.info(f"[INFO] Validating admin permissions for user: {user_code}")
         
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
         
         # Check user designation
-        cursor.execute("""
+        await cursor.execute("""
             SELECT designation_name 
             FROM sts_new.user_master 
             WHERE user_code = %s AND is_inactive = false
         """, (user_code,))
         
-        user_result = cursor.fetchone()
+        user_result = await cursor.fetchone()
         if not user_result:
             raise HTTPException(
                 status_code=HTTPStatus.FORBIDDEN,
@@ -456,13 +427,13 @@ async def approve_leave(
         logger.info(f"[INFO] User {user_code} with designation '{designation_name}' is authorized to approve/reject leave applications")
 
         # Step 2: Validate leave application exists
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id, user_code, leave_type_code, from_date, to_date, approval_status
             FROM sts_ts.leave_application
             WHERE id = %s
         """, (leave_id,))
         
-        leave_result = cursor.fetchone()
+        leave_result = await cursor.fetchone()
         if not leave_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -503,7 +474,7 @@ async def approve_leave(
                     duration_days, duration_hours, reason, approval_status,
                     approved_by, approved_at, created_at
             """
-            cursor.execute(update_query, (user_code, current_time, user_code, current_time, leave_id))
+            await cursor.execute(update_query, (user_code, current_time, user_code, current_time, leave_id))
         else:  # REJECT
             update_query = """
                 UPDATE sts_ts.leave_application
@@ -518,16 +489,16 @@ async def approve_leave(
                     duration_days, duration_hours, reason, approval_status,
                     rejected_by, rejected_at, rejection_reason, created_at
             """
-            cursor.execute(update_query, (user_code, current_time, rejection_reason, user_code, current_time, leave_id))
+            await cursor.execute(update_query, (user_code, current_time, rejection_reason, user_code, current_time, leave_id))
 
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         if not result:
             raise Exception("Failed to update leave application - no ID returned")
 
         logger.info(f"[INFO] Successfully {action.value.lower()}d leave application {leave_id}")
 
         # Step 6: Commit transaction
-        conn.commit()
+        await conn.commit()
 
         # Build response
         response_data = {
@@ -562,7 +533,7 @@ async def approve_leave(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Data integrity violation. Please check your input data."
@@ -578,20 +549,20 @@ async def approve_leave(
         logger.error(f"[ERROR] Database query error: {error_msg}")
         logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed: {error_msg}"
         )
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -599,7 +570,5 @@ async def approve_leave(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for leave approval")
+        logger.info(f"[INFO] Database cursor closed for leave approval")
 
@@ -6,10 +6,10 @@ sys.path.append('E:\projects\sts_prod_developement')
 
 from http import HTTPStatus
 import psycopg2
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from auth.jwt_handler import create_access_token
-from utils.connect_to_psql import connect_to_psql
+from db_pool import get_db_connection
 from config import load_config
 from helper_functions import verify_hash_pw, get_current_time_ist
 
@@ -20,13 +20,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('schema_name')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -37,17 +30,13 @@ class LoginSchema(BaseModel):
     password: str
 
 @router.post("/api/v1/timesheet/Login")
-def login(RequestBody: LoginSchema):
+def login(RequestBody: LoginSchema, conn=Depends(get_db_connection)):
     logger.info(f"[INFO] Starting login process for user_code: {RequestBody.user_code}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for login")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
 
         logger.info(f"[INFO] Executing user authentication query for user_code: {RequestBody.user_code}")
@@ -265,6 +254,3 @@ def login(RequestBody: LoginSchema):
         if cursor:
             cursor.close()
             logger.info(f"[INFO] Database cursor closed")
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed")
@@ -0,0 +1,110 @@
+# routes/recent_activities.py
+
+import sys
+sys.path.append('E:\projects\sts_prod_developement')
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from auth.jwt_handler import verify_token
+from http import HTTPStatus
+from typing import Optional
+import psycopg2
+from async_db import get_async_db_connection
+from activity_feed import MAX_FEED_PAGE_SIZE, fetch_activity_page
+from config import load_config
+from utils.logger import get_logger
+import traceback
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+router = APIRouter()
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+@router.get("/api/v1/timesheet/recent_activities")
+async def recent_activities(
+    parent_type: Optional[str] = Query(None, description="Filter by EPIC (the epic and all its tasks) or TASK"),
+    parent_code: Optional[int] = Query(None, description="ID of the epic or task, required with parent_type"),
+    before_id: Optional[int] = Query(None, description="next_before_id of the previous page; omit for the newest page"),
+    limit: int = Query(50, ge=1, le=MAX_FEED_PAGE_SIZE, description="Number of activities per page"),
+    current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
+):
+    """
+    Page through the activity feed, newest first
+    Pass next_before_id from the response as before_id to get the following page
+    """
+    logger.info(f"[INFO] Fetching recent activities for parent_type: {parent_type}, parent_code: {parent_code}, before_id: {before_id}, user: {current_user['user_code']}")
+
+    cursor = None
+
+    try:
+        # Step 1: Validate the filter
+        parent_type_upper = parent_type.strip().upper() if parent_type else None
+        if parent_type_upper not in (None, 'EPIC', 'TASK'):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Invalid parent_type: {parent_type}. Must be one of: EPIC, TASK"
+            )
+        if parent_type_upper and parent_code is None:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="parent_code is required when parent_type is provided"
+            )
+
+        cursor = conn.cursor()
+
+        # Step 2: Fetch one page of the feed
+        items, next_before_id = await fetch_activity_page(
+            cursor,
+            epic_code=parent_code if parent_type_upper == 'EPIC' else None,
+            entity_type='TASK' if parent_type_upper == 'TASK' else None,
+            entity_code=parent_code if parent_type_upper == 'TASK' else None,
+            before_id=before_id,
+            limit=limit,
+        )
+        logger.info(f"[INFO] Fetched {len(items)} activities, next_before_id: {next_before_id}")
+
+        return {
+            "Status_Flag": True,
+            "Status_Description": "Recent activities retrieved successfully",
+            "Status_Code": HTTPStatus.OK.value,
+            "Status_Message": HTTPStatus.OK.phrase,
+            "Response_Data": {
+                "items": items,
+                "next_before_id": next_before_id,
+            }
+        }
+
+    except HTTPException as http_err:
+        logger.error(f"[ERROR] HTTP Exception in recent activities: {http_err.detail}")
+        raise http_err
+
+    except psycopg2.OperationalError as op_error:
+        logger.error(f"[ERROR] Database operational error in recent activities: {str(op_error)}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database connection error: {str(op_error)}"
+        )
+
+    except psycopg2.ProgrammingError as prog_error:
+        logger.error(f"[ERROR] Database programming error in recent activities: {str(prog_error)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database query error: {str(prog_error)}"
+        )
+
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error in recent activities: {str(e)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
+
+    finally:
+        if cursor:
+            cursor.close()
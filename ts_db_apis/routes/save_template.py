@@ -9,7 +9,10 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from reference_registry import get_reference_data
+from batch_loader import BatchLoader
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 from typing import Optional
@@ -22,13 +25,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -52,6 +48,12 @@ class StatusCode(str, Enum):
     COMPLETED = "STS002"        # Completed
     CANCELLED = "STS010"        # Cancelled
 
+# Existing predefined tasks by id, for linking to an epic template
+PREDEFINED_TASK_LOADER = BatchLoader(
+    "SELECT id, task_title FROM sts_ts.predefined_tasks WHERE id = ANY(%(keys)s)",
+    many=False,
+)
+
 @router.post("/api/v1/timesheet/save_template")
 async def save_template(
     # Template type and identification
@@ -88,6 +90,8 @@ async def save_template(
     tasks: Optional[str] = Form(None, description="JSON array of tasks (for EPIC type only). Example: [{'task_title': 'Task 1', 'priority_code': 2, 'work_mode': 'REMOTE', 'max_hours': 15}, {'predefined_task_id': 1}]"),
     
     current_user: dict = Depends(verify_token),
+    
+    conn=Depends(get_async_db_connection),
 ):
     """
     Save or update a predefined template (Epic or Task).
@@ -104,14 +108,10 @@ async def save_template(
     """
     logger.info(f"[INFO] Starting template save/update, type: {template_type}, template_id: {template_id}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for template save/update")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         user_code = current_user['user_code']
         current_time = get_current_time_ist()
@@ -166,8 +166,8 @@ async def save_template(
                 )
             
             # Validate priority_code exists
-            cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (priority_code,))
-            if not cursor.fetchone():
+            reference_data = await get_reference_data()
+            if priority_code not in reference_data.priorities:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Priority code {priority_code} does not exist"
@@ -175,11 +175,11 @@ async def save_template(
             
             # Validate contact_person_code if provided
             if contact_person_code and contact_person_code.strip():
-                cursor.execute(
+                await cursor.execute(
                     "SELECT contact_person_code FROM sts_new.contact_master WHERE contact_person_code = %s AND is_inactive = false",
                     (contact_person_code.strip(),)
                 )
-                if not cursor.fetchone():
+                if not await cursor.fetchone():
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
                         detail=f"Contact person with code {contact_person_code} does not exist or is inactive"
@@ -190,8 +190,8 @@ async def save_template(
                 # Update existing epic template
                 logger.info(f"[INFO] Updating existing epic template with ID: {template_id}")
                 
-                cursor.execute("SELECT id, title FROM sts_ts.predefined_epics WHERE id = %s", (template_id,))
-                existing_template = cursor.fetchone()
+                await cursor.execute("SELECT id, title FROM sts_ts.predefined_epics WHERE id = %s", (template_id,))
+                existing_template = await cursor.fetchone()
                 if not existing_template:
                     raise HTTPException(
                         status_code=HTTPStatus.NOT_FOUND,
@@ -202,8 +202,8 @@ async def save_template(
                 
                 # Check title uniqueness (only if title is being changed)
                 if epic_title.strip() != existing_title:
-                    cursor.execute("SELECT id FROM sts_ts.predefined_epics WHERE title = %s AND id != %s", (epic_title.strip(), template_id))
-                    if cursor.fetchone():
+                    await cursor.execute("SELECT id FROM sts_ts.predefined_epics WHERE title = %s AND id != %s", (epic_title.strip(), template_id))
+                    if await cursor.fetchone():
                         raise HTTPException(
                             status_code=HTTPStatus.BAD_REQUEST,
                             detail=f"Epic template with title '{epic_title.strip()}' already exists. Title must be unique."
@@ -226,7 +226,7 @@ async def save_template(
                     RETURNING id
                 """
                 
-                cursor.execute(update_query, (
+                await cursor.execute(update_query, (
                     epic_title.strip(),
                     epic_description.strip() if epic_description else None,
                     contact_person_code.strip() if contact_person_code else None,
@@ -240,7 +240,7 @@ async def save_template(
                     template_id
                 ))
                 
-                result = cursor.fetchone()
+                result = await cursor.fetchone()
                 if not result:
                     raise HTTPException(
                         status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -255,8 +255,8 @@ async def save_template(
                 logger.info(f"[INFO] Creating new epic template")
                 
                 # Check title uniqueness
-                cursor.execute("SELECT id FROM sts_ts.predefined_epics WHERE title = %s", (epic_title.strip(),))
-                if cursor.fetchone():
+                await cursor.execute("SELECT id FROM sts_ts.predefined_epics WHERE title = %s", (epic_title.strip(),))
+                if await cursor.fetchone():
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
                         detail=f"Epic template with title '{epic_title.strip()}' already exists. Title must be unique."
@@ -273,7 +273,7 @@ async def save_template(
                     ) RETURNING id
                 """
                 
-                cursor.execute(insert_query, (
+                await cursor.execute(insert_query, (
                     epic_title.strip(),
                     epic_description.strip() if epic_description else None,
                     contact_person_code.strip() if contact_person_code else None,
@@ -286,7 +286,7 @@ async def save_template(
                     current_time
                 ))
                 
-                result = cursor.fetchone()
+                result = await cursor.fetchone()
                 if not result:
                     raise HTTPException(
                         status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -308,6 +308,13 @@ async def save_template(
                     
                     logger.info(f"[INFO] Processing {len(tasks_list)} tasks for epic template")
                     
+                    # Look up every existing task being linked in one query instead of one per task
+                    existing_tasks_by_id = await PREDEFINED_TASK_LOADER.load_async(cursor, [
+                        int(task_data['predefined_task_id'])
+                        for task_data in tasks_list
+                        if isinstance(task_data, dict) and task_data.get('predefined_task_id')
+                    ])
+                    
                     for task_data in tasks_list:
                         if not isinstance(task_data, dict):
                             raise ValueError("Each task must be a JSON object")
@@ -321,8 +328,7 @@ async def save_template(
                             # Link existing task
                             existing_task_id = int(task_data['predefined_task_id'])
                             
-                            cursor.execute("SELECT id, task_title FROM sts_ts.predefined_tasks WHERE id = %s", (existing_task_id,))
-                            existing_task = cursor.fetchone()
+                            existing_task = existing_tasks_by_id.get(existing_task_id)
                             if not existing_task:
                                 raise HTTPException(
                                     status_code=HTTPStatus.BAD_REQUEST,
@@ -340,7 +346,7 @@ async def save_template(
                         
                         else:
                             # Create new task or link to existing if duplicate title found
-                            task_result = _create_predefined_task(cursor, task_data, user_code, current_time)
+                            task_result = await _create_predefined_task(cursor, task_data, user_code, current_time)
                             task_id_to_link = task_result[0]
                             task_title_to_link = task_result[1]
                             is_new = task_result[2]
@@ -362,24 +368,16 @@ async def save_template(
                         
                         # Link task to epic template by updating predefined_epic_id
                         if task_id_to_link:
-                            # Check if task already belongs to this epic (prevent duplicates)
-                            cursor.execute("""
-                                SELECT predefined_epic_id FROM sts_ts.predefined_tasks 
+                            # Link only if the task does not already belong to this epic (prevent duplicates)
+                            await cursor.execute("""
+                                UPDATE sts_ts.predefined_tasks 
+                                SET predefined_epic_id = %s,
+                                    updated_by = %s,
+                                    updated_at = %s
                                 WHERE id = %s
-                            """, (task_id_to_link,))
-                            
-                            task_result = cursor.fetchone()
-                            current_epic_id = task_result[0] if task_result else None
-                            
-                            if current_epic_id != saved_template_id:
-                                # Update predefined_epic_id to link task to epic template
-                                cursor.execute("""
-                                    UPDATE sts_ts.predefined_tasks 
-                                    SET predefined_epic_id = %s,
-                                        updated_by = %s,
-                                        updated_at = %s
-                                    WHERE id = %s
-                                """, (saved_template_id, user_code, current_time, task_id_to_link))
+                                AND predefined_epic_id IS DISTINCT FROM %s
+                            """, (saved_template_id, user_code, current_time, task_id_to_link, saved_template_id))
+                            if cursor.rowcount:
                                 logger.info(f"[INFO] Linked task {task_id_to_link} to epic template {saved_template_id}")
                             else:
                                 logger.info(f"[INFO] Task {task_id_to_link} already linked to epic template {saved_template_id}, skipping")
@@ -396,7 +394,7 @@ async def save_template(
                     )
             
             # Fetch saved epic template
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT 
                     pe.id, pe.title, pe.description,
                     pe.contact_person_code, cpm.full_name AS contact_person_name,
@@ -412,7 +410,7 @@ async def save_template(
                 WHERE pe.id = %s
             """, (saved_template_id,))
             
-            template_data = cursor.fetchone()
+            template_data = await cursor.fetchone()
             
             if not template_data:
                 raise HTTPException(
@@ -518,8 +516,8 @@ async def save_template(
                 )
             
             # Validate priority_code
-            cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (task_priority_code,))
-            if not cursor.fetchone():
+            reference_data = await get_reference_data()
+            if task_priority_code not in reference_data.priorities:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Priority code {task_priority_code} does not exist"
@@ -529,8 +527,8 @@ async def save_template(
             task_team_code = None
             if team_code and team_code.strip():
                 task_team_code = team_code.strip()
-                cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
-                if not cursor.fetchone():
+                await cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
+                if not await cursor.fetchone():
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
                         detail=f"Team code {task_team_code} does not exist or is inactive"
@@ -540,8 +538,8 @@ async def save_template(
             task_type_code_val = None
             if task_type_code and task_type_code.strip():
                 task_type_code_str = str(task_type_code).strip().upper()
-                cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-                if not cursor.fetchone():
+                reference_data = await get_reference_data()
+                if task_type_code_str not in reference_data.task_types:
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
                         detail=f"Task type code {task_type_code_str} does not exist or is not active"
@@ -560,8 +558,8 @@ async def save_template(
                 # Update existing task template
                 logger.info(f"[INFO] Updating existing task template with ID: {template_id}")
                 
-                cursor.execute("SELECT id FROM sts_ts.predefined_tasks WHERE id = %s", (template_id,))
-                if not cursor.fetchone():
+                await cursor.execute("SELECT id FROM sts_ts.predefined_tasks WHERE id = %s", (template_id,))
+                if not await cursor.fetchone():
                     raise HTTPException(
                         status_code=HTTPStatus.NOT_FOUND,
                         detail=f"Task template with ID {template_id} does not exist"
@@ -586,7 +584,7 @@ async def save_template(
                     RETURNING id
                 """
                 
-                cursor.execute(update_query, (
+                await cursor.execute(update_query, (
                     task_title.strip(),
                     task_description.strip() if task_description else None,
                     status_code_str,
@@ -602,7 +600,7 @@ async def save_template(
                     template_id
                 ))
                 
-                result = cursor.fetchone()
+                result = await cursor.fetchone()
                 if not result:
                     raise HTTPException(
                         status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -628,7 +626,7 @@ async def save_template(
                     ) RETURNING id
                 """
                 
-                cursor.execute(insert_query, (
+                await cursor.execute(insert_query, (
                     task_title.strip(),
                     task_description.strip() if task_description else None,
                     status_code_str,
@@ -643,7 +641,7 @@ async def save_template(
                     current_time
                 ))
                 
-                result = cursor.fetchone()
+                result = await cursor.fetchone()
                 if not result:
                     raise HTTPException(
                         status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -654,7 +652,7 @@ async def save_template(
                 logger.info(f"[INFO] Task template created successfully with ID: {saved_template_id}")
             
             # Fetch saved task template
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT 
                     pt.id, pt.task_title, pt.task_description,
                     pt.status_code, sm.status_desc AS status_description,
@@ -672,7 +670,7 @@ async def save_template(
                 WHERE pt.id = %s
             """, (saved_template_id,))
             
-            template_data = cursor.fetchone()
+            template_data = await cursor.fetchone()
             
             if not template_data:
                 raise HTTPException(
@@ -704,7 +702,9 @@ async def save_template(
             }
 
         # Step 6: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "predefined_epics", "predefined_tasks")
+        await conn.commit()
+        invalidate_master_data("predefined_epics", "predefined_tasks")
         logger.info(f"[INFO] Template saved successfully with ID: {saved_template_id}")
 
         logger.info(f"[INFO] Template save/update completed successfully")
@@ -719,11 +719,11 @@ async def save_template(
 
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except psycopg2.IntegrityError as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Database integrity error: {error_msg}")
         raise HTTPException(
@@ -732,7 +732,7 @@ async def save_template(
         )
     except Exception as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Unexpected error: {error_msg}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
@@ -743,12 +743,9 @@ async def save_template(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for template save/update")
 
 
-def _create_predefined_task(cursor, task_data, user_code, current_time):
+async def _create_predefined_task(cursor, task_data, user_code, current_time):
     """
     Helper function to create a predefined task from task data dictionary.
     Checks if a task with the same title already exists (case-insensitive).
@@ -799,8 +796,8 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
     
     # Validate priority_code
     task_priority_code = int(task_data['priority_code'])
-    cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (task_priority_code,))
-    if not cursor.fetchone():
+    reference_data = await get_reference_data()
+    if task_priority_code not in reference_data.priorities:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Priority code {task_priority_code} does not exist"
@@ -810,8 +807,8 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
     task_team_code = None
     if 'team_code' in task_data and task_data['team_code']:
         task_team_code = str(task_data['team_code']).strip()
-        cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Team code {task_team_code} does not exist or is inactive"
@@ -821,8 +818,8 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
     task_type_code = None
     if 'task_type_code' in task_data and task_data['task_type_code']:
         task_type_code_str = str(task_data['task_type_code']).strip().upper()
-        cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-        if not cursor.fetchone():
+        reference_data = await get_reference_data()
+        if task_type_code_str not in reference_data.task_types:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Task type code {task_type_code_str} does not exist or is not active"
@@ -853,14 +850,14 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
     
     # Check if a task with the same title already exists (case-insensitive)
     task_title_trimmed = str(task_data['task_title']).strip()
-    cursor.execute("""
+    await cursor.execute("""
         SELECT id, task_title 
         FROM sts_ts.predefined_tasks 
         WHERE LOWER(TRIM(task_title)) = LOWER(TRIM(%s))
         LIMIT 1
     """, (task_title_trimmed,))
     
-    existing_task = cursor.fetchone()
+    existing_task = await cursor.fetchone()
     
     if existing_task:
         # Task with same title already exists, return existing task ID
@@ -879,7 +876,7 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
         ) RETURNING id, task_title
     """
     
-    cursor.execute(task_insert_query, (
+    await cursor.execute(task_insert_query, (
         task_title_trimmed,
         task_data.get('task_description', '').strip() if task_data.get('task_description') else None,
         status_code_str,
@@ -894,6 +891,6 @@ def _create_predefined_task(cursor, task_data, user_code, current_time):
         current_time
     ))
     
-    new_task = cursor.fetchone()
+    new_task = await cursor.fetchone()
     return (new_task[0], new_task[1], True)  # True = new task created
 
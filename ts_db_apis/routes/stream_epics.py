@@ -0,0 +1,185 @@
+# routes/stream_epics.py
+
+import sys
+sys.path.append('E:\projects\sts_prod_developement')
+
+import asyncio
+import json
+import uuid
+from typing import Any, AsyncIterator, Dict
+import psycopg2
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from auth.jwt_handler import verify_token
+from async_db import run_db
+from db_pool import get_connection, release_connection
+from routes.get_master_data import map_epic_row, map_epic_task_row
+from config import load_config
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+router = APIRouter()
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+# Epic columns 0-22 match map_epic_row, task columns 23-47 match map_epic_task_row.
+# Rows come ordered by epic so each epic's tasks follow it directly.
+EPICS_WITH_TASKS_QUERY = """
+    SELECT
+        em.id,
+        em.epic_title,
+        em.epic_description,
+        em.product_code,
+        pm.product_name,
+        em.company_code,
+        cm.company_name,
+        em.contact_person_code,
+        cpm.full_name AS contact_person_name,
+        cpm.email_id AS contact_person_email,
+        cpm.contact_num AS contact_person_phone,
+        em.reporter,
+        em.status_code,
+        sm.status_desc,
+        em.priority_code,
+        em.start_date,
+        em.due_date,
+        em.closed_on,
+        em.estimated_hours,
+        em.max_hours,
+        em.is_billable,
+        em.created_by,
+        em.created_at,
+        t.id,
+        t.epic_code,
+        t.task_title,
+        t.description,
+        t.assignee,
+        t.reporter,
+        t.status_code,
+        tsm.status_desc,
+        t.priority_code,
+        t.task_type_code,
+        t.work_mode,
+        t.assigned_team_code,
+        t.product_code,
+        t.assigned_on,
+        t.start_date,
+        t.due_date,
+        t.closed_on,
+        t.estimated_hours,
+        t.max_hours,
+        t.is_billable,
+        t.cancelled_by,
+        t.cancelled_at,
+        t.cancellation_reason,
+        t.created_by,
+        t.created_at
+    FROM sts_ts.epics em
+    LEFT JOIN sts_new.product_master pm ON em.product_code = pm.product_code
+    LEFT JOIN sts_new.company_master cm ON em.company_code = cm.company_code
+    LEFT JOIN sts_new.contact_master cpm ON em.contact_person_code = cpm.contact_person_code
+    LEFT JOIN sts_new.status_master sm ON em.status_code = sm.status_code
+    LEFT JOIN sts_ts.tasks t ON t.epic_code = em.id
+    LEFT JOIN sts_new.status_master tsm ON t.status_code = tsm.status_code
+    ORDER BY em.id DESC, t.id DESC;
+"""
+
+EPIC_COLUMN_COUNT = 23
+
+
+def ndjson_line(record_type: str, data: Dict[str, Any]) -> bytes:
+    return (json.dumps({"type": record_type, "data": data}, default=str, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+def open_epics_cursor(conn):
+    """Declare a server-side cursor for the epics/tasks query (named cursors need a transaction)"""
+    conn.autocommit = False
+    cursor = conn.cursor(name=f"stream_epics_{uuid.uuid4().hex}")
+    cursor.execute(EPICS_WITH_TASKS_QUERY)
+    return cursor
+
+
+def close_epics_cursor(conn, cursor, autocommit: bool) -> None:
+    """Close the server-side cursor, end its transaction and give the connection back to the pool"""
+    try:
+        if cursor is not None:
+            cursor.close()
+        conn.rollback()
+        conn.autocommit = autocommit
+    except Exception as e:
+        logger.warning(f"[WARNING] Failed to close epics stream cursor: {str(e)}")
+    release_connection(conn)
+
+
+async def stream_epics_with_tasks(batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Yield one NDJSON line per epic followed by one line per task of that epic, then an
+    "end" line with the totals. Rows are pulled batch_size at a time from a server-side
+    cursor, so memory stays bounded by the batch size however many epics exist.
+    """
+    # The connection is checked out inside the stream (not by a dependency) so it stays
+    # held until the last line is sent and is released even if the client disconnects
+    try:
+        conn = await asyncio.to_thread(get_connection)
+    except psycopg2.OperationalError as e:
+        logger.error(f"[ERROR] Could not check out a database connection for epics stream: {str(e)}")
+        yield ndjson_line("error", {"message": "Database connection failed", "error": str(e)})
+        return
+
+    autocommit = conn.autocommit
+    cursor = None
+    epic_count = 0
+    task_count = 0
+    try:
+        cursor = await run_db(open_epics_cursor, conn)
+        current_epic_id = None
+        while True:
+            rows = await run_db(cursor.fetchmany, batch_size)
+            if not rows:
+                break
+            chunk = []
+            for row in rows:
+                if row[0] != current_epic_id:
+                    current_epic_id = row[0]
+                    epic_count += 1
+                    chunk.append(ndjson_line("epic", map_epic_row(row)))
+                if row[EPIC_COLUMN_COUNT] is not None:
+                    task_count += 1
+                    task = map_epic_task_row(row[EPIC_COLUMN_COUNT:])
+                    task["epic_code"] = current_epic_id
+                    chunk.append(ndjson_line("task", task))
+            yield b"".join(chunk)
+        logger.info(f"[INFO] Epics stream completed, epics: {epic_count}, tasks: {task_count}")
+        yield ndjson_line("end", {"epics": epic_count, "tasks": task_count})
+    except psycopg2.Error as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"[ERROR] Database error while streaming epics, error: {str(e)}")
+        yield ndjson_line("error", {"message": "Database error while streaming epics", "error": str(e)})
+    finally:
+        # Also runs when the client disconnects mid-stream
+        close_epics_cursor(conn, cursor, autocommit)
+        logger.info(f"[INFO] Epics stream database connection released")
+
+
+@router.get("/api/v1/timesheet/GetMasterData/epics/stream")
+async def stream_epic_masters(
+    batch_size: int = Query(500, ge=1, le=5000, description="Rows fetched from the server-side cursor per round trip"),
+    current_user: dict = Depends(verify_token),
+):
+    """
+    Stream all epics with their tasks as NDJSON (application/x-ndjson).
+    Each line is {"type": "epic"|"task"|"end"|"error", "data": {...}}; every epic line is
+    followed by the lines of its tasks (carrying epic_code), and the last line is "end" with
+    the epic and task totals. Same fields as the epics section of GetMasterData.
+    """
+    logger.info(f"[INFO] Starting epics stream, batch_size: {batch_size}, user: {current_user['user_code']}")
+
+    return StreamingResponse(
+        stream_epics_with_tasks(batch_size),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
@@ -8,11 +8,18 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, format_file_size, parse_date
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget
+from blob_store import store_upload_blob
+from file_delivery import attachment_download_url
+from batch_loader import BatchLoader, unique_keys
+from hours_rollup import HoursChange, apply_hours_changes, daily_cap_error
+from reference_validation import resolve_references
+from reference_registry import check_task_type_code, get_reference_data
+from pydantic import BaseModel
 from config import load_config
 from utils.logger import get_logger
 import os
-import uuid
 from typing import List, Optional
 from enum import Enum
 import traceback
@@ -21,16 +28,8 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 upload_dir = config.get('upload_dir', 'uploads')
-base_url = config.get('base_url')
 allowed_admin_designations = config.get('admin_designations', [])
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -47,21 +46,6 @@ class ApprovalAction(str, Enum):
     APPROVE = "APPROVE"
     REJECT = "REJECT"
 
-# Task Type Code Enum - Valid values from task_type_master
-class TaskTypeCode(str, Enum):
-    ACCOUNTS = "TT001"              # Accounts
-    DEVELOPMENT = "TT002"           # Development
-    QUALITY_ASSURANCE = "TT003"     # Quality Assurance
-    USER_ACCEPTANCE_TESTING = "TT004"  # User Acceptance Testing
-    PROD_MOVE = "TT005"             # PROD Move
-    DOCUMENTATION = "TT006"         # Documentation
-    DESIGN = "TT007"                # Design
-    CODE_REVIEW = "TT008"           # Code Review
-    MEETING = "TT009"               # Meeting
-    TRAINING = "TT010"              # Training
-    IMPLEMENTATION = "TT011"        # Implementation
-    SUPPORT = "TT012"               # Support
-
 @router.post("/api/v1/timesheet/enter_timesheet/")
 async def enter_timesheet(
     entry_date: Optional[str] = Form(None, description="Entry date in DD-MM-YYYY or YYYY-MM-DD format"),
@@ -74,10 +58,11 @@ async def enter_timesheet(
     waiting_time: Optional[float] = Form(0, description="Waiting time in hours"),
     total_hours: Optional[float] = Form(None, description="Total hours (calculated: actual_hours_worked + travel_time + waiting_time). If not provided, will be calculated automatically."),
     work_location: Optional[WorkLocationCode] = Form(None, description="Work location code. Valid values: REMOTE, ON_SITE, OFFICE"),
-    task_type_code: Optional[TaskTypeCode] = Form(None, description="Task type code (TT001-TT012) - optional. If not provided and task_code is provided, will use task's task_type_code. For tickets, defaults to TT012 (Support) if not provided."),
+    task_type_code: Optional[str] = Form(None, description="Task type code (active code from task_type_master, e.g. TT002) - optional. If not provided and task_code is provided, will use task's task_type_code. For tickets, defaults to TT012 (Support) if not provided."),
     description: Optional[str] = Form(None, description="Description of work performed"),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the timesheet entry"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create a new timesheet entry as DRAFT (allows partial data)
@@ -90,15 +75,11 @@ async def enter_timesheet(
     """
     logger.info(f"[INFO] Starting timesheet entry creation for user_code: {current_user['user_code']}, task_code: {task_code}, activity_code: {activity_code}, ticket_code: {ticket_code}")
     
-    conn = None
     cursor = None
 
     try:
-        # Step 1: Establish database connection
-        logger.info(f"[INFO] Establishing database connection for timesheet entry creation")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+        # Step 1: Open a cursor on the pooled request connection
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 2: Validate and process optional fields (only if provided)
         # For DRAFT entries, all fields are optional - user can save partial data
@@ -138,12 +119,21 @@ async def enter_timesheet(
                 detail="Cannot provide multiple parent codes. Please provide exactly one of: task_code, activity_code, or ticket_code (mutually exclusive)."
             )
         
+        # Step 2.2: Resolve every referenced code (task, epic, activity, ticket) in one query;
+        # task types and work locations are checked against the in-memory reference registry
+        references = await resolve_references(cursor, {
+            "task": ("task", task_code),
+            "epic": ("epic", epic_code),
+            "activity": ("activity", activity_code),
+            "ticket": ("ticket", ticket_code),
+        })
+        reference_data = await get_reference_data()
+
         # Validate task_code and epic_code if provided
         task_epic_code = None
         task_task_type_code = None
+        task_result = references["task"]
         if task_code:
-            cursor.execute("SELECT id, epic_code, task_type_code FROM sts_ts.tasks WHERE id = %s", (task_code,))
-            task_result = cursor.fetchone()
             if not task_result:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -164,8 +154,9 @@ async def enter_timesheet(
         
         # Validate epic_code exists if provided (only for task entries)
         if epic_code:
-            cursor.execute("SELECT id FROM sts_ts.epics WHERE id = %s", (epic_code,))
-            if not cursor.fetchone():
+            # A provided epic_code was looked up directly; one taken from the task comes with the task lookup
+            epic_exists = references["epic"] is not None or (task_result is not None and epic_code == task_epic_code and task_result[3])
+            if not epic_exists:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Epic with ID {epic_code} does not exist"
@@ -173,9 +164,7 @@ async def enter_timesheet(
         
         # Validate activity_code if provided
         if activity_code:
-            cursor.execute("SELECT id, product_code FROM sts_ts.activities WHERE id = %s", (activity_code,))
-            activity_result = cursor.fetchone()
-            if not activity_result:
+            if not references["activity"]:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Activity with ID {activity_code} does not exist"
@@ -204,9 +193,7 @@ async def enter_timesheet(
         
         # Validate ticket_code if provided
         if ticket_code:
-            cursor.execute("SELECT ticket_code FROM sts_new.ticket_master WHERE ticket_code = %s", (ticket_code,))
-            ticket_result = cursor.fetchone()
-            if not ticket_result:
+            if not references["ticket"]:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Ticket with ID {ticket_code} does not exist"
@@ -238,7 +225,7 @@ async def enter_timesheet(
         if work_location:
             work_location_str = work_location.value if isinstance(work_location, WorkLocationCode) else str(work_location)
             # Validate against CHECK constraint values
-            valid_work_locations = ['REMOTE', 'ON_SITE', 'OFFICE']
+            valid_work_locations = list(reference_data.work_locations)
             if work_location_str not in valid_work_locations:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -257,55 +244,27 @@ async def enter_timesheet(
         elif ticket_code:
             # For tickets, default to Support (TT012) if task_type_code not provided
             if task_type_code is not None:
-                # Convert enum to string value
-                if isinstance(task_type_code, TaskTypeCode):
-                    task_type_code_str = task_type_code.value
-                else:
-                    task_type_code_str = str(task_type_code).upper()
-                # Validate task_type_code is one of the allowed enum values
+                # Validate task_type_code is an active task type
                 try:
-                    task_type_code_enum = TaskTypeCode(task_type_code_str)
-                    task_type_code_str = task_type_code_enum.value
-                except ValueError:
-                    raise HTTPException(
-                        status_code=HTTPStatus.BAD_REQUEST,
-                        detail=f"Task type code '{task_type_code_str}' is not allowed. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
-                    )
-                
-                cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-                if not cursor.fetchone():
+                    final_task_type_code = check_task_type_code(reference_data, task_type_code)
+                except ValueError as e:
                     raise HTTPException(
                         status_code=HTTPStatus.BAD_REQUEST,
-                        detail=f"Task type code {task_type_code_str} does not exist or is not active"
+                        detail=str(e)
                     )
-                final_task_type_code = task_type_code_str
             else:
                 # Default to Support (TT012) for tickets
                 final_task_type_code = 'TT012'
                 logger.info(f"[INFO] Using default task_type_code TT012 (Support) for ticket {ticket_code}")
         elif task_type_code is not None:
-            # Convert enum to string value
-            if isinstance(task_type_code, TaskTypeCode):
-                task_type_code_str = task_type_code.value
-            else:
-                task_type_code_str = str(task_type_code).upper()
-            # Validate task_type_code is one of the allowed enum values
+            # Validate task_type_code is an active task type
             try:
-                task_type_code_enum = TaskTypeCode(task_type_code_str)
-                task_type_code_str = task_type_code_enum.value
-            except ValueError:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code '{task_type_code_str}' is not allowed. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
-                )
-            
-            cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-            if not cursor.fetchone():
+                final_task_type_code = check_task_type_code(reference_data, task_type_code)
+            except ValueError as e:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code {task_type_code_str} does not exist or is not active"
+                    detail=str(e)
                 )
-            final_task_type_code = task_type_code_str
         elif task_code and task_task_type_code:
             # Use task's task_type_code if not provided
             final_task_type_code = task_task_type_code
@@ -350,13 +309,13 @@ async def enter_timesheet(
             ) RETURNING id
         """
         
-        cursor.execute(insert_query, (
+        await cursor.execute(insert_query, (
             entry_date_obj, current_user['user_code'], task_code, epic_code, activity_code, ticket_code,
             actual_hours_worked_val, travel_time_val, waiting_time_val, total_hours,
             work_location_str, final_task_type_code, description, created_by, current_time
         ))
         
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         entry_id = result[0]
         
         # Step 7.1: Insert initial approval history entry into sts_ts.timesheet_approval_hist table
@@ -375,7 +334,7 @@ async def enter_timesheet(
             ) RETURNING id
         """
         
-        cursor.execute(hist_insert_query, (
+        await cursor.execute(hist_insert_query, (
             entry_id,  # entry_id
             'DRAFT',  # approval_status
             None,  # status_reason (no reason for initial DRAFT status)
@@ -399,11 +358,23 @@ async def enter_timesheet(
             current_time  # created_at
         ))
         
-        hist_result = cursor.fetchone()
+        hist_result = await cursor.fetchone()
         if not hist_result:
             raise Exception("Failed to insert timesheet approval history entry - no ID returned")
         hist_id = hist_result[0]
         logger.info(f"[INFO] Successfully created initial approval history entry with id: {hist_id}")
+
+        # Step 7.2: Add the entry's hours to the user's daily/weekly rollup and enforce the daily cap
+        daily_hours = await apply_hours_changes(cursor, [
+            HoursChange(current_user['user_code'], entry_date_obj, total_hours, None, 'DRAFT')
+        ])
+        cap_error = daily_cap_error(daily_hours)
+        if cap_error:
+            await conn.rollback()
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=cap_error
+            )
         
         # Step 8: Handle file attachments if provided
         attachment_data = []
@@ -418,27 +389,14 @@ async def enter_timesheet(
                 os.chmod(upload_dir, 0o755)
                 logger.info(f"[INFO] Upload directory created successfully with permissions")
 
-            # Ensure base_url ends with a trailing slash for correct URL join
-            normalized_base_url = base_url if base_url.endswith('/') else (base_url + '/')
 
+            upload_budget = UploadBudget()
             for attachment in attachments:
                 if attachment.filename:  # Check if file was actually uploaded
                     try:
-                        # Generate unique filename
-                        file_extension = os.path.splitext(attachment.filename)[1]
-                        unique_filename = f"{uuid.uuid4()}{file_extension}"
-                        file_path = os.path.join(upload_dir, unique_filename).replace('\\', '/')
-    
-                        # Create the URL for client access
-                        file_url = normalized_base_url + unique_filename
-                        logger.info(f"[INFO] Generated unique filename: {unique_filename} for file: {attachment.filename}")
-                                
-                        # Save file to disk
+                        # Store file by content (identical files are stored once; size limits are enforced while reading)
                         try:
-                            with open(file_path, "wb") as buffer:
-                                content = await attachment.read()
-                                buffer.write(content)
-                            logger.info(f"[INFO] File saved to disk: {file_path}, size: {len(content)} bytes")
+                            stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
                         except Exception as e:
                             logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
                             raise HTTPException(
@@ -446,12 +404,10 @@ async def enter_timesheet(
                                 detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
                             )
                         
-                        file_size = len(content)
+                        file_size = stored_blob.size
+                        file_path, file_url = stored_blob.file_path, stored_blob.file_url
                         logger.info(f"[INFO] File saved to disk: {file_path}, size: {file_size} bytes")
                         
-                        # Set proper file permissions for web server access
-                        os.chmod(file_path, 0o644)
-                                
                         # Extract file information to insert into database
                         file_name = attachment.filename
                         file_type = os.path.splitext(attachment.filename)[1].lower().lstrip('.')
@@ -461,23 +417,24 @@ async def enter_timesheet(
                         # Insert attachment record into database (using entry_id instead of entry_code)
                         attachment_query = """
                             INSERT INTO sts_ts.attachments (
-                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, created_by, created_at
+                                parent_type, parent_code, file_path, file_url, file_name, file_type, file_size, purpose, blob_sha256, created_by, created_at
                             ) VALUES (
-                                'TIMESHEET_ENTRY', %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                'TIMESHEET_ENTRY', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             ) RETURNING id
                         """
                         
-                        cursor.execute(attachment_query, (
+                        await cursor.execute(attachment_query, (
                             entry_id, file_path, file_url, file_name, file_type, file_size_display, "TIMESHEET ATTACHMENT", 
-                            current_user['user_code'], current_time
+                            stored_blob.sha256, current_user['user_code'], current_time
                         ))
                         
-                        attachment_id = cursor.fetchone()[0]
+                        attachment_id = (await cursor.fetchone())[0]
                         attachment_data.append({
                             "id": attachment_id,
                             "original_filename": attachment.filename,
                             "file_path": file_path,
-                            "file_url": file_url,
+                            # Only the owner and their approvers may fetch it, so link the checked download
+                            "file_url": attachment_download_url(attachment_id),
                             "purpose": "TIMESHEET ATTACHMENT",
                             "file_size_bytes": file_size_bytes,
                             "file_size_display": file_size_display
@@ -491,7 +448,7 @@ async def enter_timesheet(
                         continue
 
         # Step 9: Commit transaction
-        conn.commit()
+        await conn.commit()
         logger.info(f"[INFO] Successfully created timesheet entry with ID: {entry_id}")
         
         return {
@@ -522,7 +479,7 @@ async def enter_timesheet(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Data integrity violation: {str(e)}"
@@ -536,7 +493,7 @@ async def enter_timesheet(
     except psycopg2.ProgrammingError as e:
         logger.error(f"[ERROR] Database query error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed: {str(e)}"
@@ -548,7 +505,7 @@ async def enter_timesheet(
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -556,9 +513,346 @@ async def enter_timesheet(
     finally:
         if cursor:
             cursor.close()
+        logger.info(f"[INFO] Database cursor closed for timesheet entry creation")
+
+# Maximum entries accepted by one enter_timesheet_batch call (a week of grid rows)
+MAX_BATCH_ENTRIES = 200
+
+class TimesheetBatchEntry(BaseModel):
+    # Same fields and rules as enter_timesheet; codes are plain strings so a bad value
+    # is reported against its row instead of rejecting the whole request
+    entry_date: Optional[str] = None
+    epic_code: Optional[int] = None
+    task_code: Optional[int] = None
+    activity_code: Optional[int] = None
+    ticket_code: Optional[int] = None
+    actual_hours_worked: Optional[float] = None
+    travel_time: Optional[float] = 0
+    waiting_time: Optional[float] = 0
+    total_hours: Optional[float] = None
+    work_location: Optional[str] = None
+    task_type_code: Optional[str] = None
+    description: Optional[str] = None
+
+class TimesheetBatchSchema(BaseModel):
+    entries: List[TimesheetBatchEntry]
+    partial: bool = False  # save the valid rows even if some rows fail validation
+
+# Set-based lookups for the codes referenced by a batch
+BATCH_TASK_LOADER = BatchLoader("SELECT id, epic_code, task_type_code FROM sts_ts.tasks WHERE id = ANY(%(keys)s)", many=False)
+BATCH_EPIC_LOADER = BatchLoader("SELECT id FROM sts_ts.epics WHERE id = ANY(%(keys)s)", many=False)
+BATCH_ACTIVITY_LOADER = BatchLoader("SELECT id FROM sts_ts.activities WHERE id = ANY(%(keys)s)", many=False)
+BATCH_TICKET_LOADER = BatchLoader("SELECT ticket_code FROM sts_new.ticket_master WHERE ticket_code = ANY(%(keys)s)", many=False)
+
+def _resolve_batch_entry(entry: TimesheetBatchEntry, lookups: dict, today) -> dict:
+    """
+    Apply enter_timesheet's rules to one batch row using prefetched lookups
+    (and the reference registry snapshot under lookups["reference_data"]).
+    Returns the values to insert, or raises ValueError with the row's error.
+    """
+    from datetime import timedelta
+
+    epic_code = entry.epic_code
+    task_code = entry.task_code
+    activity_code = entry.activity_code
+    ticket_code = entry.ticket_code
+
+    entry_date_obj = None
+    if entry.entry_date:
+        try:
+            entry_date_obj = parse_date(entry.entry_date)
+        except ValueError as e:
+            raise ValueError(f"Invalid date format: {str(e)}. Please use DD-MM-YYYY or YYYY-MM-DD format")
+        if entry_date_obj > today:
+            raise ValueError("Timesheet entry cannot be created for future dates")
+        if entry_date_obj < today - timedelta(days=7):
+            raise ValueError("Timesheet entry can only be created for dates within the past 1 week (7 days)")
+
+    if len([code for code in [task_code, activity_code, ticket_code] if code is not None]) > 1:
+        raise ValueError("Cannot provide multiple parent codes. Please provide exactly one of: task_code, activity_code, or ticket_code (mutually exclusive).")
+
+    task_task_type_code = None
+    if task_code:
+        task_result = lookups["tasks"].get(task_code)
+        if not task_result:
+            raise ValueError(f"Task with ID {task_code} does not exist")
+        task_epic_code = task_result[1]
+        task_task_type_code = task_result[2]
+        if epic_code and epic_code != task_epic_code:
+            raise ValueError(f"Epic code {epic_code} does not match the task's epic code {task_epic_code}")
+        if not epic_code:
+            epic_code = task_epic_code
+
+    if epic_code and epic_code not in lookups["epics"]:
+        raise ValueError(f"Epic with ID {epic_code} does not exist")
+
+    if activity_code:
+        if activity_code not in lookups["activities"]:
+            raise ValueError(f"Activity with ID {activity_code} does not exist")
+        if epic_code:
+            raise ValueError("epic_code cannot be provided when activity_code is provided. Activities do not belong to epics.")
+
+    if ticket_code:
+        if ticket_code not in lookups["tickets"]:
+            raise ValueError(f"Ticket with ID {ticket_code} does not exist")
+        if epic_code:
+            raise ValueError("epic_code cannot be provided when ticket_code is provided. Tickets do not belong to epics.")
+
+    work_location_str = None
+    if entry.work_location:
+        work_location_str = str(entry.work_location).upper()
+        valid_work_locations = list(lookups["reference_data"].work_locations)
+        if work_location_str not in valid_work_locations:
+            raise ValueError(f"Work location code '{work_location_str}' is invalid. Must be one of: {', '.join(valid_work_locations)}")
+
+    final_task_type_code = None
+    if activity_code:
+        final_task_type_code = None
+    elif entry.task_type_code is not None:
+        final_task_type_code = check_task_type_code(lookups["reference_data"], entry.task_type_code)
+    elif ticket_code:
+        final_task_type_code = 'TT012'
+    elif task_code and task_task_type_code:
+        final_task_type_code = task_task_type_code
+
+    actual_hours_worked_val = entry.actual_hours_worked if entry.actual_hours_worked is not None else 0
+    travel_time_val = entry.travel_time if entry.travel_time is not None else 0
+    waiting_time_val = entry.waiting_time if entry.waiting_time is not None else 0
+    calculated_total = actual_hours_worked_val + travel_time_val + waiting_time_val
+    total_hours = entry.total_hours
+    if total_hours is None:
+        total_hours = calculated_total
+    elif (actual_hours_worked_val > 0 or travel_time_val > 0 or waiting_time_val > 0) and abs(total_hours - calculated_total) > 0.01:
+        raise ValueError(f"Total hours ({total_hours}) does not match calculated value ({calculated_total}). Total hours should be actual_hours_worked + travel_time + waiting_time")
+    if total_hours and total_hours > 24:
+        raise ValueError("Total time cannot exceed 24 hours")
+
+    return {
+        "entry_date": entry_date_obj,
+        "task_code": task_code,
+        "epic_code": epic_code,
+        "activity_code": activity_code,
+        "ticket_code": ticket_code,
+        "actual_hours_worked": actual_hours_worked_val,
+        "travel_time": travel_time_val,
+        "waiting_time": waiting_time_val,
+        "total_hours": total_hours,
+        "work_location": work_location_str,
+        "task_type_code": final_task_type_code,
+        "description": entry.description,
+    }
+
+async def _load_batch_lookups(cursor, entries: List[TimesheetBatchEntry]) -> dict:
+    """Fetch every task, epic, activity and ticket referenced by the batch, one query per kind"""
+    tasks = await BATCH_TASK_LOADER.load_async(cursor, [entry.task_code for entry in entries if entry.task_code])
+    epic_codes = [entry.epic_code for entry in entries if entry.epic_code] + [task[1] for task in tasks.values()]
+    return {
+        "tasks": tasks,
+        "epics": await BATCH_EPIC_LOADER.load_async(cursor, epic_codes),
+        "activities": await BATCH_ACTIVITY_LOADER.load_async(cursor, [entry.activity_code for entry in entries if entry.activity_code]),
+        "tickets": await BATCH_TICKET_LOADER.load_async(cursor, [entry.ticket_code for entry in entries if entry.ticket_code]),
+        "reference_data": await get_reference_data(),
+    }
+
+@router.post("/api/v1/timesheet/enter_timesheet_batch/")
+async def enter_timesheet_batch(
+    RequestBody: TimesheetBatchSchema,
+    current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
+):
+    """
+    Create several DRAFT timesheet entries (e.g. a week of grid rows) in one call.
+    Each entry follows the same rules as enter_timesheet (no attachments). All referenced
+    codes are validated with one query per kind, and the entries and their DRAFT history
+    rows are written with multi-row inserts in one transaction.
+    Errors are reported per row with the entry's index. By default nothing is saved if any
+    row is invalid; with partial=true the valid rows are saved and the invalid ones reported.
+    """
+    entries = RequestBody.entries
+    logger.info(f"[INFO] Starting batch timesheet entry creation for user_code: {current_user['user_code']}, entries: {len(entries)}, partial: {RequestBody.partial}")
+
+    if not entries:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="entries cannot be empty"
+        )
+    if len(entries) > MAX_BATCH_ENTRIES:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"A batch can contain at most {MAX_BATCH_ENTRIES} entries, got {len(entries)}"
+        )
+
+    cursor = None
+
+    try:
+        # Step 1: Open a cursor on the pooled request connection
+        cursor = conn.cursor()
+
+        # Step 2: Validate every row against prefetched lookups
+        from datetime import date
+        lookups = await _load_batch_lookups(cursor, entries)
+        today = date.today()
+        valid_rows = []
+        errors = []
+        for index, entry in enumerate(entries):
+            try:
+                valid_rows.append((index, _resolve_batch_entry(entry, lookups, today)))
+            except ValueError as e:
+                errors.append({"index": index, "detail": str(e)})
+
+        if errors:
+            logger.info(f"[INFO] Batch timesheet validation failed for {len(errors)} of {len(entries)} entries")
+        if errors and (not RequestBody.partial or not valid_rows):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail={
+                    "message": f"{len(errors)} of {len(entries)} timesheet entries are invalid - nothing was saved",
+                    "errors": errors
+                }
+            )
+
+        # Step 3: Insert all entries with one multi-row INSERT (RETURNING preserves VALUES order)
+        current_time = get_current_time_ist()
+        user_code = current_user['user_code']
+        insert_query = """
+            INSERT INTO sts_ts.timesheet_entry (
+                entry_date, user_code, task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, travel_time, waiting_time, total_hours,
+                work_location, task_type_code, description, approval_status, created_by, created_at
+            ) VALUES %s
+            RETURNING id
+        """
+        insert_rows = [
+            (
+                row["entry_date"], user_code, row["task_code"], row["epic_code"], row["activity_code"], row["ticket_code"],
+                row["actual_hours_worked"], row["travel_time"], row["waiting_time"], row["total_hours"],
+                row["work_location"], row["task_type_code"], row["description"], 'DRAFT', user_code, current_time
+            )
+            for _, row in valid_rows
+        ]
+        inserted = await cursor.execute_values(insert_query, insert_rows, page_size=len(insert_rows), fetch=True)
+        entry_ids = [result[0] for result in inserted]
+        if len(entry_ids) != len(valid_rows):
+            raise Exception(f"Expected {len(valid_rows)} inserted timesheet entries, got {len(entry_ids)}")
+
+        # Step 4: Insert the initial DRAFT history rows straight from the new entries
+        logger.info(f"[INFO] Creating initial approval history entries for {len(entry_ids)} timesheet entries")
+        await cursor.execute("""
+            INSERT INTO sts_ts.timesheet_approval_hist (
+                entry_id, approval_status, status_reason,
+                entry_user_code, entry_date,
+                task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, travel_time, waiting_time, total_hours,
+                submitted_by, submitted_at,
+                approved_by, approved_at, rejected_by, rejected_at,
+                created_by, created_at
+            )
+            SELECT
+                te.id, 'DRAFT', NULL,
+                te.user_code, te.entry_date,
+                te.task_code, te.epic_code, te.activity_code, te.ticket_code,
+                te.actual_hours_worked, te.travel_time, te.waiting_time, te.total_hours,
+                NULL, NULL,
+                NULL, NULL, NULL, NULL,
+                %s, %s
+            FROM sts_ts.timesheet_entry te
+            WHERE te.id = ANY(%s)
+        """, (user_code, current_time, entry_ids))
+        if cursor.rowcount != len(entry_ids):
+            raise Exception(f"Expected {len(entry_ids)} timesheet approval history entries, inserted {cursor.rowcount}")
+
+        # Step 5: Add the hours to the user's daily/weekly rollup; the daily cap covers the whole batch
+        daily_hours = await apply_hours_changes(cursor, [
+            HoursChange(user_code, row["entry_date"], row["total_hours"], None, 'DRAFT')
+            for _, row in valid_rows
+        ])
+        cap_error = daily_cap_error(daily_hours)
+        if cap_error:
+            await conn.rollback()
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail={
+                    "message": f"{cap_error} - nothing was saved",
+                    "errors": errors
+                }
+            )
+
+        # Step 6: Commit transaction
+        await conn.commit()
+        logger.info(f"[INFO] Successfully created {len(entry_ids)} timesheet entries in batch, rejected: {len(errors)}")
+
+        created = []
+        for entry_id, (index, row) in zip(entry_ids, valid_rows):
+            created.append({
+                "index": index,
+                "id": entry_id,
+                "entry_date": str(row["entry_date"]) if row["entry_date"] else None,
+                "user_code": user_code,
+                "task_code": row["task_code"],
+                "epic_code": row["epic_code"],
+                "activity_code": row["activity_code"],
+                "ticket_code": row["ticket_code"],
+                "actual_hours_worked": row["actual_hours_worked"],
+                "travel_time": row["travel_time"],
+                "waiting_time": row["waiting_time"],
+                "total_hours": row["total_hours"],
+                "work_location": row["work_location"],
+                "task_type_code": row["task_type_code"],
+                "description": row["description"],
+                "approval_status": "DRAFT"
+            })
+
+        return {
+            "Status_Flag": True,
+            "Status_Description": f"{len(created)} timesheet entries created successfully" + (f", {len(errors)} rejected" if errors else ""),
+            "Status_Code": HTTPStatus.CREATED.value,
+            "Status_Message": HTTPStatus.CREATED.phrase,
+            "Response_Data": {
+                "created_count": len(created),
+                "error_count": len(errors),
+                "created": created,
+                "errors": errors
+            }
+        }
+
+    except psycopg2.IntegrityError as e:
+        logger.error(f"[ERROR] Database integrity error: {str(e)}")
+        if conn:
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Data integrity violation: {str(e)}"
+        )
+    except psycopg2.OperationalError as e:
+        logger.error(f"[ERROR] Database connection error: {str(e)}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Database connection failed"
+        )
+    except psycopg2.ProgrammingError as e:
+        logger.error(f"[ERROR] Database query error: {str(e)}")
+        if conn:
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database query failed: {str(e)}"
+        )
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error: {str(e)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for timesheet entry creation")
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+    finally:
+        if cursor:
+            cursor.close()
+        logger.info(f"[INFO] Database cursor closed for batch timesheet entry creation")
 
 @router.post("/api/v1/timesheet/approve_timesheet/")
 async def approve_timesheet(
@@ -566,13 +860,13 @@ async def approve_timesheet(
     action: ApprovalAction = Form(..., description="Action to perform: APPROVE or REJECT"),
     rejection_reason: Optional[str] = Form(None, description="Reason for rejection (required if action is REJECT)"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Approve or reject a timesheet entry (Admin only)
     """
     logger.info(f"[INFO] Starting timesheet approval/rejection for entry_id: {entry_id}, action: {action}, by user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
@@ -580,11 +874,10 @@ async def approve_timesheet(
         user_code = current_user['user_code']
         logger.info(f"[INFO] Validating approver permissions for user: {user_code}")
         
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
         
         # Check user designation and team information
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 um.designation_name,
                 um.team_code,
@@ -595,7 +888,7 @@ async def approve_timesheet(
             WHERE um.user_code = %s AND um.is_inactive = false
         """, (user_code,))
         
-        user_result = cursor.fetchone()
+        user_result = await cursor.fetchone()
         if not user_result:
             raise HTTPException(
                 status_code=HTTPStatus.FORBIDDEN,
@@ -644,7 +937,7 @@ async def approve_timesheet(
             rejection_reason = rejection_reason_trimmed
         
         # Step 3: Validate timesheet entry exists and get current data
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 id, user_code, entry_date, approval_status,
                 task_code, epic_code, activity_code, ticket_code,
@@ -653,7 +946,7 @@ async def approve_timesheet(
             WHERE id = %s
         """, (entry_id,))
         
-        entry_result = cursor.fetchone()
+        entry_result = await cursor.fetchone()
         if not entry_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -674,7 +967,7 @@ async def approve_timesheet(
         
         # Step 4: Check hierarchical approval permissions
         # Get timesheet owner's designation and team information
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 um.designation_name, 
                 um.team_code,
@@ -685,7 +978,7 @@ async def approve_timesheet(
             WHERE um.user_code = %s AND um.is_inactive = false
         """, (entry_user_code,))
         
-        owner_result = cursor.fetchone()
+        owner_result = await cursor.fetchone()
         if not owner_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -774,10 +1067,10 @@ async def approve_timesheet(
                     submitted_at = NULL,
                     updated_by = %s,
                     updated_at = %s
-                WHERE id = %s
+                WHERE id = %s AND approval_status = 'SUBMITTED'
                 RETURNING id
             """
-            cursor.execute(update_query, (
+            await cursor.execute(update_query, (
                 new_status, user_code, current_time, user_code, current_time, entry_id
             ))
         else:  # REJECT
@@ -794,20 +1087,25 @@ async def approve_timesheet(
                     submitted_at = NULL,
                     updated_by = %s,
                     updated_at = %s
-                WHERE id = %s
+                WHERE id = %s AND approval_status = 'SUBMITTED'
                 RETURNING id
             """
-            cursor.execute(update_query, (
+            await cursor.execute(update_query, (
                 new_status, user_code, current_time, rejection_reason, 
                 user_code, current_time, entry_id
             ))
         
-        updated_entry = cursor.fetchone()
+        updated_entry = await cursor.fetchone()
         if not updated_entry:
             raise HTTPException(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Failed to update timesheet entry"
             )
+
+        # Step 7.1: Move the entry's hours to the new status in the owner's rollup
+        await apply_hours_changes(cursor, [
+            HoursChange(entry_user_code, entry_date, total_hours, 'SUBMITTED', new_status)
+        ])
         
         # Step 8: Insert into approval history
         hist_insert_query = """
@@ -825,12 +1123,12 @@ async def approve_timesheet(
         """
         
         # Get submitted_by and submitted_at from current entry (since it was SUBMITTED)
-        cursor.execute("""
+        await cursor.execute("""
             SELECT submitted_by, submitted_at
             FROM sts_ts.timesheet_entry
             WHERE id = %s
         """, (entry_id,))
-        submitted_data = cursor.fetchone()
+        submitted_data = await cursor.fetchone()
         submitted_by_val = submitted_data[0] if submitted_data else None
         submitted_at_val = submitted_data[1] if submitted_data else None
         
@@ -847,7 +1145,7 @@ async def approve_timesheet(
         else:
             status_reason_val = None
         
-        cursor.execute(hist_insert_query, (
+        await cursor.execute(hist_insert_query, (
             entry_id, new_status, status_reason_val,
             entry_user_code, entry_date,
             entry_task_code, entry_epic_code, entry_activity_code, entry_ticket_code,  # Snapshot of parent references
@@ -857,20 +1155,20 @@ async def approve_timesheet(
             user_code, current_time
         ))
         
-        hist_id = cursor.fetchone()[0]
+        hist_id = (await cursor.fetchone())[0]
         
         # Step 9: Fetch approver/rejector name for response
-        cursor.execute("""
+        await cursor.execute("""
             SELECT user_name 
             FROM sts_new.user_master 
             WHERE user_code = %s
         """, (user_code,))
         
-        approver_result = cursor.fetchone()
+        approver_result = await cursor.fetchone()
         approver_name = approver_result[0] if approver_result else None
         
         # Step 10: Commit transaction
-        conn.commit()
+        await conn.commit()
         approver_role = "super approver" if owner_is_admin else ("team lead" if approver_is_team_lead else "admin")
         logger.info(f"[INFO] Successfully {action.value.lower()}d timesheet entry {entry_id} by {approver_role} {user_code}")
         
@@ -908,7 +1206,7 @@ async def approve_timesheet(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Data integrity violation: {str(e)}"
@@ -923,7 +1221,7 @@ async def approve_timesheet(
         logger.error(f"[ERROR] Database query error: {str(e)}")
         logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed: {str(e)}"
@@ -935,7 +1233,7 @@ async def approve_timesheet(
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -943,15 +1241,391 @@ async def approve_timesheet(
     finally:
         if cursor:
             cursor.close()
+        logger.info(f"[INFO] Database cursor closed for timesheet approval/rejection")
+
+
+class TimesheetBulkApprovalSchema(BaseModel):
+    entry_ids: List[int]
+    action: ApprovalAction
+    rejection_reason: Optional[str] = None  # required for REJECT, applied to every entry
+    partial: bool = False  # act on the eligible entries even if some entries are not eligible
+
+def _approval_error(approver_code: str, approver_is_admin: bool, entry_row) -> Optional[str]:
+    """
+    Apply approve_timesheet's hierarchy checks to one entry row of approve_timesheet_bulk's
+    eligibility query. Returns the error detail, or None if the approver may act on the entry.
+    """
+    entry_user_code, current_status = entry_row[1], entry_row[3]
+    owner_found, owner_designation, owner_team_code, team_lead, reporter_code = entry_row[14:19]
+
+    if not owner_found:
+        return f"Timesheet owner '{entry_user_code}' not found or inactive"
+
+    owner_is_admin = bool(owner_designation) and owner_designation.strip().lower() in allowed_admin_designations
+    if owner_is_admin and not reporter_code:
+        return f"Reporter (super approver) is not configured for team '{owner_team_code}'. Please configure reporter in team_master before approving admin timesheets."
+
+    approver_is_team_lead = bool(team_lead) and approver_code == team_lead
+    approver_is_reporter = bool(reporter_code) and approver_code == reporter_code
+    if owner_is_admin:
+        if not approver_is_reporter:
+            return f"Admin timesheets can only be approved by the reporter (super approver) ({reporter_code}). You ({approver_code}) are not authorized to approve this timesheet."
+    elif not (approver_is_team_lead or approver_is_admin):
+        return f"Regular employee timesheets can only be approved by Team Lead ({team_lead}) or Admins. You ({approver_code}) are not authorized to approve this timesheet."
+
+    if approver_code == entry_user_code and not owner_is_admin:
+        return "You cannot approve your own timesheet. Please have your Team Lead or an Admin approve it."
+
+    if current_status != 'SUBMITTED':
+        return f"Timesheet entry is already {current_status}. Only SUBMITTED entries can be approved or rejected."
+
+    return None
+
+@router.post("/api/v1/timesheet/approve_timesheet_bulk/")
+async def approve_timesheet_bulk(
+    RequestBody: TimesheetBulkApprovalSchema,
+    current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
+):
+    """
+    Approve or reject several SUBMITTED timesheet entries in one call (Team Lead, Admin or
+    Super Approver). Same hierarchy rules as approve_timesheet.
+    The approver is looked up once, every entry's owner, team and status are checked with one
+    locking query, the eligible entries are updated with one conditional UPDATE and their
+    history rows written with one multi-row INSERT. Errors are reported per entry; by default
+    nothing is changed if any entry is not eligible, with partial=true the eligible entries are.
+    """
+    user_code = current_user['user_code']
+    action = RequestBody.action
+    entry_ids = unique_keys(RequestBody.entry_ids)
+    logger.info(f"[INFO] Starting bulk timesheet {action.value.lower()} for {len(entry_ids)} entries, by user: {user_code}, partial: {RequestBody.partial}")
+
+    if not entry_ids:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="entry_ids cannot be empty"
+        )
+    if len(entry_ids) > MAX_BATCH_ENTRIES:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_ENTRIES} entries can be approved or rejected at once, got {len(entry_ids)}"
+        )
+
+    rejection_reason = None
+    if action == ApprovalAction.REJECT:
+        rejection_reason = RequestBody.rejection_reason.strip() if RequestBody.rejection_reason else ""
+        if not rejection_reason:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Rejection reason is required when rejecting timesheet entries. Please provide a rejection_reason."
+            )
+
+    cursor = None
+
+    try:
+        # Step 1: Resolve the approver once (designation and display name)
+        cursor = conn.cursor()
+        await cursor.execute("""
+            SELECT um.designation_name, um.user_name
+            FROM sts_new.user_master um
+            WHERE um.user_code = %s AND um.is_inactive = false
+        """, (user_code,))
+
+        approver_result = await cursor.fetchone()
+        if not approver_result:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="User not found or inactive"
+            )
+        designation_name, approver_name = approver_result
+        if not designation_name:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="User does not have a valid designation. Only Team Leads, Admins, or Super Approvers can approve/reject timesheets."
+            )
+        approver_is_admin = designation_name.strip().lower() in allowed_admin_designations
+
+        # Step 2: Fetch and lock every entry with its owner's team in one query
+        await cursor.execute("""
+            SELECT 
+                te.id, te.user_code, te.entry_date, te.approval_status,
+                te.task_code, te.epic_code, te.activity_code, te.ticket_code,
+                te.actual_hours_worked, te.travel_time, te.waiting_time, te.total_hours,
+                te.submitted_by, te.submitted_at,
+                um.user_code IS NOT NULL AS owner_found,
+                um.designation_name,
+                um.team_code,
+                tm.team_lead,
+                tm.reporter
+            FROM sts_ts.timesheet_entry te
+            LEFT JOIN sts_new.user_master um ON um.user_code = te.user_code AND um.is_inactive = false
+            LEFT JOIN sts_new.team_master tm ON um.team_code = tm.team_code
+            WHERE te.id = ANY(%s)
+            ORDER BY te.id
+            FOR UPDATE OF te
+        """, (entry_ids,))
+        entry_rows = await cursor.fetchall()
+
+        # Step 3: Check eligibility of each entry in memory
+        found_ids = {row[0] for row in entry_rows}
+        errors = [
+            {"entry_id": entry_id, "detail": f"Timesheet entry with ID {entry_id} does not exist"}
+            for entry_id in entry_ids if entry_id not in found_ids
+        ]
+        eligible_rows = []
+        for row in entry_rows:
+            approval_error = _approval_error(user_code, approver_is_admin, row)
+            if approval_error:
+                errors.append({"entry_id": row[0], "detail": approval_error})
+            else:
+                eligible_rows.append(row)
+
+        if errors:
+            logger.info(f"[INFO] Bulk timesheet {action.value.lower()} rejected {len(errors)} of {len(entry_ids)} entries")
+        if errors and (not RequestBody.partial or not eligible_rows):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail={
+                    "message": f"{len(errors)} of {len(entry_ids)} timesheet entries cannot be {'approved' if action == ApprovalAction.APPROVE else 'rejected'} - nothing was changed",
+                    "errors": errors
+                }
+            )
+
+        # Step 4: Apply the action to all eligible entries with one conditional UPDATE
+        current_time = get_current_time_ist()
+        new_status = 'APPROVED' if action == ApprovalAction.APPROVE else 'REJECTED'
+        eligible_ids = [row[0] for row in eligible_rows]
+
+        if action == ApprovalAction.APPROVE:
+            await cursor.execute("""
+                UPDATE sts_ts.timesheet_entry
+                SET 
+                    approval_status = %s,
+                    approved_by = %s,
+                    approved_at = %s,
+                    rejected_by = NULL,
+                    rejected_at = NULL,
+                    rejection_reason = NULL,
+                    submitted_by = NULL,
+                    submitted_at = NULL,
+                    updated_by = %s,
+                    updated_at = %s
+                WHERE id = ANY(%s) AND approval_status = 'SUBMITTED'
+                RETURNING id
+            """, (new_status, user_code, current_time, user_code, current_time, eligible_ids))
+        else:  # REJECT
+            await cursor.execute("""
+                UPDATE sts_ts.timesheet_entry
+                SET 
+                    approval_status = %s,
+                    rejected_by = %s,
+                    rejected_at = %s,
+                    rejection_reason = %s,
+                    approved_by = NULL,
+                    approved_at = NULL,
+                    submitted_by = NULL,
+                    submitted_at = NULL,
+                    updated_by = %s,
+                    updated_at = %s
+                WHERE id = ANY(%s) AND approval_status = 'SUBMITTED'
+                RETURNING id
+            """, (new_status, user_code, current_time, rejection_reason, user_code, current_time, eligible_ids))
+
+        updated_ids = {row[0] for row in await cursor.fetchall()}
+        if len(updated_ids) != len(eligible_ids):
+            raise Exception(f"Expected to update {len(eligible_ids)} timesheet entries, updated {len(updated_ids)}")
+
+        # Step 4.1: Move the hours to the new status in each owner's rollup
+        await apply_hours_changes(cursor, [
+            HoursChange(row[1], row[2], row[11], 'SUBMITTED', new_status)
+            for row in eligible_rows
+        ])
+
+        # Step 5: Insert all approval history rows with one multi-row INSERT
+        hist_insert_query = """
+            INSERT INTO sts_ts.timesheet_approval_hist (
+                entry_id, approval_status, status_reason,
+                entry_user_code, entry_date,
+                task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, travel_time, waiting_time, total_hours,
+                submitted_by, submitted_at,
+                approved_by, approved_at, rejected_by, rejected_at,
+                created_by, created_at
+            ) VALUES %s
+            RETURNING entry_id, id
+        """
+        approved_by_val = user_code if action == ApprovalAction.APPROVE else None
+        approved_at_val = current_time if action == ApprovalAction.APPROVE else None
+        rejected_by_val = user_code if action == ApprovalAction.REJECT else None
+        rejected_at_val = current_time if action == ApprovalAction.REJECT else None
+
+        status_reasons = {}
+        hist_rows = []
+        for row in eligible_rows:
+            # Same status_reason as approve_timesheet: the rejection reason, or a self-approval note
+            if action == ApprovalAction.REJECT:
+                status_reason_val = rejection_reason
+            elif row[1] == user_code:
+                owner_is_admin = bool(row[15]) and row[15].strip().lower() in allowed_admin_designations
+                status_reason_val = "Self-approved by super approver" if owner_is_admin else "Self-approved by admin"
+            else:
+                status_reason_val = None
+            status_reasons[row[0]] = status_reason_val
+            hist_rows.append((
+                row[0], new_status, status_reason_val,
+                row[1], row[2],
+                row[4], row[5], row[6], row[7],
+                row[8], row[9], row[10], row[11],
+                row[12], row[13],  # submitted_by, submitted_at as they were before this action
+                approved_by_val, approved_at_val, rejected_by_val, rejected_at_val,
+                user_code, current_time
+            ))
+        hist_ids = dict(await cursor.execute_values(hist_insert_query, hist_rows, page_size=len(hist_rows), fetch=True))
+
+        # Step 6: Commit transaction
+        await conn.commit()
+        logger.info(f"[INFO] Successfully {action.value.lower()}d {len(eligible_rows)} timesheet entries by {user_code}, not eligible: {len(errors)}")
+
+        action_message = "approved" if action == ApprovalAction.APPROVE else "rejected"
+        processed = [
+            {
+                "entry_id": row[0],
+                "entry_user_code": row[1],
+                "entry_date": str(row[2]) if row[2] else None,
+                "approval_status": new_status,
+                "is_self_approval": row[1] == user_code,
+                "status_reason": status_reasons[row[0]],
+                "history_id": hist_ids.get(row[0])
+            }
+            for row in eligible_rows
+        ]
+
+        response_data = {
+            "action": action.value,
+            "processed_count": len(processed),
+            "error_count": len(errors),
+            "processed": processed,
+            "errors": errors
+        }
+        if action == ApprovalAction.APPROVE:
+            response_data["approved_by"] = user_code
+            response_data["approved_by_name"] = approver_name
+            response_data["approved_at"] = str(current_time)
+        else:
+            response_data["rejected_by"] = user_code
+            response_data["rejected_by_name"] = approver_name
+            response_data["rejected_at"] = str(current_time)
+            response_data["rejection_reason"] = rejection_reason
+
+        return {
+            "Status_Flag": True,
+            "Status_Description": f"{len(processed)} timesheet entries {action_message} successfully" + (f", {len(errors)} not eligible" if errors else ""),
+            "Status_Code": HTTPStatus.OK.value,
+            "Status_Message": HTTPStatus.OK.phrase,
+            "Response_Data": response_data
+        }
+
+    except psycopg2.IntegrityError as e:
+        logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for timesheet approval/rejection")
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Data integrity violation: {str(e)}"
+        )
+    except psycopg2.OperationalError as e:
+        logger.error(f"[ERROR] Database connection error: {str(e)}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Database connection failed"
+        )
+    except psycopg2.ProgrammingError as e:
+        logger.error(f"[ERROR] Database query error: {str(e)}")
+        logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
+        if conn:
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Database query failed: {str(e)}"
+        )
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        if conn:
+            await conn.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error: {str(e)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        if conn:
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+    finally:
+        if cursor:
+            cursor.close()
+        logger.info(f"[INFO] Database cursor closed for bulk timesheet approval/rejection")
 
 
+def _submission_error(validation_row) -> Optional[str]:
+    """
+    Check that a DRAFT entry is complete enough to submit.
+    validation_row is (entry_date, task_code, epic_code, activity_code, ticket_code,
+    actual_hours_worked, work_location, description, task_type_code).
+    Returns the error detail, or None if the entry can be submitted.
+    """
+    val_entry_date, val_task_code, val_epic_code, val_activity_code, val_ticket_code, \
+    val_actual_hours, val_work_location, val_description, val_task_type_code = validation_row
+    
+    missing_fields = []
+    if not val_entry_date:
+        missing_fields.append("entry_date")
+    
+    # Validate that exactly one of task_code, activity_code, or ticket_code is provided
+    provided_codes = [code for code in [val_task_code, val_activity_code, val_ticket_code] if code is not None]
+    if len(provided_codes) == 0:
+        missing_fields.append("task_code OR activity_code OR ticket_code (exactly one required)")
+    elif len(provided_codes) > 1:
+        return "Timesheet entry cannot have multiple parent codes (task_code, activity_code, ticket_code). Please fix the entry before submission."
+    elif val_task_code:
+        # Task entry: epic_code and work_location are required
+        if not val_epic_code:
+            missing_fields.append("epic_code (required when task_code is provided)")
+        if not val_work_location:
+            missing_fields.append("work_location (required for task entries)")
+    elif val_activity_code:
+        # Activity entry: epic_code should be NULL, task_type_code should be NULL, work_location is optional, description is optional
+        if val_epic_code:
+            return "Timesheet entry with activity_code cannot have epic_code. Please fix the entry before submission."
+        if val_task_type_code:
+            return "Timesheet entry with activity_code cannot have task_type_code. Activities don't use task types. Please fix the entry before submission."
+        # work_location and description are optional for activities (can be NULL)
+    elif val_ticket_code:
+        # Ticket entry: epic_code should be NULL, work_location is optional, task_type_code defaults to TT012 (Support)
+        if val_epic_code:
+            return "Timesheet entry with ticket_code cannot have epic_code. Tickets don't belong to epics. Please fix the entry before submission."
+        # work_location and description are optional for tickets (can be NULL)
+    
+    if not val_actual_hours or val_actual_hours <= 0:
+        missing_fields.append("actual_hours_worked (must be > 0)")
+    
+    # Description is required for task entries, optional for activity and ticket entries
+    if val_task_code:
+        if not val_description or not val_description.strip():
+            missing_fields.append("description (required for task entries)")
+    # For activity and ticket entries, description is optional (not checked)
+    
+    if missing_fields:
+        return f"Cannot submit timesheet entry. Missing required fields: {', '.join(missing_fields)}. Please complete all required fields before submitting."
+    
+    return None
+
 @router.post("/api/v1/timesheet/submit_timesheet/")
 async def submit_timesheet(
     entry_id: int = Form(..., description="Timesheet entry ID to submit"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Submit a timesheet entry (DRAFT → SUBMITTED)
@@ -959,18 +1633,14 @@ async def submit_timesheet(
     """
     logger.info(f"[INFO] Starting timesheet submission for entry_id: {entry_id}, by user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        # Step 1: Establish database connection
-        logger.info(f"[INFO] Establishing database connection for timesheet submission")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
+        # Step 1: Open a cursor on the pooled request connection
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 2: Validate timesheet entry exists and get current data
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 id, user_code, entry_date, approval_status,
                 task_code, epic_code, activity_code, ticket_code,
@@ -979,7 +1649,7 @@ async def submit_timesheet(
             WHERE id = %s
         """, (entry_id,))
         
-        entry_result = cursor.fetchone()
+        entry_result = await cursor.fetchone()
         if not entry_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -1019,7 +1689,7 @@ async def submit_timesheet(
         # For task entries: epic_code and work_location are required
         # For activity entries: epic_code should be NULL, work_location is optional (can be NULL), task_type_code should be NULL
         # For ticket entries: epic_code should be NULL, work_location is optional, task_type_code defaults to TT012 (Support)
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 entry_date, task_code, epic_code, activity_code, ticket_code,
                 actual_hours_worked, work_location, description, task_type_code
@@ -1027,70 +1697,18 @@ async def submit_timesheet(
             WHERE id = %s
         """, (entry_id,))
         
-        validation_result = cursor.fetchone()
+        validation_result = await cursor.fetchone()
         if not validation_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"Timesheet entry with ID {entry_id} does not exist"
             )
         
-        val_entry_date, val_task_code, val_epic_code, val_activity_code, val_ticket_code, \
-        val_actual_hours, val_work_location, val_description, val_task_type_code = validation_result
-        
-        missing_fields = []
-        if not val_entry_date:
-            missing_fields.append("entry_date")
-        
-        # Validate that exactly one of task_code, activity_code, or ticket_code is provided
-        provided_codes = [code for code in [val_task_code, val_activity_code, val_ticket_code] if code is not None]
-        if len(provided_codes) == 0:
-            missing_fields.append("task_code OR activity_code OR ticket_code (exactly one required)")
-        elif len(provided_codes) > 1:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail="Timesheet entry cannot have multiple parent codes (task_code, activity_code, ticket_code). Please fix the entry before submission."
-            )
-        elif val_task_code:
-            # Task entry: epic_code and work_location are required
-            if not val_epic_code:
-                missing_fields.append("epic_code (required when task_code is provided)")
-            if not val_work_location:
-                missing_fields.append("work_location (required for task entries)")
-        elif val_activity_code:
-            # Activity entry: epic_code should be NULL, task_type_code should be NULL, work_location is optional, description is optional
-            if val_epic_code:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail="Timesheet entry with activity_code cannot have epic_code. Please fix the entry before submission."
-                )
-            if val_task_type_code:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail="Timesheet entry with activity_code cannot have task_type_code. Activities don't use task types. Please fix the entry before submission."
-                )
-            # work_location and description are optional for activities (can be NULL)
-        elif val_ticket_code:
-            # Ticket entry: epic_code should be NULL, work_location is optional, task_type_code defaults to TT012 (Support)
-            if val_epic_code:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail="Timesheet entry with ticket_code cannot have epic_code. Tickets don't belong to epics. Please fix the entry before submission."
-                )
-            # work_location and description are optional for tickets (can be NULL)
-        
-        if not val_actual_hours or val_actual_hours <= 0:
-            missing_fields.append("actual_hours_worked (must be > 0)")
-        
-        # Description is required for task entries, optional for activity and ticket entries
-        if val_task_code:
-            if not val_description or not val_description.strip():
-                missing_fields.append("description (required for task entries)")
-        # For activity and ticket entries, description is optional (not checked)
-        
-        if missing_fields:
+        submission_error = _submission_error(validation_result)
+        if submission_error:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
-                detail=f"Cannot submit timesheet entry. Missing required fields: {', '.join(missing_fields)}. Please complete all required fields before submitting."
+                detail=submission_error
             )
         
         # Step 6: Update timesheet_entry table (DRAFT → SUBMITTED)
@@ -1104,19 +1722,24 @@ async def submit_timesheet(
                 submitted_at = %s,
                 updated_by = %s,
                 updated_at = %s
-            WHERE id = %s
+            WHERE id = %s AND approval_status = 'DRAFT'
             RETURNING id
         """
-        cursor.execute(update_query, (
+        await cursor.execute(update_query, (
             user_code, current_time, user_code, current_time, entry_id
         ))
         
-        updated_entry = cursor.fetchone()
+        updated_entry = await cursor.fetchone()
         if not updated_entry:
             raise HTTPException(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Failed to update timesheet entry"
             )
+
+        # Step 6.1: Move the entry's hours from DRAFT to SUBMITTED in the rollup
+        await apply_hours_changes(cursor, [
+            HoursChange(user_code, entry_date, total_hours, 'DRAFT', 'SUBMITTED')
+        ])
         
         # Step 7: Insert into approval history
         hist_insert_query = """
@@ -1133,7 +1756,7 @@ async def submit_timesheet(
             ) RETURNING id
         """
         
-        cursor.execute(hist_insert_query, (
+        await cursor.execute(hist_insert_query, (
             entry_id, 'SUBMITTED', None,  # status_reason (no reason for submission)
             entry_user_code, entry_date,
             entry_task_code, entry_epic_code, entry_activity_code, entry_ticket_code,  # Snapshot of parent references
@@ -1144,10 +1767,10 @@ async def submit_timesheet(
             user_code, current_time  # created_by, created_at
         ))
         
-        hist_id = cursor.fetchone()[0]
+        hist_id = (await cursor.fetchone())[0]
         
         # Step 8: Commit transaction
-        conn.commit()
+        await conn.commit()
         logger.info(f"[INFO] Successfully submitted timesheet entry {entry_id} by user {user_code}")
         
         # Build response data
@@ -1170,13 +1793,13 @@ async def submit_timesheet(
     except HTTPException:
         # Re-raise HTTP exceptions
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -1184,7 +1807,251 @@ async def submit_timesheet(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for timesheet submission")
+        logger.info(f"[INFO] Database cursor closed for timesheet submission")
+
+# Widest date range accepted by submit_timesheet_bulk
+MAX_BULK_SUBMIT_DAYS = 31
+
+class TimesheetBulkSubmitSchema(BaseModel):
+    # Either entry_ids, or from_date and to_date (DD-MM-YYYY or YYYY-MM-DD) for the current user's DRAFT entries
+    entry_ids: Optional[List[int]] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+    partial: bool = False  # submit the complete entries even if some entries fail validation
+
+@router.post("/api/v1/timesheet/submit_timesheet_bulk/")
+async def submit_timesheet_bulk(
+    RequestBody: TimesheetBulkSubmitSchema,
+    current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
+):
+    """
+    Submit several timesheet entries (DRAFT → SUBMITTED) in one call, e.g. "Submit Week".
+    Entries are chosen by entry_ids, or by from_date/to_date (all of the current user's DRAFT
+    entries in the range). Same rules as submit_timesheet: only the owner can submit, only DRAFT
+    entries, and required fields must be present.
+    Entries are validated with one locking query, moved to SUBMITTED with one UPDATE and their
+    history rows written with one multi-row INSERT. Errors are reported per entry; by default
+    nothing is submitted if any entry fails, with partial=true the valid entries are submitted.
+    """
+    user_code = current_user['user_code']
+    logger.info(f"[INFO] Starting bulk timesheet submission by user: {user_code}, entry_ids: {RequestBody.entry_ids}, from_date: {RequestBody.from_date}, to_date: {RequestBody.to_date}, partial: {RequestBody.partial}")
+
+    by_ids = RequestBody.entry_ids is not None
+    by_range = RequestBody.from_date is not None or RequestBody.to_date is not None
+    if by_ids == by_range:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Provide either entry_ids or from_date and to_date"
+        )
 
+    from_date_obj = None
+    to_date_obj = None
+    if by_ids:
+        if not RequestBody.entry_ids:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="entry_ids cannot be empty"
+            )
+        if len(RequestBody.entry_ids) > MAX_BATCH_ENTRIES:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"At most {MAX_BATCH_ENTRIES} entries can be submitted at once, got {len(RequestBody.entry_ids)}"
+            )
+    else:
+        if not RequestBody.from_date or not RequestBody.to_date:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Both from_date and to_date are required for a date range submission"
+            )
+        try:
+            from_date_obj = parse_date(RequestBody.from_date)
+            to_date_obj = parse_date(RequestBody.to_date)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Invalid date format: {str(e)}. Please use DD-MM-YYYY or YYYY-MM-DD format"
+            )
+        if from_date_obj > to_date_obj:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="from_date cannot be after to_date"
+            )
+        if (to_date_obj - from_date_obj).days + 1 > MAX_BULK_SUBMIT_DAYS:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Date range cannot exceed {MAX_BULK_SUBMIT_DAYS} days"
+            )
+
+    cursor = None
+
+    try:
+        # Step 1: Open a cursor on the pooled request connection
+        cursor = conn.cursor()
+
+        # Step 2: Fetch and lock every candidate entry in one query
+        select_columns = """
+                id, user_code, approval_status,
+                entry_date, task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, work_location, description, task_type_code
+            FROM sts_ts.timesheet_entry
+        """
+        # Only the caller's own entries are locked, so other employees' rows are never held
+        if by_ids:
+            await cursor.execute(
+                "SELECT" + select_columns + "WHERE id = ANY(%s) AND user_code = %s ORDER BY id FOR UPDATE",
+                (RequestBody.entry_ids, user_code)
+            )
+        else:
+            await cursor.execute(
+                "SELECT" + select_columns + "WHERE user_code = %s AND approval_status = 'DRAFT' AND entry_date BETWEEN %s AND %s ORDER BY entry_date, id FOR UPDATE",
+                (user_code, from_date_obj, to_date_obj)
+            )
+        entry_rows = await cursor.fetchall()
+
+        # Step 3: Apply submit_timesheet's checks to each entry
+        found_ids = {row[0] for row in entry_rows}
+        errors = []
+        if by_ids:
+            for entry_id in unique_keys(RequestBody.entry_ids):
+                if entry_id not in found_ids:
+                    errors.append({"entry_id": entry_id, "detail": f"Timesheet entry with ID {entry_id} does not exist or does not belong to you. Only the owner of the timesheet entry can submit it."})
+
+        submit_ids = []
+        for row in entry_rows:
+            entry_id, current_status = row[0], row[2]
+            if current_status != 'DRAFT':
+                errors.append({"entry_id": entry_id, "detail": f"Timesheet entry is already {current_status}. Only DRAFT entries can be submitted."})
+            else:
+                submission_error = _submission_error(row[3:])
+                if submission_error:
+                    errors.append({"entry_id": entry_id, "detail": submission_error})
+                else:
+                    submit_ids.append(entry_id)
+
+        if errors:
+            logger.info(f"[INFO] Bulk timesheet submission validation failed for {len(errors)} entries")
+        if errors and (not RequestBody.partial or not submit_ids):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail={
+                    "message": f"{len(errors)} timesheet entries cannot be submitted - nothing was submitted",
+                    "errors": errors
+                }
+            )
+
+        if not submit_ids:
+            return {
+                "Status_Flag": True,
+                "Status_Description": "No DRAFT timesheet entries to submit",
+                "Status_Code": HTTPStatus.OK.value,
+                "Status_Message": HTTPStatus.OK.phrase,
+                "Response_Data": {
+                    "submitted_count": 0,
+                    "error_count": 0,
+                    "submitted": [],
+                    "errors": []
+                }
+            }
+
+        # Step 4: Move all valid entries to SUBMITTED in one statement
+        current_time = get_current_time_ist()
+        await cursor.execute("""
+            UPDATE sts_ts.timesheet_entry
+            SET 
+                approval_status = 'SUBMITTED',
+                submitted_by = %s,
+                submitted_at = %s,
+                updated_by = %s,
+                updated_at = %s
+            WHERE id = ANY(%s) AND approval_status = 'DRAFT'
+            RETURNING
+                id, user_code, entry_date,
+                task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, travel_time, waiting_time, total_hours
+        """, (user_code, current_time, user_code, current_time, submit_ids))
+        updated_rows = await cursor.fetchall()
+        if len(updated_rows) != len(submit_ids):
+            raise Exception(f"Expected to submit {len(submit_ids)} timesheet entries, updated {len(updated_rows)}")
+
+        # Step 4.1: Move the hours from DRAFT to SUBMITTED in the rollup
+        await apply_hours_changes(cursor, [
+            HoursChange(row[1], row[2], row[10], 'DRAFT', 'SUBMITTED')
+            for row in updated_rows
+        ])
+
+        # Step 5: Insert all approval history rows with one multi-row INSERT
+        hist_insert_query = """
+            INSERT INTO sts_ts.timesheet_approval_hist (
+                entry_id, approval_status, status_reason,
+                entry_user_code, entry_date,
+                task_code, epic_code, activity_code, ticket_code,
+                actual_hours_worked, travel_time, waiting_time, total_hours,
+                submitted_by, submitted_at,
+                approved_by, approved_at, rejected_by, rejected_at,
+                created_by, created_at
+            ) VALUES %s
+            RETURNING entry_id, id
+        """
+        hist_rows = [
+            (
+                row[0], 'SUBMITTED', None,
+                row[1], row[2],
+                row[3], row[4], row[5], row[6],
+                row[7], row[8], row[9], row[10],
+                user_code, current_time,
+                None, None,
+                None, None,
+                user_code, current_time
+            )
+            for row in updated_rows
+        ]
+        hist_ids = dict(await cursor.execute_values(hist_insert_query, hist_rows, page_size=len(hist_rows), fetch=True))
+
+        # Step 6: Commit transaction
+        await conn.commit()
+        logger.info(f"[INFO] Successfully submitted {len(updated_rows)} timesheet entries by user {user_code}, rejected: {len(errors)}")
+
+        submitted = [
+            {
+                "entry_id": row[0],
+                "entry_date": str(row[2]) if row[2] else None,
+                "approval_status": "SUBMITTED",
+                "history_id": hist_ids.get(row[0])
+            }
+            for row in updated_rows
+        ]
+
+        return {
+            "Status_Flag": True,
+            "Status_Description": f"{len(submitted)} timesheet entries submitted successfully" + (f", {len(errors)} rejected" if errors else ""),
+            "Status_Code": HTTPStatus.OK.value,
+            "Status_Message": HTTPStatus.OK.phrase,
+            "Response_Data": {
+                "submitted_by": user_code,
+                "submitted_at": str(current_time),
+                "submitted_count": len(submitted),
+                "error_count": len(errors),
+                "submitted": submitted,
+                "errors": errors
+            }
+        }
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        if conn:
+            await conn.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error: {str(e)}")
+        logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
+        if conn:
+            await conn.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
+    finally:
+        if cursor:
+            cursor.close()
+        logger.info(f"[INFO] Database cursor closed for bulk timesheet submission")
@@ -10,8 +10,12 @@ from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date
 from typing import Optional
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from activity_feed import append_activity_events, epic_events
+from history_store import write_epic_history
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
+from reference_registry import get_reference_data
 from utils.logger import get_logger
 import traceback
 from enum import Enum
@@ -20,13 +24,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -58,26 +55,23 @@ async def update_epic(
     is_billable: Optional[bool] = Form(None, description="Whether the epic is billable"),
     reporter: Optional[str] = Form(None, description="User code of the person reporting the epic"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Update epic fields (status, dates, hours, priority, etc.) and create a history entry
-    Updates both the epics table and inserts a snapshot into epic_hist
+    Updates both the epics table and records the change in epic_hist
     At least one field must be provided for update
     All parameters are optional except epic_id - you can update any combination of fields
     """
     logger.info(f"[INFO] Starting epic update for epic_id: {epic_id}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for epic update")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 1: Validate and fetch current epic data
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 id, status_code, priority_code, start_date, due_date, closed_on,
                 estimated_hours, max_hours, is_billable, product_code,
@@ -86,7 +80,7 @@ async def update_epic(
             WHERE id = %s
         """, (epic_id,))
         
-        epic_result = cursor.fetchone()
+        epic_result = await cursor.fetchone()
         if not epic_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -152,15 +146,14 @@ async def update_epic(
                     detail=f"Status code '{status_code_str}' is not allowed for epics. Allowed values are: STS001 (Not Yet Started), STS007 (In Progress), STS002 (Completed), STS010 (Cancelled)"
                 )
             
-            cursor.execute("SELECT status_desc FROM sts_new.status_master WHERE status_code = %s", (status_code_str,))
-            status_result = cursor.fetchone()
-            if not status_result:
+            reference_data = await get_reference_data()
+            if status_code_str not in reference_data.statuses:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Status code '{status_code_str}' does not exist in status_master"
                 )
             new_status_code = status_code_str
-            status_desc = status_result[0]
+            status_desc = reference_data.statuses[status_code_str]
 
         # Step 4: Validate dates if provided (skip if empty string or placeholder)
         new_start_date = current_start_date
@@ -197,8 +190,8 @@ async def update_epic(
         # Step 5: Validate product_code if provided
         new_product_code = current_product_code
         if is_valid_field(product_code):
-            cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (product_code.strip(),))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (product_code.strip(),))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Product code {product_code.strip()} does not exist"
@@ -208,8 +201,8 @@ async def update_epic(
         # Step 5.1: Validate company_code if provided
         new_company_code = current_company_code
         if company_code and company_code.strip() and company_code.lower() != "string":
-            cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s", (company_code,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s", (company_code,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Company code {company_code} does not exist"
@@ -219,8 +212,8 @@ async def update_epic(
         # Step 5.2: Validate contact_person_code if provided
         new_contact_person_code = current_contact_person_code
         if contact_person_code and contact_person_code.strip() and contact_person_code.lower() != "string":
-            cursor.execute("SELECT contact_person_code FROM sts_new.contact_master WHERE contact_person_code = %s", (contact_person_code,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT contact_person_code FROM sts_new.contact_master WHERE contact_person_code = %s", (contact_person_code,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Contact person code {contact_person_code} does not exist"
@@ -230,8 +223,8 @@ async def update_epic(
         # Step 5.3: Validate reporter if provided
         new_reporter = current_reporter
         if reporter and reporter.strip() and reporter.lower() != "string":
-            cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (reporter.strip(),))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (reporter.strip(),))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Reporter with code {reporter.strip()} does not exist"
@@ -241,8 +234,8 @@ async def update_epic(
         # Step 5.4: Validate priority_code if provided (skip if 0 or invalid)
         new_priority_code = current_priority_code
         if priority_code is not None and priority_code != 0:
-            cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (priority_code,))
-            if not cursor.fetchone():
+            reference_data = await get_reference_data()
+            if priority_code not in reference_data.priorities:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Priority code {priority_code} does not exist"
@@ -250,8 +243,8 @@ async def update_epic(
             new_priority_code = priority_code
 
         # Step 6: Validate current user exists
-        cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"User with code {current_user['user_code']} does not exist"
@@ -403,9 +396,9 @@ async def update_epic(
             RETURNING id
         """
         
-        cursor.execute(update_query, tuple(update_params))
+        await cursor.execute(update_query, tuple(update_params))
         
-        update_result = cursor.fetchone()
+        update_result = await cursor.fetchone()
         if not update_result:
             raise Exception("Failed to update epic - no ID returned")
         
@@ -421,14 +414,14 @@ async def update_epic(
             logger.info(f"[INFO] Using current reporter {reporter_for_hist} for epic history")
         else:
             # Get creator's team and fetch reporter from team_master
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT um.team_code, tm.reporter
                 FROM sts_ts.epics e
                 JOIN sts_new.user_master um ON e.created_by = um.user_code
                 LEFT JOIN sts_new.team_master tm ON um.team_code = tm.team_code
                 WHERE e.id = %s
             """, (epic_id,))
-            team_reporter_result = cursor.fetchone()
+            team_reporter_result = await cursor.fetchone()
             if team_reporter_result and team_reporter_result[1]:
                 reporter_for_hist = team_reporter_result[1]
                 logger.info(f"[INFO] Reporter not set in epic, fetched from team_master: {reporter_for_hist}")
@@ -438,21 +431,7 @@ async def update_epic(
                     detail="Reporter is not configured for epic and cannot be determined from team. Please ensure reporter is set in epics or team_master."
                 )
         
-        # Step 10: Insert status history entry with full snapshot
-        status_hist_query = """
-            INSERT INTO sts_ts.epic_hist (
-                epic_code, status_code, status_reason, user_code, reporter, priority_code, product_code,
-                start_date, due_date, closed_on, estimated_hours, max_hours,
-                cancelled_by, cancelled_at,
-                created_by, created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s,
-                %s, %s
-            ) RETURNING id
-        """
-        
+        # Step 10: Insert status history entry (only the changed columns are stored, see history_store.py)
         # Get cancelled_by, cancelled_at for history
         # If final status is STS010, use the cancelled values we set (or fetch if already set in DB)
         # If status is changing away from STS010, use None
@@ -465,12 +444,12 @@ async def update_epic(
                 cancelled_at_hist = cancelled_at
             else:
                 # Status is already STS010 and we're not changing it, fetch from DB
-                cursor.execute("""
+                await cursor.execute("""
                     SELECT cancelled_by, cancelled_at
                     FROM sts_ts.epics
                     WHERE id = %s
                 """, (epic_id,))
-                cancelled_data = cursor.fetchone()
+                cancelled_data = await cursor.fetchone()
                 cancelled_by_hist = cancelled_data[0] if cancelled_data else None
                 cancelled_at_hist = cancelled_data[1] if cancelled_data else None
         else:
@@ -478,33 +457,50 @@ async def update_epic(
             cancelled_by_hist = None
             cancelled_at_hist = None
         
-        cursor.execute(status_hist_query, (
-            epic_id,  # epic_code (references epics.id)
-            final_status_code,  # Use final status code
-            status_reason if status_reason else None,  # status_reason (used for cancellation reason when status is STS010)
-            updated_by,  # user_code - user who made the change/update
-            reporter_for_hist,  # reporter - use updated reporter if provided, otherwise current or from team_master
-            new_priority_code,  # Use updated priority
-            new_product_code,  # Use updated product_code
-            new_start_date,  # Use updated start_date
-            new_due_date,  # Use updated due_date
-            new_closed_on,  # Use updated closed_on
-            final_estimated_hours,  # Use updated estimated_hours
-            final_max_hours,  # Use updated max_hours
-            cancelled_by_hist,
-            cancelled_at_hist,
-            updated_by,  # created_by (user who made the change)
-            current_time
-        ))
-        
-        hist_result = cursor.fetchone()
-        if not hist_result:
-            raise Exception("Failed to insert epic history entry - no ID returned")
-        epic_hist_id = hist_result[0]
+        epic_hist_id = await write_epic_history(cursor, epic_id, {
+            "status_code": final_status_code,
+            "reporter": reporter_for_hist,  # updated, current, or from team_master
+            "priority_code": new_priority_code,
+            "product_code": new_product_code,
+            "start_date": new_start_date,
+            "due_date": new_due_date,
+            "closed_on": new_closed_on,
+            "estimated_hours": final_estimated_hours,
+            "max_hours": final_max_hours,
+            "cancelled_by": cancelled_by_hist,
+            "cancelled_at": cancelled_at_hist,
+        }, updated_by, current_time,
+            status_reason=status_reason if status_reason else None,  # cancellation reason when STS010
+            user_code=updated_by)  # user who made the change/update
         logger.info(f"[INFO] Successfully created epic history entry with id: {epic_hist_id}")
 
+        # Step 10.1: Record the changes in the activity feed
+        previous_snapshot = {
+            "status_code": current_status,
+            "priority_code": current_priority_code,
+            "product_code": current_product_code,
+            "reporter": current_reporter,
+            "start_date": current_start_date,
+            "due_date": current_due_date,
+            "estimated_hours": current_estimated_hours,
+        }
+        current_snapshot = {
+            "status_code": final_status_code,
+            "priority_code": new_priority_code,
+            "product_code": new_product_code,
+            "reporter": reporter_for_hist,
+            "start_date": new_start_date,
+            "due_date": new_due_date,
+            "estimated_hours": final_estimated_hours,
+        }
+        events = await epic_events(cursor, epic_id, previous_snapshot, current_snapshot,
+                                   updated_by, await get_reference_data())
+        await append_activity_events(cursor, events, updated_by, current_time)
+
         # Step 11: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "epics")
+        await conn.commit()
+        invalidate_master_data("epics")
         logger.info(f"[INFO] Successfully updated epic for epic_id: {epic_id}")
 
         # Build response with updated fields
@@ -543,8 +539,8 @@ async def update_epic(
         if is_valid_field(product_code):
             response_data["product_code"] = new_product_code
             # Fetch product name for response
-            cursor.execute("SELECT product_name FROM sts_new.product_master WHERE product_code = %s", (new_product_code,))
-            product_result = cursor.fetchone()
+            await cursor.execute("SELECT product_name FROM sts_new.product_master WHERE product_code = %s", (new_product_code,))
+            product_result = await cursor.fetchone()
             if product_result:
                 response_data["product_name"] = product_result[0]
 
@@ -559,7 +555,7 @@ async def update_epic(
     except psycopg2.IntegrityError as e:
         logger.error(f"[ERROR] Database integrity error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Data integrity violation. Please check your input data."
@@ -573,7 +569,7 @@ async def update_epic(
     except psycopg2.ProgrammingError as e:
         logger.error(f"[ERROR] Database query error: {str(e)}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail="Database query failed"
@@ -581,13 +577,13 @@ async def update_epic(
     except HTTPException:
         # Re-raise HTTP exceptions
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -595,7 +591,5 @@ async def update_epic(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for epic update")
+        logger.info(f"[INFO] Database cursor closed for epic update")
 
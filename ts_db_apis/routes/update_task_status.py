@@ -10,7 +10,11 @@ from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date
 from typing import Optional
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from activity_feed import append_activity_events, task_events
+from history_store import write_task_history
+from reference_registry import check_task_type_code, get_reference_data
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 import traceback
@@ -20,13 +24,6 @@ config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
 
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
-
 router = APIRouter()
 
 # Initialize logger for this module
@@ -39,20 +36,6 @@ class StatusCode(str, Enum):
     COMPLETED = "STS002"        # Completed
     CANCELLED = "STS010"        # Cancelled
 
-# Task Type Code Enum - Valid values from task_type_master
-class TaskTypeCode(str, Enum):
-    ACCOUNTS = "TT001"              # Accounts
-    DEVELOPMENT = "TT002"           # Development
-    QUALITY_ASSURANCE = "TT003"     # Quality Assurance
-    USER_ACCEPTANCE_TESTING = "TT004"  # User Acceptance Testing
-    PROD_MOVE = "TT005"             # PROD Move
-    DOCUMENTATION = "TT006"         # Documentation
-    DESIGN = "TT007"                # Design
-    CODE_REVIEW = "TT008"           # Code Review
-    MEETING = "TT009"               # Meeting
-    TRAINING = "TT010"              # Training
-    IMPLEMENTATION = "TT011"        # Implementation
-    SUPPORT = "TT012"               # Support
 
 @router.put("/api/v1/timesheet/update_task/{task_id}")
 async def update_task(
@@ -66,7 +49,7 @@ async def update_task(
     due_date: Optional[str] = Form(None, description="Due date in DD-MM-YYYY or YYYY-MM-DD format"),
     closed_on: Optional[str] = Form(None, description="Closed on date (completion date) in DD-MM-YYYY or YYYY-MM-DD format"),
     priority_code: Optional[int] = Form(None, description="Priority level of the task"),
-    task_type_code: Optional[TaskTypeCode] = Form(None, description="Task type code (TT001-TT012) - optional"),
+    task_type_code: Optional[str] = Form(None, description="Task type code (active code from task_type_master, e.g. TT002) - optional"),
     assignee: Optional[str] = Form(None, description="User code of the person assigned to the task"),
     reporter: Optional[str] = Form(None, description="User code of the person reporting the task"),
     assigned_team_code: Optional[str] = Form(None, description="Team code for the assigned team"),
@@ -75,26 +58,23 @@ async def update_task(
     is_billable: Optional[bool] = Form(None, description="Whether the task is billable"),
     work_mode: Optional[str] = Form(None, description="Work mode: REMOTE, ON_SITE, or OFFICE"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Update task fields (status, dates, hours, priority, assignee, reporter, etc.) and create a history entry
-    Updates both the tasks table and inserts a snapshot into task_hist
+    Updates both the tasks table and records the change in task_hist
     At least one field must be provided for update
     All parameters are optional except task_id - you can update any combination of fields
     """
     logger.info(f"[INFO] Starting task update for task_id: {task_id}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for task status update")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 1: Validate and fetch current task data
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 t.id, t.status_code, t.priority_code, t.task_type_code, t.assignee, t.reporter, t.assigned_team_code,
                 t.assigned_on, t.start_date, t.due_date, t.closed_on,
@@ -104,7 +84,7 @@ async def update_task(
             WHERE t.id = %s
         """, (task_id,))
         
-        task_result = cursor.fetchone()
+        task_result = await cursor.fetchone()
         if not task_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -160,15 +140,10 @@ async def update_task(
             )
 
         # Step 3: Get previous status description
+        reference_data = await get_reference_data()
         previous_status_desc = None
         if current_status:
-            cursor.execute("""
-                SELECT status_desc FROM sts_new.status_master 
-                WHERE status_code = %s
-            """, (current_status,))
-            prev_status_result = cursor.fetchone()
-            if prev_status_result:
-                previous_status_desc = prev_status_result[0]
+            previous_status_desc = reference_data.statuses.get(current_status)
 
         # Step 4: Validate new status code if provided (only check if it exists in status_master)
         new_status_code = None
@@ -190,18 +165,13 @@ async def update_task(
                     detail=f"Status code '{status_code_str}' is not allowed for tasks. Allowed values are: STS001 (Not Yet Started), STS007 (In Progress), STS002 (Completed), STS010 (Cancelled)"
                 )
             
-            cursor.execute("""
-                SELECT status_desc FROM sts_new.status_master 
-                WHERE status_code = %s
-            """, (status_code_str,))
-            status_result = cursor.fetchone()
-            if not status_result:
+            if status_code_str not in reference_data.statuses:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Status code '{status_code_str}' does not exist in status_master"
                 )
             new_status_code = status_code_str
-            status_desc = status_result[0]
+            status_desc = reference_data.statuses[status_code_str]
 
         # Step 5: Validate dates if provided (skip if empty string or placeholder)
         new_start_date = current_start_date
@@ -238,8 +208,8 @@ async def update_task(
         # Step 6: Validate assignee if provided (skip if empty string or placeholder)
         new_assignee = current_assignee
         if assignee and assignee.strip() and assignee.lower() != "string":
-            cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (assignee,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (assignee,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Assignee with code {assignee} does not exist"
@@ -249,8 +219,8 @@ async def update_task(
         # Step 7: Validate reporter if provided (skip if empty string or placeholder)
         new_reporter = current_reporter
         if reporter and reporter.strip() and reporter.lower() != "string":
-            cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (reporter,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (reporter,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Reporter with code {reporter} does not exist"
@@ -260,8 +230,7 @@ async def update_task(
         # Step 8: Validate priority_code if provided (skip if 0 or invalid)
         new_priority_code = current_priority_code
         if priority_code is not None and priority_code != 0:
-            cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (priority_code,))
-            if not cursor.fetchone():
+            if priority_code not in reference_data.priorities:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Priority code {priority_code} does not exist"
@@ -271,26 +240,13 @@ async def update_task(
         # Step 8.0.5: Validate and convert task_type_code if provided
         new_task_type_code = current_task_type_code
         if task_type_code is not None:
-            # Convert enum to string value
-            if isinstance(task_type_code, TaskTypeCode):
-                task_type_code_str = task_type_code.value
-            else:
-                task_type_code_str = str(task_type_code).upper()
-            # Validate task_type_code is one of the allowed enum values
+            # Validate task_type_code is an active task type
             try:
-                task_type_code_enum = TaskTypeCode(task_type_code_str)
-                task_type_code_str = task_type_code_enum.value
-            except ValueError:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code '{task_type_code_str}' is not allowed. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
-                )
-            
-            cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (task_type_code_str,))
-            if not cursor.fetchone():
+                task_type_code_str = check_task_type_code(reference_data, task_type_code)
+            except ValueError as e:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code {task_type_code_str} does not exist or is not active"
+                    detail=str(e)
                 )
             new_task_type_code = task_type_code_str
 
@@ -342,12 +298,12 @@ async def update_task(
         # Fetch epic dates - use new epic if epic_code_param is being updated, otherwise use current epic
         if epic_code_param is not None and epic_code_param > 0:
             # Epic is being updated - fetch new epic dates
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT e.id, e.start_date, e.due_date, e.closed_on, e.created_at::DATE, e.product_code
                 FROM sts_ts.epics e
                 WHERE e.id = %s
             """, (epic_code_param,))
-            epic_result = cursor.fetchone()
+            epic_result = await cursor.fetchone()
             if not epic_result:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -358,12 +314,12 @@ async def update_task(
         else:
             # Epic is not being updated - fetch current epic dates for validation
             if current_epic_code:
-                cursor.execute("""
+                await cursor.execute("""
                     SELECT e.start_date, e.due_date, e.closed_on, e.created_at::DATE, e.product_code
                     FROM sts_ts.epics e
                     WHERE e.id = %s
                 """, (current_epic_code,))
-                epic_result = cursor.fetchone()
+                epic_result = await cursor.fetchone()
                 if epic_result:
                     epic_start_date, epic_due_date, epic_closed_on, epic_created_date, epic_product_code = epic_result
                     # Ensure due_date is not accidentally set to start_date
@@ -371,8 +327,8 @@ async def update_task(
                         logger.warning(f"[WARNING] Epic {current_epic_code} has due_date equal to start_date ({epic_due_date}). This might indicate a data issue.")
 
         # Step 9: Validate current user exists
-        cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (current_user['user_code'],))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"User with code {current_user['user_code']} does not exist"
@@ -559,8 +515,8 @@ async def update_task(
                 task_team_code = current_assigned_team_code
             
             # Get assignee's team code
-            cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (new_assignee,))
-            assignee_team_result = cursor.fetchone()
+            await cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (new_assignee,))
+            assignee_team_result = await cursor.fetchone()
             if not assignee_team_result:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -572,12 +528,12 @@ async def update_task(
             # Validate assignee belongs to the task's team
             if task_team_code and assignee_team_code != task_team_code:
                 # Get team name for better error message
-                cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (task_team_code,))
-                task_team_result = cursor.fetchone()
+                await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (task_team_code,))
+                task_team_result = await cursor.fetchone()
                 task_team_name = task_team_result[0] if task_team_result else task_team_code
                 
-                cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (assignee_team_code,))
-                assignee_team_result_name = cursor.fetchone()
+                await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (assignee_team_code,))
+                assignee_team_result_name = await cursor.fetchone()
                 assignee_team_name = assignee_team_result_name[0] if assignee_team_result_name else assignee_team_code
                 
                 raise HTTPException(
@@ -596,8 +552,8 @@ async def update_task(
         # Update assigned_team_code if explicitly provided
         if assigned_team_code and assigned_team_code.strip() and assigned_team_code.lower() != "string":
             # Validate team code exists
-            cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (assigned_team_code.strip(),))
-            team_result = cursor.fetchone()
+            await cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (assigned_team_code.strip(),))
+            team_result = await cursor.fetchone()
             if team_result:
                 new_assigned_team_code = assigned_team_code.strip()
                 
@@ -619,8 +575,8 @@ async def update_task(
                     
                     if assignee_being_updated:
                         # Assignee is being updated - validate that new assignee belongs to new team
-                        cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (new_assignee,))
-                        new_assignee_team_result = cursor.fetchone()
+                        await cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (new_assignee,))
+                        new_assignee_team_result = await cursor.fetchone()
                         if not new_assignee_team_result:
                             raise HTTPException(
                                 status_code=HTTPStatus.BAD_REQUEST,
@@ -630,12 +586,12 @@ async def update_task(
                         new_assignee_team_code = new_assignee_team_result[0]
                         if new_assignee_team_code != new_assigned_team_code:
                             # New assignee doesn't belong to new team - raise error
-                            cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assigned_team_code,))
-                            task_team_result = cursor.fetchone()
+                            await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assigned_team_code,))
+                            task_team_result = await cursor.fetchone()
                             task_team_name = task_team_result[0] if task_team_result else new_assigned_team_code
                             
-                            cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assignee_team_code,))
-                            assignee_team_result_name = cursor.fetchone()
+                            await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assignee_team_code,))
+                            assignee_team_result_name = await cursor.fetchone()
                             assignee_team_name = assignee_team_result_name[0] if assignee_team_result_name else new_assignee_team_code
                             
                             raise HTTPException(
@@ -746,9 +702,9 @@ async def update_task(
             logger.info(f"[DEBUG] Full UPDATE query: {update_query}")
             logger.info(f"[DEBUG] Update params (before WHERE): {update_params[:-1]}")
         
-        cursor.execute(update_query, tuple(update_params))
+        await cursor.execute(update_query, tuple(update_params))
         
-        update_result = cursor.fetchone()
+        update_result = await cursor.fetchone()
         if not update_result:
             raise Exception("Failed to update task - no ID returned")
         
@@ -758,8 +714,8 @@ async def update_task(
             assignee_param = update_params[assignee_idx] if assignee_idx < len(update_params) else None
             if assignee_param is None:
                 # Verify assignee is actually NULL in database
-                cursor.execute("SELECT assignee FROM sts_ts.tasks WHERE id = %s", (task_id,))
-                verify_result = cursor.fetchone()
+                await cursor.execute("SELECT assignee FROM sts_ts.tasks WHERE id = %s", (task_id,))
+                verify_result = await cursor.fetchone()
                 if verify_result:
                     db_assignee = verify_result[0]
                     if db_assignee is not None:
@@ -779,8 +735,8 @@ async def update_task(
         # 1. There's an assignee, AND
         # 2. We don't have an explicit team code (neither new nor current)
         if final_assignee_for_hist and not assignee_team_code:
-            cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (final_assignee_for_hist,))
-            assignee_team_result = cursor.fetchone()
+            await cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (final_assignee_for_hist,))
+            assignee_team_result = await cursor.fetchone()
             if assignee_team_result:
                 assignee_team_code = assignee_team_result[0]
                 logger.info(f"[INFO] Assignee {final_assignee_for_hist} belongs to team {assignee_team_code}")
@@ -792,29 +748,12 @@ async def update_task(
         final_epic_code_for_hist = new_epic_code if epic_code_param is not None and epic_code_param > 0 else current_epic_code
         final_product_code = epic_product_code
         if not final_product_code and final_epic_code_for_hist:
-            cursor.execute("SELECT product_code FROM sts_ts.epics WHERE id = %s", (final_epic_code_for_hist,))
-            product_result = cursor.fetchone()
+            await cursor.execute("SELECT product_code FROM sts_ts.epics WHERE id = %s", (final_epic_code_for_hist,))
+            product_result = await cursor.fetchone()
             if product_result:
                 final_product_code = product_result[0]
 
-        # Step 12: Insert status history entry with full snapshot
-        status_hist_query = """
-            INSERT INTO sts_ts.task_hist (
-                task_code, status_code, priority_code, task_type_code, status_reason, 
-                product_code, assigned_team_code, assignee, reporter,
-                work_mode, assigned_on, start_date, due_date, closed_on,
-                estimated_hours, max_hours,
-                cancelled_by, cancelled_at,
-                created_by, created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s,
-                %s, %s,
-                %s, %s
-            ) RETURNING id
-        """
-        
+        # Step 12: Insert status history entry (only the changed columns are stored, see history_store.py)
         # Get cancelled_by, cancelled_at for history
         # If final status is STS010, use the cancelled values we set (or fetch if already set in DB)
         # If status is changing away from STS010, use None
@@ -838,49 +777,71 @@ async def update_task(
         final_task_type_code_for_hist = new_task_type_code
         if not final_task_type_code_for_hist:
             # If we don't have a task_type_code, try to get it from the most recent history entry
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT task_type_code 
                 FROM sts_ts.task_hist 
                 WHERE task_code = %s AND task_type_code IS NOT NULL 
                 ORDER BY created_at DESC, id DESC 
                 LIMIT 1
             """, (task_id,))
-            hist_task_type_result = cursor.fetchone()
+            hist_task_type_result = await cursor.fetchone()
             if hist_task_type_result and hist_task_type_result[0]:
                 final_task_type_code_for_hist = hist_task_type_result[0]
                 logger.info(f"[INFO] Preserving task_type_code {final_task_type_code_for_hist} from history for task {task_id} in task_hist")
         
-        cursor.execute(status_hist_query, (
-            task_id,  # task_code (references tasks.id)
-            final_status_code,  # Use final status code
-            new_priority_code,  # Use updated priority
-            final_task_type_code_for_hist,  # Use updated task_type_code, current, or last known from history
-            status_reason if status_reason else None,  # status_reason (used for cancellation reason when status is STS010)
-            final_product_code,  # product_code (from epic)
-            assignee_team_code,  # assigned_team_code (from assignee's team)
-            new_assignee if assignee_being_cleared or new_assignee is not None else current_assignee,  # Use updated assignee (even if None/cleared) or current
-            new_reporter if new_reporter else current_reporter,  # Use updated reporter or current
-            new_work_mode,  # Use updated work_mode if provided, otherwise current value
-            assigned_on,
-            new_start_date,  # Use updated start_date
-            new_due_date,  # Use updated due_date
-            new_closed_on,  # Use updated closed_on
-            new_estimated_hours,  # Use updated estimated_hours if provided, otherwise current value
-            new_max_hours,  # Use updated max_hours if provided, otherwise current value
-            cancelled_by_hist,
-            cancelled_at_hist,
-            updated_by,  # created_by (user who made the change)
-            current_time
-        ))
-        
-        hist_result = cursor.fetchone()
-        if not hist_result:
-            raise Exception("Failed to insert status history entry - no ID returned")
-        status_hist_id = hist_result[0]
+        status_hist_id = await write_task_history(cursor, task_id, {
+            "status_code": final_status_code,
+            "priority_code": new_priority_code,
+            "task_type_code": final_task_type_code_for_hist,  # updated, current, or last known from history
+            "product_code": final_product_code,  # from epic
+            "assigned_team_code": assignee_team_code,  # from assignee's team
+            "assignee": new_assignee if assignee_being_cleared or new_assignee is not None else current_assignee,  # updated (even if cleared) or current
+            "reporter": new_reporter if new_reporter else current_reporter,
+            "work_mode": new_work_mode,
+            "assigned_on": assigned_on,
+            "start_date": new_start_date,
+            "due_date": new_due_date,
+            "closed_on": new_closed_on,
+            "estimated_hours": new_estimated_hours,
+            "max_hours": new_max_hours,
+            "cancelled_by": cancelled_by_hist,
+            "cancelled_at": cancelled_at_hist,
+        }, updated_by, current_time, status_reason=status_reason if status_reason else None)  # cancellation reason when STS010
         logger.info(f"[INFO] Successfully created status history entry with id: {status_hist_id}")
 
+        # Step 12.1: Record the changes in the activity feed
+        previous_snapshot = {
+            "status_code": current_status,
+            "priority_code": current_priority_code,
+            "task_type_code": current_task_type_code,
+            "assignee": current_assignee,
+            "reporter": current_reporter,
+            "assigned_team_code": current_assigned_team_code,
+            "work_mode": current_work_mode,
+            "start_date": current_start_date,
+            "due_date": current_due_date,
+            "estimated_hours": current_estimated_hours,
+        }
+        current_snapshot = {
+            "status_code": final_status_code,
+            "priority_code": new_priority_code,
+            "task_type_code": final_task_type_code_for_hist,
+            "assignee": new_assignee if assignee_being_cleared or new_assignee is not None else current_assignee,
+            "reporter": new_reporter if new_reporter else current_reporter,
+            "assigned_team_code": assignee_team_code,
+            "work_mode": new_work_mode,
+            "start_date": new_start_date,
+            "due_date": new_due_date,
+            "estimated_hours": new_estimated_hours,
+        }
+        events = await task_events(cursor, task_id, final_epic_code_for_hist, previous_snapshot, current_snapshot,
+                                   updated_by, reference_data)
+        await append_activity_events(cursor, events, updated_by, current_time)
+
         # Step 13: Commit transaction
-        conn.commit()
+        await publish_master_data_change(cursor, "epics")
+        await conn.commit()
+        invalidate_master_data("epics")
         logger.info(f"[INFO] Successfully updated task status for task_id: {task_id}")
 
         # Build response with updated fields
@@ -945,8 +906,8 @@ async def update_task(
             
             # Fetch team name for the response
             if new_assigned_team_code:
-                cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assigned_team_code,))
-                team_name_result = cursor.fetchone()
+                await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (new_assigned_team_code,))
+                team_name_result = await cursor.fetchone()
                 if team_name_result:
                     response_data["assigned_team_name"] = team_name_result[0]
                     response_data["task_assigned_team_name"] = team_name_result[0]  # Also include for compatibility
@@ -970,7 +931,7 @@ async def update_task(
         logger.error(f"[ERROR] Database integrity error: {error_msg}")
         logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         
         # Provide more specific error messages for common integrity violations
         if "work_mode" in error_msg.lower() or "chk_tasks_work_mode" in error_msg.lower():
@@ -997,7 +958,7 @@ async def update_task(
         logger.error(f"[ERROR] Database query error: {error_msg}")
         logger.error(f"[ERROR] Full traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Database query failed: {error_msg}"
@@ -1005,13 +966,13 @@ async def update_task(
     except HTTPException:
         # Re-raise HTTP exceptions
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error: {str(e)}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -1019,7 +980,5 @@ async def update_task(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-        logger.info(f"[INFO] Database connection closed for task status update")
+        logger.info(f"[INFO] Database cursor closed for task status update")
 
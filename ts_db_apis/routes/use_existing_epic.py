@@ -1,7 +1,6 @@
 # routes/use_existing_epic.py
 
 import sys
-import os
 sys.path.append('E:\projects\sts_prod_developement')
 
 from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Depends
@@ -9,11 +8,17 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget, UploadTooLarge
+from blob_store import store_upload_blob
+from activity_feed import append_activity_events, epic_events, task_events
+from history_store import write_epic_history, write_task_history
+from reference_registry import check_task_type_code, get_reference_data
+from batch_loader import BatchLoader
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 from typing import List, Optional, Dict
-import uuid
 import traceback
 import json
 from datetime import datetime, timedelta
@@ -22,15 +27,6 @@ from enum import Enum
 config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
-upload_dir = config.get('upload_dir')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -44,20 +40,37 @@ class StatusCode(str, Enum):
     COMPLETED = "STS002"        # Completed
     CANCELLED = "STS010"        # Cancelled
 
-# Task Type Code Enum - Valid values from task_type_master
-class TaskTypeCode(str, Enum):
-    ACCOUNTS = "TT001"              # Accounts
-    DEVELOPMENT = "TT002"           # Development
-    QUALITY_ASSURANCE = "TT003"     # Quality Assurance
-    USER_ACCEPTANCE_TESTING = "TT004"  # User Acceptance Testing
-    PROD_MOVE = "TT005"             # PROD Move
-    DOCUMENTATION = "TT006"         # Documentation
-    DESIGN = "TT007"                # Design
-    CODE_REVIEW = "TT008"           # Code Review
-    MEETING = "TT009"               # Meeting
-    TRAINING = "TT010"              # Training
-    IMPLEMENTATION = "TT011"        # Implementation
-    SUPPORT = "TT012"               # Support
+# Predefined tasks by id (ids may arrive as strings from the JSON form field)
+PREDEFINED_TASK_LOADER = BatchLoader(
+    """
+    SELECT 
+        id, task_title, task_description,
+        status_code, priority_code, work_mode,
+        estimated_hours, max_hours, is_billable, team_code
+    FROM sts_ts.predefined_tasks
+    WHERE id = ANY(%(keys)s::bigint[])
+    """,
+    many=False,
+)
+
+# Latest task already created in an epic for each predefined task
+EXISTING_EPIC_TASK_LOADER = BatchLoader(
+    """
+    SELECT DISTINCT ON (predefined_task_id) predefined_task_id, id,
+        status_code, priority_code, task_type_code, assignee, reporter, assigned_team_code,
+        work_mode, start_date, due_date, estimated_hours
+    FROM sts_ts.tasks
+    WHERE predefined_task_id = ANY(%(keys)s)
+    AND epic_code = %(epic_code)s
+    ORDER BY predefined_task_id, created_at DESC
+    """,
+    many=False,
+)
+
+# Snapshot columns compared for activity feed events, in the order the queries above select them
+EPIC_SNAPSHOT_FIELDS = ("status_code", "priority_code", "product_code", "reporter", "start_date", "due_date", "estimated_hours")
+TASK_SNAPSHOT_FIELDS = ("status_code", "priority_code", "task_type_code", "assignee", "reporter", "assigned_team_code",
+                        "work_mode", "start_date", "due_date", "estimated_hours")
 
 @router.post("/api/v1/timesheet/use_existing_epic")
 async def use_existing_epic(
@@ -80,6 +93,7 @@ async def use_existing_epic(
     task_type_codes: Optional[str] = Form(None, description="JSON string mapping predefined_task_id to task_type_code (TT001-TT012). Example: {'1': 'TT002', '2': 'TT003'}. Key is predefined_task.id, value is task_type_code enum value."),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the epic"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create an epic from a predefined epic template
@@ -92,17 +106,13 @@ async def use_existing_epic(
     """
     logger.info(f"[INFO] Starting epic creation from predefined template {predefined_epic_id}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for epic creation from template")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
 
         # Step 1: Fetch predefined epic template
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 id, title, description,
                 contact_person_code,
@@ -112,7 +122,7 @@ async def use_existing_epic(
             WHERE id = %s AND is_active = true
         """, (predefined_epic_id,))
         
-        template_result = cursor.fetchone()
+        template_result = await cursor.fetchone()
         if not template_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -174,8 +184,8 @@ async def use_existing_epic(
             )
 
         # Step 5: Validate product exists
-        cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (final_product_code,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT product_code FROM sts_new.product_master WHERE product_code = %s", (final_product_code,))
+        if not await cursor.fetchone():
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Product with code {final_product_code} does not exist"
@@ -183,8 +193,8 @@ async def use_existing_epic(
 
         # Step 6: Validate company_code exists (if provided)
         if final_company_code:
-            cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s AND is_inactive = false", (final_company_code,))
-            if not cursor.fetchone():
+            await cursor.execute("SELECT company_code FROM sts_new.company_master WHERE company_code = %s AND is_inactive = false", (final_company_code,))
+            if not await cursor.fetchone():
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
                     detail=f"Company with code {final_company_code} does not exist or is inactive"
@@ -192,11 +202,11 @@ async def use_existing_epic(
 
         # Step 7: Validate contact_person_code exists and belongs to company (if provided)
         if final_contact_person_code:
-            cursor.execute(
+            await cursor.execute(
                 "SELECT contact_person_code, company_code FROM sts_new.contact_master WHERE contact_person_code = %s AND is_inactive = false",
                 (final_contact_person_code,)
             )
-            contact_result = cursor.fetchone()
+            contact_result = await cursor.fetchone()
             if not contact_result:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -219,8 +229,8 @@ async def use_existing_epic(
                 logger.info(f"[INFO] Auto-set company_code to {final_company_code} from contact_person_code {final_contact_person_code}")
 
         # Step 8: Validate priority_code exists
-        cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (final_priority_code,))
-        if not cursor.fetchone():
+        reference_data = await get_reference_data()
+        if final_priority_code not in reference_data.priorities:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Priority code {final_priority_code} does not exist"
@@ -228,12 +238,12 @@ async def use_existing_epic(
 
         # Step 9: Determine reporter (same logic as create_epic.py)
         user_code = current_user['user_code']
-        cursor.execute("""
+        await cursor.execute("""
             SELECT um.designation_name, um.team_code
             FROM sts_new.user_master um
             WHERE um.user_code = %s
         """, (user_code,))
-        user_result = cursor.fetchone()
+        user_result = await cursor.fetchone()
         
         if not user_result:
             raise HTTPException(
@@ -257,13 +267,13 @@ async def use_existing_epic(
             logger.info(f"[INFO] Creator {user_code} is an admin, setting reporter to created_by: {reporter}")
         else:
             # Regular employee: use team lead
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT tm.team_lead
                 FROM sts_new.user_master um
                 LEFT JOIN sts_new.team_master tm ON um.team_code = tm.team_code
                 WHERE um.user_code = %s
             """, (user_code,))
-            team_result = cursor.fetchone()
+            team_result = await cursor.fetchone()
             
             if not team_result or not team_result[0]:
                 raise HTTPException(
@@ -282,15 +292,16 @@ async def use_existing_epic(
 
         # Check if epic with same predefined_epic_id and company_code already exists (most recent one)
         # This ensures we update the correct epic when using the same template for the same company, even if product changes
-        cursor.execute("""
-            SELECT id FROM sts_ts.epics
+        await cursor.execute("""
+            SELECT id, status_code, priority_code, product_code, reporter, start_date, due_date, estimated_hours
+            FROM sts_ts.epics
             WHERE predefined_epic_id = %s
             AND (company_code = %s OR (company_code IS NULL AND %s IS NULL))
             ORDER BY created_at DESC
             LIMIT 1
         """, (predefined_epic_id, final_company_code, final_company_code))
         
-        existing_epic = cursor.fetchone()
+        existing_epic = await cursor.fetchone()
         
         if existing_epic:
             # Update existing epic instead of creating new one (including title, product, dates, hours, etc. if they changed)
@@ -321,7 +332,7 @@ async def use_existing_epic(
                 WHERE id = %s
             """
             
-            cursor.execute(update_query, (
+            await cursor.execute(update_query, (
                 final_epic_title, final_epic_description, final_product_code, final_company_code, final_contact_person_code,
                 reporter, predefined_epic_id, status_code_str, final_priority_code,
                 epic_start_date, epic_due_date, final_estimated_hours, final_max_hours, final_is_billable,
@@ -330,21 +341,27 @@ async def use_existing_epic(
             logger.info(f"[INFO] Epic updated successfully with ID: {new_epic_id}")
             
             # Step 10.2: Insert history entry into epic_hist (when updating)
-            epic_hist_insert_query = """
-                INSERT INTO sts_ts.epic_hist (
-                    epic_code, status_code, product_code, priority_code, start_date, due_date,
-                    estimated_hours, max_hours, reporter, created_by, created_at
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """
-            
-            cursor.execute(epic_hist_insert_query, (
-                new_epic_id, status_code_str, final_product_code, final_priority_code,
-                epic_start_date, epic_due_date, final_estimated_hours, final_max_hours,
-                reporter, created_by, current_time
-            ))
+            await write_epic_history(cursor, new_epic_id, {
+                "status_code": status_code_str,
+                "product_code": final_product_code,
+                "priority_code": final_priority_code,
+                "start_date": epic_start_date,
+                "due_date": epic_due_date,
+                "estimated_hours": final_estimated_hours,
+                "max_hours": final_max_hours,
+                "reporter": reporter,
+            }, created_by, current_time)
             logger.info(f"[INFO] Epic history entry created for update")
+
+            activity_events = await epic_events(
+                cursor, new_epic_id,
+                dict(zip(EPIC_SNAPSHOT_FIELDS, existing_epic[1:])),
+                dict(zip(EPIC_SNAPSHOT_FIELDS, (
+                    status_code_str, final_priority_code, final_product_code, reporter,
+                    epic_start_date, epic_due_date, final_estimated_hours
+                ))),
+                created_by, reference_data
+            )
         else:
             # Create new epic
             epic_insert_query = """
@@ -357,36 +374,34 @@ async def use_existing_epic(
             ) RETURNING id
         """
             
-            cursor.execute(epic_insert_query, (
+            await cursor.execute(epic_insert_query, (
                 final_epic_title, final_epic_description, final_product_code, final_company_code, final_contact_person_code,
                 reporter, status_code_str, final_priority_code, epic_start_date, epic_due_date,
                 final_estimated_hours, final_max_hours, final_is_billable, predefined_epic_id, created_by, current_time
             ))
             
-            epic_result = cursor.fetchone()
+            epic_result = await cursor.fetchone()
             new_epic_id = epic_result[0]
             logger.info(f"[INFO] Epic created successfully with ID: {new_epic_id}")
 
             # Step 10.3: Insert initial history entry into epic_hist (on creation)
-            epic_hist_insert_query = """
-                INSERT INTO sts_ts.epic_hist (
-                    epic_code, status_code, product_code, priority_code, start_date, due_date,
-                    estimated_hours, max_hours, reporter, created_by, created_at
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """
-            
-            cursor.execute(epic_hist_insert_query, (
-                new_epic_id, status_code_str, final_product_code, final_priority_code,
-                epic_start_date, epic_due_date, final_estimated_hours, final_max_hours,
-                reporter, created_by, current_time
-            ))
+            await write_epic_history(cursor, new_epic_id, {
+                "status_code": status_code_str,
+                "product_code": final_product_code,
+                "priority_code": final_priority_code,
+                "start_date": epic_start_date,
+                "due_date": epic_due_date,
+                "estimated_hours": final_estimated_hours,
+                "max_hours": final_max_hours,
+                "reporter": reporter,
+            }, created_by, current_time)
             logger.info(f"[INFO] Initial epic history entry created successfully")
 
+            activity_events = await epic_events(cursor, new_epic_id, None, {}, created_by, reference_data)
+
         # Step 10.1: Fetch epic creation date for task date validation
-        cursor.execute("SELECT created_at::DATE FROM sts_ts.epics WHERE id = %s", (new_epic_id,))
-        epic_created_date_result = cursor.fetchone()
+        await cursor.execute("SELECT created_at::DATE FROM sts_ts.epics WHERE id = %s", (new_epic_id,))
+        epic_created_date_result = await cursor.fetchone()
         epic_created_date = epic_created_date_result[0] if epic_created_date_result else epic_start_date
         logger.info(f"[INFO] Epic creation date: {epic_created_date}")
 
@@ -405,17 +420,8 @@ async def use_existing_epic(
             if len(predefined_task_ids_list) == 0:
                 raise ValueError("predefined_task_ids array cannot be empty. Provide at least one predefined task ID.")
             
-            placeholders = ','.join(['%s'] * len(predefined_task_ids_list))
-            cursor.execute(f"""
-            SELECT 
-                    id, task_title, task_description,
-                    status_code, priority_code, work_mode,
-                    estimated_hours, max_hours, is_billable, team_code
-                FROM sts_ts.predefined_tasks
-                WHERE id IN ({placeholders})
-            ORDER BY id ASC
-            """, tuple(predefined_task_ids_list))
-            predefined_tasks = cursor.fetchall()
+            predefined_tasks_by_id = await PREDEFINED_TASK_LOADER.load_async(cursor, predefined_task_ids_list)
+            predefined_tasks = sorted(predefined_tasks_by_id.values(), key=lambda pt: pt[0])
             
             # Step 12.0.5: Parse new_tasks parameter if provided
             new_tasks_dict = {}
@@ -472,8 +478,8 @@ async def use_existing_epic(
                             task_team_code = None
                             if 'team_code' in task_data and task_data['team_code']:
                                 task_team_code = str(task_data['team_code']).strip()
-                                cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
-                                if not cursor.fetchone():
+                                await cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (task_team_code,))
+                                if not await cursor.fetchone():
                                     raise HTTPException(
                                         status_code=HTTPStatus.BAD_REQUEST,
                                         detail=f"Team code {task_team_code} does not exist or is inactive for task ID {missing_id}"
@@ -483,8 +489,8 @@ async def use_existing_epic(
                             task_assignee = None
                             if 'assignee' in task_data and task_data['assignee']:
                                 task_assignee = str(task_data['assignee']).strip()
-                                cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (task_assignee,))
-                                if not cursor.fetchone():
+                                await cursor.execute("SELECT user_code FROM sts_new.user_master WHERE user_code = %s", (task_assignee,))
+                                if not await cursor.fetchone():
                                     raise HTTPException(
                                         status_code=HTTPStatus.BAD_REQUEST,
                                         detail=f"Assignee user code {task_assignee} does not exist for task ID {missing_id}"
@@ -514,7 +520,7 @@ async def use_existing_epic(
                                 ) RETURNING id, task_title
                             """
                             
-                            cursor.execute(task_insert_query, (
+                            await cursor.execute(task_insert_query, (
                                 task_title,
                                 task_description,
                                 status_code_str,
@@ -530,7 +536,7 @@ async def use_existing_epic(
                                 current_time
                             ))
                             
-                            new_predefined_task_result = cursor.fetchone()
+                            new_predefined_task_result = await cursor.fetchone()
                             new_predefined_task_id = new_predefined_task_result[0]
                             new_predefined_task_title = new_predefined_task_result[1]
                             
@@ -571,17 +577,8 @@ async def use_existing_epic(
                         )
                 
                 # Re-fetch predefined tasks after creating new ones (using updated IDs)
-                placeholders = ','.join(['%s'] * len(predefined_task_ids_list))
-                cursor.execute(f"""
-                    SELECT 
-                        id, task_title, task_description,
-                        status_code, priority_code, work_mode,
-                        estimated_hours, max_hours, is_billable, team_code
-                    FROM sts_ts.predefined_tasks
-                    WHERE id IN ({placeholders})
-                    ORDER BY id ASC
-                """, tuple(predefined_task_ids_list))
-                predefined_tasks = cursor.fetchall()
+                predefined_tasks_by_id = await PREDEFINED_TASK_LOADER.load_async(cursor, predefined_task_ids_list)
+                predefined_tasks = sorted(predefined_tasks_by_id.values(), key=lambda pt: pt[0])
                 logger.info(f"[INFO] Re-fetched predefined tasks after creating new ones. Found {len(predefined_tasks)} tasks. ID mapping: {id_mapping}")
             
             if len(predefined_tasks) == 0:
@@ -676,6 +673,11 @@ async def use_existing_epic(
         # Step 13: Create tasks from predefined tasks
         created_tasks = []
         
+        # Tasks already created in this epic from these predefined tasks, fetched in one query
+        existing_tasks_by_predefined_id = await EXISTING_EPIC_TASK_LOADER.load_async(
+            cursor, [pt[0] for pt in predefined_tasks], {"epic_code": new_epic_id}
+        )
+        
         for pt in predefined_tasks:
             (pt_id, pt_title, pt_description, pt_status, pt_priority, 
              pt_work_mode, 
@@ -765,8 +767,8 @@ async def use_existing_epic(
                     logger.info(f"[INFO] Using provided assignee: {final_assignee} for task '{pt_title}' (predefined_task_id: {pt_id})")
                     
                     # Validate assignee exists in user_master (NOT contact_master)
-                    cursor.execute("SELECT user_code, team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (final_assignee,))
-                    assignee_result = cursor.fetchone()
+                    await cursor.execute("SELECT user_code, team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (final_assignee,))
+                    assignee_result = await cursor.fetchone()
                     if not assignee_result:
                         logger.error(f"[ERROR] Assignee {final_assignee} does not exist in user_master or is inactive. This might be a contact person code. Assignee will be NULL.")
                         final_assignee = None
@@ -787,8 +789,8 @@ async def use_existing_epic(
                     if team_override and str(team_override).strip():
                         final_team_code = str(team_override).strip()
                         # Validate team exists
-                        cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (final_team_code,))
-                        if not cursor.fetchone():
+                        await cursor.execute("SELECT team_code FROM sts_new.team_master WHERE team_code = %s AND is_active = true", (final_team_code,))
+                        if not await cursor.fetchone():
                             logger.warning(f"[WARNING] Team {final_team_code} does not exist or is inactive, setting to NULL")
                             final_team_code = None
                         else:
@@ -802,8 +804,8 @@ async def use_existing_epic(
             
             # Step 13.1.5: ALWAYS use assignee's team code from user_master (overrides any provided team_code)
             if final_assignee:
-                cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (final_assignee,))
-                assignee_team_result = cursor.fetchone()
+                await cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (final_assignee,))
+                assignee_team_result = await cursor.fetchone()
                 if assignee_team_result:
                     final_team_code = assignee_team_result[0]
                     logger.info(f"[INFO] Using assignee {final_assignee}'s team code from user_master for task '{pt_title}': {final_team_code}")
@@ -814,62 +816,26 @@ async def use_existing_epic(
             final_task_type_code = None
             if task_type_codes_dict:
                 # Check if there's a task_type_code override for this predefined task
-                if str(pt_id) in task_type_codes_dict:
-                    task_type_code_override = task_type_codes_dict[str(pt_id)]
-                    if task_type_code_override and str(task_type_code_override).strip():
-                        task_type_code_str = str(task_type_code_override).strip().upper()
-                        # Validate task_type_code is one of the allowed enum values
-                        try:
-                            task_type_code_enum = TaskTypeCode(task_type_code_str)
-                            final_task_type_code = task_type_code_enum.value
-                            logger.info(f"[INFO] Using task_type_code {final_task_type_code} for task '{pt_title}' (predefined_task_id: {pt_id})")
-                        except ValueError:
-                            raise HTTPException(
-                                status_code=HTTPStatus.BAD_REQUEST,
-                                detail=f"Task type code '{task_type_code_str}' is not allowed for predefined_task_id {pt_id}. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
-                            )
-                        # Validate task_type_code exists in database
-                        cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (final_task_type_code,))
-                        if not cursor.fetchone():
-                            raise HTTPException(
-                                status_code=HTTPStatus.BAD_REQUEST,
-                                detail=f"Task type code {final_task_type_code} does not exist or is not active"
-                            )
-                elif pt_id in task_type_codes_dict:
-                    # Also check with integer key (in case JSON parser converts to int)
-                    task_type_code_override = task_type_codes_dict[pt_id]
-                    if task_type_code_override and str(task_type_code_override).strip():
-                        task_type_code_str = str(task_type_code_override).strip().upper()
-                        try:
-                            task_type_code_enum = TaskTypeCode(task_type_code_str)
-                            final_task_type_code = task_type_code_enum.value
-                            logger.info(f"[INFO] Using task_type_code {final_task_type_code} for task '{pt_title}' (predefined_task_id: {pt_id})")
-                        except ValueError:
-                            raise HTTPException(
-                                status_code=HTTPStatus.BAD_REQUEST,
-                                detail=f"Task type code '{task_type_code_str}' is not allowed for predefined_task_id {pt_id}. Allowed values are: TT001-TT012"
-                            )
-                        cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (final_task_type_code,))
-                        if not cursor.fetchone():
-                            raise HTTPException(
-                                status_code=HTTPStatus.BAD_REQUEST,
-                                detail=f"Task type code {final_task_type_code} does not exist or is not active"
-                            )
+                # (with the integer key too, in case the JSON parser converted it)
+                task_type_code_override = task_type_codes_dict.get(str(pt_id), task_type_codes_dict.get(pt_id))
+                if task_type_code_override and str(task_type_code_override).strip():
+                    # Validate task_type_code is an active task type
+                    reference_data = await get_reference_data()
+                    try:
+                        final_task_type_code = check_task_type_code(reference_data, task_type_code_override)
+                    except ValueError as e:
+                        raise HTTPException(
+                            status_code=HTTPStatus.BAD_REQUEST,
+                            detail=f"{str(e).rstrip('.')} (predefined_task_id {pt_id})"
+                        )
+                    logger.info(f"[INFO] Using task_type_code {final_task_type_code} for task '{pt_title}' (predefined_task_id: {pt_id})")
             
             # Step 13.2: Check if task already exists (same predefined_task_id + epic_code) and update, otherwise create new
-            cursor.execute("""
-                SELECT id FROM sts_ts.tasks
-                WHERE predefined_task_id = %s
-                AND epic_code = %s
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (pt_id, new_epic_id))
-            
-            existing_task = cursor.fetchone()
+            existing_task = existing_tasks_by_predefined_id.get(pt_id)
             
             if existing_task:
                 # Update existing task instead of creating new one
-                new_task_id = existing_task[0]
+                new_task_id = existing_task[1]
                 logger.info(f"[INFO] Task with same predefined_task_id {pt_id} and epic_code {new_epic_id} already exists with ID: {new_task_id}, updating instead of creating new")
                 
                 # If status is changing to "In Progress" (STS007), ensure start_date is set to today
@@ -905,7 +871,7 @@ async def use_existing_epic(
                     WHERE id = %s
                 """
                 
-                cursor.execute(task_update_query, (
+                await cursor.execute(task_update_query, (
                     pt_title, pt_description, final_assignee, created_by, final_team_code,
                     pt_status, pt_priority, final_task_type_code, pt_work_mode,
                     update_start_date, update_start_date, task_due_date,
@@ -925,24 +891,32 @@ async def use_existing_epic(
                 })
                 
                 # Create task history entry for update
-                task_hist_insert_query = """
-                    INSERT INTO sts_ts.task_hist (
-                        task_code, status_code, priority_code, task_type_code,
-                        product_code, assigned_team_code, assignee, reporter,
-                        work_mode, assigned_on, start_date, due_date,
-                        estimated_hours, max_hours, created_by, created_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    ) RETURNING id
-                """
-                
-                cursor.execute(task_hist_insert_query, (
-                    new_task_id, pt_status, pt_priority, final_task_type_code,
-                    final_product_code, final_team_code, final_assignee, created_by,
-                    pt_work_mode, task_start_date, task_start_date, task_due_date,
-                    float(pt_estimated_hours), float(pt_max_hours), created_by, current_time
-                ))
+                await write_task_history(cursor, new_task_id, {
+                    "status_code": pt_status,
+                    "priority_code": pt_priority,
+                    "task_type_code": final_task_type_code,
+                    "product_code": final_product_code,
+                    "assigned_team_code": final_team_code,
+                    "assignee": final_assignee,
+                    "reporter": created_by,
+                    "work_mode": pt_work_mode,
+                    "assigned_on": task_start_date,
+                    "start_date": task_start_date,
+                    "due_date": task_due_date,
+                    "estimated_hours": float(pt_estimated_hours),
+                    "max_hours": float(pt_max_hours),
+                }, created_by, current_time)
                 logger.info(f"[INFO] Task history entry created for update")
+
+                activity_events.extend(await task_events(
+                    cursor, new_task_id, new_epic_id,
+                    dict(zip(TASK_SNAPSHOT_FIELDS, existing_task[2:])),
+                    dict(zip(TASK_SNAPSHOT_FIELDS, (
+                        pt_status, pt_priority, final_task_type_code, final_assignee, created_by, final_team_code,
+                        pt_work_mode, update_start_date, task_due_date, pt_estimated_hours
+                    ))),
+                    created_by, reference_data
+                ))
             else:
                 # Create new task
                 task_insert_query = """
@@ -956,7 +930,7 @@ async def use_existing_epic(
                     ) RETURNING id
                 """
                 
-                cursor.execute(task_insert_query, (
+                await cursor.execute(task_insert_query, (
                     pt_title, pt_description, new_epic_id, final_assignee,
                     created_by,  # reporter = created_by for tasks
                     final_team_code, pt_status, pt_priority, final_task_type_code, pt_work_mode,
@@ -966,29 +940,31 @@ async def use_existing_epic(
                     final_product_code, pt_id, created_by, current_time
                 ))
                 
-                task_result = cursor.fetchone()
+                task_result = await cursor.fetchone()
                 new_task_id = task_result[0]
                 logger.info(f"[INFO] Task '{pt_title}' created successfully with ID: {new_task_id}")
                 
                 # Create initial task history entry
-                task_hist_insert_query = """
-                    INSERT INTO sts_ts.task_hist (
-                        task_code, status_code, priority_code, task_type_code,
-                        product_code, assigned_team_code, assignee, reporter,
-                        work_mode, assigned_on, start_date, due_date,
-                        estimated_hours, max_hours, created_by, created_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    ) RETURNING id
-                """
-                
-                cursor.execute(task_hist_insert_query, (
-                    new_task_id, pt_status, pt_priority, final_task_type_code,
-                    final_product_code, final_team_code, final_assignee, created_by,
-                    pt_work_mode, task_start_date, task_start_date, task_due_date,
-                    float(pt_estimated_hours), float(pt_max_hours), created_by, current_time
-                ))
+                await write_task_history(cursor, new_task_id, {
+                    "status_code": pt_status,
+                    "priority_code": pt_priority,
+                    "task_type_code": final_task_type_code,
+                    "product_code": final_product_code,
+                    "assigned_team_code": final_team_code,
+                    "assignee": final_assignee,
+                    "reporter": created_by,
+                    "work_mode": pt_work_mode,
+                    "assigned_on": task_start_date,
+                    "start_date": task_start_date,
+                    "due_date": task_due_date,
+                    "estimated_hours": float(pt_estimated_hours),
+                    "max_hours": float(pt_max_hours),
+                }, created_by, current_time)
                 logger.info(f"[INFO] Initial task history entry created successfully")
+
+                activity_events.extend(await task_events(
+                    cursor, new_task_id, new_epic_id, None, {"assignee": final_assignee}, created_by, reference_data
+                ))
             
             created_tasks.append({
                 "id": new_task_id,
@@ -1001,69 +977,77 @@ async def use_existing_epic(
             
             # Note: usage_count column has been removed from predefined_tasks table
 
+        # Step 13.3: Record the epic and task changes in the activity feed
+        await append_activity_events(cursor, activity_events, created_by, current_time)
+
         # Step 14: Handle epic attachments (similar to create_epic.py)
         epic_attachments = []
         if attachments:
+            upload_budget = UploadBudget()
             for attachment in attachments:
+                # Store file by content (identical files are stored once); the 10MB per-file and
+                # 50MB total limits abort the request as soon as they are crossed
                 try:
-                    # Generate unique filename
-                    file_extension = os.path.splitext(attachment.filename)[1] if attachment.filename else ""
-                    unique_filename = f"{uuid.uuid4()}{file_extension}"
-                    file_path = os.path.join(upload_dir, unique_filename)
-                    
-                    # Save file
-                    os.makedirs(upload_dir, exist_ok=True)
-                    with open(file_path, "wb") as f:
-                        content = await attachment.read()
-                        f.write(content)
-                    
-                    # Generate public URL
-                    file_url = f"{base_url}/files/{unique_filename}" if base_url else None
-                    
-                    # Get file size
-                    file_size = len(content)
-                    file_size_str = format_file_size(file_size)
-                    
-                    # Insert attachment record
-                    attachment_insert_query = """
-                        INSERT INTO sts_ts.attachments (
-                            parent_type, parent_code, file_name, file_path, file_url,
-                            file_type, file_size, purpose, created_by, created_at
-                        ) VALUES (
-                            'EPIC', %s, %s, %s, %s, %s, %s, 'EPIC_ATTACHMENT', %s, %s
-                        ) RETURNING id
-                    """
-                    
-                    cursor.execute(attachment_insert_query, (
-                        new_epic_id, attachment.filename, file_path, file_url,
-                        attachment.content_type or "application/octet-stream",
-                        file_size_str, created_by, current_time
-                    ))
-                    
-                    attachment_result = cursor.fetchone()
-                    attachment_id = attachment_result[0]
-                    
-                    epic_attachments.append({
-                        "id": attachment_id,
-                        "file_name": attachment.filename,
-                        "file_path": file_path,
-                        "file_url": file_url,
-                        "file_type": attachment.content_type,
-                        "file_size": file_size_str,
-                    })
-                    logger.info(f"[INFO] Attachment '{attachment.filename}' saved successfully for epic {new_epic_id}")
+                    stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
+                except UploadTooLarge as e:
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST,
+                        detail=str(e)
+                    )
+                except psycopg2.Error:
+                    # The blob bookkeeping runs on this transaction: roll the whole request back
+                    raise
                 except Exception as e:
-                    logger.error(f"[ERROR] Error saving attachment {attachment.filename}: {str(e)}")
-                    # Continue with other attachments even if one fails
+                    logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST,
+                        detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
+                    )
+                
+                # Get file size
+                file_size = stored_blob.size
+                file_path, file_url = stored_blob.file_path, stored_blob.file_url
+                file_size_str = format_file_size(file_size)
+                
+                # Insert attachment record
+                attachment_insert_query = """
+                    INSERT INTO sts_ts.attachments (
+                        parent_type, parent_code, file_name, file_path, file_url,
+                        file_type, file_size, purpose, blob_sha256, created_by, created_at
+                    ) VALUES (
+                        'EPIC', %s, %s, %s, %s, %s, %s, 'EPIC_ATTACHMENT', %s, %s, %s
+                    ) RETURNING id
+                """
+                
+                await cursor.execute(attachment_insert_query, (
+                    new_epic_id, attachment.filename, file_path, file_url,
+                    attachment.content_type or "application/octet-stream",
+                    file_size_str, stored_blob.sha256, created_by, current_time
+                ))
+                
+                attachment_result = await cursor.fetchone()
+                attachment_id = attachment_result[0]
+                
+                epic_attachments.append({
+                    "id": attachment_id,
+                    "file_name": attachment.filename,
+                    "file_path": file_path,
+                    "file_url": file_url,
+                    "file_type": attachment.content_type,
+                    "file_size": file_size_str,
+                })
+                logger.info(f"[INFO] Attachment '{attachment.filename}' saved successfully for epic {new_epic_id}")
 
         # Note: usage_count column has been removed from predefined_epics table
 
         # Commit all changes
-        conn.commit()
+        await publish_master_data_change(cursor, "epics", "predefined_tasks")
+        await conn.commit()
+        invalidate_master_data("epics", "predefined_tasks")
         logger.info(f"[INFO] Epic and tasks created successfully from predefined template {predefined_epic_id}")
 
         # Step 16: Fetch created epic data for response
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 e.id, e.epic_title, e.epic_description,
                 e.product_code, pm.product_name,
@@ -1085,7 +1069,7 @@ async def use_existing_epic(
             WHERE e.id = %s
         """, (new_epic_id,))
         
-        epic_data = cursor.fetchone()
+        epic_data = await cursor.fetchone()
         
         if not epic_data:
             raise HTTPException(
@@ -1155,11 +1139,11 @@ async def use_existing_epic(
 
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except psycopg2.IntegrityError as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Database integrity error: {error_msg}")
         raise HTTPException(
@@ -1168,7 +1152,7 @@ async def use_existing_epic(
         )
     except Exception as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Unexpected error: {error_msg}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
@@ -1179,7 +1163,4 @@ async def use_existing_epic(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for epic creation from template")
 
@@ -1,7 +1,6 @@
 # routes/use_existing_task.py
 
 import sys
-import os
 sys.path.append('E:\projects\sts_prod_developement')
 
 from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Depends
@@ -9,11 +8,17 @@ from auth.jwt_handler import verify_token
 from http import HTTPStatus
 from helper_functions import get_current_time_ist, parse_date, format_file_size
 import psycopg2
-from utils.connect_to_psql import connect_to_psql
+from async_db import get_async_db_connection
+from upload_pipeline import UploadBudget, UploadTooLarge
+from blob_store import store_upload_blob
+from activity_feed import append_activity_events, task_events
+from history_store import write_task_history
+from reference_validation import resolve_references
+from reference_registry import check_task_type_code, get_reference_data
+from master_data_cache import invalidate_master_data, publish_master_data_change
 from config import load_config
 from utils.logger import get_logger
 from typing import List, Optional, Dict
-import uuid
 import traceback
 from datetime import datetime, timedelta
 from enum import Enum
@@ -21,15 +26,6 @@ from enum import Enum
 config = load_config()
 log_dir = config.get('log_dir')
 log_file_name = config.get('log_file_name')
-upload_dir = config.get('upload_dir')
-base_url = config.get('base_url')
-
-host = config.get('host')
-port = config.get('port')
-username = config.get('username')
-password = config.get('password')
-database_name = config.get('database_name')
-schema_name = config.get('primary_schema')
 
 router = APIRouter()
 
@@ -49,20 +45,6 @@ class WorkMode(str, Enum):
     ON_SITE = "ON_SITE"
     OFFICE = "OFFICE"
 
-# Task Type Code Enum - Valid values from task_type_master
-class TaskTypeCode(str, Enum):
-    ACCOUNTS = "TT001"              # Accounts
-    DEVELOPMENT = "TT002"           # Development
-    QUALITY_ASSURANCE = "TT003"     # Quality Assurance
-    USER_ACCEPTANCE_TESTING = "TT004"  # User Acceptance Testing
-    PROD_MOVE = "TT005"             # PROD Move
-    DOCUMENTATION = "TT006"         # Documentation
-    DESIGN = "TT007"                # Design
-    CODE_REVIEW = "TT008"           # Code Review
-    MEETING = "TT009"               # Meeting
-    TRAINING = "TT010"              # Training
-    IMPLEMENTATION = "TT011"        # Implementation
-    SUPPORT = "TT012"               # Support
 
 @router.post("/api/v1/timesheet/use_existing_task")
 async def use_existing_task(
@@ -74,7 +56,7 @@ async def use_existing_task(
     assigned_team_code: Optional[str] = Form(None, description="Team code (overrides template default)"),
     status_code: Optional[StatusCode] = Form(None, description="Status code (overrides template default)"),
     priority_code: Optional[int] = Form(None, description="Priority code (overrides template default)"),
-    task_type_code: Optional[TaskTypeCode] = Form(None, description="Task type code (TT001-TT012) - optional"),
+    task_type_code: Optional[str] = Form(None, description="Task type code (active code from task_type_master, e.g. TT002) - optional"),
     work_mode: Optional[WorkMode] = Form(None, description="Work mode (overrides template default)"),
     start_date: Optional[str] = Form(None, description="Start date in DD-MM-YYYY or YYYY-MM-DD format (optional - will use template date or epic start)"),
     due_date: Optional[str] = Form(None, description="Due date in DD-MM-YYYY or YYYY-MM-DD format (optional - will use template date or epic due)"),
@@ -83,6 +65,7 @@ async def use_existing_task(
     is_billable: Optional[bool] = Form(None, description="Billable status (overrides template default)"),
     attachments: List[UploadFile] = File(default=[], description="File attachments for the task"),
     current_user: dict = Depends(verify_token),
+    conn=Depends(get_async_db_connection),
 ):
     """
     Create an actual task from a predefined task template
@@ -94,45 +77,35 @@ async def use_existing_task(
     """
     logger.info(f"[INFO] Starting task creation from predefined template {predefined_task_id}, epic: {epic_code}, user: {current_user['user_code']}")
     
-    conn = None
     cursor = None
 
     try:
-        logger.info(f"[INFO] Establishing database connection for task creation from template")
-        conn = connect_to_psql(host, port, username, password, database_name, schema_name)
         cursor = conn.cursor()
-        logger.info(f"[INFO] Database connection established successfully")
-
-        # Step 1: Validate epic exists and is an actual epic (not predefined)
-        cursor.execute("""
-            SELECT id, epic_title, start_date, due_date, closed_on, status_code, product_code
-            FROM sts_ts.epics
-            WHERE id = %s
-        """, (epic_code,))
-        
-        epic_result = cursor.fetchone()
+
+        # Step 1: Resolve the epic, template and assignee in one query;
+        # priority, status and task type codes are checked against the in-memory reference registry
+        final_assignee = assignee.strip() if assignee and assignee.strip() else None
+        references = await resolve_references(cursor, {
+            "epic": ("epic", epic_code),
+            "template": ("predefined_task", predefined_task_id),
+            "assignee": ("user", final_assignee),
+        })
+        reference_data = await get_reference_data()
+
+        # Validate epic exists and is an actual epic (not predefined)
+        epic_result = references["epic"]
         if not epic_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"Epic with ID {epic_code} does not exist"
             )
         
-        epic_title, epic_start_date, epic_due_date, epic_closed_on, epic_status_code, epic_product_code = epic_result[1], epic_result[2], epic_result[3], epic_result[4], epic_result[5], epic_result[6]
+        epic_title, epic_start_date, epic_due_date, epic_closed_on, epic_created_date, epic_status_code, epic_product_code = epic_result[1:]
         logger.info(f"[INFO] Epic found: {epic_title}, Start: {epic_start_date}, Due: {epic_due_date}, Product: {epic_product_code}")
 
         # Step 2: Fetch predefined task template
         # Note: predefined_tasks table does not have start_date or due_date columns
-        cursor.execute("""
-            SELECT 
-                id, task_title, task_description,
-                status_code, priority_code,
-                work_mode,
-                estimated_hours, max_hours, is_billable, team_code
-            FROM sts_ts.predefined_tasks
-            WHERE id = %s
-        """, (predefined_task_id,))
-        
-        template_result = cursor.fetchone()
+        template_result = references["template"]
         if not template_result:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
@@ -154,12 +127,9 @@ async def use_existing_task(
         final_team_code = assigned_team_code.strip() if assigned_team_code and assigned_team_code.strip() else (pt_team_code if pt_team_code else None)
         final_status_code = status_code.value if status_code else pt_status
         final_priority_code = priority_code if priority_code is not None else pt_priority
-        # Convert task_type_code enum to string if provided
+        # Normalize task_type_code if provided
         if task_type_code:
-            if isinstance(task_type_code, TaskTypeCode):
-                final_task_type_code = task_type_code.value
-            else:
-                final_task_type_code = str(task_type_code).upper()
+            final_task_type_code = str(task_type_code).strip().upper()
         else:
             final_task_type_code = None
         final_work_mode = work_mode.value if work_mode else pt_work_mode
@@ -176,45 +146,32 @@ async def use_existing_task(
             )
 
         # Step 7: Validate priority_code exists
-        cursor.execute("SELECT priority_code FROM sts_new.tkt_priority_master WHERE priority_code = %s", (final_priority_code,))
-        if not cursor.fetchone():
+        if final_priority_code not in reference_data.priorities:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Priority code {final_priority_code} does not exist"
             )
 
         # Step 8: Validate status_code exists
-        cursor.execute("SELECT status_code FROM sts_new.status_master WHERE status_code = %s", (final_status_code,))
-        if not cursor.fetchone():
+        if final_status_code not in reference_data.statuses:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=f"Status code {final_status_code} does not exist"
             )
 
-        # Step 8.1: Validate task_type_code exists if provided
+        # Step 8.1: Validate task_type_code is an active task type if provided
         if final_task_type_code:
-            # Validate task_type_code is one of the allowed enum values
             try:
-                task_type_code_enum = TaskTypeCode(final_task_type_code)
-                final_task_type_code = task_type_code_enum.value
-            except ValueError:
-                raise HTTPException(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code '{final_task_type_code}' is not allowed. Allowed values are: TT001 (Accounts), TT002 (Development), TT003 (Quality Assurance), TT004 (User Acceptance Testing), TT005 (PROD Move), TT006 (Documentation), TT007 (Design), TT008 (Code Review), TT009 (Meeting), TT010 (Training), TT011 (Implementation), TT012 (Support)"
-                )
-            
-            cursor.execute("SELECT type_code FROM sts_ts.task_type_master WHERE type_code = %s AND is_active = true", (final_task_type_code,))
-            if not cursor.fetchone():
+                final_task_type_code = check_task_type_code(reference_data, final_task_type_code)
+            except ValueError as e:
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
-                    detail=f"Task type code {final_task_type_code} does not exist or is not active"
+                    detail=str(e)
                 )
 
         # Step 9: Parse and validate dates
-        # Get epic creation date for validation
-        cursor.execute("SELECT created_at::DATE FROM sts_ts.epics WHERE id = %s", (epic_code,))
-        epic_created_date_result = cursor.fetchone()
-        epic_created_date = epic_created_date_result[0] if epic_created_date_result else epic_start_date
+        # Epic creation date for validation comes with the epic lookup
+        epic_created_date = epic_created_date or epic_start_date
 
         # Calculate task dates
         current_time = get_current_time_ist()
@@ -302,9 +259,8 @@ async def use_existing_task(
             logger.info(f"[INFO] Using provided assignee: {final_assignee}")
             
             # Validate assignee exists in user_master (NOT contact_master)
-            cursor.execute("SELECT user_code, team_code FROM sts_new.user_master WHERE user_code = %s AND is_inactive = false", (final_assignee,))
-            assignee_result = cursor.fetchone()
-            if not assignee_result:
+            assignee_result = references["assignee"]
+            if not assignee_result or assignee_result[2]:
                 logger.error(f"[ERROR] Assignee {final_assignee} does not exist in user_master or is inactive. This might be a contact person code.")
                 raise HTTPException(
                     status_code=HTTPStatus.BAD_REQUEST,
@@ -313,12 +269,12 @@ async def use_existing_task(
             assignee_team = assignee_result[1]
             if final_team_code and assignee_team != final_team_code:
                 # Get team names for better error message
-                cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (final_team_code,))
-                task_team_result = cursor.fetchone()
+                await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (final_team_code,))
+                task_team_result = await cursor.fetchone()
                 task_team_name = task_team_result[0] if task_team_result else final_team_code
                 
-                cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (assignee_team,))
-                assignee_team_result_name = cursor.fetchone()
+                await cursor.execute("SELECT team_name FROM sts_new.team_master WHERE team_code = %s", (assignee_team,))
+                assignee_team_result_name = await cursor.fetchone()
                 assignee_team_name = assignee_team_result_name[0] if assignee_team_result_name else assignee_team
                 
                 raise HTTPException(
@@ -344,24 +300,25 @@ async def use_existing_task(
 
         # Step 12.1: ALWAYS use assignee's team code from user_master
         if final_assignee:
-            cursor.execute("SELECT team_code FROM sts_new.user_master WHERE user_code = %s", (final_assignee,))
-            assignee_team_result = cursor.fetchone()
+            assignee_team_result = references["assignee"]
             if assignee_team_result:
-                final_team_code = assignee_team_result[0]
+                final_team_code = assignee_team_result[1]
                 logger.info(f"[INFO] Using assignee {final_assignee}'s team code from user_master: {final_team_code}")
             else:
                 logger.warning(f"[WARNING] Could not find team code for assignee {final_assignee} in user_master; assigned_team_code will be NULL")
 
         # Step 12.2: Check if task already exists (same predefined_task_id + epic_code) and update, otherwise create new
-        cursor.execute("""
-            SELECT id FROM sts_ts.tasks
+        await cursor.execute("""
+            SELECT id, status_code, priority_code, task_type_code, assignee, reporter, assigned_team_code,
+                   work_mode, start_date, due_date, estimated_hours
+            FROM sts_ts.tasks
             WHERE predefined_task_id = %s
             AND epic_code = %s
             ORDER BY created_at DESC
             LIMIT 1
         """, (predefined_task_id, epic_code))
         
-        existing_task = cursor.fetchone()
+        existing_task = await cursor.fetchone()
         
         if existing_task:
             # Update existing task instead of creating new one
@@ -401,7 +358,7 @@ async def use_existing_task(
                 WHERE id = %s
             """
             
-            cursor.execute(task_update_query, (
+            await cursor.execute(task_update_query, (
                 final_task_title, final_task_description, final_assignee, reporter, final_team_code,
                 final_status_code, final_priority_code, final_task_type_code, final_work_mode,
                 update_start_date, update_start_date, task_due_date,
@@ -411,24 +368,42 @@ async def use_existing_task(
             logger.info(f"[INFO] Task updated successfully with ID: {new_task_id}")
             
             # Create task history entry for update
-            task_hist_insert_query = """
-                INSERT INTO sts_ts.task_hist (
-                    task_code, status_code, priority_code, task_type_code,
-                    product_code, assigned_team_code, assignee, reporter,
-                    work_mode, assigned_on, start_date, due_date,
-                    estimated_hours, max_hours, created_by, created_at
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """
-            
-            cursor.execute(task_hist_insert_query, (
-                new_task_id, final_status_code, final_priority_code, final_task_type_code,
-                epic_product_code, final_team_code, final_assignee, reporter,
-                final_work_mode, update_start_date, update_start_date, task_due_date,
-                final_estimated_hours, final_max_hours, created_by, current_time
-            ))
+            await write_task_history(cursor, new_task_id, {
+                "status_code": final_status_code,
+                "priority_code": final_priority_code,
+                "task_type_code": final_task_type_code,
+                "product_code": epic_product_code,
+                "assigned_team_code": final_team_code,
+                "assignee": final_assignee,
+                "reporter": reporter,
+                "work_mode": final_work_mode,
+                "assigned_on": update_start_date,
+                "start_date": update_start_date,
+                "due_date": task_due_date,
+                "estimated_hours": final_estimated_hours,
+                "max_hours": final_max_hours,
+            }, created_by, current_time)
             logger.info(f"[INFO] Task history entry created for update")
+
+            previous_snapshot = dict(zip(
+                ("status_code", "priority_code", "task_type_code", "assignee", "reporter", "assigned_team_code",
+                 "work_mode", "start_date", "due_date", "estimated_hours"),
+                existing_task[1:]
+            ))
+            current_snapshot = {
+                "status_code": final_status_code,
+                "priority_code": final_priority_code,
+                "task_type_code": final_task_type_code,
+                "assignee": final_assignee,
+                "reporter": reporter,
+                "assigned_team_code": final_team_code,
+                "work_mode": final_work_mode,
+                "start_date": update_start_date,
+                "due_date": task_due_date,
+                "estimated_hours": final_estimated_hours,
+            }
+            events = await task_events(cursor, new_task_id, epic_code, previous_snapshot, current_snapshot,
+                                       created_by, reference_data)
         else:
             # Create new task
             task_insert_query = """
@@ -442,7 +417,7 @@ async def use_existing_task(
                 ) RETURNING id
             """
             
-            cursor.execute(task_insert_query, (
+            await cursor.execute(task_insert_query, (
                 final_task_title, final_task_description, epic_code, final_assignee,
                 reporter, final_team_code, final_status_code, final_priority_code, final_task_type_code, final_work_mode,
                 task_start_date,  # assigned_on = start_date
@@ -451,91 +426,100 @@ async def use_existing_task(
                 epic_product_code, predefined_task_id, created_by, current_time
             ))
             
-            task_result = cursor.fetchone()
+            task_result = await cursor.fetchone()
             new_task_id = task_result[0]
             logger.info(f"[INFO] Task created successfully with ID: {new_task_id}")
 
             # Create initial task history entry
-            task_hist_insert_query = """
-                INSERT INTO sts_ts.task_hist (
-                    task_code, status_code, priority_code, task_type_code,
-                    product_code, assigned_team_code, assignee, reporter,
-                    work_mode, assigned_on, start_date, due_date,
-                    estimated_hours, max_hours, created_by, created_at
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """
-            
-            cursor.execute(task_hist_insert_query, (
-                new_task_id, final_status_code, final_priority_code, final_task_type_code,
-                epic_product_code, final_team_code, final_assignee, reporter,
-                final_work_mode, task_start_date, task_start_date, task_due_date,
-                final_estimated_hours, final_max_hours, created_by, current_time
-            ))
+            await write_task_history(cursor, new_task_id, {
+                "status_code": final_status_code,
+                "priority_code": final_priority_code,
+                "task_type_code": final_task_type_code,
+                "product_code": epic_product_code,
+                "assigned_team_code": final_team_code,
+                "assignee": final_assignee,
+                "reporter": reporter,
+                "work_mode": final_work_mode,
+                "assigned_on": task_start_date,
+                "start_date": task_start_date,
+                "due_date": task_due_date,
+                "estimated_hours": final_estimated_hours,
+                "max_hours": final_max_hours,
+            }, created_by, current_time)
             logger.info(f"[INFO] Initial task history entry created successfully")
 
+            events = await task_events(cursor, new_task_id, epic_code, None, {"assignee": final_assignee},
+                                       created_by, reference_data)
+
+        # Step 12.3: Record the task changes in the activity feed
+        await append_activity_events(cursor, events, created_by, current_time)
+
         # Step 14: Handle task attachments
         task_attachments = []
         if attachments:
+            upload_budget = UploadBudget()
             for attachment in attachments:
+                # Store file by content (identical files are stored once); the 10MB per-file and
+                # 50MB total limits abort the request as soon as they are crossed
                 try:
-                    # Generate unique filename
-                    file_extension = os.path.splitext(attachment.filename)[1] if attachment.filename else ""
-                    unique_filename = f"{uuid.uuid4()}{file_extension}"
-                    file_path = os.path.join(upload_dir, unique_filename)
-                    
-                    # Save file
-                    os.makedirs(upload_dir, exist_ok=True)
-                    with open(file_path, "wb") as f:
-                        content = await attachment.read()
-                        f.write(content)
-                    
-                    # Generate public URL
-                    file_url = f"{base_url}/files/{unique_filename}" if base_url else None
-                    
-                    # Get file size
-                    file_size = len(content)
-                    file_size_str = format_file_size(file_size)
-                    
-                    # Insert attachment record
-                    attachment_insert_query = """
-                        INSERT INTO sts_ts.attachments (
-                            parent_type, parent_code, file_name, file_path, file_url,
-                            file_type, file_size, purpose, created_by, created_at
-                        ) VALUES (
-                            'TASK', %s, %s, %s, %s, %s, %s, 'TASK_ATTACHMENT', %s, %s
-                        ) RETURNING id
-                    """
-                    
-                    cursor.execute(attachment_insert_query, (
-                        new_task_id, attachment.filename, file_path, file_url,
-                        attachment.content_type or "application/octet-stream",
-                        file_size_str, created_by, current_time
-                    ))
-                    
-                    attachment_result = cursor.fetchone()
-                    attachment_id = attachment_result[0]
-                    
-                    task_attachments.append({
-                        "id": attachment_id,
-                        "file_name": attachment.filename,
-                        "file_path": file_path,
-                        "file_url": file_url,
-                        "file_type": attachment.content_type,
-                        "file_size": file_size_str,
-                    })
-                    logger.info(f"[INFO] Attachment '{attachment.filename}' saved successfully for task {new_task_id}")
+                    stored_blob = await store_upload_blob(cursor, attachment, upload_budget)
+                except UploadTooLarge as e:
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST,
+                        detail=str(e)
+                    )
+                except psycopg2.Error:
+                    # The blob bookkeeping runs on this transaction: roll the whole request back
+                    raise
                 except Exception as e:
-                    logger.error(f"[ERROR] Error saving attachment {attachment.filename}: {str(e)}")
-                    # Continue with other attachments even if one fails
+                    logger.error(f"[ERROR] Failed to save file {attachment.filename}: {str(e)}")
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST,
+                        detail=f"Failed to save file '{attachment.filename}'. Error: {str(e)}"
+                    )
+                
+                # Get file size
+                file_size = stored_blob.size
+                file_path, file_url = stored_blob.file_path, stored_blob.file_url
+                file_size_str = format_file_size(file_size)
+                
+                # Insert attachment record
+                attachment_insert_query = """
+                    INSERT INTO sts_ts.attachments (
+                        parent_type, parent_code, file_name, file_path, file_url,
+                        file_type, file_size, purpose, blob_sha256, created_by, created_at
+                    ) VALUES (
+                        'TASK', %s, %s, %s, %s, %s, %s, 'TASK_ATTACHMENT', %s, %s, %s
+                    ) RETURNING id
+                """
+                
+                await cursor.execute(attachment_insert_query, (
+                    new_task_id, attachment.filename, file_path, file_url,
+                    attachment.content_type or "application/octet-stream",
+                    file_size_str, stored_blob.sha256, created_by, current_time
+                ))
+                
+                attachment_result = await cursor.fetchone()
+                attachment_id = attachment_result[0]
+                
+                task_attachments.append({
+                    "id": attachment_id,
+                    "file_name": attachment.filename,
+                    "file_path": file_path,
+                    "file_url": file_url,
+                    "file_type": attachment.content_type,
+                    "file_size": file_size_str,
+                })
+                logger.info(f"[INFO] Attachment '{attachment.filename}' saved successfully for task {new_task_id}")
 
         # Commit all changes
-        conn.commit()
+        await publish_master_data_change(cursor, "epics")
+        await conn.commit()
+        invalidate_master_data("epics")
         logger.info(f"[INFO] Task created successfully from predefined template {predefined_task_id}")
 
         # Step 15: Fetch created task data for response
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 t.id, t.task_title, t.description, t.epic_code,
                 t.assignee, um_assignee.user_name AS assignee_name,
@@ -557,7 +541,7 @@ async def use_existing_task(
             WHERE t.id = %s
         """, (new_task_id,))
         
-        task_data = cursor.fetchone()
+        task_data = await cursor.fetchone()
         
         if not task_data:
             raise HTTPException(
@@ -599,7 +583,7 @@ async def use_existing_task(
         # Note: usage_count column has been removed from predefined_tasks table
 
         # Commit all changes
-        conn.commit()
+        await conn.commit()
         logger.info(f"[INFO] Task creation from predefined template completed successfully")
         
         return {
@@ -612,11 +596,11 @@ async def use_existing_task(
 
     except HTTPException:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         raise
     except psycopg2.IntegrityError as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Database integrity error: {error_msg}")
         raise HTTPException(
@@ -625,7 +609,7 @@ async def use_existing_task(
         )
     except Exception as e:
         if conn:
-            conn.rollback()
+            await conn.rollback()
         error_msg = str(e)
         logger.error(f"[ERROR] Unexpected error: {error_msg}")
         logger.error(f"[ERROR] Traceback: {traceback.format_exc()}")
@@ -636,7 +620,4 @@ async def use_existing_task(
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-            logger.info(f"[INFO] Database connection closed for task creation from template")
 
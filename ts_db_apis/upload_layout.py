@@ -0,0 +1,386 @@
+# upload_layout.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import argparse
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
+from psycopg2.extras import execute_values
+from starlette.exceptions import HTTPException
+
+from blob_store import BLOB_DIR, blob_file_path, blob_file_url, blob_relative_path, derivative_owner, remove_with_derivatives
+from config import load_config
+from db_pool import close_pool, get_connection, release_connection
+from file_delivery import PERSONAL_PARENT_TYPES
+from upload_pipeline import UPLOAD_CHUNK_SIZE
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+UPLOAD_DIR = config.get('upload_dir')
+
+# Relocated paths looked up by the /files resolver, kept per worker (relocations never change)
+RELOCATION_CACHE_SIZE = 10000
+_relocation_cache: Dict[str, str] = {}
+
+
+class MigrationStats(NamedTuple):
+    attachments: int  # attachments rows moved onto the sharded blob store
+    blobs: int  # blobs moved from the flat blob directory into their shard
+    deduplicated: int  # files dropped because the same content was already stored
+    missing: int  # attachments whose file was not on disk (left as they are)
+
+
+def _relative_to_upload_dir(file_path: Optional[str]) -> Optional[str]:
+    """Path of a stored file under upload_dir, or None if it is not in it."""
+    if not file_path:
+        return None
+    relative_path = os.path.relpath(file_path, UPLOAD_DIR).replace('\\', '/')
+    if relative_path.startswith('../') or relative_path == '..':
+        return None
+    return relative_path
+
+
+def _hash_file(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(UPLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _link_into_place(old_relative_path: str, new_relative_path: str) -> None:
+    """
+    Make the file also reachable at its new path. A hard link keeps the old path valid until
+    the rows pointing at it are committed; the new mtime keeps blob garbage collection off it.
+    """
+    new_path = blob_file_path(new_relative_path)
+    os.makedirs(os.path.dirname(new_path), 0o755, exist_ok=True)
+    try:
+        os.link(blob_file_path(old_relative_path), new_path)
+    except FileExistsError:
+        pass
+    os.utime(new_path)
+
+
+def _unlink_old_files(relative_paths: List[str]) -> None:
+    # Thumbnails / previews of the old file go too; moved images are queued to be rendered again
+    for relative_path in relative_paths:
+        remove_with_derivatives(blob_file_path(relative_path))
+
+
+def _record_relocations(cursor, relocations: List[tuple]) -> None:
+    execute_values(cursor, """
+        INSERT INTO sts_ts.attachment_relocations (old_relative_path, new_relative_path)
+        VALUES %s
+        ON CONFLICT (old_relative_path) DO UPDATE SET new_relative_path = EXCLUDED.new_relative_path
+    """, relocations, page_size=1000)
+
+
+def _migrate_attachment_batch(conn, cursor, after_id: int, batch_size: int):
+    """Move one batch of pre-blob-store attachments onto sharded blobs. Returns (last id, stats) or None when done."""
+    cursor.execute("""
+        SELECT id, file_path
+        FROM sts_ts.attachments
+        WHERE blob_sha256 IS NULL AND id > %s
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (after_id, batch_size))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    moved_rows = []  # (attachment id, sha256)
+    relocations = {}  # old relative path -> sha256, then -> new relative path once the blobs are registered
+    blobs = {}  # sha256 -> (relative path, size)
+    missing = 0
+    for attachment_id, file_path in rows:
+        old_relative_path = _relative_to_upload_dir(file_path)
+        if old_relative_path is None or old_relative_path.startswith(BLOB_DIR + '/') or not os.path.isfile(file_path):
+            missing += 1
+            logger.warning(f"[WARNING] Attachment {attachment_id} file not found in upload_dir, left as is: {file_path}")
+            continue
+        sha256 = _hash_file(file_path)
+        blobs.setdefault(sha256, (blob_relative_path(sha256, os.path.splitext(old_relative_path)[1]), os.path.getsize(file_path)))
+        relocations[old_relative_path] = sha256
+        moved_rows.append((attachment_id, sha256))
+
+    # Register the blobs; content that is already stored keeps its existing file
+    stored_paths = {}
+    if blobs:
+        stored = execute_values(cursor, """
+            INSERT INTO sts_ts.attachment_blobs (sha256, relative_path, file_size)
+            VALUES %s
+            ON CONFLICT (sha256) DO UPDATE SET last_referenced_at = now()
+            RETURNING sha256, relative_path
+        """, [(sha256, relative_path, size) for sha256, (relative_path, size) in blobs.items()], fetch=True)
+        stored_paths = dict(stored)
+
+    deduplicated = 0
+    linked = set()
+    for old_relative_path, sha256 in relocations.items():
+        new_relative_path = stored_paths[sha256]
+        if not os.path.exists(blob_file_path(new_relative_path)) and sha256 not in linked:
+            _link_into_place(old_relative_path, new_relative_path)
+            linked.add(sha256)
+        else:
+            deduplicated += 1
+        relocations[old_relative_path] = new_relative_path
+
+    if moved_rows:
+        execute_values(cursor, """
+            UPDATE sts_ts.attachments a
+            SET blob_sha256 = v.sha256, file_path = v.file_path, file_url = v.file_url,
+                thumbnail_path = NULL, thumbnail_url = NULL, preview_path = NULL, preview_url = NULL,
+                preview_status = CASE WHEN a.preview_status IS NULL THEN NULL ELSE 'PENDING' END
+            FROM (VALUES %s) AS v(id, sha256, file_path, file_url)
+            WHERE a.id = v.id
+        """, [
+            (attachment_id, sha256, blob_file_path(stored_paths[sha256]), blob_file_url(stored_paths[sha256]))
+            for attachment_id, sha256 in moved_rows
+        ], page_size=1000)
+        _record_relocations(cursor, list(relocations.items()))
+    conn.commit()
+    _unlink_old_files(list(relocations))
+    return rows[-1][0], MigrationStats(len(moved_rows), 0, deduplicated, missing)
+
+
+def _migrate_blob_batch(conn, cursor, batch_size: int) -> Optional[int]:
+    """Move one batch of blobs stored before sharding into their shard. Returns the number moved, or None when done."""
+    # Locking the blob rows first makes uploads reusing them wait, so their attachments rows get the new path
+    cursor.execute("""
+        SELECT sha256, relative_path
+        FROM sts_ts.attachment_blobs
+        WHERE relative_path NOT LIKE %s
+        ORDER BY sha256
+        LIMIT %s
+        FOR UPDATE
+    """, (f"{BLOB_DIR}/%/%/%", batch_size))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    moves = []  # (sha256, old relative path, new relative path)
+    for sha256, old_relative_path in rows:
+        new_relative_path = blob_relative_path(sha256, os.path.splitext(old_relative_path)[1])
+        if os.path.exists(blob_file_path(old_relative_path)):
+            _link_into_place(old_relative_path, new_relative_path)
+        moves.append((sha256, old_relative_path, new_relative_path))
+
+    execute_values(cursor, """
+        UPDATE sts_ts.attachment_blobs b
+        SET relative_path = v.new_relative_path
+        FROM (VALUES %s) AS v(sha256, new_relative_path)
+        WHERE b.sha256 = v.sha256
+    """, [(sha256, new_relative_path) for sha256, _, new_relative_path in moves], page_size=1000)
+    execute_values(cursor, """
+        UPDATE sts_ts.attachments a
+        SET file_path = v.file_path, file_url = v.file_url,
+            thumbnail_path = NULL, thumbnail_url = NULL, preview_path = NULL, preview_url = NULL,
+            preview_status = CASE WHEN a.preview_status IS NULL THEN NULL ELSE 'PENDING' END
+        FROM (VALUES %s) AS v(sha256, file_path, file_url)
+        WHERE a.blob_sha256 = v.sha256
+    """, [
+        (sha256, blob_file_path(new_relative_path), blob_file_url(new_relative_path))
+        for sha256, _, new_relative_path in moves
+    ], page_size=1000)
+    _record_relocations(cursor, [(old_relative_path, new_relative_path) for _, old_relative_path, new_relative_path in moves])
+    conn.commit()
+    _unlink_old_files([old_relative_path for _, old_relative_path, _ in moves])
+    return len(moves)
+
+
+def _remove_leftover_files(cursor, batch_size: int) -> int:
+    """Old files of relocations committed by an interrupted run that stopped before removing them."""
+    removed = 0
+    after_path = ''
+    while True:
+        cursor.execute("""
+            SELECT old_relative_path, new_relative_path
+            FROM sts_ts.attachment_relocations
+            WHERE old_relative_path > %s
+            ORDER BY old_relative_path
+            LIMIT %s
+        """, (after_path, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return removed
+        for old_relative_path, new_relative_path in rows:
+            if os.path.exists(blob_file_path(old_relative_path)) and os.path.exists(blob_file_path(new_relative_path)):
+                _unlink_old_files([old_relative_path])
+                removed += 1
+        after_path = rows[-1][0]
+
+
+def migrate_upload_layout(conn, batch_size: int = 200) -> MigrationStats:
+    """
+    Move every stored file into the sharded layout on a synchronous psycopg2 connection,
+    one committed batch at a time, while the API keeps running:
+
+    - attachments uploaded before the blob store are hashed and become blobs (files with
+      the same content are stored once), and their file_path / file_url are rewritten;
+    - blobs from the flat blobs/ directory move into their shard.
+
+    Each old path is recorded in sts_ts.attachment_relocations for the /files resolver.
+    Files are hard linked to the new path before the batch commits and the old path is
+    removed after, so a path in the database always exists. Safe to stop and rerun.
+    """
+    totals = MigrationStats(0, 0, 0, 0)
+    cursor = conn.cursor()
+    try:
+        leftovers = _remove_leftover_files(cursor, batch_size)
+        if leftovers:
+            logger.info(f"[INFO] Upload layout migration: removed {leftovers} file(s) left at their old path by an earlier run")
+        conn.rollback()
+
+        after_id = 0
+        while True:
+            result = _migrate_attachment_batch(conn, cursor, after_id, batch_size)
+            if result is None:
+                break
+            after_id, stats = result
+            totals = totals._replace(
+                attachments=totals.attachments + stats.attachments,
+                deduplicated=totals.deduplicated + stats.deduplicated,
+                missing=totals.missing + stats.missing,
+            )
+            logger.info(f"[INFO] Upload layout migration: attachments up to id {after_id} done, totals {totals}")
+
+        while True:
+            moved = _migrate_blob_batch(conn, cursor, batch_size)
+            if moved is None:
+                break
+            totals = totals._replace(blobs=totals.blobs + moved)
+            logger.info(f"[INFO] Upload layout migration: {totals.blobs} blob(s) moved into shards")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return totals
+
+
+def _load_relocation(old_relative_path: str) -> Optional[str]:
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT new_relative_path
+                FROM sts_ts.attachment_relocations
+                WHERE old_relative_path = %s
+            """, (old_relative_path,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        conn.rollback()
+    finally:
+        release_connection(conn)
+    return row[0] if row else None
+
+
+async def resolve_relocated_path(old_relative_path: str) -> Optional[str]:
+    """Where a file that was under old_relative_path (relative to upload_dir) lives now, or None."""
+    new_relative_path = _relocation_cache.get(old_relative_path)
+    if new_relative_path is None:
+        new_relative_path = await asyncio.to_thread(_load_relocation, old_relative_path)
+        if new_relative_path is None:
+            return None
+        if len(_relocation_cache) >= RELOCATION_CACHE_SIZE:
+            _relocation_cache.clear()
+        _relocation_cache[old_relative_path] = new_relative_path
+    return new_relative_path
+
+
+def _load_is_personal(relative_path: str) -> bool:
+    # Derivatives are as private as the file they were generated from
+    owner_path = derivative_owner(relative_path) or relative_path
+    if owner_path.startswith(BLOB_DIR + '/'):
+        match_column, match_value = "blob_sha256", os.path.basename(owner_path).split('.', 1)[0]
+    else:
+        match_column, match_value = "file_path", blob_file_path(owner_path)
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            # A blob can be shared by several attachments: it stays public while any of them is
+            cursor.execute(f"""
+                SELECT bool_and(parent_type IN %s)
+                FROM sts_ts.attachments
+                WHERE {match_column} = %s
+            """, (PERSONAL_PARENT_TYPES, match_value))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        conn.rollback()
+    finally:
+        release_connection(conn)
+    return bool(row and row[0])
+
+
+async def is_personal_file(relative_path: str) -> bool:
+    """Whether a file under upload_dir belongs only to timesheet entry / leave application attachments."""
+    return await asyncio.to_thread(_load_is_personal, relative_path)
+
+
+class RelocatingStaticFiles(StaticFiles):
+    """
+    StaticFiles for upload_dir that answers requests for files moved by the layout
+    migration (old /files/<name> URLs) with a permanent redirect to their new URL.
+
+    Files of timesheet entries and leave applications (and their thumbnails / previews)
+    are answered with 404 like missing ones: they are only served by the access-checked
+    attachment download. For that to hold, nginx must proxy /files to the API rather
+    than serve upload_dir itself (upload_dir is only exposed as the internal
+    accel_redirect_location).
+    """
+
+    async def get_response(self, path: str, scope):
+        if await is_personal_file(path.replace('\\', '/').lstrip('/')):
+            raise HTTPException(status_code=404)
+        try:
+            response = await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            response = None
+        if response is not None and response.status_code != 404:
+            return response
+
+        new_relative_path = await resolve_relocated_path(path.replace('\\', '/').lstrip('/'))
+        if new_relative_path is None:
+            if response is not None:
+                return response
+            raise HTTPException(status_code=404)
+        return RedirectResponse(url=blob_file_url(new_relative_path), status_code=301)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move stored attachment files into the sharded upload layout.")
+    parser.add_argument("--batch-size", type=int, default=200, help="Attachments or blobs moved per transaction")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        stats = migrate_upload_layout(conn, batch_size=args.batch_size)
+    finally:
+        release_connection(conn)
+        close_pool()
+    print(f"{stats.attachments} attachment(s) moved onto the blob store ({stats.deduplicated} duplicate file(s) dropped), "
+          f"{stats.blobs} blob(s) moved into shards, {stats.missing} attachment(s) without a file left as they are")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# upload_pipeline.py
+
+import sys
+sys.path.append('/opt/stage/src/')
+
+import asyncio
+import hashlib
+import os
+from typing import NamedTuple, Optional
+
+from config import load_config
+from helper_functions import format_file_size
+from utils.logger import get_logger
+
+config = load_config()
+log_dir = config.get('log_dir')
+log_file_name = config.get('log_file_name')
+
+# Initialize logger for this module
+logger = get_logger(log_file_name, log_dir=log_dir)
+
+UPLOAD_CHUNK_SIZE = config.get('upload_chunk_size')
+MAX_FILE_SIZE = config.get('max_file_size')
+MAX_TOTAL_UPLOAD_SIZE = config.get('max_total_upload_size')
+
+
+class UploadTooLarge(ValueError):
+    """An upload crossed the per-file or per-request size limit; nothing of it is left on disk."""
+
+
+class StoredUpload(NamedTuple):
+    file_path: str
+    size: int
+    sha256: str  # hex digest of the content
+
+
+class UploadBudget:
+    """Bytes left for the uploads of one request (the total limit spans all its files)."""
+
+    def __init__(self, limit: int = MAX_TOTAL_UPLOAD_SIZE):
+        self.limit = limit
+        self.used = 0
+
+    def check(self, size: int) -> None:
+        if self.used + size > self.limit:
+            raise UploadTooLarge(f"Total file size cannot exceed {format_file_size(self.limit)}")
+
+
+class UploadDigest(NamedTuple):
+    size: int
+    sha256: str  # hex digest of the content
+
+
+def _write_chunk(handle, hasher, chunk: bytes) -> None:
+    # hashlib releases the GIL on large buffers, so hashing here keeps the event loop free too
+    hasher.update(chunk)
+    handle.write(chunk)
+
+
+def _finish_file(handle, file_path: str) -> None:
+    handle.close()
+    # Readable by the web server that serves the files
+    os.chmod(file_path, 0o644)
+
+
+def _discard_file(handle, file_path: str) -> None:
+    handle.close()
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+class _SizeLimit:
+    """Running size of one upload against the per-file limit and the request's budget."""
+
+    def __init__(self, upload, budget: Optional[UploadBudget], max_file_size: int):
+        self.budget = budget
+        self.max_file_size = max_file_size
+        self.error = f"File '{upload.filename}' is too large. Maximum size is {format_file_size(max_file_size)}"
+        self.size = 0
+        # Reject on the declared size (multipart part length) without reading anything
+        declared_size = getattr(upload, "size", None)
+        if declared_size is not None:
+            self.check(declared_size)
+
+    def check(self, size: int) -> None:
+        if size > self.max_file_size:
+            raise UploadTooLarge(self.error)
+        if self.budget is not None:
+            self.budget.check(size)
+
+    def add(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self.check(self.size)
+
+    def charge(self) -> None:
+        if self.budget is not None:
+            self.budget.used += self.size
+
+
+async def hash_upload(
+    upload,
+    budget: Optional[UploadBudget] = None,
+    max_file_size: int = MAX_FILE_SIZE,
+) -> UploadDigest:
+    """
+    Read a FastAPI UploadFile through in UPLOAD_CHUNK_SIZE chunks for its size and SHA-256
+    without writing it anywhere, under the same limits as save_upload (raising UploadTooLarge
+    early and charging the budget). The upload is left at its end; seek(0) to read it again.
+    """
+    limit = _SizeLimit(upload, budget, max_file_size)
+    hasher = hashlib.sha256()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        limit.add(chunk)
+        await asyncio.to_thread(hasher.update, chunk)
+    limit.charge()
+    return UploadDigest(limit.size, hasher.hexdigest())
+
+
+async def save_upload(
+    upload,
+    file_path: str,
+    budget: Optional[UploadBudget] = None,
+    max_file_size: int = MAX_FILE_SIZE,
+) -> StoredUpload:
+    """
+    Stream a FastAPI UploadFile to file_path in UPLOAD_CHUNK_SIZE chunks, with the disk
+    writes in a worker thread, computing its size and SHA-256 as it goes. Memory use is
+    one chunk whatever the file size.
+
+    Raises UploadTooLarge as soon as the file exceeds max_file_size or the request's
+    budget, before the rest is read; a partial or failed file is removed. The budget is
+    only charged for files that were stored.
+    """
+    limit = _SizeLimit(upload, budget, max_file_size)
+    hasher = hashlib.sha256()
+    handle = await asyncio.to_thread(open, file_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            limit.add(chunk)
+            await asyncio.to_thread(_write_chunk, handle, hasher, chunk)
+        await asyncio.to_thread(_finish_file, handle, file_path)
+    except BaseException:
+        await asyncio.to_thread(_discard_file, handle, file_path)
+        raise
+
+    limit.charge()
+    stored = StoredUpload(file_path, limit.size, hasher.hexdigest())
+    logger.info(f"[INFO] Upload '{upload.filename}' saved to {file_path}: {stored.size} bytes, sha256 {stored.sha256}")
+    return stored